@@ -1,11 +1,17 @@
 import os
 import json
 import time
-import requests
 import logging
-from datetime import datetime, timedelta
 from typing import Dict, Optional, Any, Tuple
 
+try:
+    from .http_pool import get_http_pool
+    from .token_manager import credential_key, get_token_manager
+except ImportError:
+    # For standalone execution
+    from http_pool import get_http_pool
+    from token_manager import credential_key, get_token_manager
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -13,6 +19,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Token fetches run on the shared refresher thread; never let one hang it
+AUTH_REQUEST_TIMEOUT = int(os.getenv("AUTH_REQUEST_TIMEOUT", 30))
+
+# Shared pooled HTTP clients
+http_pool = get_http_pool()
+
 class APIAuthManager:
     """Manages authentication for various financial APIs."""
     
@@ -24,7 +36,6 @@ class APIAuthManager:
             credentials_file: Path to JSON file containing API credentials.
                              If None, credentials are loaded from environment variables.
         """
-        self.tokens = {}  # Store active tokens
         self.credentials = {}  # Store API credentials
         
         # Load credentials from file or environment variables
@@ -32,6 +43,20 @@ class APIAuthManager:
             self._load_credentials_from_file(credentials_file)
         else:
             self._load_credentials_from_env()
+        
+        # OAuth tokens are shared with every client using the same credentials
+        # and renewed in the background before they expire
+        self.token_manager = get_token_manager()
+        cbk = self.credentials.get('cbk', {})
+        mpesa = self.credentials.get('mpesa', {})
+        self.token_names = {
+            'cbk': f"cbk:{credential_key(cbk.get('base_url'), self.credentials.get('rapidapi', {}).get('api_key'))}",
+            'mpesa': f"mpesa:{credential_key(mpesa.get('base_url'), mpesa.get('consumer_key'))}"
+        }
+        if self.credentials.get('rapidapi', {}).get('api_key'):
+            self.token_manager.register(self.token_names['cbk'], self._fetch_cbk_token)
+        if mpesa.get('consumer_key') and mpesa.get('consumer_secret'):
+            self.token_manager.register(self.token_names['mpesa'], self._fetch_mpesa_token)
     
     def _load_credentials_from_file(self, file_path: str) -> None:
         """
@@ -122,17 +147,6 @@ class APIAuthManager:
         Returns:
             Dictionary containing authentication headers
         """
-        # For APIs that use OAuth tokens, check if we have a valid token
-        if api_name in ['mpesa', 'cbk'] and api_name in self.tokens:
-            token_data = self.tokens[api_name]
-            # Check if token is still valid
-            if datetime.now() < token_data['expiry']:
-                return {'Authorization': f"Bearer {token_data['access_token']}"}
-            
-            # Token expired, need to refresh
-            logger.info(f"Token for {api_name} expired, refreshing...")
-        
-        # Get fresh authentication headers
         if api_name == 'nse':
             return self._get_nse_headers()
         elif api_name == 'cbk':
@@ -153,6 +167,25 @@ class APIAuthManager:
             logger.warning(f"Unknown API: {api_name}, returning empty headers")
             return {}
     
+    def get_oauth_token(self, api_name: str) -> Optional[str]:
+        """
+        Get a valid OAuth token from the shared token manager.
+        
+        Args:
+            api_name: Name of the API ('cbk' or 'mpesa')
+            
+        Returns:
+            Access token or None if it could not be obtained
+        """
+        name = self.token_names.get(api_name)
+        if name is None:
+            return None
+        try:
+            return self.token_manager.get_token(name)
+        except Exception as e:
+            logger.error(f"Error getting {api_name} token: {e}")
+            return None
+    
     def _get_nse_headers(self) -> Dict[str, str]:
         """Get authentication headers for NSE API."""
         return {
@@ -164,19 +197,15 @@ class APIAuthManager:
         """
         Get authentication headers for CBK API.
         
-        This method obtains a new OAuth token if needed.
+        The OAuth token comes from the shared token manager.
         """
-        # If we don't have a valid token, get a new one
-        if 'cbk' not in self.tokens or datetime.now() >= self.tokens['cbk']['expiry']:
-            token_response = self._fetch_cbk_token()
-            if token_response:
-                self.tokens['cbk'] = token_response
-            else:
-                logger.error("Failed to obtain CBK token")
-                return {}
+        token = self.get_oauth_token('cbk')
+        if not token:
+            logger.error("Failed to obtain CBK token")
+            return {}
         
         return {
-            'Authorization': f"Bearer {self.tokens['cbk']['access_token']}",
+            'Authorization': f"Bearer {token}",
             'Content-Type': 'application/json',
             'x-rapidapi-key': self.credentials.get('rapidapi', {}).get('api_key', ''),
             'x-rapidapi-host': 'cbk-bonds.p.rapidapi.com'
@@ -197,15 +226,13 @@ class APIAuthManager:
                 'x-rapidapi-host': 'cbk-bonds.p.rapidapi.com'
             }
             
-            response = requests.post(url, headers=headers, json={})
+            response = http_pool.session().post(url, headers=headers, json={}, timeout=AUTH_REQUEST_TIMEOUT)
             if response.status_code == 200:
                 token_data = response.json()
-                # Set token expiry (typically 1 hour, but we'll use the provided expiry if available)
-                expiry_seconds = token_data.get('expires_in', 3600)
-                expiry = datetime.now() + timedelta(seconds=expiry_seconds)
+                # Tokens typically last 1 hour, but we'll use the provided expiry if available
                 return {
                     'access_token': token_data.get('access_token', ''),
-                    'expiry': expiry
+                    'expires_in': token_data.get('expires_in', 3600)
                 }
             else:
                 logger.error(f"CBK token request failed: {response.status_code} {response.text}")
@@ -218,19 +245,15 @@ class APIAuthManager:
         """
         Get authentication headers for M-Pesa API.
         
-        This method obtains a new OAuth token if needed.
+        The OAuth token comes from the shared token manager.
         """
-        # If we don't have a valid token, get a new one
-        if 'mpesa' not in self.tokens or datetime.now() >= self.tokens['mpesa']['expiry']:
-            token_response = self._fetch_mpesa_token()
-            if token_response:
-                self.tokens['mpesa'] = token_response
-            else:
-                logger.error("Failed to obtain M-Pesa token")
-                return {}
+        token = self.get_oauth_token('mpesa')
+        if not token:
+            logger.error("Failed to obtain M-Pesa token")
+            return {}
         
         return {
-            'Authorization': f"Bearer {self.tokens['mpesa']['access_token']}",
+            'Authorization': f"Bearer {token}",
             'Content-Type': 'application/json'
         }
     
@@ -253,14 +276,13 @@ class APIAuthManager:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.get(url, headers=headers)
+            response = http_pool.session().get(url, headers=headers, timeout=AUTH_REQUEST_TIMEOUT)
             if response.status_code == 200:
                 token_data = response.json()
-                # Set token expiry (typically 1 hour)
-                expiry = datetime.now() + timedelta(seconds=3599)
+                # Tokens expire after 1 hour
                 return {
                     'access_token': token_data.get('access_token', ''),
-                    'expiry': expiry
+                    'expires_in': 3599
                 }
             else:
                 logger.error(f"M-Pesa token request failed: {response.status_code} {response.text}")
@@ -337,38 +359,22 @@ class TokenManager:
             auth_manager: The API Authentication Manager instance
         """
         self.auth_manager = auth_manager
-        self.token_refresh_callbacks = {
-            'mpesa': self.auth_manager._fetch_mpesa_token,
-            'cbk': self.auth_manager._fetch_cbk_token,
-            # Add more APIs as needed
-        }
     
     def get_token(self, api_name: str) -> Tuple[bool, Optional[str]]:
         """
         Get a valid token for the specified API.
         
+        Tokens are renewed in the background before they expire and shared
+        across workers, so this rarely waits on a token endpoint.
+        
         Args:
             api_name: Name of the API (e.g., 'mpesa', 'cbk')
             
         Returns:
             Tuple of (success, token_string)
         """
-        # Check if token exists and is valid
-        if api_name in self.auth_manager.tokens:
-            token_data = self.auth_manager.tokens[api_name]
-            # Check if token is still valid
-            if datetime.now() < token_data['expiry']:
-                return True, token_data['access_token']
-        
-        # Token doesn't exist or is expired, try to refresh
-        if api_name in self.token_refresh_callbacks:
-            token_data = self.token_refresh_callbacks[api_name]()
-            if token_data:
-                self.auth_manager.tokens[api_name] = token_data
-                return True, token_data['access_token']
-        
-        # Failed to get or refresh token
-        return False, None
+        token = self.auth_manager.get_oauth_token(api_name)
+        return token is not None, token
 
 
 # Example usage
@@ -0,0 +1,1114 @@
+import os
+import copy
+import json
+import time
+import sys
+import uuid
+import zlib
+import struct
+import asyncio
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+import redis
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('pesaguru.cache')
+
+# Redis configuration for the shared (L2) cache
+REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
+REDIS_DB = int(os.getenv('REDIS_DB', 0))
+REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', None)
+
+# In-process (L1) cache limits
+L1_MAX_ENTRIES = int(os.getenv('CACHE_L1_MAX_ENTRIES', 4096))
+L1_MAX_TTL = int(os.getenv('CACHE_L1_MAX_TTL', 300))  # Upper bound on L1 freshness in seconds
+
+# Prefix applied to every Redis key so namespaces never collide with other apps
+KEY_PREFIX = "pesaguru"
+
+# Seconds to wait before retrying Redis after a connection failure
+REDIS_RETRY_INTERVAL = 30
+
+# Cross-process single-flight lock settings
+LOCK_TTL_MS = int(os.getenv('CACHE_LOCK_TTL_MS', 5000))  # Upper bound on one upstream fetch
+LOCK_POLL_INTERVAL = 0.05  # Seconds between checks while another process loads a key
+
+# Compare-and-delete so a process only releases the lock it holds
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Default TTLs (in seconds) per cache namespace
+NAMESPACE_TTLS = {
+    'forex': 300,
+    'nse_api': 300,
+    'chat_api': 3600,
+    'investments': 300,
+    'macroeconomic': 3600,
+    'inflation': 86400,
+    'news': 1800,
+    'market_data_api': 3600,
+    'market_analysis': 3600,
+}
+
+DEFAULT_TTL = 300
+
+
+class JSONCodec:
+    """JSON codec used for values stored in Redis"""
+
+    @staticmethod
+    def _default(value: Any) -> Any:
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        # NumPy scalars and arrays expose item()/tolist()
+        if hasattr(value, 'tolist'):
+            return value.tolist()
+        if hasattr(value, 'item'):
+            return value.item()
+        return str(value)
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, default=self._default, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class ColumnarCodec(JSONCodec):
+    """
+    Compact binary codec for time-series payloads.
+
+    Lists of uniform records (e.g. daily OHLCV bars) are stored column by column:
+    numeric columns become packed little-endian float64/int64 arrays and everything else stays
+    in a JSON skeleton. The result is optionally zlib-compressed. Values written
+    by JSONCodec are still readable, so a namespace can switch codecs in place.
+    Columns mixing ints and floats decode as floats, as they would from JSON
+    through pandas.
+    """
+
+    MAGIC = b'PGC1'
+    FLAG_ZLIB = 0x01
+    COLUMNS_TAG = '__columns__'
+    MIN_ROWS = 2  # Shorter lists gain nothing from the columnar layout
+
+    def __init__(self, compress: bool = True, compress_level: int = 6, min_compress_bytes: int = 512):
+        """
+        Args:
+            compress: Whether to zlib-compress encoded payloads
+            compress_level: zlib compression level (1-9)
+            min_compress_bytes: Payloads smaller than this are stored uncompressed
+        """
+        self.compress = compress
+        self.compress_level = compress_level
+        self.min_compress_bytes = min_compress_bytes
+
+    def dumps(self, value: Any) -> bytes:
+        buffers = []
+        skeleton = self._encode(value, buffers)
+        meta = json.dumps(
+            {'v': skeleton, 'b': [len(buf) for buf in buffers]},
+            default=self._default, separators=(',', ':')
+        ).encode('utf-8')
+        payload = struct.pack('<I', len(meta)) + meta + b''.join(buffers)
+
+        flags = 0
+        if self.compress and len(payload) >= self.min_compress_bytes:
+            payload = zlib.compress(payload, self.compress_level)
+            flags |= self.FLAG_ZLIB
+        return self.MAGIC + bytes([flags]) + payload
+
+    def loads(self, data: bytes) -> Any:
+        if not data.startswith(self.MAGIC):
+            # Entry written before the namespace switched to this codec
+            return super().loads(data)
+
+        flags = data[len(self.MAGIC)]
+        payload = data[len(self.MAGIC) + 1:]
+        if flags & self.FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+
+        (meta_len,) = struct.unpack_from('<I', payload)
+        meta = json.loads(payload[4:4 + meta_len])
+        buffers = []
+        offset = 4 + meta_len
+        for size in meta['b']:
+            buffers.append(payload[offset:offset + size])
+            offset += size
+        return self._decode(meta['v'], buffers)
+
+    def _encode(self, value: Any, buffers: list) -> Any:
+        if isinstance(value, dict):
+            return {k: self._encode(v, buffers) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            if self._is_record_list(value):
+                return self._encode_records(value, buffers)
+            return [self._encode(v, buffers) for v in value]
+        return value
+
+    def _is_record_list(self, value) -> bool:
+        if len(value) < self.MIN_ROWS or not isinstance(value[0], dict):
+            return False
+        fields = list(value[0].keys())
+        if not all(isinstance(field, str) for field in fields):
+            return False
+        return all(isinstance(row, dict) and list(row.keys()) == fields for row in value)
+
+    def _encode_records(self, rows: list, buffers: list) -> Dict[str, Any]:
+        columns = {}
+        for field in rows[0].keys():
+            values = [row[field] for row in rows]
+            dtype = self._numeric_dtype(values)
+            if dtype is None:
+                columns[field] = [self._encode(v, buffers) for v in values]
+            else:
+                packed = array(dtype, values)
+                if sys.byteorder != 'little':
+                    packed.byteswap()
+                columns[field] = {'buf': len(buffers), 'dtype': dtype}
+                buffers.append(packed.tobytes())
+        return {self.COLUMNS_TAG: list(rows[0].keys()), 'n': len(rows), 'cols': columns}
+
+    @staticmethod
+    def _numeric_dtype(values: list) -> Optional[str]:
+        """Pick a packed array typecode for a column, or None if it is not purely numeric"""
+        has_float = False
+        for v in values:
+            if isinstance(v, bool) or not isinstance(v, (int, float)):
+                return None
+            if isinstance(v, float):
+                has_float = True
+            elif not -2**63 <= v < 2**63:
+                return None
+        # Little-endian float64 / int64
+        return 'd' if has_float else 'q'
+
+    def _decode(self, value: Any, buffers: list) -> Any:
+        if isinstance(value, dict):
+            if self.COLUMNS_TAG in value:
+                return self._decode_records(value, buffers)
+            return {k: self._decode(v, buffers) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._decode(v, buffers) for v in value]
+        return value
+
+    def _decode_records(self, encoded: Dict[str, Any], buffers: list) -> list:
+        columns = []
+        for field in encoded[self.COLUMNS_TAG]:
+            column = encoded['cols'][field]
+            if isinstance(column, dict):
+                packed = array(column['dtype'])
+                packed.frombytes(buffers[column['buf']])
+                if sys.byteorder != 'little':
+                    packed.byteswap()
+                columns.append(packed.tolist())
+            else:
+                columns.append([self._decode(v, buffers) for v in column])
+        if not columns:
+            return [{} for _ in range(encoded['n'])]
+        fields = encoded[self.COLUMNS_TAG]
+        return [dict(zip(fields, row)) for row in zip(*columns)]
+
+
+class NamespaceConfig:
+    """Caching policy for one namespace"""
+
+    def __init__(self, ttl: int, l1_ttl: Optional[int] = None, use_l2: bool = True, codec=None):
+        """
+        Args:
+            ttl: Time-to-live in seconds for entries in this namespace
+            l1_ttl: Optional shorter lifetime for the in-process copy
+            use_l2: Whether entries are shared through Redis
+            codec: Object with dumps()/loads() used for Redis values
+        """
+        self.ttl = ttl
+        self.l1_ttl = l1_ttl
+        self.use_l2 = use_l2
+        self.codec = codec or JSONCodec()
+
+
+class CacheMetrics:
+    """Hit/miss/latency counters for one namespace"""
+
+    def __init__(self):
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.errors = 0
+        self.coalesced = 0
+        self.l2_get_seconds = 0.0
+        self.l2_get_count = 0
+        self.load_seconds = 0.0
+        self.load_count = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return {
+            'l1_hits': self.l1_hits,
+            'l2_hits': self.l2_hits,
+            'misses': self.misses,
+            'sets': self.sets,
+            'errors': self.errors,
+            'coalesced': self.coalesced,
+            'hit_rate': round((self.l1_hits + self.l2_hits) / lookups, 4) if lookups else 0.0,
+            'avg_l2_get_ms': round(self.l2_get_seconds / self.l2_get_count * 1000, 3) if self.l2_get_count else 0.0,
+            'avg_load_ms': round(self.load_seconds / self.load_count * 1000, 3) if self.load_count else 0.0,
+        }
+
+
+# Values that can be shared between callers without copying
+IMMUTABLE_TYPES = (str, bytes, int, float, bool, type(None))
+
+
+def _private_copy(value: Any) -> Any:
+    """Deep copy of a cached value, so callers never mutate what another caller reads"""
+    if isinstance(value, IMMUTABLE_TYPES):
+        return value
+    return copy.deepcopy(value)
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded in-process cache with per-entry expiry.
+
+    Values are copied on the way in and on the way out, so mutating a value
+    returned by get() (or passed to set()) never changes the cached entry.
+    """
+
+    def __init__(self, max_entries: int = L1_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return _private_copy(value)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        value = _private_copy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _Flight:
+    """An in-progress load that concurrent callers for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TieredCache:
+    """
+    Two-tier cache shared by the PesaGuru API integrations.
+
+    Reads check the in-process LRU (L1) first, then Redis (L2). L1 hits skip the
+    network round-trip and the deserialization; each caller gets its own copy of
+    the value, so callers may modify what they are given.
+
+    get_or_set()/aget_or_set() coalesce concurrent misses for the same key: within a
+    process only one thread or task runs the loader and the others await its result,
+    and across processes a short Redis lock lets one worker fetch while the rest wait
+    for the value to land in Redis. The async methods run their Redis calls on a
+    worker thread, so a slow Redis never blocks the event loop.
+
+    get_stale_while_revalidate() serves an expired value immediately, up to a hard
+    staleness bound, while a background thread fetches a replacement.
+    """
+
+    def __init__(self, max_entries: int = L1_MAX_ENTRIES, redis_client=None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries held in the L1 cache
+            redis_client: Optional Redis client; created from environment if omitted
+        """
+        self.l1 = LRUCache(max_entries)
+        self._redis = redis_client
+        self._redis_retry_at = 0.0
+        self._namespaces: Dict[str, NamespaceConfig] = {
+            name: NamespaceConfig(ttl) for name, ttl in NAMESPACE_TTLS.items()
+        }
+        self._metrics: Dict[str, CacheMetrics] = {}
+        self._lock = threading.Lock()
+
+        # In-flight loads, keyed by full cache key (threads) or (loop id, key) (asyncio)
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[tuple, asyncio.Future] = {}
+        self._refreshing = set()
+        self._flights_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Configuration
+    # ------------------------------------------------------------------
+
+    def configure_namespace(self, namespace: str, ttl: Optional[int] = None,
+                            l1_ttl: Optional[int] = None, use_l2: Optional[bool] = None,
+                            codec=None) -> NamespaceConfig:
+        """
+        Create or update the caching policy for a namespace.
+
+        Args:
+            namespace: Namespace name
+            ttl: Time-to-live in seconds
+            l1_ttl: Optional shorter lifetime for the in-process copy
+            use_l2: Whether entries are shared through Redis
+            codec: Object with dumps()/loads() used for Redis values
+
+        Returns:
+            NamespaceConfig: The resulting configuration
+        """
+        with self._lock:
+            config = self._namespaces.get(namespace)
+            if config is None:
+                config = NamespaceConfig(ttl if ttl is not None else DEFAULT_TTL)
+                self._namespaces[namespace] = config
+            if ttl is not None:
+                config.ttl = ttl
+            if l1_ttl is not None:
+                config.l1_ttl = l1_ttl
+            if use_l2 is not None:
+                config.use_l2 = use_l2
+            if codec is not None:
+                config.codec = codec
+            return config
+
+    def _config(self, namespace: str) -> NamespaceConfig:
+        config = self._namespaces.get(namespace)
+        if config is None:
+            config = self.configure_namespace(namespace)
+        return config
+
+    def _stats(self, namespace: str) -> CacheMetrics:
+        metrics = self._metrics.get(namespace)
+        if metrics is None:
+            with self._lock:
+                metrics = self._metrics.setdefault(namespace, CacheMetrics())
+        return metrics
+
+    @staticmethod
+    def make_key(*parts: Any, **params: Any) -> str:
+        """
+        Build a canonical cache key from positional parts and keyword parameters.
+
+        Keyword parameters are sorted so that argument order never changes the key.
+
+        Returns:
+            str: The cache key
+        """
+        segments = [str(part) for part in parts]
+        if params:
+            segments.append(json.dumps(params, sort_keys=True, default=str, separators=(',', ':')))
+        return ":".join(segments)
+
+    def _full_key(self, namespace: str, key: str) -> str:
+        return f"{KEY_PREFIX}:{namespace}:{key}"
+
+    # ------------------------------------------------------------------
+    # Redis connection
+    # ------------------------------------------------------------------
+
+    def _get_redis(self):
+        """Return a live Redis client, or None while Redis is unreachable"""
+        if self._redis is not None:
+            return self._redis
+        if time.monotonic() < self._redis_retry_at:
+            return None
+
+        try:
+            client = redis.Redis(
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                db=REDIS_DB,
+                password=REDIS_PASSWORD,
+                socket_connect_timeout=1,
+                socket_timeout=1
+            )
+            client.ping()
+            self._redis = client
+            logger.info("Shared cache connected to Redis")
+        except Exception as e:
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+            logger.warning(f"Redis unavailable for shared cache, using in-process cache only: {e}")
+        return self._redis
+
+    def _redis_failed(self, namespace: str, error: Exception) -> None:
+        self._stats(namespace).errors += 1
+        logger.warning(f"Redis cache error in namespace '{namespace}': {error}")
+        if isinstance(error, redis.exceptions.ConnectionError):
+            self._redis = None
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+
+    # ------------------------------------------------------------------
+    # Cache operations
+    # ------------------------------------------------------------------
+
+    def get(self, namespace: str, key: str) -> Any:
+        """
+        Get a value from the cache.
+
+        Args:
+            namespace: Cache namespace
+            key: Key within the namespace
+
+        Returns:
+            Any: Cached value, or None if not found
+        """
+        metrics = self._stats(namespace)
+        full_key = self._full_key(namespace, key)
+
+        value = self.l1.get(full_key)
+        if value is not None:
+            metrics.l1_hits += 1
+            return value
+
+        value = self._read_l2(namespace, full_key)
+        if value is not None:
+            metrics.l2_hits += 1
+            return value
+
+        metrics.misses += 1
+        return None
+
+    async def aget(self, namespace: str, key: str) -> Any:
+        """Async variant of get(); only L1 misses leave the event loop"""
+        value = self.l1.get(self._full_key(namespace, key))
+        if value is not None:
+            self._stats(namespace).l1_hits += 1
+            return value
+        return await self._off_loop(namespace, self.get, namespace, key)
+
+    async def aset(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """Async variant of set() that writes Redis from a worker thread"""
+        return await self._off_loop(namespace, self.set, namespace, key, value, ttl)
+
+    async def _off_loop(self, namespace: str, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a cache call that may reach Redis on a worker thread"""
+        if not self._config(namespace).use_l2:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Get several values, reading every L1 miss from Redis in one round-trip.
+
+        Args:
+            namespace: Cache namespace
+            keys: Keys within the namespace
+
+        Returns:
+            Dict[str, Any]: Cached values for the keys that were found
+        """
+        metrics = self._stats(namespace)
+        found = {}
+        pending = {}  # full key -> key
+
+        for key in dict.fromkeys(keys):
+            full_key = self._full_key(namespace, key)
+            value = self.l1.get(full_key)
+            if value is not None:
+                metrics.l1_hits += 1
+                found[key] = value
+            else:
+                pending[full_key] = key
+
+        if pending:
+            l2_values = self._read_l2_many(namespace, list(pending))
+            for full_key, key in pending.items():
+                value = l2_values.get(full_key)
+                if value is not None:
+                    metrics.l2_hits += 1
+                    found[key] = value
+                else:
+                    metrics.misses += 1
+
+        return found
+
+    def _read_l2_many(self, namespace: str, full_keys: list) -> Dict[str, Any]:
+        """Read values from Redis with one MGET (plus TTLs in the same pipeline) and copy them into L1"""
+        config = self._config(namespace)
+        if not config.use_l2:
+            return {}
+
+        client = self._get_redis()
+        if client is None:
+            return {}
+
+        metrics = self._stats(namespace)
+        start = time.perf_counter()
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.mget(full_keys)
+            for full_key in full_keys:
+                pipe.pttl(full_key)
+            replies = pipe.execute()
+        except Exception as e:
+            self._redis_failed(namespace, e)
+            return {}
+        finally:
+            metrics.l2_get_seconds += time.perf_counter() - start
+            metrics.l2_get_count += 1
+
+        values = {}
+        for full_key, data, remaining_ms in zip(full_keys, replies[0], replies[1:]):
+            if data is None:
+                continue
+            try:
+                value = config.codec.loads(data)
+            except Exception as e:
+                metrics.errors += 1
+                logger.warning(f"Failed to decode cached value for {full_key}: {e}")
+                continue
+            if value is not None:
+                remaining = remaining_ms / 1000 if remaining_ms and remaining_ms > 0 else config.ttl
+                self.l1.set(full_key, value, self._l1_ttl(config, remaining))
+                values[full_key] = value
+        return values
+
+    def _read_l2(self, namespace: str, full_key: str) -> Any:
+        """Read a value from Redis and copy it into L1, without counting a lookup"""
+        config = self._config(namespace)
+        if not config.use_l2:
+            return None
+
+        client = self._get_redis()
+        if client is None:
+            return None
+
+        metrics = self._stats(namespace)
+        start = time.perf_counter()
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.get(full_key)
+            pipe.pttl(full_key)
+            data, remaining_ms = pipe.execute()
+        except Exception as e:
+            self._redis_failed(namespace, e)
+            return None
+        finally:
+            metrics.l2_get_seconds += time.perf_counter() - start
+            metrics.l2_get_count += 1
+
+        if data is None:
+            return None
+
+        try:
+            value = config.codec.loads(data)
+        except Exception as e:
+            metrics.errors += 1
+            logger.warning(f"Failed to decode cached value for {full_key}: {e}")
+            return None
+
+        if value is not None:
+            remaining = remaining_ms / 1000 if remaining_ms and remaining_ms > 0 else config.ttl
+            self.l1.set(full_key, value, self._l1_ttl(config, remaining))
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """
+        Store a value in both cache tiers.
+
+        Args:
+            namespace: Cache namespace
+            key: Key within the namespace
+            value: Value to cache
+            ttl: Optional TTL in seconds overriding the namespace default
+
+        Returns:
+            bool: True if the value reached Redis (or Redis is not used), False otherwise
+        """
+        config = self._config(namespace)
+        metrics = self._stats(namespace)
+        full_key = self._full_key(namespace, key)
+        ttl = ttl if ttl is not None else config.ttl
+
+        self.l1.set(full_key, value, self._l1_ttl(config, ttl))
+        metrics.sets += 1
+
+        if not config.use_l2:
+            return True
+
+        client = self._get_redis()
+        if client is None:
+            return False
+
+        try:
+            client.setex(full_key, int(max(1, ttl)), config.codec.dumps(value))
+            return True
+        except Exception as e:
+            self._redis_failed(namespace, e)
+            return False
+
+    def set_many(self, namespace: str, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """
+        Store several values in both cache tiers, writing Redis in one pipeline.
+
+        Args:
+            namespace: Cache namespace
+            items: Values keyed by key within the namespace
+            ttl: Optional TTL in seconds overriding the namespace default
+
+        Returns:
+            bool: True if the values reached Redis (or Redis is not used), False otherwise
+        """
+        if not items:
+            return True
+
+        config = self._config(namespace)
+        metrics = self._stats(namespace)
+        ttl = ttl if ttl is not None else config.ttl
+        l1_ttl = self._l1_ttl(config, ttl)
+
+        full_items = {self._full_key(namespace, key): value for key, value in items.items()}
+        for full_key, value in full_items.items():
+            self.l1.set(full_key, value, l1_ttl)
+        metrics.sets += len(full_items)
+
+        if not config.use_l2:
+            return True
+
+        client = self._get_redis()
+        if client is None:
+            return False
+
+        try:
+            pipe = client.pipeline(transaction=False)
+            for full_key, value in full_items.items():
+                pipe.setex(full_key, int(max(1, ttl)), config.codec.dumps(value))
+            pipe.execute()
+            return True
+        except Exception as e:
+            self._redis_failed(namespace, e)
+            return False
+
+    def delete(self, namespace: str, key: str) -> None:
+        """
+        Remove a value from both cache tiers.
+
+        Args:
+            namespace: Cache namespace
+            key: Key within the namespace
+        """
+        full_key = self._full_key(namespace, key)
+        self.l1.delete(full_key)
+
+        client = self._get_redis() if self._config(namespace).use_l2 else None
+        if client is not None:
+            try:
+                client.delete(full_key)
+            except Exception as e:
+                self._redis_failed(namespace, e)
+
+    def get_or_set(self, namespace: str, key: str, loader: Callable[[], Any],
+                   ttl: Union[int, Callable[[Any], int], None] = None) -> Any:
+        """
+        Return the cached value, calling loader() and caching its result on a miss.
+
+        Concurrent misses for the same key are coalesced so that loader() runs once.
+        Falsy loader results are returned but not cached.
+
+        Args:
+            namespace: Cache namespace
+            key: Key within the namespace
+            loader: Function producing the value on a miss
+            ttl: Optional TTL in seconds overriding the namespace default, or a
+                function computing it from the loaded value
+
+        Returns:
+            Any: Cached or freshly loaded value
+        """
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+
+        full_key = self._full_key(namespace, key)
+        with self._flights_lock:
+            flight = self._flights.get(full_key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _Flight()
+                self._flights[full_key] = flight
+
+        if not is_leader:
+            self._stats(namespace).coalesced += 1
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._load_once(namespace, key, full_key, loader, ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(full_key, None)
+            flight.done.set()
+
+    def _load_once(self, namespace: str, key: str, full_key: str,
+                   loader: Callable[[], Any], ttl: Union[int, Callable[[Any], int], None]) -> Any:
+        """Run loader() under the cross-process lock, or wait for the lock holder's value"""
+        token = self._acquire_lock(namespace, full_key)
+        if token is None:
+            self._stats(namespace).coalesced += 1
+            deadline = time.monotonic() + LOCK_TTL_MS / 1000
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                value = self._read_l2(namespace, full_key)
+                if value is not None:
+                    return value
+            # The lock holder failed or produced nothing cacheable; load locally
+            logger.debug(f"Timed out waiting for {full_key}, loading locally")
+
+        try:
+            start = time.perf_counter()
+            value = loader()
+            self._record_load(namespace, start)
+
+            if value:
+                self.set(namespace, key, value, ttl(value) if callable(ttl) else ttl)
+            return value
+        finally:
+            if token:
+                self._release_lock(namespace, full_key, token)
+
+    async def aget_or_set(self, namespace: str, key: str, loader: Callable[[], Any],
+                          ttl: Union[int, Callable[[Any], int], None] = None) -> Any:
+        """
+        Async variant of get_or_set() for coroutine loaders.
+
+        Concurrent misses for the same key within an event loop share one loader
+        call; other processes are coordinated through the Redis lock.
+
+        Args:
+            namespace: Cache namespace
+            key: Key within the namespace
+            loader: Coroutine function producing the value on a miss
+            ttl: Optional TTL in seconds overriding the namespace default, or a
+                function computing it from the loaded value
+
+        Returns:
+            Any: Cached or freshly loaded value
+        """
+        value = await self.aget(namespace, key)
+        if value is not None:
+            return value
+
+        full_key = self._full_key(namespace, key)
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), full_key)
+        with self._flights_lock:
+            future = self._async_flights.get(flight_key)
+            is_leader = future is None
+            if is_leader:
+                future = loop.create_future()
+                self._async_flights[flight_key] = future
+
+        if not is_leader:
+            self._stats(namespace).coalesced += 1
+            # Shield so a cancelled waiter does not cancel the shared load
+            return await asyncio.shield(future)
+
+        try:
+            value = await self._aload_once(namespace, key, full_key, loader, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure is not logged as lost
+            future.exception()
+            raise
+        finally:
+            with self._flights_lock:
+                self._async_flights.pop(flight_key, None)
+
+    async def _aload_once(self, namespace: str, key: str, full_key: str,
+                          loader: Callable[[], Any], ttl: Union[int, Callable[[Any], int], None]) -> Any:
+        """Async counterpart of _load_once()"""
+        token = await self._off_loop(namespace, self._acquire_lock, namespace, full_key)
+        if token is None:
+            self._stats(namespace).coalesced += 1
+            deadline = time.monotonic() + LOCK_TTL_MS / 1000
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+                value = await self._off_loop(namespace, self._read_l2, namespace, full_key)
+                if value is not None:
+                    return value
+            logger.debug(f"Timed out waiting for {full_key}, loading locally")
+
+        try:
+            start = time.perf_counter()
+            value = await loader()
+            self._record_load(namespace, start)
+
+            if value:
+                await self.aset(namespace, key, value, ttl(value) if callable(ttl) else ttl)
+            return value
+        finally:
+            if token:
+                await self._off_loop(namespace, self._release_lock, namespace, full_key, token)
+
+    def get_stale_while_revalidate(self, namespace: str, key: str, loader: Callable[[], Any],
+                                   ttl: Optional[int] = None,
+                                   max_stale: Optional[int] = None) -> Tuple[Any, float, bool]:
+        """
+        Return a cached value without waiting on the upstream once it has been loaded.
+
+        Values younger than ttl are returned as fresh. Values older than ttl but
+        within ttl + max_stale are returned immediately and flagged stale while a
+        background thread reloads them. Anything older (or a cold cache) is loaded
+        synchronously, with concurrent callers coalesced.
+
+        Args:
+            namespace: Cache namespace
+            key: Key within the namespace
+            loader: Function producing the value
+            ttl: Seconds a value counts as fresh (namespace default if omitted)
+            max_stale: Seconds past ttl a value may still be served (defaults to ttl)
+
+        Returns:
+            Tuple[Any, float, bool]: The value, its age in seconds and whether it is stale
+        """
+        ttl = ttl if ttl is not None else self._config(namespace).ttl
+        max_stale = max_stale if max_stale is not None else ttl
+        retention = ttl + max_stale
+        envelope_key = f"{key}:swr"
+        full_key = self._full_key(namespace, envelope_key)
+
+        envelope = self.get(namespace, envelope_key)
+        if envelope is not None:
+            age = time.time() - envelope['fetched_at']
+            if age >= ttl:
+                # Another worker may already have refreshed the shared copy
+                newer = self._read_l2(namespace, full_key)
+                if newer is not None and newer['fetched_at'] > envelope['fetched_at']:
+                    envelope = newer
+                    age = time.time() - envelope['fetched_at']
+
+            if age < ttl:
+                return envelope['value'], age, False
+            if age < retention:
+                self._refresh_in_background(namespace, envelope_key, loader, retention)
+                return envelope['value'], age, True
+
+            # Past the hard staleness bound; never serve it
+            self.delete(namespace, envelope_key)
+
+        envelope = self.get_or_set(namespace, envelope_key,
+                                   lambda: self._make_envelope(loader()), ttl=retention)
+        if envelope is None:
+            return None, 0.0, False
+        return envelope['value'], time.time() - envelope['fetched_at'], False
+
+    @staticmethod
+    def _make_envelope(value: Any) -> Optional[Dict[str, Any]]:
+        if not value:
+            return None
+        return {'value': value, 'fetched_at': time.time()}
+
+    def _refresh_in_background(self, namespace: str, envelope_key: str,
+                               loader: Callable[[], Any], retention: int) -> None:
+        """Reload a stale value on a daemon thread, at most once per key at a time"""
+        full_key = self._full_key(namespace, envelope_key)
+        with self._flights_lock:
+            if full_key in self._refreshing:
+                return
+            self._refreshing.add(full_key)
+
+        def refresh():
+            token = self._acquire_lock(namespace, full_key)
+            try:
+                if token is None:
+                    # Another worker is refreshing; its value will reach Redis
+                    return
+                start = time.perf_counter()
+                envelope = self._make_envelope(loader())
+                self._record_load(namespace, start)
+                if envelope is not None:
+                    self.set(namespace, envelope_key, envelope, retention)
+            except Exception as e:
+                logger.warning(f"Background refresh of {full_key} failed, serving stale value: {e}")
+            finally:
+                if token:
+                    self._release_lock(namespace, full_key, token)
+                with self._flights_lock:
+                    self._refreshing.discard(full_key)
+
+        threading.Thread(target=refresh, name=f"cache-refresh:{envelope_key}", daemon=True).start()
+
+    def _acquire_lock(self, namespace: str, full_key: str) -> Any:
+        """
+        Try to take the cross-process load lock for a key.
+
+        Returns:
+            A token to release the lock with, None if another process holds it,
+            or False if Redis is not in use (load without coordination)
+        """
+        if not self._config(namespace).use_l2:
+            return False
+
+        client = self._get_redis()
+        if client is None:
+            return False
+
+        token = uuid.uuid4().hex
+        try:
+            if client.set(f"{full_key}:lock", token, nx=True, px=LOCK_TTL_MS):
+                return token
+            return None
+        except Exception as e:
+            self._redis_failed(namespace, e)
+            return False
+
+    @contextmanager
+    def load_lock(self, namespace: str, key: str):
+        """
+        Hold the cross-process load lock for a key around a custom load.
+
+        For callers that decide themselves when a cached value must be replaced
+        (get_or_set() only loads on a miss).
+
+        Args:
+            namespace: Cache namespace
+            key: Key within the namespace
+
+        Yields:
+            bool: True if this process should load (it holds the lock, or Redis is
+            not in use), False if another process is loading the key
+        """
+        full_key = self._full_key(namespace, key)
+        token = self._acquire_lock(namespace, full_key)
+        try:
+            yield token is not None
+        finally:
+            if token:
+                self._release_lock(namespace, full_key, token)
+
+    def _release_lock(self, namespace: str, full_key: str, token: str) -> None:
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            client.eval(RELEASE_LOCK_SCRIPT, 1, f"{full_key}:lock", token)
+        except Exception as e:
+            self._redis_failed(namespace, e)
+
+    def _record_load(self, namespace: str, start: float) -> None:
+        metrics = self._stats(namespace)
+        metrics.load_seconds += time.perf_counter() - start
+        metrics.load_count += 1
+
+    @staticmethod
+    def _l1_ttl(config: NamespaceConfig, ttl: float) -> float:
+        l1_ttl = min(ttl, L1_MAX_TTL)
+        if config.l1_ttl is not None:
+            l1_ttl = min(l1_ttl, config.l1_ttl)
+        return l1_ttl
+
+    def clear_local(self) -> None:
+        """Drop every entry from the in-process cache"""
+        self.l1.clear()
+
+    def stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get cache metrics.
+
+        Args:
+            namespace: Optional namespace to report; all namespaces if omitted
+
+        Returns:
+            Dict: Metrics per namespace plus the L1 size
+        """
+        if namespace is not None:
+            return self._stats(namespace).to_dict()
+
+        return {
+            'l1_entries': len(self.l1),
+            'l1_max_entries': self.l1.max_entries,
+            'redis_connected': self._redis is not None,
+            'namespaces': {name: metrics.to_dict() for name, metrics in list(self._metrics.items())},
+        }
+
+
+def with_staleness_marker(value: Any, age_seconds: float, is_stale: bool) -> Any:
+    """
+    Attach staleness information to a dict served by get_stale_while_revalidate().
+
+    Args:
+        value: The cached value
+        age_seconds: Age of the value in seconds
+        is_stale: Whether the value is past its freshness TTL
+
+    Returns:
+        Any: A copy of dict values with 'stale' and 'data_age_seconds' keys added;
+        other values are returned unchanged
+    """
+    if not isinstance(value, dict):
+        return value
+    marked = dict(value)
+    marked['stale'] = is_stale
+    marked['data_age_seconds'] = round(age_seconds, 1)
+    return marked
+
+
+_cache_instance = None
+_cache_instance_lock = threading.Lock()
+
+
+def get_cache() -> TieredCache:
+    """
+    Get the process-wide shared cache.
+
+    Returns:
+        TieredCache: The shared cache instance
+    """
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_instance_lock:
+            if _cache_instance is None:
+                _cache_instance = TieredCache()
+    return _cache_instance
@@ -10,10 +10,23 @@ from functools import lru_cache
 
 import httpx
 import redis
+import requests
 from pydantic import BaseSettings, Field
 from fastapi import HTTPException, status, Depends
 from fastapi.responses import JSONResponse
 
+try:
+    from .http_pool import get_http_pool
+    from .market_hours import CBK_DAILY, CBK_WEEKLY, policy_ttl
+    from .snapshot_store import get_snapshot_store
+    from .token_manager import TokenUnavailable, credential_key, get_token_manager
+except ImportError:
+    # For standalone execution
+    from http_pool import get_http_pool
+    from market_hours import CBK_DAILY, CBK_WEEKLY, policy_ttl
+    from snapshot_store import get_snapshot_store
+    from token_manager import TokenUnavailable, credential_key, get_token_manager
+
 # Configure logging with more structured format
 logging.basicConfig(
     level=logging.INFO,
@@ -82,8 +95,25 @@ class CacheExpiry(Enum):
     TREASURY = 86400       # 24 hours
     CURRENCIES = 604800    # 1 week
     ECONOMIC = 86400       # 24 hours
+    
+    def ttl(self) -> int:
+        """Expiry adjusted to the CBK publication calendar (longer over weekends and holidays)"""
+        return policy_ttl(self.value, CACHE_DATA_CLASS.get(self))
+
+
+# When each kind of CBK data is next published (ECONOMIC has TREASURY's value, so
+# Enum makes it an alias; monthly indicators are served on the weekly schedule too)
+CACHE_DATA_CLASS = {
+    CacheExpiry.FOREX: CBK_DAILY,
+    CacheExpiry.INTEREST_RATES: CBK_DAILY,
+    CacheExpiry.MONETARY_POLICY: CBK_DAILY,
+    CacheExpiry.TREASURY: CBK_WEEKLY,
+}
 
 
+# Shared keep-alive HTTP connection pools
+http_pool = get_http_pool()
+
 # Initialize Redis client for caching with better error handling
 redis_client = None
 try:
@@ -137,8 +167,6 @@ class CBKApi:
         self.client_id = settings.cbk_client_id
         self.client_secret = settings.cbk_client_secret
         self.token_url = settings.cbk_token_url
-        self.access_token = None
-        self.token_expires_at = 0
         self.request_timeout = settings.api_request_timeout
         
         # Initialize async HTTP client with connection pooling
@@ -153,9 +181,14 @@ class CBKApi:
         self.rate_limit_reset = time.time() + 3600
         self.rate_limit_max = 1000  # Assumed max requests per hour
         
+        # Auth tokens are shared by every CBK client and renewed in the background
+        self.token_name = f"cbk:{credential_key(self.token_url, self.client_id)}"
+        
         # Check if credentials are available
         if not self.client_id or not self.client_secret:
             logger.warning("CBK API credentials not found in environment variables")
+        else:
+            get_token_manager().register(self.token_name, self._request_auth_token)
     
     async def __aenter__(self):
         """Async context manager entry."""
@@ -195,8 +228,9 @@ class CBKApi:
     
     async def _get_auth_token(self) -> str:
         """
-        Get a valid authentication token for CBK API with async implementation.
-        Handles token refresh if expired.
+        Get a valid authentication token for CBK API.
+        The shared token manager renews tokens before they expire, so this
+        only waits on the token endpoint when no valid token exists yet.
         
         Returns:
             str: Valid access token
@@ -204,22 +238,33 @@ class CBKApi:
         Raises:
             CBKApiAuthError: If authentication fails
         """
-        # Check if token exists and is not expired
-        current_time = time.time()
-        if self.access_token and current_time < self.token_expires_at:
-            return self.access_token
+        try:
+            return await get_token_manager().aget_token(self.token_name)
+        except TokenUnavailable as e:
+            raise CBKApiAuthError(str(e))
+    
+    def _request_auth_token(self) -> Dict:
+        """
+        Request a new token from the CBK OAuth endpoint (called by the token manager).
+        
+        Returns:
+            Dict: Token response with access_token and expires_in
         
-        # Request new token
+        Raises:
+            CBKApiAuthError: If authentication fails
+            CBKApiError: If the token endpoint cannot be reached
+        """
         try:
             logger.info("Requesting new CBK API auth token")
-            response = await self.http_client.post(
+            response = http_pool.session().post(
                 self.token_url,
                 data={
                     "grant_type": "client_credentials",
                     "client_id": self.client_id,
                     "client_secret": self.client_secret
                 },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=self.request_timeout
             )
             
             if response.status_code != 200:
@@ -227,16 +272,9 @@ class CBKApi:
                 logger.error(error_msg)
                 raise CBKApiAuthError(error_msg)
                 
-            token_data = response.json()
-            self.access_token = token_data.get("access_token")
-            
-            # Set expiry time with a buffer (5 min) before actual expiry
-            expires_in = token_data.get("expires_in", 3600)
-            self.token_expires_at = current_time + expires_in - 300
-            
-            return self.access_token
+            return response.json()
             
-        except httpx.RequestError as e:
+        except requests.RequestException as e:
             error_msg = f"Auth token request error: {str(e)}"
             logger.error(error_msg)
             raise CBKApiError(status_code=503, detail=error_msg)
@@ -290,11 +328,19 @@ class CBKApi:
                 logger.info(f"Cache hit for: {endpoint}")
                 return json.loads(cached_response)
         
+        # While the CBK API is down, answer from the last good response instead of waiting on timeouts
+        snapshots = get_snapshot_store()
+        snapshot_key = f"{endpoint}:{json.dumps(params or {}, sort_keys=True, default=str)}"
+        snapshot = await snapshots.aserve_if_down("cbk", snapshot_key)
+        if snapshot is not None:
+            logger.info(f"CBK API down, serving last-known-good data for: {endpoint}")
+            return snapshot
+        
         # Make API request with auth token
         url = f"{self.base_url}/{endpoint}"
-        token = await self._get_auth_token()
         
         try:
+            token = await self._get_auth_token()
             logger.info(f"Making CBK API request: {endpoint}")
             response = await self.http_client.get(
                 url,
@@ -305,7 +351,7 @@ class CBKApi:
             if response.status_code == 401:
                 # Token might be expired, get a new one and retry once
                 logger.info("Auth token expired, refreshing and retrying")
-                self.access_token = None
+                get_token_manager().invalidate(self.token_name, token)
                 token = await self._get_auth_token()
                 
                 response = await self.http_client.get(
@@ -328,6 +374,8 @@ class CBKApi:
                 )
             
             data = response.json()
+            snapshots.mark_ok("cbk")
+            await snapshots.asave("cbk", snapshot_key, data)
             
             # Store in cache if enabled
             if use_cache and redis_client and cache_key:
@@ -338,11 +386,20 @@ class CBKApi:
                 
             return data
             
-        except httpx.RequestError as e:
-            error_msg = f"CBK API request error: {str(e)}"
+        except (httpx.RequestError, CBKApiError) as e:
+            if isinstance(e, CBKApiError) and e.status_code < 500:
+                raise
+            error_msg = e.detail if isinstance(e, CBKApiError) else f"CBK API request error: {str(e)}"
             logger.error(error_msg)
             
-            # Use fallback if enabled
+            # Serve the last good response, marked with its age
+            snapshots.mark_failed("cbk")
+            snapshot = await snapshots.aserve("cbk", snapshot_key)
+            if snapshot is not None:
+                logger.info(f"Serving last-known-good data for: {endpoint}")
+                return snapshot
+            
+            # Use fallback if enabled (no real data has been seen yet)
             if settings.use_fallback_on_error:
                 logger.info(f"Using fallback data for {endpoint}")
                 return self._get_fallback_data(endpoint, params)
@@ -420,7 +477,7 @@ class CBKApi:
         return await self._make_api_request(
             "forex", 
             params, 
-            cache_ttl=CacheExpiry.FOREX.value
+            cache_ttl=CacheExpiry.FOREX.ttl()
         )
     
     async def get_interest_rates(self, rate_type: Optional[str] = None) -> Dict:
@@ -441,7 +498,7 @@ class CBKApi:
         return await self._make_api_request(
             "interest-rates", 
             params, 
-            cache_ttl=CacheExpiry.INTEREST_RATES.value
+            cache_ttl=CacheExpiry.INTEREST_RATES.ttl()
         )
     
     async def get_monetary_policy(self) -> Dict:
@@ -454,7 +511,7 @@ class CBKApi:
         # Monetary policy data changes infrequently, cache for 12 hours
         return await self._make_api_request(
             "monetary-policy", 
-            cache_ttl=CacheExpiry.MONETARY_POLICY.value
+            cache_ttl=CacheExpiry.MONETARY_POLICY.ttl()
         )
     
     async def get_t_bill_rates(self) -> Dict:
@@ -467,7 +524,7 @@ class CBKApi:
         # T-Bill rates typically update weekly, cache for 24 hours
         return await self._make_api_request(
             "treasury/t-bills", 
-            cache_ttl=CacheExpiry.TREASURY.value
+            cache_ttl=CacheExpiry.TREASURY.ttl()
         )
     
     async def get_t_bond_rates(self) -> Dict:
@@ -480,7 +537,7 @@ class CBKApi:
         # T-Bond rates update monthly, cache for 24 hours
         return await self._make_api_request(
             "treasury/t-bonds", 
-            cache_ttl=CacheExpiry.TREASURY.value
+            cache_ttl=CacheExpiry.TREASURY.ttl()
         )
 
     async def get_currencies_list(self) -> List[Dict]:
@@ -493,7 +550,7 @@ class CBKApi:
         # Currency list rarely changes, cache for a week
         result = await self._make_api_request(
             "currencies", 
-            cache_ttl=CacheExpiry.CURRENCIES.value
+            cache_ttl=CacheExpiry.CURRENCIES.ttl()
         )
         return cast(List[Dict], result)
     
@@ -507,7 +564,7 @@ class CBKApi:
         # Economic indicators typically update monthly, cache for 24 hours
         return await self._make_api_request(
             "indicators", 
-            cache_ttl=CacheExpiry.ECONOMIC.value
+            cache_ttl=CacheExpiry.ECONOMIC.ttl()
         )
     
     async def convert_currency(
@@ -537,7 +594,7 @@ class CBKApi:
         return await self._make_api_request(
             "converter", 
             params, 
-            cache_ttl=CacheExpiry.FOREX.value
+            cache_ttl=CacheExpiry.FOREX.ttl()
         )
 
 
@@ -1,18 +1,38 @@
 import os
-import json
 import logging
+import secrets
 import time
-from datetime import datetime, timedelta
+import asyncio
+import contextvars
+from datetime import datetime
 from typing import Dict, List, Optional, Union, Any
 
-import httpx
-import redis
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Depends, Security, status
+from fastapi import FastAPI, HTTPException, Depends, Request, Security, status
 from fastapi.security import OAuth2PasswordBearer, APIKeyHeader
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
+try:
+    from .cache import get_cache
+    from .http_pool import get_http_pool
+    from .market_hours import CBK_DAILY, CBK_WEEKLY, NSE_SESSION, is_complete, policy_ttl
+    from .mpesa_api import MpesaAPI
+    from .prefetch import CachePrefetcher, PREFETCH_ENABLED
+    from .rate_limit import rate_limit_stats
+    from .stock_index import get_stock_index
+    from .token_manager import TokenUnavailable, credential_key, get_token_manager
+except ImportError:
+    # For standalone execution
+    from cache import get_cache
+    from http_pool import get_http_pool
+    from market_hours import CBK_DAILY, CBK_WEEKLY, NSE_SESSION, is_complete, policy_ttl
+    from mpesa_api import MpesaAPI
+    from prefetch import CachePrefetcher, PREFETCH_ENABLED
+    from rate_limit import rate_limit_stats
+    from stock_index import get_stock_index
+    from token_manager import TokenUnavailable, credential_key, get_token_manager
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -27,18 +47,11 @@ load_dotenv()
 # Initialize FastAPI
 app = FastAPI(title="PesaGuru Chat API", version="1.0.0")
 
-# Initialize Redis for caching
-REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
-REDIS_DB = int(os.getenv("REDIS_DB", "0"))
-REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
-redis_client = redis.Redis(
-    host=REDIS_HOST,
-    port=REDIS_PORT,
-    db=REDIS_DB,
-    password=REDIS_PASSWORD,
-    decode_responses=True
-)
+# Shared two-tier cache (in-process LRU + Redis)
+cache = get_cache()
+
+# Shared keep-alive HTTP connection pools
+http_pool = get_http_pool()
 
 # API keys and credentials
 NSE_API_KEY = os.getenv("NSE_API_KEY")
@@ -59,6 +72,35 @@ FOREX_API_URL = "https://exchange-rates7.p.rapidapi.com"
 NEWS_API_URL = "https://news-api14.p.rapidapi.com"
 ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
 
+# M-Pesa callbacks are not signed; they are only accepted with ?token=<MPESA_CALLBACK_TOKEN> in MPESA_CALLBACK_URL
+MPESA_ENV = os.getenv("MPESA_ENV", "sandbox")
+MPESA_CALLBACK_TOKEN = os.getenv("MPESA_CALLBACK_TOKEN")
+
+# Autocomplete matches priced live per search (searches run on every keystroke)
+STOCK_SEARCH_PRICE_LIMIT = int(os.getenv("STOCK_SEARCH_PRICE_LIMIT", 3))
+
+# Keywords that route a question to stock handling (companies named without them are resolved last)
+STOCK_QUERY_TERMS = ["stock", "share", "price", "nse"]
+
+# The exchange itself, which is also a listed stock; "how is the NSE doing" asks about the market
+EXCHANGE_SYMBOLS = {"NSE"}
+
+# Stock analysis sections a question needs (keyword -> MarketAnalysis sections)
+STOCK_ANALYSIS_QUERY_SECTIONS = {
+    "trend": ["price", "trend"],
+    "technical": ["price", "trend"],
+    "rsi": ["price", "trend"],
+    "forecast": ["price", "prediction"],
+    "predict": ["price", "prediction"],
+    "sentiment": ["sentiment"],
+    "news": ["sentiment"],
+    "volatil": ["volatility"],
+    "risk": ["volatility"],
+    "recommend": ["price", "recommendation"],
+    "should i buy": ["price", "recommendation"],
+    "should i sell": ["price", "recommendation"],
+}
+
 # Security
 api_key_header = APIKeyHeader(name="X-API-Key")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -124,6 +166,9 @@ class ChatbotResponse(BaseModel):
     sources: Optional[List[str]] = None
     follow_up_questions: Optional[List[str]] = None
 
+# Set while prefetching: fetches skip the cache read and overwrite the cached entry
+refresh_cache = contextvars.ContextVar("refresh_cache", default=False)
+
 # Helper functions
 def get_cache_key(prefix: str, **kwargs) -> str:
     """Generate a cache key from prefix and parameters"""
@@ -134,27 +179,44 @@ async def get_from_cache_or_fetch(
     cache_key: str, 
     fetch_func, 
     expiry_seconds: int = 3600,
+    data_class: Optional[str] = None,
     **kwargs
 ) -> Any:
-    """Get data from cache or fetch from source and cache it"""
-    # Try to get from cache first
-    cached_data = redis_client.get(cache_key)
-    if cached_data:
-        logger.info(f"Cache hit for {cache_key}")
-        return json.loads(cached_data)
+    """
+    Get data from cache or fetch from source and cache it.
     
-    # If not in cache, fetch it
-    logger.info(f"Cache miss for {cache_key}, fetching from source")
-    data = await fetch_func(**kwargs)
+    Concurrent misses for the same key share a single fetch, both within this
+    process and across workers, so an expiring popular key does not fan out to
+    the upstream API. With a data_class, expiry_seconds is adjusted to the
+    NSE/CBK calendar (see market_hours.policy_ttl); incomplete results are
+    never kept past expiry_seconds.
+    """
+    def ttl(data):
+        return policy_ttl(expiry_seconds, data_class, complete=is_complete(data))
     
-    # Cache the result
-    redis_client.setex(
-        cache_key,
-        expiry_seconds,
-        json.dumps(data, default=str)  # Handle datetime serialization
-    )
+    async def fetch():
+        logger.info(f"Cache miss for {cache_key}, fetching from source")
+        return await fetch_func(**kwargs)
     
-    return data
+    if refresh_cache.get():
+        data = await fetch_func(**kwargs)
+        if data:
+            cache.set("chat_api", cache_key, data, ttl=ttl(data))
+        return data
+    
+    return await cache.aget_or_set("chat_api", cache_key, fetch, ttl=ttl)
+
+def load_market_analysis():
+    """
+    Import the market analysis service on first use (it loads the
+    statsmodels/scikit-learn stack, which plain price lookups never need)
+    """
+    try:
+        from ..services import market_analysis
+    except ImportError:
+        # For standalone execution
+        from services import market_analysis
+    return market_analysis
 
 async def validate_api_key(api_key: str = Security(api_key_header)):
     """Validate the API key"""
@@ -191,7 +253,7 @@ class NSEApiClient:
         cache_key = get_cache_key("nse_stock", symbol=symbol)
         
         async def fetch_stock():
-            async with httpx.AsyncClient() as client:
+            async with http_pool.async_client() as client:
                 response = await client.get(
                     f"{self.base_url}/stocks/{symbol}",
                     headers=self.headers
@@ -221,7 +283,8 @@ class NSEApiClient:
         result = await get_from_cache_or_fetch(
             cache_key, 
             fetch_stock,
-            expiry_seconds=300  # Cache for 5 minutes
+            expiry_seconds=300,  # Cache for 5 minutes while the NSE trades
+            data_class=NSE_SESSION
         )
         
         if result:
@@ -241,7 +304,7 @@ class NSEApiClient:
         cache_key = get_cache_key("nse_index", index=index)
         
         async def fetch_index():
-            async with httpx.AsyncClient() as client:
+            async with http_pool.async_client() as client:
                 response = await client.get(
                     f"{self.base_url}/index/{index}",
                     headers=self.headers
@@ -257,7 +320,8 @@ class NSEApiClient:
         return await get_from_cache_or_fetch(
             cache_key, 
             fetch_index,
-            expiry_seconds=300  # Cache for 5 minutes
+            expiry_seconds=300,  # Cache for 5 minutes while the NSE trades
+            data_class=NSE_SESSION
         )
     
     async def get_top_gainers(self, limit: int = 5) -> List[StockInfo]:
@@ -273,7 +337,7 @@ class NSEApiClient:
         cache_key = get_cache_key("nse_top_gainers", limit=limit)
         
         async def fetch_gainers():
-            async with httpx.AsyncClient() as client:
+            async with http_pool.async_client() as client:
                 response = await client.get(
                     f"{self.base_url}/top-gainers",
                     headers=self.headers
@@ -301,7 +365,8 @@ class NSEApiClient:
         stocks_data = await get_from_cache_or_fetch(
             cache_key, 
             fetch_gainers,
-            expiry_seconds=300  # Cache for 5 minutes
+            expiry_seconds=300,  # Cache for 5 minutes while the NSE trades
+            data_class=NSE_SESSION
         )
         
         return [StockInfo(**stock) for stock in stocks_data]
@@ -319,7 +384,7 @@ class NSEApiClient:
         cache_key = get_cache_key("nse_top_losers", limit=limit)
         
         async def fetch_losers():
-            async with httpx.AsyncClient() as client:
+            async with http_pool.async_client() as client:
                 response = await client.get(
                     f"{self.base_url}/top-losers",
                     headers=self.headers
@@ -347,7 +412,8 @@ class NSEApiClient:
         stocks_data = await get_from_cache_or_fetch(
             cache_key, 
             fetch_losers,
-            expiry_seconds=300  # Cache for 5 minutes
+            expiry_seconds=300,  # Cache for 5 minutes while the NSE trades
+            data_class=NSE_SESSION
         )
         
         return [StockInfo(**stock) for stock in stocks_data]
@@ -362,10 +428,22 @@ class NSEApiClient:
         Returns:
             List[StockInfo]: List of matching stocks
         """
+        # Resolve listed stocks locally and only fetch prices for the best few
+        matches = get_stock_index().search(query, limit=STOCK_SEARCH_PRICE_LIMIT)
+        if matches:
+            prices = await asyncio.gather(
+                *(self.get_stock_price(match["symbol"]) for match in matches)
+            )
+            return [
+                stock.copy(update={"name": match["name"], "sector": match["sector"]})
+                for match, stock in zip(matches, prices)
+                if stock is not None
+            ]
+        
         cache_key = get_cache_key("nse_search", query=query)
         
         async def fetch_search():
-            async with httpx.AsyncClient() as client:
+            async with http_pool.async_client() as client:
                 response = await client.get(
                     f"{self.base_url}/search?q={query}",
                     headers=self.headers
@@ -422,7 +500,7 @@ class CBKApiClient:
         cache_key = "cbk_forex_rates"
         
         async def fetch_rates():
-            async with httpx.AsyncClient() as client:
+            async with http_pool.async_client() as client:
                 # First get the token for authentication
                 response = await client.post(
                     f"{self.base_url}/service/token/",
@@ -473,7 +551,8 @@ class CBKApiClient:
         rates_data = await get_from_cache_or_fetch(
             cache_key, 
             fetch_rates,
-            expiry_seconds=86400  # Cache for 24 hours
+            expiry_seconds=86400,  # Cache until the next CBK publication
+            data_class=CBK_DAILY
         )
         
         return [ForexRate(**rate) for rate in rates_data]
@@ -488,7 +567,7 @@ class CBKApiClient:
         cache_key = "cbk_cbr_rate"
         
         async def fetch_cbr():
-            async with httpx.AsyncClient() as client:
+            async with http_pool.async_client() as client:
                 # First get the token for authentication
                 response = await client.post(
                     f"{self.base_url}/service/token/",
@@ -532,7 +611,8 @@ class CBKApiClient:
         return await get_from_cache_or_fetch(
             cache_key, 
             fetch_cbr,
-            expiry_seconds=86400  # Cache for 24 hours
+            expiry_seconds=86400,  # Cache until the next CBK publication
+            data_class=CBK_DAILY
         )
     
     async def get_treasury_bond_rates(self) -> Dict[str, Any]:
@@ -545,7 +625,7 @@ class CBKApiClient:
         cache_key = "cbk_bond_rates"
         
         async def fetch_bond_rates():
-            async with httpx.AsyncClient() as client:
+            async with http_pool.async_client() as client:
                 # First get the token for authentication
                 response = await client.post(
                     f"{self.base_url}/service/token/",
@@ -585,7 +665,8 @@ class CBKApiClient:
         return await get_from_cache_or_fetch(
             cache_key, 
             fetch_bond_rates,
-            expiry_seconds=86400  # Cache for 24 hours
+            expiry_seconds=86400,  # Cache until the next auction results
+            data_class=CBK_WEEKLY
         )
 
 
@@ -596,33 +677,39 @@ class MPesaApiClient:
         self.consumer_key = MPESA_CONSUMER_KEY
         self.consumer_secret = MPESA_CONSUMER_SECRET
         self.base_url = MPESA_API_URL
-        self.access_token = None
-        self.token_expiry = datetime.now()
+        
+        # Access tokens are shared with the other M-Pesa clients and renewed in the background
+        self.token_name = f"mpesa:{credential_key(self.base_url, self.consumer_key)}"
+        if self.consumer_key and self.consumer_secret:
+            get_token_manager().register(self.token_name, self._request_access_token)
     
     async def _get_access_token(self):
         """Get OAuth access token for M-Pesa API"""
-        if self.access_token and datetime.now() < self.token_expiry:
-            return self.access_token
+        try:
+            return await get_token_manager().aget_token(self.token_name)
+        except TokenUnavailable as e:
+            logger.error(f"Error getting M-Pesa access token: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to authenticate with M-Pesa API"
+            )
+    
+    def _request_access_token(self):
+        """Request a new M-Pesa access token (called by the token manager)"""
+        response = http_pool.session().get(
+            f"{self.base_url}/oauth/v1/generate?grant_type=client_credentials",
+            auth=(self.consumer_key, self.consumer_secret)
+        )
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/oauth/v1/generate?grant_type=client_credentials",
-                auth=(self.consumer_key, self.consumer_secret)
+        if response.status_code != 200:
+            logger.error(f"Error getting M-Pesa access token: {response.text}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to authenticate with M-Pesa API"
             )
-            
-            if response.status_code != 200:
-                logger.error(f"Error getting M-Pesa access token: {response.text}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to authenticate with M-Pesa API"
-                )
-            
-            data = response.json()
-            self.access_token = data.get("access_token")
-            # Token typically expires in 1 hour
-            self.token_expiry = datetime.now() + timedelta(seconds=3598)
-            
-            return self.access_token
+        
+        # Token typically expires in 1 hour (expires_in)
+        return response.json()
     
     async def get_loan_rates(self) -> List[LoanRate]:
         """
@@ -787,7 +874,7 @@ class CryptoApiClient:
             if not usd_rate:
                 usd_rate = 147.50  # Fallback if we can't get live rate
             
-            async with httpx.AsyncClient() as client:
+            async with http_pool.async_client() as client:
                 headers = {}
                 if self.api_key:
                     headers["x-cg-api-key"] = self.api_key
@@ -862,7 +949,7 @@ class NewsApiClient:
         cache_key = get_cache_key("financial_news", country=country, limit=limit)
         
         async def fetch_news():
-            async with httpx.AsyncClient() as client:
+            async with http_pool.async_client() as client:
                 response = await client.get(
                     f"{self.base_url}/search",
                     params={
@@ -961,6 +1048,47 @@ class ChatApiService:
             ]
         }
     
+    async def get_stock_analysis(self, symbol: str, sections: List[str]) -> Dict[str, Any]:
+        """Get a stock analysis response for the chatbot, computing only the requested sections"""
+        analysis = await asyncio.to_thread(load_market_analysis().get_market_analysis().analyze_stock, symbol, 90, sections)
+        
+        if "error" in analysis:
+            return {
+                "response_text": f"I couldn't analyze {symbol} right now. {analysis['error']}.",
+                "data": None,
+                "intent": "stock_analysis",
+                "confidence": 0.0,
+                "sources": []
+            }
+        
+        parts = []
+        if "latest_price" in analysis:
+            parts.append(
+                f"{symbol} last closed at KES {analysis['latest_price']:,.2f} "
+                f"({analysis['price_change_pct']:+.2f}% over the past 90 days)."
+            )
+        if "current_trend" in analysis:
+            rsi = analysis["technical_indicators"]["RSI"]
+            parts.append(f"The trend is {analysis['current_trend'].lower()} with an RSI of {rsi:.0f}.")
+        if "price_prediction" in analysis:
+            forecast = analysis["price_prediction"]["next_7_days"]
+            parts.append(f"The 7-day forecast points {analysis['price_prediction']['prediction_trend'].lower()}, "
+                         f"to about KES {forecast[-1]:,.2f}.")
+        if "sentiment_analysis" in analysis:
+            parts.append(f"News sentiment is {analysis['sentiment_analysis'].lower()}.")
+        if "risk_level" in analysis:
+            parts.append(f"Its annualized volatility is {analysis['volatility']:.1%} ({analysis['risk_level'].lower()} risk).")
+        if "recommendation" in analysis:
+            parts.append(f"Our current view: {analysis['recommendation']}.")
+        
+        return {
+            "response_text": " ".join(parts),
+            "data": analysis,
+            "intent": "stock_analysis",
+            "confidence": 0.9,
+            "sources": ["Nairobi Stock Exchange (NSE)", "PesaGuru market analysis"]
+        }
+    
     async def get_market_summary(self) -> Dict[str, Any]:
         """Get market summary response for the chatbot"""
         top_gainers = await self.nse_client.get_top_gainers(5)
@@ -1170,6 +1298,31 @@ class ChatApiService:
             ]
         }
     
+    async def get_stock_response(self, symbol: Optional[str], query_text: str) -> Dict[str, Any]:
+        """
+        Answer a stock question: analysis sections the question asks about,
+        a quote for a named stock, or the market summary otherwise
+        
+        Args:
+            symbol (str): Resolved NSE symbol, if any
+            query_text (str): Lower-cased user query
+            
+        Returns:
+            Dict: Response data
+        """
+        # Only the analysis sections the question asks about
+        sections = []
+        for keyword, keyword_sections in STOCK_ANALYSIS_QUERY_SECTIONS.items():
+            if keyword in query_text:
+                sections.extend(section for section in keyword_sections if section not in sections)
+        
+        if symbol and sections:
+            return await self.get_stock_analysis(symbol, sections)
+        if symbol:
+            return await self.get_stock_info(symbol)
+        # Default to market summary if no specific stock is mentioned
+        return await self.get_market_summary()
+    
     async def process_query(self, query: ChatbotQuery) -> ChatbotResponse:
         """
         Process a chatbot query and return an appropriate response
@@ -1187,34 +1340,9 @@ class ChatApiService:
         # Get response based on intent
         response_data = None
         
-        if any(term in query_text for term in ["stock", "share", "price", "nse", "safaricom", "equity", "kcb"]):
-            # Extract stock symbol if present
-            stock_symbols = {
-                "safaricom": "SCOM",
-                "equity": "EQTY",
-                "kcb": "KCB",
-                "coop": "COOP",
-                "eabl": "EABL",
-                "bamburi": "BAMB",
-                "britam": "BRIT",
-                "jubilee": "JUB",
-                "kengen": "KEGN",
-                "kenya airways": "KA"
-            }
-            
-            symbol = None
-            for name, symbol_code in stock_symbols.items():
-                if name in query_text:
-                    symbol = symbol_code
-                    break
-            
-            if symbol:
-                response_data = await self.get_stock_info(symbol)
-            elif "market" in query_text or "summary" in query_text:
-                response_data = await self.get_market_summary()
-            else:
-                # Default to market summary if no specific stock is mentioned
-                response_data = await self.get_market_summary()
+        if any(term in query_text for term in STOCK_QUERY_TERMS):
+            symbol = get_stock_index().resolve(query.query_text, exclude=EXCHANGE_SYMBOLS)
+            response_data = await self.get_stock_response(symbol, query_text)
                 
         elif any(term in query_text for term in ["forex", "exchange", "dollar", "euro", "pound", "currency"]):
             response_data = await self.get_forex_rates()
@@ -1254,25 +1382,29 @@ class ChatApiService:
             response_data = await self.get_financial_news()
             
         else:
-            # Default fallback response
-            response_data = {
-                "response_text": (
-                    "I'm not sure what financial information you're looking for. "
-                    "You can ask me about stocks, forex rates, loans, cryptocurrencies, or financial news. "
-                    "For example, try asking 'What's the current price of Safaricom stock?' or 'Show me today's forex rates.'"
-                ),
-                "data": None,
-                "intent": "unknown",
-                "confidence": 0.5,
-                "sources": [],
-                "follow_up_questions": [
-                    "What's the current price of Safaricom stock?",
-                    "Show me today's market summary",
-                    "What are the current forex rates?",
-                    "Compare loan options for 10,000 KES",
-                    "What are the current cryptocurrency prices?"
-                ]
-            }
+            # A company named without any other intent keyword ("how is safaricom doing")
+            symbol = get_stock_index().resolve(query.query_text, exclude=EXCHANGE_SYMBOLS)
+            if symbol:
+                response_data = await self.get_stock_response(symbol, query_text)
+            else:
+                response_data = {
+                    "response_text": (
+                        "I'm not sure what financial information you're looking for. "
+                        "You can ask me about stocks, forex rates, loans, cryptocurrencies, or financial news. "
+                        "For example, try asking 'What's the current price of Safaricom stock?' or 'Show me today's forex rates.'"
+                    ),
+                    "data": None,
+                    "intent": "unknown",
+                    "confidence": 0.5,
+                    "sources": [],
+                    "follow_up_questions": [
+                        "What's the current price of Safaricom stock?",
+                        "Show me today's market summary",
+                        "What are the current forex rates?",
+                        "Compare loan options for 10,000 KES",
+                        "What are the current cryptocurrency prices?"
+                    ]
+                }
         
         # Translate response if language is Swahili
         if query.language.lower() == "sw":
@@ -1286,6 +1418,54 @@ class ChatApiService:
 # Create API endpoints
 chat_api_service = ChatApiService()
 
+# Cache prefetching (tasks named in prefetch_config.json)
+async def refresh_entries(calls: List) -> int:
+    """Re-fetch the cache entries behind client calls, returning how many were refreshed"""
+    token = refresh_cache.set(True)
+    try:
+        results = await asyncio.gather(*calls, return_exceptions=True)
+    finally:
+        refresh_cache.reset(token)
+    
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Prefetch call failed: {str(result)}")
+    return sum(1 for result in results if result and not isinstance(result, Exception))
+
+async def prefetch_stock_prices(parameters: Dict[str, Any]) -> int:
+    nse_client = chat_api_service.nse_client
+    return await refresh_entries([nse_client.get_stock_price(symbol) for symbol in parameters.get("symbols", [])])
+
+async def prefetch_market_movers(parameters: Dict[str, Any]) -> int:
+    nse_client = chat_api_service.nse_client
+    limit = parameters.get("limit", 5)
+    calls = [nse_client.get_market_index(index) for index in parameters.get("indices", ["NSE20"])]
+    return await refresh_entries(calls + [nse_client.get_top_gainers(limit), nse_client.get_top_losers(limit)])
+
+async def prefetch_forex_rates(parameters: Dict[str, Any]) -> int:
+    return await refresh_entries([chat_api_service.cbk_client.get_forex_rates()])
+
+async def prefetch_cbk_rates(parameters: Dict[str, Any]) -> int:
+    return await refresh_entries([chat_api_service.cbk_client.get_cbr_rate()])
+
+async def prefetch_treasury_rates(parameters: Dict[str, Any]) -> int:
+    return await refresh_entries([chat_api_service.cbk_client.get_treasury_bond_rates()])
+
+async def prefetch_mobile_loan_rates(parameters: Dict[str, Any]) -> int:
+    return await refresh_entries([chat_api_service.mpesa_client.get_loan_rates()])
+
+prefetcher = CachePrefetcher(
+    tasks={
+        "stock_prices": prefetch_stock_prices,
+        "market_movers": prefetch_market_movers,
+        "forex_rates": prefetch_forex_rates,
+        "cbk_rates": prefetch_cbk_rates,
+        "treasury_rates": prefetch_treasury_rates,
+        "mobile_loan_rates": prefetch_mobile_loan_rates,
+    },
+    namespaces=["chat_api"]
+)
+
 @app.post("/api/chat", response_model=ChatbotResponse, dependencies=[Depends(validate_api_key)])
 async def chat(query: ChatbotQuery):
     """
@@ -1309,6 +1489,30 @@ async def get_stock(symbol: str):
     
     return stock_info
 
+@app.get("/api/stocks/{symbol}/analysis", dependencies=[Depends(validate_api_key)])
+async def get_stock_analysis(symbol: str, fields: Optional[str] = None, days: int = 90):
+    """
+    Analyze an NSE stock; `fields` selects comma-separated sections or result
+    fields (e.g. "price,trend"), so only those are computed
+    """
+    market_analysis = load_market_analysis()
+    try:
+        market_analysis.resolve_stock_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    analysis = await asyncio.to_thread(
+        market_analysis.get_market_analysis().analyze_stock, symbol.upper(), days, fields
+    )
+    
+    if "error" in analysis:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=analysis["error"]
+        )
+    
+    return analysis
+
 @app.get("/api/market/summary", dependencies=[Depends(validate_api_key)])
 async def get_market_summary():
     """
@@ -1390,6 +1594,107 @@ async def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/api/cache/stats", dependencies=[Depends(validate_api_key)])
+async def cache_stats():
+    """
+    Hit/miss/latency metrics for the shared cache
+    """
+    return cache.stats()
+
+@app.get("/api/prefetch/stats", dependencies=[Depends(validate_api_key)])
+async def prefetch_stats():
+    """
+    Prefetch job status and cache hit rates, including the first minutes after the NSE opens
+    """
+    return prefetcher.get_stats()
+
+@app.get("/api/rate-limits/stats", dependencies=[Depends(validate_api_key)])
+async def rate_limits_stats():
+    """
+    Token-bucket metrics for upstream API rate limiters in this worker
+    """
+    return rate_limit_stats()
+
+@app.get("/api/tokens/stats", dependencies=[Depends(validate_api_key)])
+async def token_stats():
+    """
+    OAuth token renewals and remaining lifetimes in this worker (never the tokens themselves)
+    """
+    return get_token_manager().get_stats()
+
+_mpesa_api = None
+
+def get_mpesa_api() -> MpesaAPI:
+    """M-Pesa integration used to process callbacks, created on the first one"""
+    global _mpesa_api
+    if _mpesa_api is None:
+        _mpesa_api = MpesaAPI(env=MPESA_ENV)
+    return _mpesa_api
+
+@app.post("/api/callbacks/mpesa")
+@app.post("/api/callbacks/mpesa/timeout")
+async def mpesa_callback(request: Request, token: Optional[str] = None):
+    """
+    Receive M-Pesa STK push, result and queue timeout callbacks
+    
+    Processing a callback resolves any wait_for_stk_result() / wait_for_result()
+    call awaiting it, in this worker or another. Point MPESA_CALLBACK_URL and
+    MPESA_TIMEOUT_URL here, with ?token=<MPESA_CALLBACK_TOKEN>, for those waits
+    to complete. Without MPESA_CALLBACK_TOKEN every callback is refused.
+    """
+    if not MPESA_CALLBACK_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="M-Pesa callbacks are disabled until MPESA_CALLBACK_TOKEN is set",
+        )
+    if not secrets.compare_digest(token or "", MPESA_CALLBACK_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid callback token",
+        )
+    try:
+        callback_data = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Callback body must be JSON")
+    
+    # Resolving waiters writes the callback to the shared cache
+    result = await asyncio.to_thread(get_mpesa_api().process_callback, callback_data)
+    if result.get("type") in ("unknown", "error"):
+        logger.warning(f"M-Pesa callback not matched to a request: {result.get('error', result['type'])}")
+    
+    # Acknowledge so M-Pesa does not resend the callback
+    return {"ResultCode": 0, "ResultDesc": "Accepted"}
+
+@app.on_event("startup")
+async def build_stock_index():
+    """
+    Build the stock search index before the first query
+    """
+    get_stock_index()
+
+@app.on_event("startup")
+async def start_prefetcher():
+    """
+    Warm the market data caches on a market-hours schedule
+    """
+    if PREFETCH_ENABLED:
+        prefetcher.start()
+
+@app.on_event("shutdown")
+async def stop_prefetcher():
+    """
+    Stop scheduling prefetch jobs
+    """
+    await prefetcher.stop()
+
+@app.on_event("shutdown")
+async def close_http_pool():
+    """
+    Close pooled upstream connections on shutdown
+    """
+    await http_pool.aclose()
+    http_pool.close()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
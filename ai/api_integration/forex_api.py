@@ -1,18 +1,29 @@
 import os
-import json
 import time
 import logging
+import warnings
+import threading
 import requests
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Union
 from functools import lru_cache
 
-import redis
-import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
 from flask import Flask, jsonify, request
 
+try:
+    from .cache import get_cache, with_staleness_marker
+    from .http_pool import get_http_pool
+    from .market_hours import CBK_DAILY, FOREX, is_complete, policy_ttl
+    from .rate_limit import get_rate_limiter
+except ImportError:
+    # For standalone execution
+    from cache import get_cache, with_staleness_marker
+    from http_pool import get_http_pool
+    from market_hours import CBK_DAILY, FOREX, is_complete, policy_ttl
+    from rate_limit import get_rate_limiter
+
 # Load environment variables
 load_dotenv()
 
@@ -28,16 +39,22 @@ EXCHANGE_RATES_API_KEY = os.getenv('EXCHANGE_RATES_API_KEY')
 CBK_API_KEY = os.getenv('CBK_API_KEY')
 OPEN_EXCHANGE_RATES_API_KEY = os.getenv('OPEN_EXCHANGE_RATES_API_KEY')
 
-# Redis configuration for caching
-REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
-REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
-REDIS_DB = int(os.getenv('REDIS_DB', 0))
-REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', None)
-
-# Default cache expiration times (in seconds)
+# Default cache expiration times (in seconds), stretched over the weekend by the TTL policy
 LIVE_RATES_CACHE_EXPIRY = 300  # 5 minutes
 HISTORICAL_RATES_CACHE_EXPIRY = 86400  # 24 hours
 MARKET_TRENDS_CACHE_EXPIRY = 3600  # 1 hour
+MARKET_SUMMARY_MAX_STALENESS = 3600 * 2  # Serve a summary at most 2 hours past expiry
+RATE_STORE_EXPIRY = 86400 * 30  # Past daily rates never change, so keep them for 30 days
+
+# Look-back windows (in days) reported by the volatility analytics
+DEFAULT_VOLATILITY_WINDOWS = (7, 30, 90)
+
+# Currency every live rate is fetched against; all other pairs are triangulated
+RATE_MATRIX_ANCHOR = "USD"
+
+# Currencies recorded for every date fetched into the rate store, so later
+# requests for other pairs on the same base can be served without refetching
+RATE_STORE_CURRENCIES = ["KES", "USD", "EUR", "GBP", "JPY", "CNY", "ZAR", "AED", "UGX", "TZS", "RWF"]
 
 # Default currency pairs with KES
 DEFAULT_CURRENCY_PAIRS = [
@@ -51,21 +68,11 @@ DEFAULT_BASE_CURRENCIES = ["USD", "EUR", "GBP"]
 # List of African currencies relevant to Kenyan users
 AFRICAN_CURRENCIES = ["ZAR", "UGX", "TZS", "RWF", "NGN", "EGP", "GHS", "MAD"]
 
-# Connect to Redis for caching
-try:
-    redis_client = redis.Redis(
-        host=REDIS_HOST,
-        port=REDIS_PORT,
-        db=REDIS_DB,
-        password=REDIS_PASSWORD,
-        decode_responses=True
-    )
-    redis_client.ping()  # Test connection
-    logger.info("Connected to Redis cache")
-    cache_available = True
-except Exception as e:
-    logger.warning(f"Redis cache not available: {e}")
-    cache_available = False
+# Shared two-tier cache (in-process LRU + Redis)
+cache = get_cache()
+
+# Shared keep-alive HTTP connection pools
+http_pool = get_http_pool()
 
 
 class ForexAPIException(Exception):
@@ -73,6 +80,246 @@ class ForexAPIException(Exception):
     pass
 
 
+class ForexRateStore:
+    """
+    Per-date store of historical exchange rates, keyed by base currency.
+    
+    Each base currency maps dates (YYYY-MM-DD) to {currency: rate}. The store is
+    kept in memory and mirrored to the shared cache so every worker benefits from
+    dates any of them has already fetched. Only completed days are stored; the
+    current day's rate is still moving.
+    """
+    
+    def __init__(self, ttl: int = RATE_STORE_EXPIRY):
+        """
+        Args:
+            ttl: Seconds a base currency's stored rates are kept in the shared cache
+        """
+        self.ttl = ttl
+        self._rates = {}  # base -> {date -> {currency -> rate}}
+        self._lock = threading.Lock()
+    
+    def _cache_key(self, base_currency: str) -> str:
+        return f"rate_store:{base_currency}"
+    
+    def _load(self, base_currency: str) -> Dict[str, Dict[str, float]]:
+        """Return the in-memory rates for a base, seeding them from the shared cache"""
+        rates = self._rates.get(base_currency)
+        if rates is None:
+            rates = cache.get("forex", self._cache_key(base_currency)) or {}
+            self._rates[base_currency] = rates
+        return rates
+    
+    def lookup(self, base_currency: str, target_currency: str, dates: List[str]) -> Tuple[Dict[str, float], List[str]]:
+        """
+        Split requested dates into stored rates and dates still to fetch.
+        
+        Args:
+            base_currency: The base currency code
+            target_currency: The target currency code
+            dates: Dates in YYYY-MM-DD format
+            
+        Returns:
+            Tuple[Dict[str, float], List[str]]: Rates found by date, and missing dates
+        """
+        with self._lock:
+            rates = self._load(base_currency)
+            found = {}
+            missing = []
+            for date in dates:
+                rate = rates.get(date, {}).get(target_currency)
+                if rate is None:
+                    missing.append(date)
+                else:
+                    found[date] = rate
+            return found, missing
+    
+    def merge(self, base_currency: str, rates_by_date: Dict[str, Dict[str, float]]) -> None:
+        """
+        Merge newly fetched rates into the store and the shared cache.
+        
+        Args:
+            base_currency: The base currency code
+            rates_by_date: {date: {currency: rate}} for completed days
+        """
+        if not rates_by_date:
+            return
+        with self._lock:
+            # Pick up dates other workers stored since we last loaded this base
+            shared = cache.get("forex", self._cache_key(base_currency)) or {}
+            rates = self._load(base_currency)
+            for date, day_rates in shared.items():
+                rates.setdefault(date, {}).update(day_rates)
+            for date, day_rates in rates_by_date.items():
+                rates.setdefault(date, {}).update(day_rates)
+            cache.set("forex", self._cache_key(base_currency), rates, ttl=self.ttl)
+
+
+class ForexRateMatrix:
+    """
+    Cross-rate matrix derived from a single set of anchor-based rates.
+    
+    Given how many units of each currency one unit of the anchor buys, the rate
+    between any two currencies is rates[to] / rates[from]. The full matrix is
+    precomputed so single lookups are O(1) and bulk conversions are one NumPy op.
+    """
+    
+    def __init__(self, anchor: str, rates: Dict[str, float], timestamp: int = None, source: str = None):
+        """
+        Args:
+            anchor: Currency the rates are quoted against (e.g. USD)
+            rates: Units of each currency per one unit of the anchor
+            timestamp: Unix time the rates were published
+            source: Provider the rates came from
+        """
+        valid = {currency: float(rate) for currency, rate in rates.items() if rate and currency != anchor}
+        self.anchor = anchor
+        self.currencies = [anchor] + sorted(valid)
+        self.index = {currency: i for i, currency in enumerate(self.currencies)}
+        self.timestamp = timestamp or int(time.time())
+        self.source = source
+        
+        per_anchor = np.array([1.0] + [valid[currency] for currency in self.currencies[1:]])
+        # matrix[i, j] = units of currency j per unit of currency i
+        self.matrix = np.outer(1.0 / per_anchor, per_anchor)
+    
+    def __contains__(self, currency: str) -> bool:
+        return currency in self.index
+    
+    def rate(self, from_currency: str, to_currency: str) -> float:
+        """
+        Get the exchange rate between two currencies.
+        
+        Raises:
+            ForexAPIException: If either currency is not in the matrix
+        """
+        return float(self.matrix[self._index_of(from_currency), self._index_of(to_currency)])
+    
+    def rates_for(self, base_currency: str, target_currencies: List[str]) -> Dict[str, float]:
+        """
+        Get rates from one base currency to several targets (unknown targets are skipped).
+        """
+        row = self.matrix[self._index_of(base_currency)]
+        return {currency: float(row[self.index[currency]]) for currency in target_currencies if currency in self.index}
+    
+    def convert_many(self, amounts, from_currency, to_currency) -> np.ndarray:
+        """
+        Convert many amounts at once.
+        
+        Args:
+            amounts: Array-like of amounts
+            from_currency: Source currency code, or array-like of codes (one per amount)
+            to_currency: Target currency code, or array-like of codes (one per amount)
+            
+        Returns:
+            np.ndarray: Converted amounts
+        """
+        amounts = np.asarray(amounts, dtype=float)
+        return amounts * self.matrix[self._indices_of(from_currency), self._indices_of(to_currency)]
+    
+    def _index_of(self, currency: str) -> int:
+        try:
+            return self.index[currency]
+        except KeyError:
+            raise ForexAPIException(f"No exchange rate available for {currency}")
+    
+    def _indices_of(self, currencies):
+        if isinstance(currencies, str):
+            return self._index_of(currencies)
+        # Resolve each distinct code once, then broadcast back to every position
+        unique, inverse = np.unique(np.asarray(currencies), return_inverse=True)
+        return np.array([self._index_of(currency) for currency in unique], dtype=int)[inverse]
+    
+    def to_dict(self) -> dict:
+        """Serializable form used for the shared cache"""
+        return {
+            "base": self.anchor,
+            "rates": {currency: float(self.matrix[0, i]) for i, currency in enumerate(self.currencies) if i},
+            "timestamp": self.timestamp,
+            "source": self.source
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "ForexRateMatrix":
+        return cls(data["base"], data["rates"], data.get("timestamp"), data.get("source"))
+
+
+def compute_volatility_analytics(rates: np.ndarray, windows=DEFAULT_VOLATILITY_WINDOWS) -> Dict[int, Dict[str, np.ndarray]]:
+    """
+    Volatility metrics for many currency pairs and look-back windows in one pass.
+    
+    Missing observations (NaN) are skipped: each return compares a rate with the
+    previous available rate for the same pair, as the per-pair calculation did.
+    
+    Args:
+        rates: Matrix of rates, shape (pairs, dates), oldest date first
+        windows: Look-back windows in days
+        
+    Returns:
+        Dict[int, Dict[str, np.ndarray]]: Per window, arrays with one value per pair for
+        volatility (std of returns), average_change (ATR-style mean absolute return),
+        max_change, change (first to last rate) and max_drawdown, plus
+        rolling_volatility with shape (pairs, dates)
+    """
+    rates = np.atleast_2d(np.asarray(rates, dtype=float))
+    n_pairs, n_dates = rates.shape
+    valid = ~np.isnan(rates)
+    
+    # Forward-fill so every observation can be compared with the previous available one
+    last_valid = np.maximum.accumulate(np.where(valid, np.arange(n_dates), 0), axis=1)
+    filled = rates[np.arange(n_pairs)[:, None], last_valid]
+    
+    returns = np.full_like(rates, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[:, 1:] = np.where(valid[:, 1:], rates[:, 1:] / filled[:, :-1] - 1, np.nan)
+    abs_returns = np.abs(returns)
+    
+    # Prefix sums give every trailing-window sum of returns in O(dates)
+    has_return = ~np.isnan(returns)
+    zeroed = np.where(has_return, returns, 0.0)
+    cum_count = np.concatenate([np.zeros((n_pairs, 1)), np.cumsum(has_return, axis=1)], axis=1)
+    cum_sum = np.concatenate([np.zeros((n_pairs, 1)), np.cumsum(zeroed, axis=1)], axis=1)
+    cum_sq = np.concatenate([np.zeros((n_pairs, 1)), np.cumsum(zeroed ** 2, axis=1)], axis=1)
+    
+    analytics = {}
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        # All-NaN windows legitimately produce NaN
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        
+        for window in windows:
+            # Rolling sample standard deviation of the returns in each trailing window
+            ends = np.arange(1, n_dates + 1)
+            starts = np.maximum(ends - window, 0)
+            count = cum_count[:, ends] - cum_count[:, starts]
+            total = cum_sum[:, ends] - cum_sum[:, starts]
+            total_sq = cum_sq[:, ends] - cum_sq[:, starts]
+            variance = (total_sq - total ** 2 / count) / (count - 1)
+            rolling_volatility = np.where(count > 1, np.sqrt(np.maximum(variance, 0)), np.nan)
+            
+            window_returns = abs_returns[:, -window:]
+            window_rates = rates[:, -(window + 1):]
+            
+            first = np.full(n_pairs, np.nan)
+            window_valid = ~np.isnan(window_rates)
+            has_rate = window_valid.any(axis=1)
+            first[has_rate] = window_rates[has_rate, window_valid[has_rate].argmax(axis=1)]
+            last = filled[:, -1]
+            
+            running_peak = np.fmax.accumulate(window_rates, axis=1)
+            drawdown = 1 - window_rates / running_peak
+            
+            analytics[window] = {
+                "volatility": rolling_volatility[:, -1],
+                "average_change": np.nanmean(window_returns, axis=1),
+                "max_change": np.nanmax(window_returns, axis=1),
+                "change": (last - first) / first,
+                "max_drawdown": np.nanmax(drawdown, axis=1),
+                "rolling_volatility": rolling_volatility,
+            }
+    
+    return analytics
+
+
 class ForexAPI:
     """
     Main class for interacting with foreign exchange APIs.
@@ -106,9 +353,16 @@ class ForexAPI:
             "Content-Type": "application/json"
         }
         
-        # Initialize the rate limiting mechanism
-        self.last_api_call = 0
+        # Shared token-bucket rate limiter spacing calls across all workers
         self.min_call_interval = 1  # Minimum time between API calls in seconds
+        self.rate_limiter = get_rate_limiter("forex_api", rate=1, per=self.min_call_interval, burst=1)
+        
+        # Historical rates already fetched, by base currency and date
+        self.rate_store = ForexRateStore()
+        
+        # Latest cross-rate matrix and when it was built (monotonic seconds)
+        self._rate_matrix = None
+        self._rate_matrix_loaded_at = 0.0
         
         logger.info("ForexAPI initialized for PesaGuru Chatbot")
     
@@ -125,7 +379,7 @@ class ForexAPI:
         """
         sorted_kwargs = sorted(kwargs.items())
         kwargs_str = "_".join(f"{k}:{v}" for k, v in sorted_kwargs)
-        return f"forex:{prefix}:{kwargs_str}"
+        return f"{prefix}:{kwargs_str}"
     
     def _get_from_cache(self, key: str) -> Optional[dict]:
         """
@@ -137,19 +391,9 @@ class ForexAPI:
         Returns:
             Optional[dict]: The cached data or None if not found
         """
-        if not cache_available:
-            return None
-        
-        try:
-            data = redis_client.get(key)
-            if data:
-                return json.loads(data)
-            return None
-        except Exception as e:
-            logger.warning(f"Error getting data from cache: {e}")
-            return None
+        return cache.get("forex", key)
     
-    def _store_in_cache(self, key: str, data: dict, expiry: int) -> bool:
+    def _store_in_cache(self, key: str, data: dict, expiry: int, data_class: str = FOREX) -> bool:
         """
         Store data in cache.
         
@@ -157,19 +401,12 @@ class ForexAPI:
             key: The cache key
             data: The data to store
             expiry: Expiry time in seconds
+            data_class: When the data can change (see market_hours.policy_ttl)
             
         Returns:
             bool: True if data was stored successfully, False otherwise
         """
-        if not cache_available:
-            return False
-        
-        try:
-            redis_client.setex(key, expiry, json.dumps(data))
-            return True
-        except Exception as e:
-            logger.warning(f"Error storing data in cache: {e}")
-            return False
+        return cache.set("forex", key, data, ttl=policy_ttl(expiry, data_class, complete=is_complete(data)))
     
     def _make_api_request(self, url: str, headers: dict, params: Optional[dict] = None) -> dict:
         """
@@ -186,18 +423,12 @@ class ForexAPI:
         Raises:
             ForexAPIException: If the API request fails
         """
-        # Implement basic rate limiting
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_api_call
-        
-        if time_since_last_call < self.min_call_interval:
-            sleep_time = self.min_call_interval - time_since_last_call
-            time.sleep(sleep_time)
-        
-        self.last_api_call = time.time()
+        # Keep requests min_call_interval apart across every worker
+        if not self.rate_limiter.acquire():
+            raise ForexAPIException("API rate limit not available, request throttled")
         
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            response = http_pool.session().get(url, headers=headers, params=params, timeout=10)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
@@ -241,6 +472,46 @@ class ForexAPI:
             logger.info(f"Retrieved live rates from cache for {base_currency}")
             return cached_data
         
+        # Derive the rates from the cross-rate matrix (one upstream fetch serves every base)
+        try:
+            matrix = self.get_rate_matrix()
+            if base_currency in matrix:
+                result = {
+                    "base": base_currency,
+                    "rates": matrix.rates_for(base_currency, target_currencies),
+                    "timestamp": matrix.timestamp,
+                    "last_updated": datetime.fromtimestamp(matrix.timestamp).isoformat(),
+                    "source": matrix.source if base_currency == matrix.anchor else f"{matrix.source} (cross rates)"
+                }
+                self._store_in_cache(cache_key, result, LIVE_RATES_CACHE_EXPIRY)
+                return result
+        except ForexAPIException as e:
+            logger.warning(f"Rate matrix unavailable, fetching {base_currency} rates directly: {e}")
+        
+        result = self._fetch_live_rates(base_currency, target_currencies)
+        
+        # Store in cache
+        self._store_in_cache(cache_key, result, LIVE_RATES_CACHE_EXPIRY)
+        
+        return result
+    
+    def _fetch_live_rates(self, base_currency: str, target_currencies: Optional[List[str]] = None) -> dict:
+        """
+        Fetch live rates for one base currency from the primary API, falling back to Open Exchange Rates.
+        
+        Args:
+            base_currency: The base currency code
+            target_currencies: Currency codes to keep (None keeps every currency returned)
+            
+        Returns:
+            dict: Exchange rates data
+            
+        Raises:
+            ForexAPIException: If no provider returned rates
+        """
+        def keep(currency):
+            return target_currencies is None or currency in target_currencies
+        
         # Request data from primary API
         try:
             url = f"{self.exchange_rates_endpoint}/latest"
@@ -251,15 +522,12 @@ class ForexAPI:
             # Format the response
             result = {
                 "base": base_currency,
-                "rates": {currency: rate for currency, rate in data.get("rates", {}).items() if currency in target_currencies},
+                "rates": {currency: rate for currency, rate in data.get("rates", {}).items() if keep(currency)},
                 "timestamp": int(time.time()),
                 "last_updated": datetime.now().isoformat(),
                 "source": "exchange-rates-api"
             }
             
-            # Store in cache
-            self._store_in_cache(cache_key, result, LIVE_RATES_CACHE_EXPIRY)
-            
             return result
             
         except ForexAPIException as e:
@@ -278,21 +546,64 @@ class ForexAPI:
                 # Format the response
                 result = {
                     "base": base_currency,
-                    "rates": {currency: rate for currency, rate in data.get("rates", {}).items() if currency in target_currencies},
+                    "rates": {currency: rate for currency, rate in data.get("rates", {}).items() if keep(currency)},
                     "timestamp": data.get("timestamp", int(time.time())),
                     "last_updated": datetime.fromtimestamp(data.get("timestamp", time.time())).isoformat(),
                     "source": "openexchangerates"
                 }
                 
-                # Store in cache
-                self._store_in_cache(cache_key, result, LIVE_RATES_CACHE_EXPIRY)
-                
                 return result
                 
             except Exception as fallback_error:
                 logger.error(f"All forex APIs failed: {fallback_error}")
                 raise ForexAPIException("Could not retrieve exchange rates from any source")
     
+    def get_rate_matrix(self) -> ForexRateMatrix:
+        """
+        Get the cross-rate matrix built from one anchor-currency fetch.
+        
+        The matrix is shared across workers through the cache and rebuilt at most
+        once per LIVE_RATES_CACHE_EXPIRY; concurrent rebuilds are coalesced.
+        
+        Returns:
+            ForexRateMatrix: Current cross rates
+            
+        Raises:
+            ForexAPIException: If the anchor rates could not be fetched
+        """
+        if self._rate_matrix is not None and time.monotonic() - self._rate_matrix_loaded_at < LIVE_RATES_CACHE_EXPIRY:
+            return self._rate_matrix
+        
+        data = cache.get_or_set(
+            "forex",
+            self._get_cache_key("rate_matrix", base=RATE_MATRIX_ANCHOR),
+            lambda: self._fetch_live_rates(RATE_MATRIX_ANCHOR),
+            ttl=policy_ttl(LIVE_RATES_CACHE_EXPIRY, FOREX)
+        )
+        if not data or not data.get("rates"):
+            raise ForexAPIException(f"Could not build rate matrix from {RATE_MATRIX_ANCHOR} rates")
+        
+        self._rate_matrix = ForexRateMatrix(RATE_MATRIX_ANCHOR, data["rates"], data.get("timestamp"), data.get("source"))
+        self._rate_matrix_loaded_at = time.monotonic()
+        return self._rate_matrix
+    
+    def convert_many(self, amounts, from_currency, to_currency) -> np.ndarray:
+        """
+        Convert many amounts at live rates in one vectorized operation.
+        
+        Args:
+            amounts: Array-like of amounts
+            from_currency: Source currency code, or array-like of codes (one per amount)
+            to_currency: Target currency code, or array-like of codes (one per amount)
+            
+        Returns:
+            np.ndarray: Converted amounts
+            
+        Raises:
+            ForexAPIException: If rates are unavailable or a currency is unknown
+        """
+        return self.get_rate_matrix().convert_many(amounts, from_currency, to_currency)
+    
     def get_historical_rates(self, date: str, base_currency: str = "USD", target_currencies: List[str] = None) -> dict:
         """
         Get historical exchange rates for a specific date.
@@ -435,6 +746,33 @@ class ForexAPI:
                 "last_updated": cached_data.get("last_updated", datetime.now().isoformat())
             }
         
+        # Triangulate from the cross-rate matrix when both currencies are known
+        try:
+            matrix = self.get_rate_matrix()
+            if from_currency in matrix and to_currency in matrix:
+                rate = matrix.rate(from_currency, to_currency)
+                result = {
+                    "amount": amount,
+                    "from": from_currency,
+                    "to": to_currency,
+                    "rate": rate,
+                    "converted_amount": amount * rate,
+                    "timestamp": matrix.timestamp,
+                    "last_updated": datetime.fromtimestamp(matrix.timestamp).isoformat()
+                }
+                
+                # Store rate in cache
+                cache_data = {
+                    "rate": result["rate"],
+                    "timestamp": result["timestamp"],
+                    "last_updated": result["last_updated"]
+                }
+                self._store_in_cache(cache_key, cache_data, LIVE_RATES_CACHE_EXPIRY)
+                
+                return result
+        except ForexAPIException as e:
+            logger.warning(f"Rate matrix unavailable, using conversion endpoint: {e}")
+        
         # Request fresh data from API
         try:
             url = f"{self.exchange_rates_endpoint}/convert"
@@ -543,7 +881,7 @@ class ForexAPI:
             auth_url = f"{self.cbk_endpoint}/service/token/"
             auth_payload = "{}"
             
-            auth_response = requests.post(auth_url, headers=self.cbk_headers, data=auth_payload)
+            auth_response = http_pool.session().post(auth_url, headers=self.cbk_headers, data=auth_payload)
             auth_response.raise_for_status()
             
             auth_data = auth_response.json()
@@ -560,7 +898,7 @@ class ForexAPI:
                 "Authorization": f"Bearer {token}"
             }
             
-            rates_response = requests.get(rates_url, headers=rates_headers)
+            rates_response = http_pool.session().get(rates_url, headers=rates_headers)
             rates_response.raise_for_status()
             
             rates_data = rates_response.json()
@@ -575,7 +913,7 @@ class ForexAPI:
             }
             
             # Store in cache
-            self._store_in_cache(cache_key, result, LIVE_RATES_CACHE_EXPIRY)
+            self._store_in_cache(cache_key, result, LIVE_RATES_CACHE_EXPIRY, CBK_DAILY)
             
             return result
             
@@ -605,7 +943,7 @@ class ForexAPI:
                     "source": "calculated_from_exchange_rates_api"
                 }
                 
-                # Store in cache
+                # Store in cache (market-derived, so retried before the next CBK publication)
                 self._store_in_cache(cache_key, result, LIVE_RATES_CACHE_EXPIRY)
                 
                 return result
@@ -684,55 +1022,29 @@ class ForexAPI:
             logger.info(f"Retrieved time series from cache for {base_currency}/{target_currency}")
             return cached_data
         
-        # Request data from primary API
         try:
-            # For time series, we need to make multiple requests for historical data
-            start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+            dates = self._time_series_dates(start_date, end_date, interval)
             
-            dates = []
-            current_dt = start_dt
+            # Only dates missing from the rate store are requested upstream
+            stored_rates, missing_dates = self.rate_store.lookup(base_currency, target_currency, dates)
+            fetched_rates = self._fetch_rates_for_dates(base_currency, target_currency, missing_dates) if missing_dates else {}
             
-            # Generate list of dates based on interval
-            while current_dt <= end_dt:
-                dates.append(current_dt.strftime("%Y-%m-%d"))
-                
-                if interval == "daily":
-                    current_dt += timedelta(days=1)
-                elif interval == "weekly":
-                    current_dt += timedelta(days=7)
-                elif interval == "monthly":
-                    # Add approximately a month
-                    if current_dt.month == 12:
-                        current_dt = current_dt.replace(year=current_dt.year + 1, month=1)
-                    else:
-                        current_dt = current_dt.replace(month=current_dt.month + 1)
-                else:
-                    # Default to daily
-                    current_dt += timedelta(days=1)
+            logger.info(
+                f"Time series {base_currency}/{target_currency}: {len(dates)} dates, "
+                f"{len(stored_rates)} from store, {len(missing_dates)} fetched"
+            )
             
-            # Get historical data for each date
+            # Single pass over the requested dates merges stored and fetched rates in order
             time_series_data = []
-            
             for date in dates:
-                try:
-                    historical_data = self.get_historical_rates(
-                        date=date,
-                        base_currency=base_currency,
-                        target_currencies=[target_currency]
-                    )
-                    
-                    rate = historical_data["rates"].get(target_currency)
-                    
-                    if rate is not None:
-                        time_series_data.append({
-                            "date": date,
-                            "rate": rate
-                        })
-                except Exception as date_error:
-                    logger.warning(f"Could not get data for {date}: {date_error}")
-                    # Continue with other dates if one fails
-                    continue
+                rate = stored_rates.get(date)
+                if rate is None:
+                    rate = fetched_rates.get(date, {}).get(target_currency)
+                if rate is not None:
+                    time_series_data.append({
+                        "date": date,
+                        "rate": rate
+                    })
             
             # Format the response
             result = {
@@ -754,6 +1066,128 @@ class ForexAPI:
             logger.error(f"Failed to get time series data: {e}")
             raise ForexAPIException(f"Could not retrieve time series data for {base_currency}/{target_currency}")
     
+    @staticmethod
+    def _time_series_dates(start_date: str, end_date: str, interval: str) -> List[str]:
+        """
+        List the dates in a time series range for the given interval.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            interval: 'daily', 'weekly' or 'monthly' (anything else is treated as daily)
+            
+        Returns:
+            List[str]: Dates in YYYY-MM-DD format
+        """
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+        
+        dates = []
+        current_dt = start_dt
+        
+        while current_dt <= end_dt:
+            dates.append(current_dt.strftime("%Y-%m-%d"))
+            
+            if interval == "weekly":
+                current_dt += timedelta(days=7)
+            elif interval == "monthly":
+                # Add approximately a month
+                if current_dt.month == 12:
+                    current_dt = current_dt.replace(year=current_dt.year + 1, month=1)
+                else:
+                    current_dt = current_dt.replace(month=current_dt.month + 1)
+            else:
+                # Daily (and the default for unknown intervals)
+                current_dt += timedelta(days=1)
+        
+        return dates
+    
+    def _fetch_rates_for_dates(self, base_currency: str, target_currency: str, dates: List[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Fetch historical rates for dates missing from the rate store.
+        
+        Uses the provider's range endpoint when available and fetches any dates
+        it did not cover one at a time. Completed days are merged into the store.
+        
+        Per-date requests share the forex_api limit of one call per second, so a
+        year-long gap takes about six minutes however many threads issue them;
+        configure OPEN_EXCHANGE_RATES_API_KEY on a plan with the time-series
+        endpoint to fill long gaps in a single request.
+        
+        Args:
+            base_currency: The base currency code
+            target_currency: The target currency code
+            dates: Dates in YYYY-MM-DD format
+            
+        Returns:
+            Dict[str, Dict[str, float]]: {date: {currency: rate}} for the dates fetched
+        """
+        currencies = sorted(set(RATE_STORE_CURRENCIES + [target_currency]) - {base_currency})
+        
+        fetched = self._fetch_rate_range(base_currency, currencies, dates[0], dates[-1])
+        fetched = {date: fetched[date] for date in dates if date in fetched}
+        remaining = [date for date in dates if date not in fetched]
+        
+        if len(remaining) > 30:
+            logger.info(f"Fetching {len(remaining)} dates individually (about "
+                        f"{len(remaining) * self.min_call_interval:.0f}s at the forex_api rate limit)")
+        
+        for date in remaining:
+            try:
+                day_rates = self.get_historical_rates(
+                    date=date,
+                    base_currency=base_currency,
+                    target_currencies=currencies
+                )["rates"]
+            except Exception as date_error:
+                logger.warning(f"Could not get data for {date}: {date_error}")
+                # Continue with other dates if one fails
+                continue
+            if day_rates:
+                fetched[date] = day_rates
+        
+        # Today's rate is still moving, so only completed days are stored
+        today = datetime.now().strftime("%Y-%m-%d")
+        self.rate_store.merge(base_currency, {date: rates for date, rates in fetched.items() if date < today})
+        
+        return fetched
+    
+    def _fetch_rate_range(self, base_currency: str, currencies: List[str], start_date: str, end_date: str) -> Dict[str, Dict[str, float]]:
+        """
+        Fetch a span of daily rates in one request from Open Exchange Rates' time-series endpoint.
+        
+        Args:
+            base_currency: The base currency code
+            currencies: Currency codes to include
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            
+        Returns:
+            Dict[str, Dict[str, float]]: {date: {currency: rate}}, empty if the range endpoint is unavailable
+        """
+        if not self.open_exchange_rates_api_key:
+            return {}
+        
+        try:
+            url = f"{self.open_exchange_rates_endpoint}/time-series.json"
+            params = {
+                "app_id": self.open_exchange_rates_api_key,
+                "base": base_currency,
+                "start": start_date,
+                "end": end_date,
+                "symbols": ",".join(currencies)
+            }
+            
+            data = self._make_api_request(url, {}, params)
+            return {
+                date: {currency: rate for currency, rate in day_rates.items() if currency in currencies}
+                for date, day_rates in data.get("rates", {}).items()
+            }
+        except ForexAPIException as e:
+            # Range requests need a paid plan; fall back to per-date requests
+            logger.info(f"Range endpoint unavailable, fetching dates individually: {e}")
+            return {}
+    
     def get_forex_volatility(self, currency_pair: str = "USD/KES", period: int = 30) -> dict:
         """
         Calculate forex volatility for a currency pair.
@@ -772,6 +1206,7 @@ class ForexAPI:
             "volatility": 0.0125,  # Standard deviation of daily returns
             "max_daily_change": 0.0231,
             "average_daily_change": 0.0045,
+            "max_drawdown": 0.0180,  # Largest peak-to-trough fall over the period
             "trend": "upward",  # upward, downward, or stable
             "recommendation": "The USD/KES pair has shown low volatility...",
             "last_updated": "2022-03-09T12:32:57Z"
@@ -790,83 +1225,26 @@ class ForexAPI:
             return cached_data
         
         try:
-            # Get time series data
-            end_date = datetime.now().strftime("%Y-%m-%d")
-            start_date = (datetime.now() - timedelta(days=period)).strftime("%Y-%m-%d")
-            
-            time_series = self.get_forex_time_series(
-                base_currency=base_currency,
-                target_currency=target_currency,
-                start_date=start_date,
-                end_date=end_date,
-                interval="daily"
-            )
+            analytics = self.get_volatility_analytics([currency_pair], windows=(period,))[currency_pair]
+            metrics = analytics["windows"][str(period)]
             
-            # Extract rates from time series
-            rates = [item["rate"] for item in time_series["data"]]
-            
-            if len(rates) < 2:
+            if metrics["volatility"] is None:
                 raise ForexAPIException(f"Not enough data points for {currency_pair}")
             
-            # Calculate daily returns
-            returns = []
-            for i in range(1, len(rates)):
-                daily_return = (rates[i] - rates[i-1]) / rates[i-1]
-                returns.append(daily_return)
-            
-            # Calculate volatility (standard deviation of returns)
-            volatility = pd.Series(returns).std()
-            
-            # Calculate other metrics
-            max_daily_change = max(abs(min(returns)), abs(max(returns)))
-            average_daily_change = sum(abs(r) for r in returns) / len(returns)
-            
-            # Determine trend
-            first_rate = rates[0]
-            last_rate = rates[-1]
-            percent_change = (last_rate - first_rate) / first_rate
-            
-            if percent_change > 0.01:
-                trend = "upward"
-            elif percent_change < -0.01:
-                trend = "downward"
-            else:
-                trend = "stable"
-            
-            # Generate recommendation
-            if volatility < 0.005:
-                volatility_level = "very low"
-            elif volatility < 0.01:
-                volatility_level = "low"
-            elif volatility < 0.02:
-                volatility_level = "moderate"
-            elif volatility < 0.03:
-                volatility_level = "high"
-            else:
-                volatility_level = "very high"
-            
-            recommendation = (
-                f"The {currency_pair} pair has shown {volatility_level} volatility over the past {period} days "
-                f"with an average daily change of {round(average_daily_change * 100, 2)}%. "
-                f"The trend has been {trend}. "
-            )
-            
-            if trend == "upward" and volatility_level in ["very low", "low"]:
-                recommendation += "This may present a stable buying opportunity for KES holders."
-            elif trend == "downward" and volatility_level in ["very low", "low"]:
-                recommendation += "This may present a stable selling opportunity for foreign currency holders."
-            elif volatility_level in ["high", "very high"]:
-                recommendation += "Exercise caution due to heightened market volatility."
+            volatility = metrics["volatility"]
+            average_daily_change = metrics["average_daily_change"]
+            trend = metrics["trend"]
             
             # Format the response
             result = {
                 "currency_pair": currency_pair,
                 "period": period,
                 "volatility": volatility,
-                "max_daily_change": max_daily_change,
+                "max_daily_change": metrics["max_daily_change"],
                 "average_daily_change": average_daily_change,
+                "max_drawdown": metrics["max_drawdown"],
                 "trend": trend,
-                "recommendation": recommendation,
+                "recommendation": self._volatility_recommendation(currency_pair, period, volatility, average_daily_change, trend),
                 "last_updated": datetime.now().isoformat()
             }
             
@@ -878,6 +1256,140 @@ class ForexAPI:
         except Exception as e:
             logger.error(f"Failed to calculate volatility: {e}")
             raise ForexAPIException(f"Could not calculate volatility for {currency_pair}")
+    
+    def get_volatility_analytics(self, currency_pairs: List[str], windows=DEFAULT_VOLATILITY_WINDOWS) -> dict:
+        """
+        Volatility, average daily change, drawdown and trend for several pairs and windows at once.
+        
+        Args:
+            currency_pairs: Currency pairs, e.g. ["USD/KES", "EUR/KES"]
+            windows: Look-back windows in days (default: 7, 30 and 90)
+            
+        Returns:
+            dict: Per pair, the latest rate and metrics for each window
+            
+        Example return:
+        {
+            "USD/KES": {
+                "latest_rate": 129.2,
+                "windows": {
+                    "7": {"volatility": 0.0021, "average_daily_change": 0.0015, "max_daily_change": 0.004,
+                          "max_drawdown": 0.003, "change": 0.002, "trend": "stable"},
+                    "30": {...},
+                    "90": {...}
+                }
+            },
+            ...
+        }
+        """
+        windows = sorted(set(int(window) for window in windows))
+        
+        # Generate cache key
+        cache_key = self._get_cache_key(
+            "volatility_analytics",
+            pairs="_".join(sorted(currency_pairs)),
+            windows="_".join(str(window) for window in windows),
+            date=datetime.now().strftime("%Y-%m-%d")
+        )
+        
+        cached_data = self._get_from_cache(cache_key)
+        if cached_data:
+            logger.info(f"Retrieved volatility analytics from cache for {len(currency_pairs)} pairs")
+            return cached_data
+        
+        # One daily series per pair covering the longest window, aligned on dates
+        end_date = datetime.now().strftime("%Y-%m-%d")
+        start_date = (datetime.now() - timedelta(days=windows[-1])).strftime("%Y-%m-%d")
+        dates = self._time_series_dates(start_date, end_date, "daily")
+        date_index = {date: i for i, date in enumerate(dates)}
+        
+        rates = np.full((len(currency_pairs), len(dates)), np.nan)
+        for row, pair in enumerate(currency_pairs):
+            base_currency, target_currency = pair.split('/')
+            try:
+                time_series = self.get_forex_time_series(
+                    base_currency=base_currency,
+                    target_currency=target_currency,
+                    start_date=start_date,
+                    end_date=end_date,
+                    interval="daily"
+                )
+                for item in time_series["data"]:
+                    if item["date"] in date_index:
+                        rates[row, date_index[item["date"]]] = item["rate"]
+            except Exception as e:
+                logger.warning(f"Could not get time series for {pair}: {e}")
+        
+        analytics = compute_volatility_analytics(rates, windows)
+        
+        def as_float(value):
+            return None if np.isnan(value) else float(value)
+        
+        result = {}
+        for row, pair in enumerate(currency_pairs):
+            observed = rates[row][~np.isnan(rates[row])]
+            pair_windows = {}
+            for window in windows:
+                metrics = analytics[window]
+                change = as_float(metrics["change"][row])
+                pair_windows[str(window)] = {
+                    "volatility": as_float(metrics["volatility"][row]),
+                    "average_daily_change": as_float(metrics["average_change"][row]),
+                    "max_daily_change": as_float(metrics["max_change"][row]),
+                    "max_drawdown": as_float(metrics["max_drawdown"][row]),
+                    "change": change,
+                    "trend": self._classify_trend(change)
+                }
+            result[pair] = {
+                "latest_rate": float(observed[-1]) if observed.size else None,
+                "windows": pair_windows
+            }
+        
+        # Store in cache
+        self._store_in_cache(cache_key, result, MARKET_TRENDS_CACHE_EXPIRY)
+        
+        return result
+    
+    @staticmethod
+    def _classify_trend(change: Optional[float]) -> str:
+        """Label a fractional rate change as upward, downward or stable"""
+        if change is None:
+            return "stable"
+        if change > 0.01:
+            return "upward"
+        if change < -0.01:
+            return "downward"
+        return "stable"
+    
+    @staticmethod
+    def _volatility_recommendation(currency_pair: str, period: int, volatility: float,
+                                   average_daily_change: float, trend: str) -> str:
+        """Describe a pair's volatility and trend for end users"""
+        if volatility < 0.005:
+            volatility_level = "very low"
+        elif volatility < 0.01:
+            volatility_level = "low"
+        elif volatility < 0.02:
+            volatility_level = "moderate"
+        elif volatility < 0.03:
+            volatility_level = "high"
+        else:
+            volatility_level = "very high"
+        
+        recommendation = (
+            f"The {currency_pair} pair has shown {volatility_level} volatility over the past {period} days "
+            f"with an average daily change of {round(average_daily_change * 100, 2)}%. "
+            f"The trend has been {trend}. "
+        )
+        
+        if trend == "upward" and volatility_level in ["very low", "low"]:
+            recommendation += "This may present a stable buying opportunity for KES holders."
+        elif trend == "downward" and volatility_level in ["very low", "low"]:
+            recommendation += "This may present a stable selling opportunity for foreign currency holders."
+        elif volatility_level in ["high", "very high"]:
+            recommendation += "Exercise caution due to heightened market volatility."
+        
+        return recommendation
 
     def get_forex_market_summary(self) -> dict:
         """
@@ -905,15 +1417,23 @@ class ForexAPI:
             "last_updated": "2022-03-09T12:32:57Z"
         }
         """
-        # Generate cache key
-        cache_key = self._get_cache_key("market_summary", date=datetime.now().strftime("%Y-%m-%d"))
-        
-        # Try to get from cache first
-        cached_data = self._get_from_cache(cache_key)
-        if cached_data:
-            logger.info("Retrieved forex market summary from cache")
-            return cached_data
+        # Serve the cached summary immediately and rebuild it in the background once expired
+        summary, age, is_stale = cache.get_stale_while_revalidate(
+            "forex",
+            self._get_cache_key("market_summary"),
+            self._build_forex_market_summary,
+            ttl=policy_ttl(MARKET_TRENDS_CACHE_EXPIRY, FOREX),
+            max_stale=MARKET_SUMMARY_MAX_STALENESS
+        )
+        return with_staleness_marker(summary, age, is_stale)
+    
+    def _build_forex_market_summary(self) -> dict:
+        """
+        Build the forex market summary from live rates and volatility data.
         
+        Returns:
+            dict: Forex market summary
+        """
         try:
             # Get KES performance against major currencies
             # This is a placeholder - normally we would call a method to get this
@@ -931,13 +1451,17 @@ class ForexAPI:
                 }
             }
             
-            # Get volatility for major currency pairs
+            # Get volatility for major currency pairs (all pairs and windows in one pass)
             key_currency_pairs = ["USD/KES", "EUR/KES", "GBP/KES"]
             key_currencies = []
             
+            volatility_analytics = self.get_volatility_analytics(key_currency_pairs)
+            
             for pair in key_currency_pairs:
                 try:
-                    volatility_data = self.get_forex_volatility(currency_pair=pair)
+                    metrics = volatility_analytics[pair]["windows"]["30"]
+                    if metrics["volatility"] is None:
+                        raise ForexAPIException("Not enough data points")
                     
                     base_currency = pair.split('/')[0]
                     
@@ -947,8 +1471,14 @@ class ForexAPI:
                     key_currencies.append({
                         "currency": pair,
                         "rate": current_rate["converted_amount"],
-                        "trend": volatility_data["trend"],
-                        "comment": volatility_data["recommendation"]
+                        "trend": metrics["trend"],
+                        "comment": self._volatility_recommendation(
+                            pair, 30, metrics["volatility"], metrics["average_daily_change"], metrics["trend"]
+                        ),
+                        "volatility": {
+                            window: window_metrics["volatility"]
+                            for window, window_metrics in volatility_analytics[pair]["windows"].items()
+                        }
                     })
                 except Exception as e:
                     logger.warning(f"Could not get volatility for {pair}: {e}")
@@ -1001,14 +1531,11 @@ class ForexAPI:
                     continue
             
             # Generate global outlook
-            global_volatility_levels = []
-            
-            for pair in key_currency_pairs:
-                try:
-                    volatility_data = self.get_forex_volatility(currency_pair=pair)
-                    global_volatility_levels.append(volatility_data["volatility"])
-                except Exception:
-                    pass
+            global_volatility_levels = [
+                volatility_analytics[pair]["windows"]["30"]["volatility"]
+                for pair in key_currency_pairs
+                if volatility_analytics[pair]["windows"]["30"]["volatility"] is not None
+            ]
             
             if global_volatility_levels:
                 avg_volatility = sum(global_volatility_levels) / len(global_volatility_levels)
@@ -1063,9 +1590,6 @@ class ForexAPI:
                 "last_updated": datetime.now().isoformat()
             }
             
-            # Store in cache
-            self._store_in_cache(cache_key, result, MARKET_TRENDS_CACHE_EXPIRY)
-            
             return result
             
         except Exception as e:
@@ -1122,38 +1646,31 @@ class ForexAPI:
             today = datetime.now().strftime("%Y-%m-%d")
             week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
             
-            # Get current rates
-            current_rates = {}
-            for currency in target_currencies:
-                try:
-                    if base_currency == "KES":
-                        # For KES base, we need to get the inverse rate
-                        conversion = self.get_kes_conversion_rate(amount=1, from_currency=currency, to_currency="KES")
-                        current_rates[currency] = 1 / conversion["converted_amount"] if conversion["converted_amount"] > 0 else 0
-                    else:
-                        # For other bases, get direct rate
-                        conversion = self.get_kes_conversion_rate(amount=1, from_currency=base_currency, to_currency=currency)
-                        current_rates[currency] = conversion["converted_amount"]
-                except Exception as e:
-                    logger.warning(f"Could not get current rate for {base_currency}/{currency}: {e}")
-                    current_rates[currency] = 0
+            # Current and week-ago rates for every target come from one anchor-based
+            # rate set each, triangulated through the base currency
+            current_matrix = self.get_rate_matrix()
+            try:
+                week_ago_matrix = ForexRateMatrix(
+                    RATE_MATRIX_ANCHOR,
+                    self.get_historical_rates(
+                        date=week_ago,
+                        base_currency=RATE_MATRIX_ANCHOR,
+                        target_currencies=sorted(set(target_currencies) | {base_currency})
+                    )["rates"]
+                )
+            except Exception as e:
+                logger.warning(f"Could not get historical rates for {week_ago}: {e}")
+                week_ago_matrix = None
             
-            # Get rates from a week ago
-            week_ago_rates = {}
-            for currency in target_currencies:
+            def cross_rate(matrix, currency):
                 try:
-                    if base_currency == "KES":
-                        # Get historical rates with USD as base (common approach)
-                        historical = self.get_historical_rates(date=week_ago, base_currency="USD", target_currencies=["KES", currency])
-                        kes_to_usd = historical["rates"]["KES"]
-                        currency_to_usd = historical["rates"][currency]
-                        week_ago_rates[currency] = currency_to_usd / kes_to_usd if kes_to_usd > 0 else 0
-                    else:
-                        historical = self.get_historical_rates(date=week_ago, base_currency=base_currency, target_currencies=[currency])
-                        week_ago_rates[currency] = historical["rates"][currency]
-                except Exception as e:
-                    logger.warning(f"Could not get historical rate for {base_currency}/{currency}: {e}")
-                    week_ago_rates[currency] = 0
+                    return matrix.rate(base_currency, currency) if matrix is not None else 0
+                except ForexAPIException as e:
+                    logger.warning(f"Could not get rate for {base_currency}/{currency}: {e}")
+                    return 0
+            
+            current_rates = {currency: cross_rate(current_matrix, currency) for currency in target_currencies}
+            week_ago_rates = {currency: cross_rate(week_ago_matrix, currency) for currency in target_currencies}
             
             # Calculate performance (positive means base strengthened, negative means it weakened)
             performance = {}
@@ -1579,11 +2096,19 @@ def get_timeseries():
 
 @app.route('/api/forex/volatility', methods=['GET'])
 def get_volatility():
-    """API endpoint to get volatility analysis for a forex pair"""
+    """API endpoint to get volatility analysis for a forex pair, or several pairs and windows"""
     currency_pair = request.args.get('pair', 'USD/KES')
     period = request.args.get('period', 30, type=int)
+    pairs = request.args.get('pairs')
+    windows = request.args.get('windows')
     
     try:
+        if pairs or windows:
+            # e.g. ?pairs=USD/KES,EUR/KES&windows=7,30,90
+            currency_pairs = pairs.split(',') if pairs else [currency_pair]
+            window_list = [int(w) for w in windows.split(',')] if windows else DEFAULT_VOLATILITY_WINDOWS
+            return jsonify(forex_api.get_volatility_analytics(currency_pairs, window_list))
+        
         volatility = forex_api.get_forex_volatility(currency_pair, period)
         return jsonify(volatility)
     except Exception as e:
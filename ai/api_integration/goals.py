@@ -6,10 +6,19 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Union, Any
 
+try:
+    from .http_pool import get_http_pool
+except ImportError:
+    # For standalone execution
+    from http_pool import get_http_pool
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Shared keep-alive HTTP connection pools
+http_pool = get_http_pool()
+
 class GoalsAPI:
     """Class to handle financial goals API integration for PesaGuru in Kenya"""
     
@@ -80,7 +89,7 @@ class GoalsAPI:
                 logger.warning("Cannot refresh token: Missing client credentials")
                 return
                 
-            response = requests.post(
+            response = http_pool.session().post(
                 f"{self.base_url}/auth/token",
                 data={
                     "grant_type": "client_credentials",
@@ -147,7 +156,7 @@ class GoalsAPI:
         
         while retry_count < max_retries:
             try:
-                response = requests.request(
+                response = http_pool.session().request(
                     method=method,
                     url=url,
                     headers=headers,
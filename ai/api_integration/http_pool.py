@@ -0,0 +1,242 @@
+import os
+import atexit
+import time
+import socket
+import asyncio
+import logging
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('pesaguru.http_pool')
+
+# Connection pool limits shared by every upstream integration
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', 20))  # Distinct hosts with their own pool (sync)
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 20))  # Kept-alive connections per host (sync)
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', 100))  # Total open connections (async)
+HTTP_MAX_KEEPALIVE = int(os.getenv('HTTP_MAX_KEEPALIVE', 20))  # Idle connections kept open (async)
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', 60))  # Seconds an idle connection is kept
+HTTP_DNS_CACHE_TTL = float(os.getenv('HTTP_DNS_CACHE_TTL', 0))  # Seconds a resolved address is reused (0 disables)
+HTTP_DNS_CACHE_MAX_ENTRIES = int(os.getenv('HTTP_DNS_CACHE_MAX_ENTRIES', 256))  # Lookups kept at most
+
+
+class DNSCache:
+    """
+    TTL cache in front of socket.getaddrinfo().
+
+    requests (through urllib3) and httpx (through anyio) both resolve hosts with
+    socket.getaddrinfo(), so wrapping it once covers the sync and async pools.
+    Only successful lookups are cached; failures always go back to the resolver.
+
+    Installing the cache replaces socket.getaddrinfo() for the whole process and
+    getaddrinfo() does not report record TTLs, so the cache is opt-in: set
+    HTTP_DNS_CACHE_TTL below the TTL of the upstream records. Expired lookups are
+    evicted and at most ``max_entries`` are kept.
+    """
+
+    def __init__(self, ttl: float = HTTP_DNS_CACHE_TTL, max_entries: int = HTTP_DNS_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries: Dict[tuple, tuple] = {}  # lookup arguments -> (expires_at, addresses), oldest first
+        self._lock = threading.Lock()
+        self._resolve = None
+        self.hits = 0
+        self.misses = 0
+
+    def install(self) -> None:
+        """Route socket.getaddrinfo() through the cache"""
+        if self._resolve is None:
+            self._resolve = socket.getaddrinfo
+            socket.getaddrinfo = self.getaddrinfo
+
+    def uninstall(self) -> None:
+        """Restore the original socket.getaddrinfo()"""
+        if self._resolve is not None:
+            socket.getaddrinfo = self._resolve
+            self._resolve = None
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return list(entry[1])
+
+        self.misses += 1
+        addresses = self._resolve(host, port, family, type, proto, flags)
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                self._evict(now)
+            self._entries[key] = (now + self.ttl, tuple(addresses))
+        return addresses
+
+    def _evict(self, now: float) -> None:
+        """Drop expired lookups, then the oldest ones until there is room for one more"""
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class HTTPPoolManager:
+    """
+    Process-wide owner of long-lived HTTP clients.
+
+    Sync code shares one requests.Session; async code shares one httpx.AsyncClient
+    per event loop (httpx clients cannot be used across loops). Reusing kept-alive
+    connections means TLS handshakes only happen when a pool opens a new
+    connection instead of on every request, and the optional DNS cache spares
+    those new connections a lookup while the host's address is still cached.
+
+    Each async client is closed when its event loop shuts down, so the
+    short-lived loops started by asyncio.run() do not leak connections.
+    """
+
+    def __init__(self, dns_cache: DNSCache = None):
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._async_clients = weakref.WeakKeyDictionary()  # event loop -> httpx.AsyncClient
+        self._closers = set()  # Tasks closing each async client with its loop
+        self.dns_cache = dns_cache
+
+    def session(self) -> requests.Session:
+        """
+        Get the shared requests session.
+
+        Returns:
+            requests.Session: Session with pooled keep-alive connections
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def get_async_client(self):
+        """
+        Get the httpx client for the running event loop.
+
+        Returns:
+            httpx.AsyncClient: Client with pooled keep-alive connections
+        """
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+                )
+            )
+            self._async_clients[loop] = client
+            # asyncio.run() cancels pending tasks before closing the loop, which closes the client
+            closer = loop.create_task(self._close_with_loop(client))
+            self._closers.add(closer)
+            closer.add_done_callback(self._closers.discard)
+        return client
+
+    @staticmethod
+    async def _close_with_loop(client) -> None:
+        """Wait for the event loop to shut down, then close its client"""
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            if not client.is_closed:
+                await client.aclose()
+
+    @asynccontextmanager
+    async def async_client(self):
+        """
+        Borrow the pooled httpx client; unlike ``async with httpx.AsyncClient()``
+        leaving the block keeps the client and its connections open.
+        """
+        yield self.get_async_client()
+
+    async def aclose(self) -> None:
+        """Close the httpx client owned by the running event loop"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None and not client.is_closed:
+            await client.aclose()
+            logger.info("Closed pooled async HTTP client")
+
+    def close(self) -> None:
+        """Close the shared requests session"""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+                logger.info("Closed pooled HTTP session")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Describe the pools currently open.
+
+        Returns:
+            Dict[str, Any]: Pool limits and open client counts
+        """
+        return {
+            "sync_session_open": self._session is not None,
+            "async_clients_open": sum(1 for client in self._async_clients.values() if not client.is_closed),
+            "dns_cache": {
+                "ttl": self.dns_cache.ttl,
+                "entries": len(self.dns_cache),
+                "hits": self.dns_cache.hits,
+                "misses": self.dns_cache.misses,
+            } if self.dns_cache is not None else None,
+            "limits": {
+                "pool_hosts": HTTP_POOL_HOSTS,
+                "pool_maxsize": HTTP_POOL_MAXSIZE,
+                "max_connections": HTTP_MAX_CONNECTIONS,
+                "max_keepalive": HTTP_MAX_KEEPALIVE,
+                "keepalive_expiry": HTTP_KEEPALIVE_EXPIRY,
+            },
+        }
+
+
+_pool_instance = None
+_pool_instance_lock = threading.Lock()
+
+
+def get_http_pool() -> HTTPPoolManager:
+    """
+    Get the process-wide HTTP pool manager.
+
+    Returns:
+        HTTPPoolManager: The shared pool manager
+    """
+    global _pool_instance
+    if _pool_instance is None:
+        with _pool_instance_lock:
+            if _pool_instance is None:
+                dns_cache = None
+                if HTTP_DNS_CACHE_TTL > 0:
+                    dns_cache = DNSCache(HTTP_DNS_CACHE_TTL)
+                    dns_cache.install()
+                _pool_instance = HTTPPoolManager(dns_cache)
+                atexit.register(_pool_instance.close)
+    return _pool_instance
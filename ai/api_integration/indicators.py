@@ -0,0 +1,379 @@
+import logging
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .nse_panel import get_market_panel
+except ImportError:
+    # For standalone execution
+    from nse_panel import get_market_panel
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('indicators')
+
+SMA_SHORT_WINDOW = 20  # Also the Bollinger band window
+SMA_LONG_WINDOW = 50
+RSI_WINDOW = 14
+BOLLINGER_WIDTH = 2  # Band distance in standard deviations
+
+# Closes kept per symbol: enough to drop the oldest bar out of every window
+RING_SIZE = max(SMA_SHORT_WINDOW, SMA_LONG_WINDOW, RSI_WINDOW + 1)
+
+INDICATOR_COLUMNS = ['close', 'date', 'bars', 'RSI', 'SMA_20', 'SMA_50', 'upper_band', 'lower_band']
+
+
+class IndicatorEngine:
+    """
+    Rolling SMA-20/50, RSI-14 and Bollinger band state for many symbols.
+
+    Each symbol keeps its last RING_SIZE closes and running window sums, so a
+    new bar updates its indicators in O(1) instead of re-rolling the history.
+    A cold start computes the same state for every symbol at once from a
+    dates x symbols close matrix. Values match pandas rolling windows over the
+    bars a symbol actually traded (simple-average RSI, sample std bands).
+    """
+
+    def __init__(self, symbols: Optional[List[str]] = None):
+        """
+        Create an engine with empty state
+
+        Args:
+            symbols (List[str], optional): Symbols to allocate up front
+        """
+        self._lock = threading.RLock()
+        self.symbols = []
+        self.symbol_index = {}
+        self._ring = np.empty((0, RING_SIZE))
+        self._bars = np.zeros(0, dtype=np.int64)
+        self._first_date = np.empty(0, dtype='datetime64[D]')
+        self._last_date = np.empty(0, dtype='datetime64[D]')
+        self._short_sum = np.zeros(0)
+        self._short_sumsq = np.zeros(0)
+        self._long_sum = np.zeros(0)
+        self._gain_sum = np.zeros(0)
+        self._loss_sum = np.zeros(0)
+        self._add_symbols(symbols or [])
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.symbol_index
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def _add_symbols(self, symbols: List[str]) -> None:
+        """Grow the state arrays for symbols not seen before"""
+        new = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self.symbol_index]
+        if not new:
+            return
+        for symbol in new:
+            self.symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        count = len(new)
+        self._ring = np.vstack([self._ring, np.full((count, RING_SIZE), np.nan)])
+        self._bars = np.concatenate([self._bars, np.zeros(count, dtype=np.int64)])
+        for name in ('_first_date', '_last_date'):
+            setattr(self, name, np.concatenate([getattr(self, name), np.full(count, np.datetime64('NaT'), dtype='datetime64[D]')]))
+        for name in ('_short_sum', '_short_sumsq', '_long_sum', '_gain_sum', '_loss_sum'):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(count)]))
+
+    # ------------------------------------------------------------------
+    # Cold start
+    # ------------------------------------------------------------------
+
+    def cold_start(self, closes: np.ndarray, symbols: List[str],
+                   dates: Optional[Sequence] = None) -> None:
+        """
+        Replace the state of the given symbols from their close history
+
+        Args:
+            closes (np.ndarray): (dates x symbols) closes, NaN where a symbol did not trade
+            symbols (List[str]): Symbol for each column
+            dates (Sequence, optional): Date of each row (sets each symbol's first and last bar dates)
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        if closes.ndim == 1:
+            closes = closes[:, None]
+        n_rows, n_cols = closes.shape
+
+        # Push each column's traded bars to the bottom, keeping their order
+        traded = ~np.isnan(closes)
+        order = np.argsort(traded, axis=0, kind='stable')
+        packed = np.take_along_axis(closes, order, axis=0)
+        if n_rows < RING_SIZE:
+            packed = np.vstack([np.full((RING_SIZE - n_rows, n_cols), np.nan), packed])
+        window = packed[-RING_SIZE:]
+        bars = traded.sum(axis=0)
+
+        deltas = np.diff(window, axis=0)
+        short = window[-SMA_SHORT_WINDOW:]
+
+        # Bar k lives at ring position k % RING_SIZE
+        bar_numbers = bars[None, :] - RING_SIZE + np.arange(RING_SIZE)[:, None]
+        ring = np.full((n_cols, RING_SIZE), np.nan)
+        np.put_along_axis(ring, (bar_numbers % RING_SIZE).T, window.T, axis=1)
+
+        first_date = np.full(n_cols, np.datetime64('NaT'), dtype='datetime64[D]')
+        last_date = first_date.copy()
+        if dates is not None and n_rows:
+            dates = np.asarray(dates, dtype='datetime64[D]')
+            first_row = np.argmax(traded, axis=0)
+            last_row = n_rows - 1 - np.argmax(traded[::-1], axis=0)
+            first_date = np.where(bars > 0, dates[first_row], first_date)
+            last_date = np.where(bars > 0, dates[last_row], last_date)
+
+        with self._lock:
+            self._add_symbols(symbols)
+            rows = np.array([self.symbol_index[symbol] for symbol in symbols], dtype=np.int64)
+            self._ring[rows] = ring
+            self._bars[rows] = bars
+            self._first_date[rows] = first_date
+            self._last_date[rows] = last_date
+            self._short_sum[rows] = np.nansum(short, axis=0)
+            self._short_sumsq[rows] = np.nansum(short ** 2, axis=0)
+            self._long_sum[rows] = np.nansum(window[-SMA_LONG_WINDOW:], axis=0)
+            self._gain_sum[rows] = np.nansum(np.clip(deltas[-RSI_WINDOW:], 0, None), axis=0)
+            self._loss_sum[rows] = np.nansum(np.clip(-deltas[-RSI_WINDOW:], 0, None), axis=0)
+
+    @classmethod
+    def from_panel(cls, panel) -> 'IndicatorEngine':
+        """
+        Cold-start an engine for every symbol in the NSE market panel
+
+        Args:
+            panel (NSEMarketPanel): Shared market panel
+
+        Returns:
+            IndicatorEngine: Engine holding the latest indicators per symbol
+        """
+        engine = cls()
+        engine.cold_start(panel.close, panel.symbols, panel.dates)
+        return engine
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def update(self, symbol: str, close: float,
+               bar_date: Union[str, date, datetime, None] = None) -> Optional[Dict]:
+        """
+        Apply one bar in O(1)
+
+        A bar dated after the symbol's last bar is appended; one on the same
+        date replaces the last bar (intraday prices revise today's bar). Older
+        bars are ignored.
+
+        Args:
+            symbol (str): Stock symbol
+            close (float): Closing (or latest) price
+            bar_date (str | date | datetime, optional): Bar date (default: today)
+
+        Returns:
+            Optional[Dict]: The symbol's indicators after the update
+        """
+        if close is None or not np.isfinite(close):
+            return self.get(symbol)
+        bar_date = np.datetime64(pd.Timestamp(bar_date if bar_date is not None else datetime.now()).date(), 'D')
+
+        with self._lock:
+            self._add_symbols([symbol])
+            i = self.symbol_index[symbol]
+            n = int(self._bars[i])
+            last_date = self._last_date[i]
+            ring = self._ring[i]
+
+            if n and not np.isnat(last_date) and bar_date < last_date:
+                return self._row(i)
+
+            if n and bar_date == last_date:
+                # Revise the last bar: swap its close in every window sum
+                old = ring[(n - 1) % RING_SIZE]
+                self._short_sum[i] += close - old
+                self._short_sumsq[i] += close * close - old * old
+                self._long_sum[i] += close - old
+                if n > 1:
+                    previous = ring[(n - 2) % RING_SIZE]
+                    old_delta, new_delta = old - previous, close - previous
+                    self._gain_sum[i] += max(new_delta, 0) - max(old_delta, 0)
+                    self._loss_sum[i] += max(-new_delta, 0) - max(-old_delta, 0)
+                ring[(n - 1) % RING_SIZE] = close
+            else:
+                if n >= SMA_SHORT_WINDOW:
+                    dropped = ring[(n - SMA_SHORT_WINDOW) % RING_SIZE]
+                    self._short_sum[i] -= dropped
+                    self._short_sumsq[i] -= dropped * dropped
+                if n >= SMA_LONG_WINDOW:
+                    self._long_sum[i] -= ring[(n - SMA_LONG_WINDOW) % RING_SIZE]
+                if n > RSI_WINDOW:
+                    dropped_delta = ring[(n - RSI_WINDOW) % RING_SIZE] - ring[(n - RSI_WINDOW - 1) % RING_SIZE]
+                    self._gain_sum[i] -= max(dropped_delta, 0)
+                    self._loss_sum[i] -= max(-dropped_delta, 0)
+                if n:
+                    delta = close - ring[(n - 1) % RING_SIZE]
+                    self._gain_sum[i] += max(delta, 0)
+                    self._loss_sum[i] += max(-delta, 0)
+                self._short_sum[i] += close
+                self._short_sumsq[i] += close * close
+                self._long_sum[i] += close
+                ring[n % RING_SIZE] = close
+                self._bars[i] = n + 1
+                if not n:
+                    self._first_date[i] = bar_date
+                self._last_date[i] = bar_date
+
+            return self._row(i)
+
+    def sync(self, symbol: str, closes: Sequence[float], dates: Sequence) -> Optional[Dict]:
+        """
+        Bring a symbol up to date with a fetched history
+
+        Symbols are cold-started from the series when they are unknown or the
+        series reaches further back than the engine's state (e.g. a symbol that
+        so far only saw live quotes); otherwise only the bars dated from the
+        last bar on are applied, one O(1) update each.
+
+        Args:
+            symbol (str): Stock or index symbol
+            closes (Sequence[float]): Closes, oldest first
+            dates (Sequence): Date of each close
+
+        Returns:
+            Optional[Dict]: The symbol's indicators
+        """
+        dates = np.asarray(pd.to_datetime(dates).values, dtype='datetime64[D]')
+        closes = np.asarray(closes, dtype=np.float64)
+
+        traded = ~np.isnan(closes)
+        with self._lock:
+            i = self.symbol_index.get(symbol)
+            if (i is None or not self._bars[i] or np.isnat(self._last_date[i])
+                    or self._bars[i] < traded.sum()
+                    or (traded.any() and self._first_date[i] > dates[traded][0])):
+                self.cold_start(closes, [symbol], dates)
+            else:
+                newer = np.flatnonzero(dates >= self._last_date[i])
+                for position in newer:
+                    self.update(symbol, closes[position], dates[position])
+            return self.get(symbol)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _values(self, rows: np.ndarray, frame: bool = True) -> Union[pd.DataFrame, Dict]:
+        """Indicator values for state rows (NaN until a window has filled)"""
+        bars = self._bars[rows]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sma_short = np.where(bars >= SMA_SHORT_WINDOW, self._short_sum[rows] / SMA_SHORT_WINDOW, np.nan)
+            variance = (self._short_sumsq[rows] - self._short_sum[rows] ** 2 / SMA_SHORT_WINDOW) / (SMA_SHORT_WINDOW - 1)
+            std = np.sqrt(np.clip(variance, 0, None))
+            sma_long = np.where(bars >= SMA_LONG_WINDOW, self._long_sum[rows] / SMA_LONG_WINDOW, np.nan)
+            rs = self._gain_sum[rows] / self._loss_sum[rows]
+            rsi = np.where(bars > RSI_WINDOW, 100 - 100 / (1 + rs), np.nan)
+
+        values = {
+            'close': np.where(bars > 0, self._ring[rows, (bars - 1) % RING_SIZE], np.nan),
+            'date': self._last_date[rows],
+            'bars': bars,
+            'RSI': rsi,
+            'SMA_20': sma_short,
+            'SMA_50': sma_long,
+            'upper_band': sma_short + BOLLINGER_WIDTH * std,
+            'lower_band': sma_short - BOLLINGER_WIDTH * std,
+        }
+        if not frame:
+            row = {key: value[0].item() for key, value in values.items()}
+            row['date'] = pd.Timestamp(row['date']) if row['date'] is not None else None
+            return row
+
+        values['date'] = pd.to_datetime(values['date'])
+        return pd.DataFrame(
+            values,
+            index=pd.Index([self.symbols[row] for row in rows], name='symbol'),
+            columns=INDICATOR_COLUMNS
+        )
+
+    def _row(self, i: int) -> Dict:
+        """Indicator values for one state row, without building a DataFrame"""
+        return self._values(np.array([i]), frame=False)
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        """
+        Latest indicators for one symbol
+
+        Args:
+            symbol (str): Stock symbol
+
+        Returns:
+            Optional[Dict]: close, date, bars, RSI, SMA_20, SMA_50, upper_band and
+                lower_band, or None for an unknown symbol
+        """
+        with self._lock:
+            i = self.symbol_index.get(symbol)
+            if i is None or not self._bars[i]:
+                return None
+            return self._row(i)
+
+    def snapshot(self, symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Latest indicators for many symbols in one vectorized pass
+
+        Args:
+            symbols (List[str], optional): Symbols to include (default: all; unknown ones are skipped)
+
+        Returns:
+            pd.DataFrame: One row per symbol, indexed by symbol
+        """
+        with self._lock:
+            if symbols is None:
+                rows = np.arange(len(self.symbols))
+            else:
+                rows = np.array([self.symbol_index[s] for s in symbols if s in self.symbol_index], dtype=np.int64)
+            return self._values(rows)
+
+
+def compute_indicators(closes: Sequence[float]) -> Dict:
+    """
+    Indicators for a single close series (for data outside the market panel)
+
+    Args:
+        closes (Sequence[float]): Closes, oldest first
+
+    Returns:
+        Dict: Same fields as IndicatorEngine.get
+    """
+    engine = IndicatorEngine()
+    engine.cold_start(np.asarray(closes, dtype=np.float64), ['series'])
+    return engine.snapshot().iloc[0].to_dict()
+
+
+# Singleton instance
+_engine_instance = None
+_engine_instance_lock = threading.Lock()
+
+
+def get_indicator_engine() -> IndicatorEngine:
+    """
+    Get the process-wide indicator engine, cold-starting it from the market panel
+
+    Returns:
+        IndicatorEngine: Engine instance (empty when no NSE data is available)
+    """
+    global _engine_instance
+    if _engine_instance is None:
+        with _engine_instance_lock:
+            if _engine_instance is None:
+                panel = get_market_panel()
+                if panel is None:
+                    _engine_instance = IndicatorEngine()
+                else:
+                    _engine_instance = IndicatorEngine.from_panel(panel)
+                    logger.info(f"Computed indicators for {len(_engine_instance)} symbols from the market panel")
+    return _engine_instance
@@ -1,12 +1,20 @@
 import os
-import json
-import time
 import requests
 import pandas as pd
 from datetime import datetime, timedelta
 import logging
 from typing import Dict, List, Optional, Union, Tuple
 
+try:
+    from .cache import get_cache
+    from .http_pool import get_http_pool
+    from .snapshot_store import get_snapshot_store
+except ImportError:
+    # For standalone execution
+    from cache import get_cache
+    from http_pool import get_http_pool
+    from snapshot_store import get_snapshot_store
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -22,9 +30,18 @@ CBK_INFLATION_URL = "https://www.centralbank.go.ke/inflation-rates/"
 KNBS_BASE_URL = "https://www.knbs.or.ke/api/v1/"
 
 # Cache configuration
-CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
 CACHE_EXPIRY = 86400  # 24 hours in seconds
 
+# Shared two-tier cache (in-process LRU + Redis)
+cache = get_cache()
+
+# Shared keep-alive HTTP connection pools
+http_pool = get_http_pool()
+
+# Last good response from each source, served when every source is failing
+snapshots = get_snapshot_store()
+SNAPSHOT_KEY = "kenya_inflation"
+
 
 class InflationAPI:
     """Class to handle inflation data API calls and processing."""
@@ -34,19 +51,15 @@ class InflationAPI:
         Initialize the Inflation API integration.
         
         Args:
-            use_cache (bool): Whether to cache API responses locally
+            use_cache (bool): Whether to cache API responses in the shared cache
             cache_expiry (int): Cache expiry time in seconds
         """
         self.use_cache = use_cache
         self.cache_expiry = cache_expiry
-        
-        # Create cache directory if it doesn't exist
-        if use_cache and not os.path.exists(CACHE_DIR):
-            os.makedirs(CACHE_DIR)
     
     def _get_cached_data(self, cache_key: str) -> Optional[Dict]:
         """
-        Retrieve data from local cache if available and not expired.
+        Retrieve data from the shared cache if available and not expired.
         
         Args:
             cache_key (str): The key to identify the cached data
@@ -56,30 +69,15 @@ class InflationAPI:
         """
         if not self.use_cache:
             return None
-            
-        cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
         
-        if not os.path.exists(cache_file):
-            return None
-            
-        # Check if cache has expired
-        file_modified_time = os.path.getmtime(cache_file)
-        if time.time() - file_modified_time > self.cache_expiry:
-            logger.info(f"Cache for {cache_key} has expired")
-            return None
-            
-        try:
-            with open(cache_file, 'r') as f:
-                data = json.load(f)
-                logger.info(f"Retrieved {cache_key} data from cache")
-                return data
-        except Exception as e:
-            logger.error(f"Error reading cache file {cache_file}: {e}")
-            return None
+        data = cache.get("inflation", cache_key)
+        if data is not None:
+            logger.info(f"Retrieved {cache_key} data from cache")
+        return data
     
     def _save_to_cache(self, cache_key: str, data: Dict) -> bool:
         """
-        Save data to local cache.
+        Save data to the shared cache.
         
         Args:
             cache_key (str): The key to identify the cached data
@@ -90,17 +88,11 @@ class InflationAPI:
         """
         if not self.use_cache:
             return False
-            
-        cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
         
-        try:
-            with open(cache_file, 'w') as f:
-                json.dump(data, f)
-                logger.info(f"Saved {cache_key} data to cache")
-                return True
-        except Exception as e:
-            logger.error(f"Error writing to cache file {cache_file}: {e}")
-            return False
+        saved = cache.set("inflation", cache_key, data, ttl=self.cache_expiry)
+        if saved:
+            logger.info(f"Saved {cache_key} data to cache")
+        return saved
     
     def get_kenya_inflation_trading_economics(self) -> Dict:
         """
@@ -131,7 +123,7 @@ class InflationAPI:
         }
         
         try:
-            response = requests.get(url, headers=headers, params=querystring)
+            response = http_pool.session().get(url, headers=headers, params=querystring)
             response.raise_for_status()
             
             data = response.json()
@@ -178,7 +170,7 @@ class InflationAPI:
             return cached_data
         
         try:
-            response = requests.get(WORLD_BANK_ENDPOINT)
+            response = http_pool.session().get(WORLD_BANK_ENDPOINT)
             response.raise_for_status()
             
             data = response.json()
@@ -255,7 +247,7 @@ class InflationAPI:
                 "User-Agent": "PesaGuru Financial Advisor Chatbot/1.0"
             }
             
-            response = requests.get(url, headers=headers)
+            response = http_pool.session().get(url, headers=headers)
             
             # If CBK doesn't offer an API, this would fail and we'd need to implement scraping
             if response.status_code == 404:
@@ -323,7 +315,7 @@ class InflationAPI:
                 "User-Agent": "PesaGuru Financial Advisor Chatbot/1.0"
             }
             
-            response = requests.get(url, headers=headers)
+            response = http_pool.session().get(url, headers=headers)
             
             # If KNBS doesn't offer an API, this would fail
             if response.status_code == 404:
@@ -373,30 +365,37 @@ class InflationAPI:
         Fetch Kenya inflation data using multiple sources with fallback.
         
         The function tries different data sources in order of reliability
-        and returns the first successful result.
+        and returns the first successful result. Sources that failed recently
+        are skipped; if none answers, the last good response from the most
+        reliable source is served, marked stale with its age.
         
         Returns:
             Dict: Inflation data from the first successful source
         """
-        # Try Trading Economics API first
-        data = self.get_kenya_inflation_trading_economics()
-        if "error" not in data and data.get("historical_data"):
-            return data
-        
-        # Try World Bank API as fallback
-        data = self.get_kenya_inflation_world_bank()
-        if "error" not in data and data.get("historical_data"):
-            return data
-        
-        # Try Central Bank of Kenya as fallback
-        data = self.get_kenya_inflation_cbk()
-        if "error" not in data and data.get("historical_data"):
-            return data
-        
-        # Try KNBS as last resort
-        data = self.get_kenya_inflation_knbs()
-        if "error" not in data and data.get("historical_data"):
-            return data
+        # Trading Economics first, then World Bank, CBK and KNBS as last resort
+        sources = [
+            ("inflation_trading_economics", self.get_kenya_inflation_trading_economics),
+            ("inflation_world_bank", self.get_kenya_inflation_world_bank),
+            ("inflation_cbk", self.get_kenya_inflation_cbk),
+            ("inflation_knbs", self.get_kenya_inflation_knbs),
+        ]
+        
+        for source, fetch in sources:
+            if snapshots.is_down(source):
+                continue
+            data = fetch()
+            if "error" not in data and data.get("historical_data"):
+                snapshots.mark_ok(source)
+                snapshots.save(source, SNAPSHOT_KEY, data)
+                return data
+            snapshots.mark_failed(source)
+        
+        # No source answered; fall back to the last known good data
+        for source, _ in sources:
+            data = snapshots.serve(source, SNAPSHOT_KEY)
+            if data is not None:
+                logger.info(f"Serving last-known-good inflation data from {source}")
+                return data
         
         # If all sources fail, return a consolidated error
         return {
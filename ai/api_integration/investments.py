@@ -1,14 +1,20 @@
 import os
 import json
 import logging
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import time
 from dotenv import load_dotenv
 from functools import lru_cache
-import redis
+
+try:
+    from .cache import get_cache
+    from .http_pool import get_http_pool
+except ImportError:
+    # For standalone execution
+    from cache import get_cache
+    from http_pool import get_http_pool
 
 # Configure logging
 logging.basicConfig(
@@ -26,22 +32,11 @@ YAHOO_FINANCE_API_KEY = os.getenv('YAHOO_FINANCE_API_KEY', '64be62d004msh5d2c420
 ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY', '08HAWE6C99AGWNEZ')
 RAPIDAPI_KEY = os.getenv('RAPIDAPI_KEY', '64be62d004msh5d2c420664b91e8p114762jsn5d31ba70e581')
 
-# Redis configuration for caching
-try:
-    redis_client = redis.Redis(
-        host=os.getenv('REDIS_HOST', 'localhost'),
-        port=int(os.getenv('REDIS_PORT', 6379)),
-        db=int(os.getenv('REDIS_DB', 0)),
-        password=os.getenv('REDIS_PASSWORD', None),
-        decode_responses=True
-    )
-    # Test connection
-    redis_client.ping()
-    REDIS_AVAILABLE = True
-    logger.info("Redis connection established successfully")
-except Exception as e:
-    REDIS_AVAILABLE = False
-    logger.warning(f"Redis connection failed: {e}. Will use in-memory caching.")
+# Shared two-tier cache (in-process LRU + Redis)
+cache = get_cache()
+
+# Shared keep-alive HTTP connection pools
+http_pool = get_http_pool()
 
 # Constants
 NSE_SECTORS = [
@@ -77,17 +72,7 @@ class InvestmentAPI:
         Returns:
             dict or None: Cached data or None if not found
         """
-        if not REDIS_AVAILABLE:
-            return None
-            
-        try:
-            data = redis_client.get(key)
-            if data:
-                return json.loads(data)
-            return None
-        except Exception as e:
-            logger.error(f"Error getting data from cache: {e}")
-            return None
+        return cache.get("investments", key)
 
     def _cache_set(self, key, data, expiry=300):
         """
@@ -101,15 +86,7 @@ class InvestmentAPI:
         Returns:
             bool: True if successful, False otherwise
         """
-        if not REDIS_AVAILABLE:
-            return False
-            
-        try:
-            redis_client.setex(key, expiry, json.dumps(data))
-            return True
-        except Exception as e:
-            logger.error(f"Error setting data in cache: {e}")
-            return False
+        return cache.set("investments", key, data, ttl=expiry)
 
     def get_stock_price(self, symbol):
         """
@@ -136,7 +113,7 @@ class InvestmentAPI:
                 "X-RapidAPI-Host": self.nse_api_host
             }
             
-            response = requests.get(url, headers=headers)
+            response = http_pool.session().get(url, headers=headers)
             
             if response.status_code == 200:
                 data = response.json()
@@ -171,7 +148,7 @@ class InvestmentAPI:
                 "X-RapidAPI-Host": self.yahoo_finance_api_host
             }
             
-            response = requests.get(url, headers=headers)
+            response = http_pool.session().get(url, headers=headers)
             
             if response.status_code == 200:
                 data = response.json()
@@ -218,7 +195,7 @@ class InvestmentAPI:
                 "X-RapidAPI-Host": self.nse_api_host
             }
             
-            response = requests.get(url, headers=headers)
+            response = http_pool.session().get(url, headers=headers)
             
             if response.status_code == 200:
                 data = response.json()
@@ -265,7 +242,7 @@ class InvestmentAPI:
                 "X-RapidAPI-Host": self.yahoo_finance_api_host
             }
             
-            response = requests.get(url, headers=headers, params=params)
+            response = http_pool.session().get(url, headers=headers, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -340,7 +317,7 @@ class InvestmentAPI:
                 "X-RapidAPI-Host": self.yahoo_finance_api_host
             }
             
-            response = requests.get(url, headers=headers, params=params)
+            response = http_pool.session().get(url, headers=headers, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -1,12 +1,20 @@
 import os
 import json
-import time
 import logging
 from datetime import datetime, timedelta
 import requests
-import redis
 from dotenv import load_dotenv
 
+try:
+    from .cache import get_cache
+    from .http_pool import get_http_pool
+    from .rate_limit import get_rate_limiter
+except ImportError:
+    # For standalone execution
+    from cache import get_cache
+    from http_pool import get_http_pool
+    from rate_limit import get_rate_limiter
+
 # Load environment variables
 load_dotenv()
 
@@ -17,18 +25,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Redis for caching (if available)
-try:
-    redis_client = redis.Redis(
-        host=os.getenv('REDIS_HOST', 'localhost'),
-        port=int(os.getenv('REDIS_PORT', 6379)),
-        db=int(os.getenv('REDIS_DB', 0)),
-        password=os.getenv('REDIS_PASSWORD', None)
-    )
-    REDIS_AVAILABLE = True
-except Exception:
-    logger.warning("Redis not available. Running without cache.")
-    REDIS_AVAILABLE = False
+# Shared two-tier cache (in-process LRU + Redis)
+cache = get_cache()
+
+# Shared keep-alive HTTP connection pools
+http_pool = get_http_pool()
 
 class MacroeconomicAPI:
     """
@@ -51,30 +52,38 @@ class MacroeconomicAPI:
         self.cache_enabled = os.getenv('ENABLE_CACHE', 'True').lower() == 'true'
         self.cache_ttl = int(os.getenv('CACHE_TTL', 3600))  # Default: 1 hour
         
-        # Rate limiting
-        self.request_intervals = {}
-        self.last_request_time = {}
-    
     def _rate_limit(self, api_name, min_interval=1):
         """
         Implement rate limiting to prevent API abuse.
         
+        Requests to one API are spaced at least min_interval apart across all
+        workers, using the shared token-bucket limiter.
+        
         Args:
             api_name (str): Name of the API being called
             min_interval (float): Minimum interval between requests in seconds
             
         Returns:
-            None
+            bool: True if a request slot was acquired before the limiter timed out
         """
-        current_time = time.time()
-        if api_name in self.last_request_time:
-            elapsed = current_time - self.last_request_time[api_name]
-            if elapsed < min_interval:
-                sleep_time = min_interval - elapsed
-                logger.debug(f"Rate limiting {api_name} API. Sleeping for {sleep_time:.2f} seconds")
-                time.sleep(sleep_time)
-        
-        self.last_request_time[api_name] = time.time()
+        limiter = get_rate_limiter(f"macroeconomic.{api_name}", rate=1, per=min_interval, burst=1)
+        return limiter.acquire()
+    
+    def _rate_limited_response(self, description):
+        """
+        Build the error response returned when the rate limiter timed out.
+        
+        Args:
+            description (str): What was being fetched
+            
+        Returns:
+            dict: Error response in the same shape as upstream failures
+        """
+        logger.warning(f"Rate limit reached, not fetching {description}")
+        return {
+            "error": f"Rate limit reached while fetching {description}",
+            "timestamp": datetime.now().isoformat()
+        }
     
     def _get_from_cache(self, cache_key):
         """
@@ -86,17 +95,10 @@ class MacroeconomicAPI:
         Returns:
             dict or None: Cached data if available, None otherwise
         """
-        if not self.cache_enabled or not REDIS_AVAILABLE:
+        if not self.cache_enabled:
             return None
         
-        try:
-            cached_data = redis_client.get(cache_key)
-            if cached_data:
-                return json.loads(cached_data)
-        except Exception as e:
-            logger.warning(f"Error retrieving from cache: {e}")
-        
-        return None
+        return cache.get("macroeconomic", cache_key)
     
     def _save_to_cache(self, cache_key, data, ttl=None):
         """
@@ -110,21 +112,11 @@ class MacroeconomicAPI:
         Returns:
             bool: True if successfully cached, False otherwise
         """
-        if not self.cache_enabled or not REDIS_AVAILABLE:
+        if not self.cache_enabled:
             return False
         
         ttl = ttl if ttl is not None else self.cache_ttl
-        
-        try:
-            redis_client.setex(
-                cache_key,
-                ttl,
-                json.dumps(data)
-            )
-            return True
-        except Exception as e:
-            logger.warning(f"Error saving to cache: {e}")
-            return False
+        return cache.set("macroeconomic", cache_key, data, ttl=ttl)
     
     def get_cbk_interest_rates(self, force_refresh=False):
         """
@@ -146,14 +138,15 @@ class MacroeconomicAPI:
                 return cached_data
         
         # Rate limit
-        self._rate_limit("cbk_api", 2)
+        if not self._rate_limit("cbk_api", 2):
+            return self._rate_limited_response("CBK interest rates")
         
         try:
             # For CBK API integration, we would use the actual endpoint
             # headers = {
             #     "Authorization": f"Bearer {self.cbk_api_key}"
             # }
-            # response = requests.get(f"{self.cbk_base_url}/interest-rates", headers=headers)
+            # response = http_pool.session().get(f"{self.cbk_base_url}/interest-rates", headers=headers)
             # response.raise_for_status()
             # data = response.json()
             
@@ -209,7 +202,8 @@ class MacroeconomicAPI:
                 return cached_data
         
         # Rate limit
-        self._rate_limit("exchange_rate_api", 1)
+        if not self._rate_limit("exchange_rate_api", 1):
+            return self._rate_limited_response("exchange rates")
         
         try:
             headers = {
@@ -220,7 +214,7 @@ class MacroeconomicAPI:
             # First, check if we're fetching KES rates
             if base_currency == "KES":
                 # If base is KES, we'll need to fetch USD/KES and then calculate others
-                response = requests.get(
+                response = http_pool.session().get(
                     f"{self.exchange_rate_url}/latest",
                     headers=headers,
                     params={"base": "USD"}
@@ -242,7 +236,7 @@ class MacroeconomicAPI:
                         rates[currency] = rate / usd_to_kes
             else:
                 # For other base currencies, fetch directly
-                response = requests.get(
+                response = http_pool.session().get(
                     f"{self.exchange_rate_url}/latest",
                     headers=headers,
                     params={"base": base_currency}
@@ -291,7 +285,8 @@ class MacroeconomicAPI:
                 return cached_data
         
         # Rate limit
-        self._rate_limit("economic_data_api", 2)
+        if not self._rate_limit("economic_data_api", 2):
+            return self._rate_limited_response("Kenya GDP data")
         
         try:
             # For actual implementation, replace with real API call
@@ -349,7 +344,8 @@ class MacroeconomicAPI:
                 return cached_data
         
         # Rate limit
-        self._rate_limit("economic_data_api", 2)
+        if not self._rate_limit("economic_data_api", 2):
+            return self._rate_limited_response("Kenya inflation data")
         
         try:
             # For actual implementation, replace with real API call
@@ -420,7 +416,8 @@ class MacroeconomicAPI:
                 return cached_data
         
         # Rate limit
-        self._rate_limit("economic_data_api", 2)
+        if not self._rate_limit("economic_data_api", 2):
+            return self._rate_limited_response("Kenya balance of trade data")
         
         try:
             # Using information from Table_17__Balance_of_Merchandise_Trade__20192023_.csv
@@ -486,7 +483,8 @@ class MacroeconomicAPI:
                 return cached_data
         
         # Rate limit
-        self._rate_limit("financial_indicators_api", 2)
+        if not self._rate_limit("financial_indicators_api", 2):
+            return self._rate_limited_response("Kenya financial indicators")
         
         try:
             # Using information from Table_2__Trends_in_the_Real_Values_of_Selected_Financial_Aggregates
@@ -577,7 +575,8 @@ class MacroeconomicAPI:
                 return cached_data
         
         # Rate limit
-        self._rate_limit("economic_forecast_api", 2)
+        if not self._rate_limit("economic_forecast_api", 2):
+            return self._rate_limited_response(f"{country} economic forecast")
         
         try:
             # For actual implementation, replace with real API call
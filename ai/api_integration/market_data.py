@@ -1,16 +1,31 @@
 import os
 import requests
 import json
+import functools
+import inspect
+import time
+import threading
+import concurrent.futures
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import logging
 from typing import Dict, List, Union, Optional, Any
-import aiohttp
 import asyncio
-import redis
 from dotenv import load_dotenv
 
+try:
+    from .cache import get_cache, with_staleness_marker, ColumnarCodec
+    from .http_pool import get_http_pool
+    from .market_hours import CBK_DAILY, FOREX, NSE_DAILY, NSE_SESSION, is_complete, policy_ttl
+    from .stock_index import get_stock_index
+except ImportError:
+    # For standalone execution
+    from cache import get_cache, with_staleness_marker, ColumnarCodec
+    from http_pool import get_http_pool
+    from market_hours import CBK_DAILY, FOREX, NSE_DAILY, NSE_SESSION, is_complete, policy_ttl
+    from stock_index import get_stock_index
+
 # Load environment variables
 load_dotenv()
 
@@ -35,26 +50,11 @@ COIN_GECKO_API_KEY = os.getenv("COIN_GECKO_API_KEY")
 MPESA_API_KEY = os.getenv("MPESA_API_KEY")
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 
-# Redis client for caching
-REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
-REDIS_DB = int(os.getenv("REDIS_DB", "0"))
-REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
+# Shared two-tier cache (in-process LRU + Redis)
+cache = get_cache()
 
-try:
-    redis_client = redis.Redis(
-        host=REDIS_HOST,
-        port=REDIS_PORT,
-        db=REDIS_DB,
-        password=REDIS_PASSWORD,
-        decode_responses=True
-    )
-    redis_client.ping()  # Test connection
-    REDIS_AVAILABLE = True
-    logger.info("Redis cache connection established successfully")
-except Exception as e:
-    logger.warning(f"Redis cache connection failed: {e}. Will operate without caching.")
-    REDIS_AVAILABLE = False
+# Shared keep-alive HTTP connection pools
+http_pool = get_http_pool()
 
 # Cache TTL in seconds
 CACHE_TTL = {
@@ -66,6 +66,60 @@ CACHE_TTL = {
     "stock_historical": 60 * 60 * 24,  # 24 hours for historical data
 }
 
+# When each kind of data can change; the TTL policy stretches or trims CACHE_TTL to match
+CACHE_DATA_CLASS = {
+    "stock_price": NSE_SESSION,
+    "nse_market_summary": NSE_SESSION,
+    "stock_historical": NSE_DAILY,
+    "forex_rates": FOREX,
+    "cbk_rates": CBK_DAILY,
+}
+
+# Time series are stored in Redis as compressed columnar arrays instead of JSON
+CACHE_CODECS = {
+    "stock_historical": ColumnarCodec(),
+    "crypto_historical": ColumnarCodec(),
+}
+
+# Upstream provider behind each fetchable function; concurrency caps apply per provider
+FETCH_SOURCES = {
+    "stock_price": "nse",
+    "stock_historical": "nse",
+    "stock_search": "nse",
+    "nse_market_summary": "nse",
+    "sector_performance": "nse",
+    "cbk_rates": "cbk",
+    "economic_indicators": "cbk",
+    "treasury_bonds_rates": "cbk",
+    "forex_rates": "forex",
+    "crypto_prices": "coingecko",
+    "crypto_historical": "coingecko",
+    "market_news": "news",
+    "stock_sentiment": "news",
+    "mpesa_loan_rates": "lenders",
+    "bank_loan_rates": "lenders",
+    "unit_trust_rates": "lenders",
+}
+
+# Maximum in-flight calls per provider within one event loop
+SOURCE_CONCURRENCY = {
+    "nse": 4,
+    "cbk": 2,
+    "forex": 2,
+    "coingecko": 2,  # Free tier rate limits aggressively
+    "news": 2,
+}
+DEFAULT_SOURCE_CONCURRENCY = 4
+
+# Seconds one call may take (including time queued behind its provider's cap)
+DEFAULT_FETCH_TIMEOUT = 15
+FETCH_MAX_WORKERS = 16  # Threads running blocking API calls for fetch_multiple_apis
+FETCH_TIMINGS_KEY = "timings"  # Reserved fetch_multiple_apis result key (never a query key)
+
+# Market snapshots are served stale-while-revalidate
+SNAPSHOT_TTL = 60  # Seconds a snapshot counts as fresh
+SNAPSHOT_MAX_STALENESS = 60 * 10  # Hard bound on how stale a served snapshot may be
+
 
 class APIError(Exception):
     """Custom exception for API errors"""
@@ -73,47 +127,51 @@ class APIError(Exception):
 
 
 def get_cache_key(prefix: str, **kwargs) -> str:
-    """Generate a cache key from prefix and parameters"""
-    params = "_".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
-    return f"{prefix}:{params}"
+    """Generate a canonical cache key from prefix and parameters"""
+    return cache.make_key(prefix, **kwargs)
 
 
 def cache_result(func):
-    """Decorator to cache API results using Redis"""
-    def wrapper(*args, **kwargs):
-        if not REDIS_AVAILABLE:
-            return func(*args, **kwargs)
+    """Decorator to cache API results in the shared two-tier cache"""
+    namespace = func.__name__
+    base_ttl = CACHE_TTL.get(namespace, 300)  # Default 5 minutes
+    cache.configure_namespace(
+        namespace,
+        ttl=base_ttl,
+        codec=CACHE_CODECS.get(namespace)
+    )
+    data_class = CACHE_DATA_CLASS.get(namespace)
+    signature = inspect.signature(func)
 
-        # Generate cache key based on function name and arguments
-        func_name = func.__name__
-        cache_key = get_cache_key(func_name, **kwargs)
-        ttl = CACHE_TTL.get(func_name.split("_")[0], 300)  # Default 5 minutes
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Bind positional and keyword arguments (with defaults) so that
+        # stock_price("SCOM") and stock_price(symbol="SCOM") share one key
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        cache_key = get_cache_key(namespace, **bound.arguments)
 
-        # Check if result is cached
-        cached_result = redis_client.get(cache_key)
-        if cached_result:
-            logger.info(f"Cache hit for {cache_key}")
-            return json.loads(cached_result)
+        def load():
+            logger.info(f"Cache miss for {cache_key}, fetching from source")
+            return func(*args, **kwargs)
 
-        # Execute function and cache result
-        result = func(*args, **kwargs)
-        if result:
-            redis_client.setex(cache_key, ttl, json.dumps(result))
-            logger.info(f"Cached result for {cache_key} (TTL: {ttl}s)")
+        def ttl(value):
+            return policy_ttl(base_ttl, data_class, complete=is_complete(value))
 
-        return result
+        # Concurrent misses for the same key share a single upstream fetch
+        return cache.get_or_set(namespace, cache_key, load, ttl=ttl)
     return wrapper
 
 
 async def fetch_async(url: str, headers: Dict = None, params: Dict = None) -> Dict:
     """Async function to fetch data from API"""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, params=params) as response:
-                if response.status != 200:
-                    logger.error(f"API request failed: {response.status} - {await response.text()}")
-                    return None
-                return await response.json()
+        async with http_pool.async_client() as client:
+            response = await client.get(url, headers=headers, params=params, timeout=30)
+            if response.status_code != 200:
+                logger.error(f"API request failed: {response.status_code} - {response.text}")
+                return None
+            return response.json()
     except Exception as e:
         logger.error(f"Async fetch error: {e}")
         return None
@@ -122,7 +180,7 @@ async def fetch_async(url: str, headers: Dict = None, params: Dict = None) -> Di
 def fetch_data(url: str, headers: Dict = None, params: Dict = None) -> Dict:
     """Fetch data from API with error handling"""
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=30)
+        response = http_pool.session().get(url, headers=headers, params=params, timeout=30)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.HTTPError as e:
@@ -383,6 +441,20 @@ def stock_search(query: str) -> List[Dict]:
     """
     logger.info(f"Searching for stocks with query: {query}")
     
+    # Listed NSE stocks are answered from the local index without a network call
+    matches = get_stock_index().search(query, limit=10)
+    if matches:
+        return [
+            {
+                "symbol": match["symbol"],
+                "name": match["name"],
+                "sector": match["sector"],
+                "exchange": "NSE",
+                "currency": "KES"
+            }
+            for match in matches
+        ]
+    
     # Try Alpha Vantage first for search
     try:
         url = "https://www.alphavantage.co/query"
@@ -468,10 +540,13 @@ def nse_market_summary() -> Dict:
         # Get top gainers and losers by fetching and sorting individual stocks
         # This is a simplified approach; in production, use actual API endpoints for top movers
         top_stocks = []
+        missing = []
         for symbol in ["SCOM", "EQTY", "KCB", "COOP", "ABSA", "BAT", "EABL", "SCBK", "DTK", "JUB"]:
             stock_data = stock_price(symbol)
             if stock_data:
                 top_stocks.append(stock_data)
+            else:
+                missing.append(symbol)
         
         # Sort by change percent for gainers and losers
         top_stocks.sort(key=lambda x: x.get("change_percent", 0), reverse=True)
@@ -484,7 +559,8 @@ def nse_market_summary() -> Dict:
             "timestamp": datetime.now().isoformat(),
             "indices": indices,
             "top_gainers": gainers,
-            "top_losers": losers
+            "top_losers": losers,
+            "partial": bool(missing)  # Some quotes could not be fetched
         }
     except Exception as e:
         logger.error(f"Failed to fetch NSE market summary: {e}")
@@ -1405,15 +1481,82 @@ def sector_performance() -> Dict:
 
 
 # API Utility Functions
-async def fetch_multiple_apis(query_list: List[Dict]) -> Dict:
+# Process-wide provider caps, shared by every fan-out whichever event loop it runs on
+_source_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_source_semaphores_lock = threading.Lock()
+
+# Dedicated pool so that asyncio.run() never waits on a call that missed its deadline
+_fetch_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=FETCH_MAX_WORKERS, thread_name_prefix="market-fetch"
+)
+
+
+def _get_source_semaphore(source: str) -> threading.BoundedSemaphore:
+    """Return the concurrency-limiting semaphore for a provider"""
+    semaphore = _source_semaphores.get(source)
+    if semaphore is None:
+        with _source_semaphores_lock:
+            semaphore = _source_semaphores.setdefault(
+                source, threading.BoundedSemaphore(SOURCE_CONCURRENCY.get(source, DEFAULT_SOURCE_CONCURRENCY))
+            )
+    return semaphore
+
+
+def _call_with_source_limit(source: str, func, args: List, kwargs: Dict, timeout: float):
+    """Run a blocking API call once its provider has a free slot"""
+    semaphore = _get_source_semaphore(source)
+    # Give up once the caller's deadline has passed rather than holding a worker thread
+    if not semaphore.acquire(timeout=timeout):
+        raise TimeoutError(f"No free {source} slot within {timeout}s")
+    try:
+        return func(*args, **kwargs)
+    finally:
+        semaphore.release()
+
+
+async def _fetch_one(key: str, source: str, func, args: List, kwargs: Dict, timeout: float) -> Dict:
+    """Run one blocking API function in a worker thread under its provider cap and deadline"""
+    started = time.perf_counter()
+    outcome = {"source": source, "status": "ok", "result": None}
+    
+    # Blocking HTTP clients run in the fetch thread pool
+    call = asyncio.get_running_loop().run_in_executor(
+        _fetch_executor, functools.partial(_call_with_source_limit, source, func, args, kwargs, timeout)
+    )
+    
+    try:
+        outcome["result"] = await asyncio.wait_for(call, timeout=timeout)
+    except asyncio.TimeoutError:
+        # The worker thread finishes in the background; its result is discarded
+        logger.warning(f"Timed out fetching data for {key} after {timeout}s")
+        outcome["status"] = "timeout"
+    except Exception as e:
+        logger.error(f"Error fetching data for {key}: {e}")
+        outcome["status"] = "error"
+        outcome["error"] = str(e)
+    
+    outcome["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return outcome
+
+
+async def fetch_multiple_apis(query_list: List[Dict], timeout: float = DEFAULT_FETCH_TIMEOUT) -> Dict:
     """
     Fetch data from multiple APIs concurrently
     
+    All queries start at once; calls to the same provider are capped by
+    SOURCE_CONCURRENCY across the whole process. A call that fails or misses
+    its deadline yields None without holding up the others, so callers always
+    get partial results. The source, status and elapsed time of every call are
+    returned under FETCH_TIMINGS_KEY; drop that entry before caching results.
+    
     Args:
-        query_list: List of dictionaries with 'function', 'args', and 'kwargs' keys
+        query_list: List of dictionaries with 'function', 'args', 'kwargs', 'key'
+            and optional per-call 'timeout' keys
+        timeout: Default per-call deadline in seconds
         
     Returns:
-        Dict with API responses
+        Dict with API responses keyed by query key, plus a FETCH_TIMINGS_KEY
+        entry with the source, status and elapsed_ms of every call
     """
     logger.info(f"Fetching data from {len(query_list)} APIs concurrently")
     
@@ -1438,35 +1581,43 @@ async def fetch_multiple_apis(query_list: List[Dict]) -> Dict:
             "sector_performance": sector_performance
         }
         
-        # Create tasks for each API request
-        results = {}
-        tasks = []
+        # Create a coroutine for each API request
+        keys = []
+        calls = []
         
         for i, query in enumerate(query_list):
             func_name = query.get("function")
-            args = query.get("args", [])
-            kwargs = query.get("kwargs", {})
             
             if func_name in function_map:
-                func = function_map[func_name]
-                
-                # Handle the function call
                 key = query.get("key", f"{func_name}_{i}")
-                
-                # Use asyncio.to_thread to run synchronous functions asynchronously
-                task = asyncio.to_thread(func, *args, **kwargs)
-                tasks.append((key, task))
+                if key == FETCH_TIMINGS_KEY:
+                    logger.warning(f"Query key '{key}' is reserved for call timings; skipping {func_name}")
+                    continue
+                keys.append(key)
+                calls.append(_fetch_one(
+                    key,
+                    FETCH_SOURCES.get(func_name, func_name),
+                    function_map[func_name],
+                    query.get("args", []),
+                    query.get("kwargs", {}),
+                    query.get("timeout", timeout)
+                ))
             else:
                 logger.warning(f"Unknown function: {func_name}")
         
-        # Run tasks concurrently
-        for key, task in tasks:
-            try:
-                result = await task
-                results[key] = result
-            except Exception as e:
-                logger.error(f"Error fetching data for {key}: {e}")
-                results[key] = None
+        # Run every request at once; _fetch_one never raises, so one slow or
+        # failing source cannot cancel or delay the rest
+        outcomes = await asyncio.gather(*calls)
+        
+        results = {}
+        timings = {}
+        for key, outcome in zip(keys, outcomes):
+            results[key] = outcome.pop("result")
+            timings[key] = outcome
+        results[FETCH_TIMINGS_KEY] = timings
+        logger.info("Fetch timings: " + ", ".join(
+            f"{key}={outcome['status']}/{outcome['elapsed_ms']}ms" for key, outcome in timings.items()
+        ))
         
         return results
     except Exception as e:
@@ -1474,34 +1625,52 @@ async def fetch_multiple_apis(query_list: List[Dict]) -> Dict:
         return {}
 
 
+def run_fetch_multiple_apis(query_list: List[Dict], timeout: float = DEFAULT_FETCH_TIMEOUT) -> Dict:
+    """
+    Synchronous entry point for fetch_multiple_apis
+    
+    Safe to call from plain threads and from code already running inside an
+    event loop (the fan-out then runs on its own loop in a helper thread).
+    
+    Args:
+        query_list: Queries as accepted by fetch_multiple_apis
+        timeout: Default per-call deadline in seconds
+        
+    Returns:
+        Dict with API responses and timings
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(fetch_multiple_apis(query_list, timeout=timeout))
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, fetch_multiple_apis(query_list, timeout=timeout)).result()
+
+
 def get_market_snapshot() -> Dict:
     """
     Get a comprehensive market snapshot with key data
     
+    Snapshots are served stale-while-revalidate: once one has been built, callers
+    get the cached copy immediately (marked with 'stale' and 'data_age_seconds')
+    while an expired snapshot is rebuilt in the background. Snapshots older than
+    SNAPSHOT_TTL + SNAPSHOT_MAX_STALENESS are never served.
+    
     Returns:
         Dict containing market snapshot data
     """
-    logger.info("Generating market snapshot")
-    
     try:
-        # Define the APIs to call
-        query_list = [
-            {"function": "nse_market_summary", "key": "nse_summary"},
-            {"function": "forex_rates", "key": "forex_rates"},
-            {"function": "crypto_prices", "key": "crypto_prices"},
-            {"function": "market_news", "kwargs": {"limit": 5}, "key": "latest_news"},
-            {"function": "cbk_rates", "key": "cbk_rates"},
-            {"function": "economic_indicators", "key": "economic_indicators"}
-        ]
-        
-        # Use asyncio to run the requests
-        loop = asyncio.get_event_loop()
-        results = loop.run_until_complete(fetch_multiple_apis(query_list))
-        
-        # Add timestamp
-        results["timestamp"] = datetime.now().isoformat()
-        
-        return results
+        snapshot, age, is_stale = cache.get_stale_while_revalidate(
+            "market_snapshot", "latest", _build_market_snapshot,
+            ttl=SNAPSHOT_TTL, max_stale=SNAPSHOT_MAX_STALENESS
+        )
+        if snapshot is None:
+            return {
+                "error": "Market data sources are unavailable",
+                "timestamp": datetime.now().isoformat()
+            }
+        return with_staleness_marker(snapshot, age, is_stale)
     except Exception as e:
         logger.error(f"Error generating market snapshot: {e}")
         return {
@@ -1510,6 +1679,37 @@ def get_market_snapshot() -> Dict:
         }
 
 
+def _build_market_snapshot() -> Optional[Dict]:
+    """Fetch the data behind a market snapshot, or None if every upstream API failed"""
+    logger.info("Generating market snapshot")
+    
+    # Define the APIs to call
+    query_list = [
+        {"function": "nse_market_summary", "key": "nse_summary"},
+        {"function": "forex_rates", "key": "forex_rates"},
+        {"function": "crypto_prices", "key": "crypto_prices"},
+        {"function": "market_news", "kwargs": {"limit": 5}, "key": "latest_news"},
+        {"function": "cbk_rates", "key": "cbk_rates"},
+        {"function": "economic_indicators", "key": "economic_indicators"}
+    ]
+    
+    # Runs on request threads and background refresh threads alike
+    results = run_fetch_multiple_apis(query_list)
+    
+    # Timings describe this fetch only; they must not be cached with the snapshot
+    results.pop(FETCH_TIMINGS_KEY, None)
+    
+    # An empty snapshot must not replace (or be cached as) a good one
+    if not any(results.get(query["key"]) for query in query_list):
+        logger.error("Every market data source failed; no snapshot built")
+        return None
+    
+    # Add timestamp
+    results["timestamp"] = datetime.now().isoformat()
+    
+    return results
+
+
 def analyze_investment_options(risk_profile: str = "moderate") -> Dict:
     """
     Analyze investment options based on risk profile
@@ -1530,9 +1730,8 @@ def analyze_investment_options(risk_profile: str = "moderate") -> Dict:
             {"function": "sector_performance", "key": "sectors"}
         ]
         
-        # Use asyncio to run the requests
-        loop = asyncio.get_event_loop()
-        results = loop.run_until_complete(fetch_multiple_apis(query_list))
+        # Fetch all sources concurrently
+        results = run_fetch_multiple_apis(query_list)
         
         # Process the data based on risk profile
         recommendations = {
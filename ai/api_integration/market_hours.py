@@ -0,0 +1,285 @@
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Any, FrozenSet, Optional
+
+# NSE trading calendar (Kenya does not observe daylight saving, so a fixed offset is exact)
+NSE_TIMEZONE = timezone(timedelta(hours=3), "EAT")
+NSE_OPEN_TIME = time.fromisoformat(os.getenv("NSE_OPEN_TIME", "09:30"))
+NSE_CLOSE_TIME = time.fromisoformat(os.getenv("NSE_CLOSE_TIME", "15:00"))
+NSE_EOD_DELAY = timedelta(minutes=int(os.getenv("NSE_EOD_DELAY_MINUTES", 30)))  # Close until end-of-day data is published
+NSE_TRADING_DAYS = {0, 1, 2, 3, 4}  # Monday to Friday
+NSE_HOLIDAYS = {
+    date.fromisoformat(day.strip())
+    for day in os.getenv("NSE_HOLIDAYS", "").split(",") if day.strip()
+}  # Comma-separated YYYY-MM-DD closures not derivable from the calendar (e.g. Idd-ul-Fitr, gazetted one-offs)
+
+# CBK publication calendar
+CBK_PUBLICATION_TIME = time.fromisoformat(os.getenv("CBK_PUBLICATION_TIME", "16:00"))  # Daily indicative and interbank rates
+CBK_AUCTION_RESULTS_DAY = 4  # T-bill auction results come out on Fridays
+
+# Interbank forex trades around the clock on weekdays; the week runs Monday 01:00 to Saturday 01:00 EAT
+FOREX_WEEK_OPEN = (0, time(1, 0))
+FOREX_WEEK_CLOSE = (5, time(1, 0))
+
+# Kenyan public holidays on fixed dates (month, day); a holiday falling on a Sunday is observed on the Monday
+FIXED_PUBLIC_HOLIDAYS = [
+    (1, 1),    # New Year's Day
+    (5, 1),    # Labour Day
+    (6, 1),    # Madaraka Day
+    (10, 10),  # Mazingira Day
+    (10, 20),  # Mashujaa Day
+    (12, 12),  # Jamhuri Day
+    (12, 25),  # Christmas Day
+    (12, 26),  # Boxing Day
+]
+
+# Data classes the TTL policy distinguishes
+NSE_SESSION = "nse_session"  # Quotes, indices and movers: change only while the NSE trades
+NSE_DAILY = "nse_daily"  # End-of-day bars and listings: change once per session, after the close
+FOREX = "forex"  # Interbank exchange rates: move around the clock on weekdays
+CBK_DAILY = "cbk_daily"  # CBK indicative, interbank and policy rates: published once per business day
+CBK_WEEKLY = "cbk_weekly"  # Treasury rates: change with the weekly auction results
+
+MIN_POLICY_TTL = 60  # Seconds; never cache for less, even just before a publication
+MAX_POLICY_TTL = int(os.getenv("MAX_POLICY_TTL", 4 * 86400))  # Bounds the TTL across long holiday weekends
+
+# Sources lag the official publication times, so fetches made shortly after one may still return the previous figures
+PUBLICATION_SETTLE = timedelta(minutes=int(os.getenv("PUBLICATION_SETTLE_MINUTES", 60)))
+SETTLE_TTL = int(os.getenv("PUBLICATION_SETTLE_TTL", 300))  # Seconds; TTL cap while a publication settles
+
+
+def nairobi_time(at: Optional[datetime] = None) -> datetime:
+    """
+    Convert a timestamp to Nairobi time.
+
+    Args:
+        at: Timestamp (naive values are taken as server-local time); now if omitted
+
+    Returns:
+        datetime: Timezone-aware Nairobi time
+    """
+    if at is None:
+        return datetime.now(NSE_TIMEZONE)
+    return at.astimezone(NSE_TIMEZONE)
+
+
+def _easter_sunday(year: int) -> date:
+    """Western Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+@lru_cache(maxsize=16)
+def kenyan_public_holidays(year: int) -> FrozenSet[date]:
+    """
+    Kenyan public holidays for a year.
+
+    Covers the fixed-date holidays (moved to Monday when they fall on a
+    Sunday) plus Good Friday and Easter Monday. Holidays set by the lunar
+    calendar or by gazette notice are added through NSE_HOLIDAYS.
+
+    Args:
+        year: Calendar year
+
+    Returns:
+        FrozenSet[date]: Holiday dates
+    """
+    holidays = set()
+    for month, day in FIXED_PUBLIC_HOLIDAYS:
+        holiday = date(year, month, day)
+        if holiday.weekday() == 6:
+            holiday += timedelta(days=1)
+        holidays.add(holiday)
+
+    easter = _easter_sunday(year)
+    holidays.add(easter - timedelta(days=2))
+    holidays.add(easter + timedelta(days=1))
+    return frozenset(holidays)
+
+
+def is_trading_day(day: date) -> bool:
+    """Whether the NSE holds a session (and the CBK publishes) on the given date"""
+    return (day.weekday() in NSE_TRADING_DAYS and day not in NSE_HOLIDAYS
+            and day not in kenyan_public_holidays(day.year))
+
+
+def _next_trading_day(day: date) -> date:
+    """First trading day on or after the given date"""
+    # Bounded search; a trading day always falls within a few weeks
+    for _ in range(31):
+        if is_trading_day(day):
+            return day
+        day += timedelta(days=1)
+    raise ValueError("No NSE trading day within 31 days; check NSE_HOLIDAYS")
+
+
+def is_market_open(at: Optional[datetime] = None) -> bool:
+    """
+    Check whether the NSE is in its trading session.
+
+    Args:
+        at: Timestamp to check; now if omitted
+
+    Returns:
+        bool: True between the open and close of a trading day
+    """
+    local = nairobi_time(at)
+    return is_trading_day(local.date()) and NSE_OPEN_TIME <= local.time() < NSE_CLOSE_TIME
+
+
+def session_open(at: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Start of the trading session in progress.
+
+    Args:
+        at: Timestamp to check; now if omitted
+
+    Returns:
+        datetime: Today's open, or None when the market is closed
+    """
+    local = nairobi_time(at)
+    if not is_market_open(local):
+        return None
+    return datetime.combine(local.date(), NSE_OPEN_TIME, tzinfo=NSE_TIMEZONE)
+
+
+def next_market_open(at: Optional[datetime] = None) -> datetime:
+    """
+    Next time the NSE opens after a timestamp.
+
+    Args:
+        at: Timestamp to start from; now if omitted
+
+    Returns:
+        datetime: Timezone-aware Nairobi time of the next open
+    """
+    return _next_daily_event(nairobi_time(at), NSE_OPEN_TIME)
+
+
+def _next_daily_event(local: datetime, at_time: time, delay: timedelta = timedelta(0)) -> datetime:
+    """Next trading-day occurrence of a time of day (plus delay) strictly after a timestamp"""
+    day = _next_trading_day(local.date())
+    while True:
+        event = datetime.combine(day, at_time, tzinfo=NSE_TIMEZONE) + delay
+        if event > local:
+            return event
+        day = _next_trading_day(day + timedelta(days=1))
+
+
+def _next_weekly_publication(local: datetime) -> datetime:
+    """Next auction-results publication, moved to the following business day over holidays"""
+    # Start from the latest results day, whose publication may have moved past today
+    results_day = local.date() - timedelta(days=(local.weekday() - CBK_AUCTION_RESULTS_DAY) % 7)
+    while True:
+        publication_day = _next_trading_day(results_day)
+        event = datetime.combine(publication_day, CBK_PUBLICATION_TIME, tzinfo=NSE_TIMEZONE)
+        if event > local:
+            return event
+        results_day += timedelta(days=7)
+
+
+def _forex_week_reopen(local: datetime) -> Optional[datetime]:
+    """When interbank forex reopens, or None while it is trading"""
+    weekday, now = local.weekday(), local.time()
+    closed = ((weekday, now) >= FOREX_WEEK_CLOSE) or ((weekday, now) < FOREX_WEEK_OPEN)
+    if not closed:
+        return None
+    days_ahead = (FOREX_WEEK_OPEN[0] - weekday) % 7
+    return datetime.combine(local.date() + timedelta(days=days_ahead), FOREX_WEEK_OPEN[1], tzinfo=NSE_TIMEZONE)
+
+
+def is_complete(value: Any) -> bool:
+    """
+    Check whether a fetched value is a full, fresh response.
+
+    Only such values are held until the data next changes. Errors, partial
+    results and stale or last-known-good copies are marked with the 'error',
+    'partial', 'stale' and 'last_known_good' keys.
+
+    Args:
+        value: Value returned by a fetcher
+
+    Returns:
+        bool: True unless the value is empty or carries one of the markers above
+    """
+    if not value:
+        return False
+    if isinstance(value, dict):
+        return not any(value.get(marker) for marker in ("error", "partial", "stale", "last_known_good"))
+    return True
+
+
+def policy_ttl(base_ttl: int, data_class: Optional[str], at: Optional[datetime] = None,
+               complete: bool = True) -> int:
+    """
+    Adjust a cache TTL to when the data can next change.
+
+    Session data keeps its TTL while the NSE trades and otherwise lives until
+    the next open. Data published on a schedule (end-of-day NSE data, CBK
+    rates, auction results) lives until the next publication, which is
+    shorter than the base TTL late on a publication day and much longer over
+    weekends and public holidays. Forex keeps its TTL except over the weekend.
+
+    For PUBLICATION_SETTLE after the close or a publication the TTL is capped
+    at SETTLE_TTL, since sources may not have the new figures yet. Incomplete
+    values are never kept past the base TTL.
+
+    Args:
+        base_ttl: TTL in seconds the caller would otherwise use
+        data_class: One of the data classes above; None keeps the base TTL
+        at: Time the value is cached; now if omitted
+        complete: Whether the value is a full, fresh response (see is_complete)
+
+    Returns:
+        int: TTL in seconds
+    """
+    if data_class is None:
+        return base_ttl
+
+    local = nairobi_time(at)
+    # The first event after this is within the settle window if it is not after now
+    settle_start = local - PUBLICATION_SETTLE
+    if data_class == NSE_SESSION:
+        if is_market_open(local):
+            return base_ttl
+        changes_at = next_market_open(local)
+        published_at = _next_daily_event(settle_start, NSE_CLOSE_TIME)
+        floor = base_ttl
+    elif data_class == NSE_DAILY:
+        changes_at = _next_daily_event(local, NSE_CLOSE_TIME, NSE_EOD_DELAY)
+        published_at = _next_daily_event(settle_start, NSE_CLOSE_TIME, NSE_EOD_DELAY)
+        floor = MIN_POLICY_TTL
+    elif data_class == CBK_DAILY:
+        changes_at = _next_daily_event(local, CBK_PUBLICATION_TIME)
+        published_at = _next_daily_event(settle_start, CBK_PUBLICATION_TIME)
+        floor = MIN_POLICY_TTL
+    elif data_class == CBK_WEEKLY:
+        changes_at = _next_weekly_publication(local)
+        published_at = _next_weekly_publication(settle_start)
+        floor = MIN_POLICY_TTL
+    elif data_class == FOREX:
+        changes_at = _forex_week_reopen(local)
+        if changes_at is None:
+            return base_ttl
+        published_at = None
+        floor = base_ttl
+    else:
+        raise ValueError(f"Unknown TTL data class: {data_class}")
+
+    if published_at is not None and published_at <= local:
+        return min(base_ttl, SETTLE_TTL)
+
+    ttl = max(floor, min(int((changes_at - local).total_seconds()), MAX_POLICY_TTL))
+    if not complete:
+        return min(ttl, base_ttl)
+    return ttl
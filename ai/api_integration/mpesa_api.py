@@ -1,13 +1,24 @@
+import asyncio
 import base64
 import json
 import logging
 import os
+import threading
 import time
 from datetime import datetime
 
-import requests
 from dotenv import load_dotenv
 
+try:
+    from .cache import get_cache
+    from .http_pool import get_http_pool
+    from .token_manager import credential_key, get_token_manager
+except ImportError:
+    # For standalone execution
+    from cache import get_cache
+    from http_pool import get_http_pool
+    from token_manager import credential_key, get_token_manager
+
 # Load environment variables
 load_dotenv()
 
@@ -18,6 +29,101 @@ logging.basicConfig(
 )
 logger = logging.getLogger('mpesa_api')
 
+# Async requests and callback waits
+MPESA_REQUEST_TIMEOUT = int(os.getenv("MPESA_REQUEST_TIMEOUT", 30))
+STK_CALLBACK_TIMEOUT = int(os.getenv("MPESA_STK_CALLBACK_TIMEOUT", 90))  # Customers get about a minute to enter their PIN
+RESULT_CALLBACK_TIMEOUT = int(os.getenv("MPESA_RESULT_CALLBACK_TIMEOUT", 120))
+CALLBACK_NAMESPACE = "mpesa_callbacks"
+CALLBACK_RETENTION = 600  # Seconds a processed callback stays available to late or remote waiters
+SHARED_CALLBACK_POLL_INTERVAL = 1.0  # Seconds between checks for callbacks received by other workers
+
+# Shared keep-alive HTTP connection pools
+http_pool = get_http_pool()
+
+
+class CallbackWaiters:
+    """
+    Futures awaiting M-Pesa callbacks, keyed by CheckoutRequestID (STK push)
+    or ConversationID (B2C, transaction status and balance results).
+
+    Callbacks may be processed on any thread, and by a different worker than
+    the one waiting, so every resolved callback is also written to the shared
+    cache. Waiters check it on registration (the callback may beat them) and
+    every SHARED_CALLBACK_POLL_INTERVAL seconds while they wait, which is a
+    Redis read rather than an M-Pesa status query.
+    """
+
+    def __init__(self):
+        self._waiters = {}  # request id -> [(event loop, future)]
+        self._lock = threading.Lock()
+        self.cache = get_cache()
+        self.cache.configure_namespace(CALLBACK_NAMESPACE, ttl=CALLBACK_RETENTION, use_l2=True)
+
+    def resolve(self, request_id, result):
+        """
+        Hand a processed callback to everything waiting on its request
+
+        Args:
+            request_id (str): CheckoutRequestID or ConversationID
+            result (dict): Processed callback
+        """
+        self.cache.set(CALLBACK_NAMESPACE, request_id, result)
+        with self._lock:
+            waiters = self._waiters.pop(request_id, [])
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._set_result, future, result)
+
+    @staticmethod
+    def _set_result(future, result):
+        if not future.done():
+            future.set_result(result)
+
+    async def wait(self, request_id, timeout):
+        """
+        Wait for the callback of a request
+
+        Args:
+            request_id (str): CheckoutRequestID or ConversationID
+            timeout (float): Seconds to wait
+
+        Returns:
+            dict: Processed callback, or None if none arrived in time
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            self._waiters.setdefault(request_id, []).append(waiter)
+
+        deadline = loop.time() + timeout
+        try:
+            while True:
+                result = await self.cache.aget(CALLBACK_NAMESPACE, request_id)
+                if result is not None:
+                    return result
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+                try:
+                    return await asyncio.wait_for(
+                        asyncio.shield(future), min(remaining, SHARED_CALLBACK_POLL_INTERVAL)
+                    )
+                except asyncio.TimeoutError:
+                    continue
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(request_id)
+                if waiters and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._waiters[request_id]
+            future.cancel()
+
+
+# Shared by every MpesaAPI instance in the process
+callback_waiters = CallbackWaiters()
+
+
 class MpesaAPI:
     """
     Class to handle M-Pesa API integrations for PesaGuru
@@ -60,9 +166,10 @@ class MpesaAPI:
             self.shortcode = os.getenv("MPESA_SHORTCODE")
             self.passkey = os.getenv("MPESA_PASSKEY")
         
-        # Initialize access token
-        self.access_token = None
-        self.token_expiry = 0  # Unix timestamp
+        # Access tokens are shared by every client with these credentials and renewed in the background
+        self.token_name = f"mpesa:{credential_key(self.base_url, self.consumer_key)}"
+        if self.consumer_key and self.consumer_secret:
+            get_token_manager().register(self.token_name, self._request_auth_token)
         
         # Callback URLs (should be configurable)
         self.callback_url = os.getenv("MPESA_CALLBACK_URL", "https://pesaguru.com/api/callbacks/mpesa")
@@ -74,44 +181,44 @@ class MpesaAPI:
         """
         Get OAuth access token from M-Pesa API
         
+        The shared token manager renews the token before it expires, so this
+        only waits on the OAuth endpoint when no valid token exists yet.
+        
         Returns:
             str: Access token
         """
-        # Check if we have a valid token already
-        current_time = int(time.time())
-        if self.access_token and current_time < self.token_expiry:
-            return self.access_token
-        
         try:
-            # Prepare auth credentials
-            auth_string = f"{self.consumer_key}:{self.consumer_secret}"
-            auth_bytes = auth_string.encode("ascii")
-            auth_b64 = base64.b64encode(auth_bytes).decode("ascii")
-            
-            # Set headers
-            headers = {
-                "Authorization": f"Basic {auth_b64}"
-            }
-            
-            # Make API request
-            url = f"{self.base_url}{self.OAUTH_URL}"
-            response = requests.get(url, headers=headers)
-            
-            # Process response
-            if response.status_code == 200:
-                data = response.json()
-                self.access_token = data["access_token"]
-                # Token typically expires in 1 hour, but we'll set it to expire in 50 minutes to be safe
-                self.token_expiry = current_time + 3000  # 50 minutes
-                return self.access_token
-            else:
-                logger.error(f"Failed to get auth token: {response.text}")
-                return None
-                
+            return get_token_manager().get_token(self.token_name)
         except Exception as e:
             logger.error(f"Error getting auth token: {str(e)}")
             return None
     
+    def _request_auth_token(self):
+        """
+        Request a new access token from the M-Pesa OAuth endpoint (called by the token manager)
+        
+        Returns:
+            dict: Token response with access_token and expires_in
+        """
+        # Prepare auth credentials
+        auth_string = f"{self.consumer_key}:{self.consumer_secret}"
+        auth_bytes = auth_string.encode("ascii")
+        auth_b64 = base64.b64encode(auth_bytes).decode("ascii")
+        
+        # Set headers
+        headers = {
+            "Authorization": f"Basic {auth_b64}"
+        }
+        
+        # Make API request
+        url = f"{self.base_url}{self.OAUTH_URL}"
+        response = http_pool.session().get(url, headers=headers, timeout=MPESA_REQUEST_TIMEOUT)
+        
+        # Process response
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to get auth token: {response.text}")
+        return response.json()
+    
     def _generate_password(self, timestamp):
         """
         Generate a base64 encoded password for STK push
@@ -126,51 +233,34 @@ class MpesaAPI:
         password_bytes = password_str.encode("ascii")
         return base64.b64encode(password_bytes).decode("ascii")
     
-    def initiate_stk_push(self, phone_number, amount, reference, description="PesaGuru Payment"):
+    @staticmethod
+    def _format_phone_number(phone_number):
+        """Format a phone number as 254XXXXXXXXX (remove leading 0 or +)"""
+        if phone_number.startswith("+"):
+            phone_number = phone_number[1:]
+        if phone_number.startswith("0"):
+            phone_number = "254" + phone_number[1:]
+        return phone_number
+    
+    def _post(self, path, data, failure_message, error_message, success_codes=(200,)):
         """
-        Initiate an STK push request to a customer's phone
+        Make an authenticated POST request to the M-Pesa API
         
         Args:
-            phone_number (str): Customer phone number (format: 254XXXXXXXXX)
-            amount (int): Amount to charge
-            reference (str): Payment reference
-            description (str, optional): Transaction description
+            path (str): API endpoint path
+            data (dict): Request body
+            failure_message (str): Logged when M-Pesa rejects the request
+            error_message (str): Logged when the request cannot be made
+            success_codes (tuple, optional): HTTP status codes treated as success
         
         Returns:
-            dict: API response
+            dict: API response, or a dict with an "error" key
         """
         # Get auth token
         token = self._get_auth_token()
         if not token:
             return {"error": "Could not get authentication token"}
         
-        # Generate timestamp
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        
-        # Generate password
-        password = self._generate_password(timestamp)
-        
-        # Format phone number (remove leading 0 or +254)
-        if phone_number.startswith("+"):
-            phone_number = phone_number[1:]
-        if phone_number.startswith("0"):
-            phone_number = "254" + phone_number[1:]
-        
-        # Prepare request data
-        data = {
-            "BusinessShortCode": self.shortcode,
-            "Password": password,
-            "Timestamp": timestamp,
-            "TransactionType": "CustomerPayBillOnline",
-            "Amount": amount,
-            "PartyA": phone_number,
-            "PartyB": self.shortcode,
-            "PhoneNumber": phone_number,
-            "CallBackURL": self.callback_url,
-            "AccountReference": reference,
-            "TransactionDesc": description
-        }
-        
         # Set headers
         headers = {
             "Authorization": f"Bearer {token}",
@@ -179,49 +269,29 @@ class MpesaAPI:
         
         try:
             # Make API request
-            url = f"{self.base_url}{self.STK_PUSH_URL}"
-            response = requests.post(url, json=data, headers=headers)
+            url = f"{self.base_url}{path}"
+            response = http_pool.session().post(url, json=data, headers=headers, timeout=MPESA_REQUEST_TIMEOUT)
             
             # Process response
-            if response.status_code in [200, 201]:
+            if response.status_code in success_codes:
                 return response.json()
             else:
-                logger.error(f"STK push failed: {response.text}")
+                logger.error(f"{failure_message}: {response.text}")
                 return {"error": response.text}
                 
         except Exception as e:
-            logger.error(f"Error initiating STK push: {str(e)}")
+            logger.error(f"{error_message}: {str(e)}")
             return {"error": str(e)}
     
-    def check_stk_push_status(self, checkout_request_id):
-        """
-        Check the status of an STK push transaction
-        
-        Args:
-            checkout_request_id (str): Checkout request ID from STK push response
-        
-        Returns:
-            dict: API response
-        """
-        # Get auth token
-        token = self._get_auth_token()
-        if not token:
+    async def _apost(self, path, data, failure_message, error_message, success_codes=(200,)):
+        """Async variant of _post() using the pooled httpx client"""
+        # Get auth token (only waits on the OAuth endpoint when no valid token exists yet)
+        try:
+            token = await get_token_manager().aget_token(self.token_name)
+        except Exception as e:
+            logger.error(f"Error getting auth token: {str(e)}")
             return {"error": "Could not get authentication token"}
         
-        # Generate timestamp
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        
-        # Generate password
-        password = self._generate_password(timestamp)
-        
-        # Prepare request data
-        data = {
-            "BusinessShortCode": self.shortcode,
-            "Password": password,
-            "Timestamp": timestamp,
-            "CheckoutRequestID": checkout_request_id
-        }
-        
         # Set headers
         headers = {
             "Authorization": f"Bearer {token}",
@@ -230,38 +300,57 @@ class MpesaAPI:
         
         try:
             # Make API request
-            url = f"{self.base_url}{self.STK_QUERY_URL}"
-            response = requests.post(url, json=data, headers=headers)
+            url = f"{self.base_url}{path}"
+            response = await http_pool.get_async_client().post(
+                url, json=data, headers=headers, timeout=MPESA_REQUEST_TIMEOUT
+            )
             
             # Process response
-            if response.status_code == 200:
+            if response.status_code in success_codes:
                 return response.json()
             else:
-                logger.error(f"STK status check failed: {response.text}")
+                logger.error(f"{failure_message}: {response.text}")
                 return {"error": response.text}
                 
         except Exception as e:
-            logger.error(f"Error checking STK status: {str(e)}")
+            logger.error(f"{error_message}: {str(e)}")
             return {"error": str(e)}
     
-    def check_transaction_status(self, transaction_id, command="TransactionStatusQuery"):
-        """
-        Check the status of a transaction
-        
-        Args:
-            transaction_id (str): Transaction ID
-            command (str, optional): Command ID
+    def _stk_push_payload(self, phone_number, amount, reference, description):
+        """Request body for an STK push"""
+        # Generate timestamp
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        phone_number = self._format_phone_number(phone_number)
         
-        Returns:
-            dict: API response
-        """
-        # Get auth token
-        token = self._get_auth_token()
-        if not token:
-            return {"error": "Could not get authentication token"}
+        return {
+            "BusinessShortCode": self.shortcode,
+            "Password": self._generate_password(timestamp),
+            "Timestamp": timestamp,
+            "TransactionType": "CustomerPayBillOnline",
+            "Amount": amount,
+            "PartyA": phone_number,
+            "PartyB": self.shortcode,
+            "PhoneNumber": phone_number,
+            "CallBackURL": self.callback_url,
+            "AccountReference": reference,
+            "TransactionDesc": description
+        }
+    
+    def _stk_query_payload(self, checkout_request_id):
+        """Request body for an STK push status query"""
+        # Generate timestamp
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         
-        # Prepare request data
-        data = {
+        return {
+            "BusinessShortCode": self.shortcode,
+            "Password": self._generate_password(timestamp),
+            "Timestamp": timestamp,
+            "CheckoutRequestID": checkout_request_id
+        }
+    
+    def _transaction_status_payload(self, transaction_id, command):
+        """Request body for a transaction status query"""
+        return {
             "Initiator": os.getenv("MPESA_INITIATOR_NAME", "testapi"),
             "SecurityCredential": os.getenv("MPESA_SECURITY_CREDENTIAL", ""),
             "CommandID": command,
@@ -273,77 +362,99 @@ class MpesaAPI:
             "Remarks": "Transaction status check",
             "Occasion": ""
         }
-        
-        # Set headers
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
+    
+    def _account_balance_payload(self, command):
+        """Request body for an account balance query"""
+        return {
+            "Initiator": os.getenv("MPESA_INITIATOR_NAME", "testapi"),
+            "SecurityCredential": os.getenv("MPESA_SECURITY_CREDENTIAL", ""),
+            "CommandID": command,
+            "PartyA": self.shortcode,
+            "IdentifierType": "4",  # Shortcode
+            "Remarks": "Account balance query",
+            "QueueTimeOutURL": self.timeout_url,
+            "ResultURL": self.callback_url
+        }
+    
+    def _b2c_payload(self, phone_number, amount, command_id, remarks, occasion):
+        """Request body for a B2C payment"""
+        return {
+            "InitiatorName": os.getenv("MPESA_INITIATOR_NAME", "testapi"),
+            "SecurityCredential": os.getenv("MPESA_SECURITY_CREDENTIAL", ""),
+            "CommandID": command_id,
+            "Amount": amount,
+            "PartyA": self.shortcode,
+            "PartyB": self._format_phone_number(phone_number),
+            "Remarks": remarks if remarks else "B2C Payment",
+            "QueueTimeOutURL": self.timeout_url,
+            "ResultURL": self.callback_url,
+            "Occasion": occasion
         }
+    
+    def initiate_stk_push(self, phone_number, amount, reference, description="PesaGuru Payment"):
+        """
+        Initiate an STK push request to a customer's phone
         
-        try:
-            # Make API request
-            url = f"{self.base_url}{self.TRANSACTION_STATUS_URL}"
-            response = requests.post(url, json=data, headers=headers)
-            
-            # Process response
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Transaction status check failed: {response.text}")
-                return {"error": response.text}
-                
-        except Exception as e:
-            logger.error(f"Error checking transaction status: {str(e)}")
-            return {"error": str(e)}
+        Args:
+            phone_number (str): Customer phone number (format: 254XXXXXXXXX)
+            amount (int): Amount to charge
+            reference (str): Payment reference
+            description (str, optional): Transaction description
+        
+        Returns:
+            dict: API response
+        """
+        return self._post(
+            self.STK_PUSH_URL,
+            self._stk_push_payload(phone_number, amount, reference, description),
+            "STK push failed", "Error initiating STK push", success_codes=(200, 201)
+        )
     
-    def check_account_balance(self, command="AccountBalance"):
+    def check_stk_push_status(self, checkout_request_id):
         """
-        Check account balance
+        Check the status of an STK push transaction
         
         Args:
-            command (str, optional): Command ID
+            checkout_request_id (str): Checkout request ID from STK push response
         
         Returns:
             dict: API response
         """
-        # Get auth token
-        token = self._get_auth_token()
-        if not token:
-            return {"error": "Could not get authentication token"}
+        return self._post(
+            self.STK_QUERY_URL, self._stk_query_payload(checkout_request_id),
+            "STK status check failed", "Error checking STK status"
+        )
+    
+    def check_transaction_status(self, transaction_id, command="TransactionStatusQuery"):
+        """
+        Check the status of a transaction
         
-        # Prepare request data
-        data = {
-            "Initiator": os.getenv("MPESA_INITIATOR_NAME", "testapi"),
-            "SecurityCredential": os.getenv("MPESA_SECURITY_CREDENTIAL", ""),
-            "CommandID": command,
-            "PartyA": self.shortcode,
-            "IdentifierType": "4",  # Shortcode
-            "Remarks": "Account balance query",
-            "QueueTimeOutURL": self.timeout_url,
-            "ResultURL": self.callback_url
-        }
+        Args:
+            transaction_id (str): Transaction ID
+            command (str, optional): Command ID
         
-        # Set headers
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
+        Returns:
+            dict: API response
+        """
+        return self._post(
+            self.TRANSACTION_STATUS_URL, self._transaction_status_payload(transaction_id, command),
+            "Transaction status check failed", "Error checking transaction status"
+        )
+    
+    def check_account_balance(self, command="AccountBalance"):
+        """
+        Check account balance
         
-        try:
-            # Make API request
-            url = f"{self.base_url}{self.ACCOUNT_BALANCE_URL}"
-            response = requests.post(url, json=data, headers=headers)
-            
-            # Process response
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Account balance check failed: {response.text}")
-                return {"error": response.text}
-                
-        except Exception as e:
-            logger.error(f"Error checking account balance: {str(e)}")
-            return {"error": str(e)}
+        Args:
+            command (str, optional): Command ID
+        
+        Returns:
+            dict: API response
+        """
+        return self._post(
+            self.ACCOUNT_BALANCE_URL, self._account_balance_payload(command),
+            "Account balance check failed", "Error checking account balance"
+        )
     
     def register_c2b_urls(self, confirmation_url=None, validation_url=None, response_type="Completed"):
         """
@@ -357,11 +468,6 @@ class MpesaAPI:
         Returns:
             dict: API response
         """
-        # Get auth token
-        token = self._get_auth_token()
-        if not token:
-            return {"error": "Could not get authentication token"}
-        
         # Use default URLs if not provided
         if not confirmation_url:
             confirmation_url = os.getenv(
@@ -383,27 +489,10 @@ class MpesaAPI:
             "ValidationURL": validation_url
         }
         
-        # Set headers
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-        
-        try:
-            # Make API request
-            url = f"{self.base_url}{self.C2B_REGISTER_URL}"
-            response = requests.post(url, json=data, headers=headers)
-            
-            # Process response
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"C2B URL registration failed: {response.text}")
-                return {"error": response.text}
-                
-        except Exception as e:
-            logger.error(f"Error registering C2B URLs: {str(e)}")
-            return {"error": str(e)}
+        return self._post(
+            self.C2B_REGISTER_URL, data,
+            "C2B URL registration failed", "Error registering C2B URLs"
+        )
     
     def b2c_payment(self, phone_number, amount, command_id="BusinessPayment", remarks="", occasion=""):
         """
@@ -419,57 +508,122 @@ class MpesaAPI:
         Returns:
             dict: API response
         """
-        # Get auth token
-        token = self._get_auth_token()
-        if not token:
-            return {"error": "Could not get authentication token"}
+        return self._post(
+            self.B2C_URL, self._b2c_payload(phone_number, amount, command_id, remarks, occasion),
+            "B2C payment failed", "Error sending B2C payment"
+        )
+    
+    async def ainitiate_stk_push(self, phone_number, amount, reference, description="PesaGuru Payment"):
+        """Async variant of initiate_stk_push(); pair with wait_for_stk_result() instead of polling"""
+        return await self._apost(
+            self.STK_PUSH_URL,
+            self._stk_push_payload(phone_number, amount, reference, description),
+            "STK push failed", "Error initiating STK push", success_codes=(200, 201)
+        )
+    
+    async def acheck_stk_push_status(self, checkout_request_id):
+        """Async variant of check_stk_push_status()"""
+        return await self._apost(
+            self.STK_QUERY_URL, self._stk_query_payload(checkout_request_id),
+            "STK status check failed", "Error checking STK status"
+        )
+    
+    async def acheck_transaction_status(self, transaction_id, command="TransactionStatusQuery"):
+        """Async variant of check_transaction_status(); the result arrives by callback (see wait_for_result())"""
+        return await self._apost(
+            self.TRANSACTION_STATUS_URL, self._transaction_status_payload(transaction_id, command),
+            "Transaction status check failed", "Error checking transaction status"
+        )
+    
+    async def acheck_account_balance(self, command="AccountBalance"):
+        """Async variant of check_account_balance(); the result arrives by callback (see wait_for_result())"""
+        return await self._apost(
+            self.ACCOUNT_BALANCE_URL, self._account_balance_payload(command),
+            "Account balance check failed", "Error checking account balance"
+        )
+    
+    async def ab2c_payment(self, phone_number, amount, command_id="BusinessPayment", remarks="", occasion=""):
+        """Async variant of b2c_payment(); the result arrives by callback (see wait_for_result())"""
+        return await self._apost(
+            self.B2C_URL, self._b2c_payload(phone_number, amount, command_id, remarks, occasion),
+            "B2C payment failed", "Error sending B2C payment"
+        )
+    
+    async def wait_for_stk_result(self, checkout_request_id, timeout=STK_CALLBACK_TIMEOUT):
+        """
+        Wait for the callback of an STK push instead of polling its status
         
-        # Format phone number (remove leading 0 or +254)
-        if phone_number.startswith("+"):
-            phone_number = phone_number[1:]
-        if phone_number.startswith("0"):
-            phone_number = "254" + phone_number[1:]
+        The wait is resolved by process_callback(), in this worker or (through
+        the shared cache) in another one. Callbacks are not signed, so one
+        reporting a successful payment is confirmed with a status query before
+        it is returned. If no callback arrives in time, the status is queried once.
         
-        # Prepare request data
-        data = {
-            "InitiatorName": os.getenv("MPESA_INITIATOR_NAME", "testapi"),
-            "SecurityCredential": os.getenv("MPESA_SECURITY_CREDENTIAL", ""),
-            "CommandID": command_id,
-            "Amount": amount,
-            "PartyA": self.shortcode,
-            "PartyB": phone_number,
-            "Remarks": remarks if remarks else "B2C Payment",
-            "QueueTimeOutURL": self.timeout_url,
-            "ResultURL": self.callback_url,
-            "Occasion": occasion
-        }
+        Args:
+            checkout_request_id (str): Checkout request ID from the STK push response
+            timeout (float, optional): Seconds to wait for the callback
         
-        # Set headers
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
+        Returns:
+            dict: Processed callback (see process_callback()), or the STK query response
+            when no callback arrived or the query did not confirm the payment
+        """
+        result = await callback_waiters.wait(checkout_request_id, timeout)
+        if result is not None:
+            if str(result.get("result_code")) != "0":
+                return result
+            status = await self.acheck_stk_push_status(checkout_request_id)
+            if str(status.get("ResultCode")) == "0":
+                return result
+            logger.warning(f"STK callback for {checkout_request_id} reported a payment the status query did not confirm")
+            return status
         
-        try:
-            # Make API request
-            url = f"{self.base_url}{self.B2C_URL}"
-            response = requests.post(url, json=data, headers=headers)
-            
-            # Process response
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"B2C payment failed: {response.text}")
-                return {"error": response.text}
-                
-        except Exception as e:
-            logger.error(f"Error sending B2C payment: {str(e)}")
-            return {"error": str(e)}
+        logger.warning(f"No STK callback for {checkout_request_id} after {timeout}s, querying its status")
+        return await self.acheck_stk_push_status(checkout_request_id)
+    
+    async def ainitiate_stk_push_and_wait(self, phone_number, amount, reference,
+                                          description="PesaGuru Payment", timeout=STK_CALLBACK_TIMEOUT):
+        """
+        Initiate an STK push and wait for the customer's response
+        
+        Args:
+            phone_number (str): Customer phone number (format: 254XXXXXXXXX)
+            amount (int): Amount to charge
+            reference (str): Payment reference
+            description (str, optional): Transaction description
+            timeout (float, optional): Seconds to wait for the callback
+        
+        Returns:
+            dict: Processed callback, or the STK push response if it was not accepted
+        """
+        response = await self.ainitiate_stk_push(phone_number, amount, reference, description)
+        if "CheckoutRequestID" not in response:
+            return response
+        return await self.wait_for_stk_result(response["CheckoutRequestID"], timeout)
+    
+    async def wait_for_result(self, conversation_id, timeout=RESULT_CALLBACK_TIMEOUT):
+        """
+        Wait for the result callback of a B2C payment, transaction status or balance request
+        
+        Args:
+            conversation_id (str): ConversationID from the request's response
+            timeout (float, optional): Seconds to wait for the callback
+        
+        Returns:
+            dict: Processed callback, or a dict with an "error" key on timeout
+        """
+        result = await callback_waiters.wait(conversation_id, timeout)
+        if result is not None:
+            return result
+        
+        logger.warning(f"No M-Pesa result callback for {conversation_id} after {timeout}s")
+        return {"error": f"No result callback received within {timeout} seconds"}
 
     def process_callback(self, callback_data):
         """
         Process M-Pesa callback data
         
+        Also resolves any wait_for_stk_result() / wait_for_result() call
+        awaiting this callback.
+        
         Args:
             callback_data (dict): Callback data from M-Pesa
             
@@ -506,6 +660,8 @@ class MpesaAPI:
                             result["phone_number"] = item.get("Value", "")
                 
                 logger.info(f"Processed STK push callback: {json.dumps(result, indent=2)}")
+                if result["checkout_request_id"]:
+                    callback_waiters.resolve(result["checkout_request_id"], result)
                 return result
                 
             elif "Body" in callback_data and "Result" in callback_data["Body"]:
@@ -525,6 +681,8 @@ class MpesaAPI:
                 }
                 
                 logger.info(f"Processed transaction status callback: {json.dumps(result, indent=2)}")
+                if result["conversation_id"]:
+                    callback_waiters.resolve(result["conversation_id"], result)
                 return result
                 
             else:
@@ -1,6 +1,4 @@
 import os
-import json
-import time
 import logging
 import requests
 from datetime import datetime, timedelta
@@ -8,6 +6,14 @@ from typing import List, Dict, Any, Optional, Union
 import pandas as pd
 from dotenv import load_dotenv
 
+try:
+    from .cache import get_cache
+    from .http_pool import get_http_pool
+except ImportError:
+    # For standalone execution
+    from cache import get_cache
+    from http_pool import get_http_pool
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -52,58 +58,38 @@ ENDPOINTS = {
     },
 }
 
+# Shared two-tier cache (in-process LRU + Redis)
+cache = get_cache()
+
+# Shared keep-alive HTTP connection pools
+http_pool = get_http_pool()
+
 class NewsAPIClient:
     """Client for fetching financial news from multiple API sources"""
     
-    def __init__(self, api_key: str = None, cache_dir: str = "cache"):
+    def __init__(self, api_key: str = None, cache_duration: int = 1800):
         """Initialize the News API client
         
         Args:
             api_key: RapidAPI key (defaults to value from environment)
-            cache_dir: Directory to store cached responses
+            cache_duration: Seconds to keep cached responses (default: 30 minutes)
         """
         self.api_key = api_key or API_KEYS.get("rapid_api")
-        self.cache_dir = cache_dir
-        self.cache_duration = 1800  # 30 minutes in seconds
+        self.cache_duration = cache_duration
         
-        # Create cache directory if it doesn't exist
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
-            
         logger.info("NewsAPIClient initialized")
     
-    def _get_cache_path(self, endpoint: str, params: Dict) -> str:
-        """Get the cache file path for a specific request
+    def _get_cache_key(self, endpoint: str, params: Dict) -> str:
+        """Get the cache key for a specific request
         
         Args:
             endpoint: API endpoint
             params: Request parameters
             
         Returns:
-            Path to the cache file
-        """
-        # Create a unique cache key based on endpoint and params
-        param_str = "_".join([f"{k}_{v}" for k, v in sorted(params.items())])
-        endpoint_key = endpoint.replace("/", "_")
-        cache_key = f"{endpoint_key}_{param_str}"
-        return os.path.join(self.cache_dir, f"{cache_key}.json")
-    
-    def _is_cache_valid(self, cache_path: str) -> bool:
-        """Check if the cache is still valid
-        
-        Args:
-            cache_path: Path to the cache file
-            
-        Returns:
-            True if cache is valid, False otherwise
+            Cache key
         """
-        if not os.path.exists(cache_path):
-            return False
-        
-        # Check if the cache file is not expired
-        file_mtime = os.path.getmtime(cache_path)
-        age = time.time() - file_mtime
-        return age < self.cache_duration
+        return cache.make_key(endpoint, **params)
     
     def _request(self, 
                  endpoint_key: str, 
@@ -138,14 +124,11 @@ class NewsAPIClient:
         
         # Check cache if enabled
         if use_cache:
-            cache_path = self._get_cache_path(path, params or {})
-            if self._is_cache_valid(cache_path):
-                try:
-                    with open(cache_path, 'r') as f:
-                        logger.debug(f"Using cached response for {url}")
-                        return json.load(f)
-                except (json.JSONDecodeError, IOError) as e:
-                    logger.warning(f"Error reading cache: {e}")
+            cache_key = self._get_cache_key(path, params or {})
+            cached_data = cache.get("news", cache_key)
+            if cached_data is not None:
+                logger.debug(f"Using cached response for {url}")
+                return cached_data
         
         # Prepare headers
         headers = {
@@ -156,7 +139,7 @@ class NewsAPIClient:
         # Make the request
         try:
             logger.debug(f"Making request to {url}")
-            response = requests.get(url, headers=headers, params=params)
+            response = http_pool.session().get(url, headers=headers, params=params)
             response.raise_for_status()
             
             try:
@@ -164,9 +147,7 @@ class NewsAPIClient:
                 
                 # Save to cache if enabled
                 if use_cache:
-                    cache_path = self._get_cache_path(path, params or {})
-                    with open(cache_path, 'w') as f:
-                        json.dump(data, f)
+                    cache.set("news", cache_key, data, ttl=self.cache_duration)
                 
                 return data
             except ValueError:
@@ -4,9 +4,29 @@ import time
 import logging
 import requests
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Union, Any
-import redis
+
+try:
+    from .cache import get_cache
+    from .http_pool import get_http_pool
+    from .nse_store import NSE_DATA_DIR, get_historical_store
+    from .nse_panel import get_market_panel
+    from .rate_limit import get_rate_limiter
+    from .stock_index import get_stock_index
+    from .indicators import get_indicator_engine
+    from .market_hours import NSE_DAILY, NSE_SESSION, policy_ttl
+except ImportError:
+    # For standalone execution
+    from cache import get_cache
+    from http_pool import get_http_pool
+    from nse_store import NSE_DATA_DIR, get_historical_store
+    from nse_panel import get_market_panel
+    from rate_limit import get_rate_limiter
+    from stock_index import get_stock_index
+    from indicators import get_indicator_engine
+    from market_hours import NSE_DAILY, NSE_SESSION, policy_ttl
 
 # Configure logging
 logging.basicConfig(
@@ -20,12 +40,6 @@ NSE_API_KEY = os.environ.get('NSE_API_KEY')
 NSE_API_HOST = "nairobi-stock-exchange-nse.p.rapidapi.com"
 RAPID_API_KEY = os.environ.get('RAPID_API_KEY', "64be62d004msh5d2c420664b91e8p114762jsn5d31ba70e581")  # Default from docs
 
-# Redis configuration for caching
-REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
-REDIS_PORT = int(os.environ.get('REDIS_PORT', 6379))
-REDIS_DB = int(os.environ.get('REDIS_DB', 0))
-REDIS_PASSWORD = os.environ.get('REDIS_PASSWORD', None)
-
 # Cache TTL (Time To Live) in seconds
 CACHE_TTL = {
     'stock_price': 300,  # 5 minutes for stock prices
@@ -34,52 +48,38 @@ CACHE_TTL = {
     'sectors': 86400,  # 24 hours for sector information
 }
 
+# When each kind of data can change; stretches the TTLs above outside the trading session
+CACHE_DATA_CLASS = {
+    'stock_price': NSE_SESSION,
+    'market_index': NSE_SESSION,
+    'stock_details': NSE_DAILY,
+    'sectors': NSE_DAILY,
+}
+
 # API rate limiting
 RATE_LIMIT_REQUESTS = 10  # Maximum requests per minute
 RATE_LIMIT_WINDOW = 60  # Time window in seconds
 
-# Initialize Redis client for caching
-try:
-    redis_client = redis.Redis(
-        host=REDIS_HOST,
-        port=REDIS_PORT,
-        db=REDIS_DB,
-        password=REDIS_PASSWORD,
-        decode_responses=True
-    )
-    redis_client.ping()  # Test connection
-    REDIS_AVAILABLE = True
-    logger.info("Redis cache initialized successfully")
-except Exception as e:
-    REDIS_AVAILABLE = False
-    logger.warning(f"Redis cache initialization failed: {e}. Continuing without caching.")
+# Batch price retrieval
+NSE_BULK_PRICES_ENDPOINT = os.environ.get('NSE_BULK_PRICES_ENDPOINT')  # e.g. "stocks"; unset if the provider has no bulk quotes
+BULK_PRICES_MAX_SYMBOLS = 50  # Symbols per bulk request
+PRICE_FETCH_WORKERS = 8  # Concurrent per-symbol requests when no bulk endpoint is available
 
-# Rate limiting counter
-request_timestamps = []
+# Shared two-tier cache (in-process LRU + Redis)
+cache = get_cache()
 
+# Shared keep-alive HTTP connection pools
+http_pool = get_http_pool()
 
-def _check_rate_limit() -> bool:
-    """
-    Check if we're within API rate limits
-    
-    Returns:
-        bool: True if request can proceed, False if rate limit is exceeded
-    """
-    global request_timestamps
-    current_time = time.time()
-    
-    # Remove timestamps older than the rate limit window
-    request_timestamps = [ts for ts in request_timestamps if current_time - ts < RATE_LIMIT_WINDOW]
-    
-    # Check if we've exceeded the rate limit
-    if len(request_timestamps) >= RATE_LIMIT_REQUESTS:
-        logger.warning("Rate limit exceeded, request throttled")
-        return False
-    
-    # Add current timestamp to the list
-    request_timestamps.append(current_time)
-    return True
+# Upstream quota shared by every worker (token bucket in Redis)
+rate_limiter = get_rate_limiter('nse_api', RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW)
 
+# Market panel fields -> local historical data columns
+PANEL_COLUMNS = {
+    'close': 'day_price',
+    'high': 'day_high',
+    'low': 'day_low',
+}
 
 def _get_cache_key(endpoint: str, params: Dict = None) -> str:
     """
@@ -94,8 +94,13 @@ def _get_cache_key(endpoint: str, params: Dict = None) -> str:
     """
     if params:
         param_str = json.dumps(params, sort_keys=True)
-        return f"nse_api:{endpoint}:{param_str}"
-    return f"nse_api:{endpoint}"
+        return f"{endpoint}:{param_str}"
+    return endpoint
+
+
+def _cache_ttl(kind: str) -> int:
+    """TTL for a kind of data, adjusted to the NSE trading calendar"""
+    return policy_ttl(CACHE_TTL[kind], CACHE_DATA_CLASS[kind])
 
 
 def _set_cache(key: str, data: Any, ttl: int) -> bool:
@@ -110,16 +115,7 @@ def _set_cache(key: str, data: Any, ttl: int) -> bool:
     Returns:
         bool: True if successful, False otherwise
     """
-    if not REDIS_AVAILABLE:
-        return False
-    
-    try:
-        serialized_data = json.dumps(data)
-        redis_client.setex(key, ttl, serialized_data)
-        return True
-    except Exception as e:
-        logger.error(f"Error setting cache: {e}")
-        return False
+    return cache.set("nse_api", key, data, ttl=ttl)
 
 
 def _get_cache(key: str) -> Optional[Any]:
@@ -132,20 +128,11 @@ def _get_cache(key: str) -> Optional[Any]:
     Returns:
         Optional[Any]: Cached data or None if not found
     """
-    if not REDIS_AVAILABLE:
-        return None
-    
-    try:
-        data = redis_client.get(key)
-        if data:
-            return json.loads(data)
-        return None
-    except Exception as e:
-        logger.error(f"Error getting cache: {e}")
-        return None
+    return cache.get("nse_api", key)
 
 
-def _make_api_request(endpoint: str, params: Dict = None, cache_ttl: int = None) -> Optional[Dict]:
+def _make_api_request(endpoint: str, params: Dict = None, cache_ttl: int = None,
+                      read_cache: bool = True, write_cache: bool = True) -> Optional[Dict]:
     """
     Make a request to the NSE API with caching and rate limiting
     
@@ -153,6 +140,8 @@ def _make_api_request(endpoint: str, params: Dict = None, cache_ttl: int = None)
         endpoint (str): API endpoint
         params (Dict, optional): Query parameters
         cache_ttl (int, optional): Cache TTL in seconds, if None uses default based on endpoint
+        read_cache (bool): Check the cache before calling the API (skip when the caller already did)
+        write_cache (bool): Cache the response under this endpoint's key
         
     Returns:
         Optional[Dict]: API response data or None on error
@@ -161,16 +150,15 @@ def _make_api_request(endpoint: str, params: Dict = None, cache_ttl: int = None)
     cache_key = _get_cache_key(endpoint, params)
     
     # Try to get from cache first
-    cached_data = _get_cache(cache_key)
-    if cached_data:
-        logger.info(f"Cache hit for {cache_key}")
-        return cached_data
-    
-    # Check rate limit before making request
-    if not _check_rate_limit():
-        # If rate limit exceeded, wait and retry
-        time.sleep(5)
-        return _make_api_request(endpoint, params, cache_ttl)
+    if read_cache:
+        cached_data = _get_cache(cache_key)
+        if cached_data:
+            logger.info(f"Cache hit for {cache_key}")
+            return cached_data
+    
+    # Wait for the shared rate limit before making request
+    if not rate_limiter.acquire():
+        return None
     
     # Construct API URL
     url = f"https://{NSE_API_HOST}/{endpoint}"
@@ -183,7 +171,7 @@ def _make_api_request(endpoint: str, params: Dict = None, cache_ttl: int = None)
     
     try:
         # Make API request
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        response = http_pool.session().get(url, headers=headers, params=params, timeout=10)
         response.raise_for_status()  # Raise exception for HTTP errors
         
         # Parse response
@@ -193,16 +181,17 @@ def _make_api_request(endpoint: str, params: Dict = None, cache_ttl: int = None)
         if cache_ttl is None:
             # Use default TTL based on endpoint type
             if "stocks" in endpoint:
-                cache_ttl = CACHE_TTL['stock_price']
+                cache_ttl = _cache_ttl('stock_price')
             elif "index" in endpoint:
-                cache_ttl = CACHE_TTL['market_index']
+                cache_ttl = _cache_ttl('market_index')
             elif "sectors" in endpoint:
-                cache_ttl = CACHE_TTL['sectors']
+                cache_ttl = _cache_ttl('sectors')
             else:
-                cache_ttl = CACHE_TTL['stock_details']
+                cache_ttl = _cache_ttl('stock_details')
         
         # Cache the result
-        _set_cache(cache_key, data, cache_ttl)
+        if write_cache:
+            _set_cache(cache_key, data, cache_ttl)
         
         return data
     
@@ -211,7 +200,7 @@ def _make_api_request(endpoint: str, params: Dict = None, cache_ttl: int = None)
         if e.response.status_code == 429:
             logger.warning("Rate limit exceeded according to API response")
             time.sleep(10)  # Wait longer for rate limit errors
-            return _make_api_request(endpoint, params, cache_ttl)
+            return _make_api_request(endpoint, params, cache_ttl, read_cache, write_cache)
     except requests.exceptions.ConnectionError:
         logger.error("Connection error: Failed to connect to the API")
     except requests.exceptions.Timeout:
@@ -235,25 +224,125 @@ def get_stock_price(symbol: str) -> Optional[Dict]:
         Optional[Dict]: Stock price data or None on error
     """
     endpoint = f"stocks/{symbol}"
-    return _make_api_request(endpoint)
+    data = _make_api_request(endpoint)
+    _record_price(symbol, data)
+    return data
+
+
+def _record_price(symbol: str, data: Optional[Dict]) -> None:
+    """
+    Feed a quote into the indicator engine as the symbol's bar for its trading day
+    
+    Only symbols whose history the engine already holds (from the market panel
+    or a history sync) are updated; a lone quote would otherwise become a
+    one-bar history.
+    
+    Args:
+        symbol (str): Stock symbol
+        data (Optional[Dict]): Price data from the API
+    """
+    if not data or data.get('price') is None:
+        return
+    
+    try:
+        bar_date = pd.Timestamp(data.get('date') or data.get('timestamp') or datetime.now())
+        if bar_date.weekday() >= 5:
+            # No NSE session at weekends; the quote is the last session's close
+            return
+        engine = get_indicator_engine()
+        if engine.get(symbol) is None:
+            return
+        engine.update(symbol, float(data['price']), bar_date)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Could not record price for {symbol}: {e}")
 
 
 def get_multiple_stock_prices(symbols: List[str]) -> Dict[str, Optional[Dict]]:
     """
     Get real-time prices for multiple stocks
     
+    Cached prices are read in one Redis round-trip. The rest come from one bulk
+    request per BULK_PRICES_MAX_SYMBOLS symbols when NSE_BULK_PRICES_ENDPOINT is
+    configured, and otherwise (or for symbols the bulk response lacks) from
+    concurrent per-symbol requests that share the API rate limit.
+    
     Args:
         symbols (List[str]): List of stock symbols
         
     Returns:
         Dict[str, Optional[Dict]]: Dictionary mapping symbols to their price data
     """
-    results = {}
-    for symbol in symbols:
-        results[symbol] = get_stock_price(symbol)
+    symbols = list(dict.fromkeys(symbols))
+    keys = {symbol: _get_cache_key(f"stocks/{symbol}") for symbol in symbols}
+    
+    cached = cache.get_many("nse_api", keys.values())
+    results = {symbol: cached.get(key) for symbol, key in keys.items()}
+    missing = [symbol for symbol, data in results.items() if not data]
+    if missing:
+        logger.info(f"Price cache hits: {len(symbols) - len(missing)}/{len(symbols)}")
+    
+    if missing and NSE_BULK_PRICES_ENDPOINT:
+        for start in range(0, len(missing), BULK_PRICES_MAX_SYMBOLS):
+            results.update(_fetch_bulk_prices(missing[start:start + BULK_PRICES_MAX_SYMBOLS]))
+        missing = [symbol for symbol in missing if not results.get(symbol)]
+    
+    if missing:
+        # The rate limiter, not the pool size, decides how fast these go out
+        with ThreadPoolExecutor(max_workers=min(PRICE_FETCH_WORKERS, len(missing))) as executor:
+            fetched = executor.map(
+                lambda symbol: _make_api_request(f"stocks/{symbol}", read_cache=False),
+                missing
+            )
+            results.update(zip(missing, fetched))
+    
+    for symbol, data in results.items():
+        _record_price(symbol, data)
+    
     return results
 
 
+def _fetch_bulk_prices(symbols: List[str]) -> Dict[str, Dict]:
+    """
+    Fetch prices for several symbols with one request to the bulk quotes endpoint
+    
+    Args:
+        symbols (List[str]): Stock symbols
+        
+    Returns:
+        Dict[str, Dict]: Price data for the symbols present in the response
+    """
+    data = _make_api_request(
+        NSE_BULK_PRICES_ENDPOINT,
+        {"symbols": ",".join(symbols)},
+        read_cache=False,
+        write_cache=False
+    )
+    if not data:
+        return {}
+    
+    # Accept either a list of quotes or a mapping of symbol -> quote, optionally under "data"
+    items = data.get("data", data) if isinstance(data, dict) else data
+    if isinstance(items, list):
+        quotes = {
+            str(item.get("symbol") or item.get("code") or "").upper(): item
+            for item in items if isinstance(item, dict)
+        }
+    elif isinstance(items, dict):
+        quotes = {str(symbol).upper(): item for symbol, item in items.items() if isinstance(item, dict)}
+    else:
+        return {}
+    
+    prices = {symbol: quotes[symbol.upper()] for symbol in symbols if symbol.upper() in quotes}
+    
+    # Store each quote under the same key get_stock_price uses
+    cache.set_many(
+        "nse_api",
+        {_get_cache_key(f"stocks/{symbol}"): price for symbol, price in prices.items()},
+        ttl=_cache_ttl('stock_price')
+    )
+    return prices
+
+
 def get_market_index(index_name: str = "NSE20") -> Optional[Dict]:
     """
     Get the current value of an NSE market index
@@ -279,7 +368,7 @@ def get_stock_details(symbol: str) -> Optional[Dict]:
         Optional[Dict]: Stock details or None on error
     """
     endpoint = f"stocks/{symbol}/details"
-    return _make_api_request(endpoint, cache_ttl=CACHE_TTL['stock_details'])
+    return _make_api_request(endpoint, cache_ttl=_cache_ttl('stock_details'))
 
 
 def get_sector_stocks(sector: str) -> Optional[List[Dict]]:
@@ -369,7 +458,7 @@ def get_historical_data(symbol: str, start_date: Optional[str] = None, end_date:
 
 def fetch_local_historical_data(symbol: str, year: str = None) -> Optional[pd.DataFrame]:
     """
-    Fetch historical data from local CSV files
+    Fetch historical data from the local NSE store, or the CSV files if no store has been built
     
     Args:
         symbol (str): Stock symbol
@@ -378,8 +467,23 @@ def fetch_local_historical_data(symbol: str, year: str = None) -> Optional[pd.Da
     Returns:
         Optional[pd.DataFrame]: Historical data or None if not found
     """
+    # Read just this symbol's slice from the columnar store when available
+    store = get_historical_store()
+    if store is not None:
+        try:
+            if year:
+                symbol_data = store.load(symbol, start_date=f"{year}-01-01", end_date=f"{year}-12-31")
+            else:
+                symbol_data = store.load(symbol, include_source=True)
+            
+            if symbol_data is None:
+                logger.warning(f"No historical data found for symbol {symbol}" + (f" in year {year}" if year else ""))
+            return symbol_data
+        except Exception as e:
+            logger.error(f"Error reading NSE store, falling back to CSV files: {e}")
+    
     # Define the data directory
-    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+    data_dir = NSE_DATA_DIR
     
     try:
         # Handle specific year request
@@ -501,19 +605,30 @@ def get_stock_performance(symbol: str, period: str = "1y") -> Optional[Dict]:
             return performance
     
     # Fallback to local data if API request fails or if period is "all"
-    year = datetime.now().year if period == "1y" else None
-    local_data = fetch_local_historical_data(symbol, str(year) if year else None)
-    
-    if local_data is None or local_data.empty:
-        logger.warning(f"No historical data found for symbol {symbol}")
-        return None
-    
-    # Filter data based on period if not "all"
-    if days:
+    panel = get_market_panel()
+    if panel is not None and symbol in panel:
+        # Slice the shared market panel instead of loading the symbol's history
         end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+        start_date = end_date - timedelta(days=days) if days else None
+        local_data = panel.history(symbol, start_date, end_date)
+        if local_data is None:
+            logger.warning(f"No historical data found for symbol {symbol}")
+            return None
+        local_data = local_data.rename(columns=PANEL_COLUMNS)
+    else:
+        year = datetime.now().year if period == "1y" else None
+        local_data = fetch_local_historical_data(symbol, str(year) if year else None)
         
-        local_data = local_data[(local_data['date'] >= start_date) & (local_data['date'] <= end_date)]
+        if local_data is None or local_data.empty:
+            logger.warning(f"No historical data found for symbol {symbol}")
+            return None
+        
+        # Filter data based on period if not "all"
+        if days:
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=days)
+            
+            local_data = local_data[(local_data['date'] >= start_date) & (local_data['date'] <= end_date)]
     
     # Calculate performance metrics
     performance = _calculate_performance_metrics(local_data)
@@ -632,49 +747,15 @@ def get_stock_suggestions(partial_query: str) -> Optional[List[Dict]]:
     if len(partial_query) < 2:
         return []
     
-    # Check local data first
-    results = []
-    
-    # Search in local sector data
-    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
-    sector_files = [f for f in os.listdir(data_dir) if f.startswith("NSE_data_stock_market_sectors")]
-    
-    if sector_files:
-        # Use the most recent sector file
-        sector_files.sort(reverse=True)
-        sector_file = os.path.join(data_dir, sector_files[0])
-        
-        try:
-            df = pd.read_csv(sector_file)
-            # Standardize column names
-            df.columns = [col.lower().replace(' ', '_') for col in df.columns]
-            
-            # Find stock code column
-            code_col = next((col for col in df.columns if 'code' in col.lower()), None)
-            name_col = next((col for col in df.columns if 'name' in col.lower()), None)
-            sector_col = next((col for col in df.columns if 'sector' in col.lower()), None)
-            
-            if code_col and name_col:
-                # Filter stocks that match the query
-                matches = df[
-                    (df[code_col].str.contains(partial_query, case=False)) | 
-                    (df[name_col].str.contains(partial_query, case=False))
-                ]
-                
-                # Format results
-                for _, row in matches.iterrows():
-                    stock = {
-                        'symbol': row[code_col],
-                        'name': row[name_col],
-                        'sector': row[sector_col] if sector_col else 'Unknown'
-                    }
-                    results.append(stock)
-        except Exception as e:
-            logger.error(f"Error searching local stock data: {e}")
+    # Check the in-memory symbol/name index first
+    results = [
+        {'symbol': match['symbol'], 'name': match['name'], 'sector': match['sector']}
+        for match in get_stock_index().search(partial_query, limit=10)
+    ]
     
     # If we found results locally, return them
     if results:
-        return results[:10]  # Limit to 10 suggestions
+        return results
     
     # Otherwise, try the API
     api_results = search_stocks(partial_query)
@@ -704,6 +785,14 @@ def search_stocks(query: str) -> Optional[List[Dict]]:
     Returns:
         Optional[List[Dict]]: Search results or None on error
     """
+    # Answer from the local index when it knows the stock
+    matches = get_stock_index().search(query, limit=10)
+    if matches:
+        return [
+            {'symbol': match['symbol'], 'name': match['name'], 'sector': match['sector']}
+            for match in matches
+        ]
+    
     endpoint = "search"
     params = {"q": query}
     return _make_api_request(endpoint, params)
@@ -741,6 +830,9 @@ def init_nse_api():
     try:
         logger.info("Initializing NSE API and pre-warming caches...")
         
+        # Build the stock search index
+        get_stock_index()
+        
         # Get market summary
         get_market_summary()
         
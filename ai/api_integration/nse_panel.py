@@ -0,0 +1,432 @@
+import os
+import json
+import atexit
+import time
+import struct
+import hashlib
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from multiprocessing import shared_memory, resource_tracker
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .market_hours import is_trading_day, nairobi_time
+    from .nse_store import NSEHistoricalStore, get_historical_store
+except ImportError:
+    # For standalone execution
+    from market_hours import is_trading_day, nairobi_time
+    from nse_store import NSEHistoricalStore, get_historical_store
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('nse_panel')
+
+# Panel fields (panel name -> NSE store column), each a dates x symbols float32 matrix
+PANEL_FIELDS = {
+    'close': 'day_price',
+    'volume': 'volume',
+    'high': 'day_high',
+    'low': 'day_low',
+}
+
+PANEL_SHM_PREFIX = os.environ.get('NSE_PANEL_SHM_PREFIX', 'pesaguru_nse_')
+PANEL_ATTACH_TIMEOUT = float(os.environ.get('NSE_PANEL_ATTACH_TIMEOUT', 30))  # Seconds to wait for another process to finish building
+PANEL_MAX_LAG_SESSIONS = int(os.environ.get('NSE_PANEL_MAX_LAG_SESSIONS', 2))  # Older panels are not used where recent data is needed
+
+# Segment layout: header | metadata JSON | dates (datetime64[D]) | one float32 matrix per field
+PANEL_MAGIC = b'PGPANEL1'
+PANEL_HEADER = struct.Struct('<8sIIII')  # magic, ready flag, n_dates, n_symbols, metadata length
+PANEL_HEADER_SIZE = 64
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _panel_name(store: NSEHistoricalStore) -> str:
+    """Name the segment after the store build, so a rebuilt store gets a fresh panel"""
+    digest = hashlib.md5(f"{store.index['built_at']}|{','.join(PANEL_FIELDS)}".encode()).hexdigest()[:10]
+    return f"{PANEL_SHM_PREFIX}{digest}"
+
+
+def _layout(n_dates: int, n_symbols: int, meta_len: int) -> Dict[str, int]:
+    """Byte offsets of each block inside the segment"""
+    offsets = {'dates': _align(PANEL_HEADER_SIZE + meta_len)}
+    offset = offsets['dates'] + n_dates * 8
+    for field in PANEL_FIELDS:
+        offsets[field] = _align(offset)
+        offset = offsets[field] + n_dates * n_symbols * 4
+    offsets['size'] = max(offset, 1)
+    return offsets
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing segment without letting this process unlink it at exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, create=False, track=False)
+    except TypeError:
+        # Python < 3.13 registers every attachment with the resource tracker
+        shm = shared_memory.SharedMemory(name=name, create=False)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _build_segment(name: str, store: NSEHistoricalStore) -> shared_memory.SharedMemory:
+    """
+    Materialize the panel from the NSE store straight into a new shared memory segment
+
+    Raises:
+        FileExistsError: If another process created the segment first
+    """
+    symbols = sorted(store.symbols)
+    row_dates = np.asarray(store.column("date"))
+    dates = np.unique(row_dates)
+
+    # Every store row becomes one (date, symbol) cell
+    symbol_ids = np.empty(len(row_dates), dtype=np.int64)
+    for position, symbol in enumerate(symbols):
+        entry = store.symbols[symbol]
+        symbol_ids[entry["offset"]:entry["offset"] + entry["length"]] = position
+    date_ids = np.searchsorted(dates, row_dates)
+
+    meta = json.dumps({
+        "symbols": symbols,
+        "fields": list(PANEL_FIELDS),
+        "store_built_at": store.index["built_at"],
+        "created_at": datetime.now().isoformat(),
+    }).encode()
+    layout = _layout(len(dates), len(symbols), len(meta))
+
+    shm = shared_memory.SharedMemory(name=name, create=True, size=layout['size'])
+    try:
+        shm.buf[PANEL_HEADER_SIZE:PANEL_HEADER_SIZE + len(meta)] = meta
+        np.ndarray(dates.shape, dtype='datetime64[D]', buffer=shm.buf, offset=layout['dates'])[:] = dates
+        for field, column in PANEL_FIELDS.items():
+            matrix = np.ndarray((len(dates), len(symbols)), dtype=np.float32, buffer=shm.buf, offset=layout[field])
+            matrix.fill(np.nan)
+            matrix[date_ids, symbol_ids] = store.column(column)
+            del matrix
+
+        # Publish last: readers wait for the ready flag before mapping the arrays
+        PANEL_HEADER.pack_into(shm.buf, 0, PANEL_MAGIC, 1, len(dates), len(symbols), len(meta))
+    except Exception:
+        shm.close()
+        shm.unlink()
+        raise
+
+    logger.info(f"Built NSE market panel {name}: {len(dates)} dates x {len(symbols)} symbols ({layout['size'] / 1e6:.1f} MB)")
+    return shm
+
+
+class NSEMarketPanel:
+    """
+    Zero-copy view over the shared NSE market panel.
+
+    Each field is a (dates x symbols) float32 matrix backed by one shared
+    memory segment, so every worker process reads the same physical pages.
+    Cells are NaN on days a symbol did not trade. Arrays are read-only.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False):
+        self.shm = shm
+        self.name = shm.name
+        self.owner = owner
+        self.owner_pid = os.getpid()
+
+        magic, ready, n_dates, n_symbols, meta_len = PANEL_HEADER.unpack_from(shm.buf, 0)
+        if magic != PANEL_MAGIC or not ready:
+            raise ValueError(f"Shared memory segment {shm.name} is not a ready NSE panel")
+
+        meta = json.loads(bytes(shm.buf[PANEL_HEADER_SIZE:PANEL_HEADER_SIZE + meta_len]))
+        layout = _layout(n_dates, n_symbols, meta_len)
+
+        self.symbols = meta["symbols"]
+        self.symbol_index = {symbol: position for position, symbol in enumerate(self.symbols)}
+        self.store_built_at = meta["store_built_at"]
+
+        self.dates = np.ndarray((n_dates,), dtype='datetime64[D]', buffer=shm.buf, offset=layout['dates'])
+        self.dates.flags.writeable = False
+        self.fields = {}
+        for field in meta["fields"]:
+            matrix = np.ndarray((n_dates, n_symbols), dtype=np.float32, buffer=shm.buf, offset=layout[field])
+            matrix.flags.writeable = False
+            self.fields[field] = matrix
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.symbol_index
+
+    @property
+    def as_of(self) -> Optional[date]:
+        """Date of the panel's last session"""
+        return pd.Timestamp(self.dates[-1]).date() if len(self.dates) else None
+
+    def sessions_behind(self, today: Optional[date] = None, limit: int = 31) -> int:
+        """
+        Trading sessions before today that the panel does not cover
+
+        Args:
+            today (date, optional): Reference date (default: today in Nairobi)
+            limit (int): Stop counting here; older panels report the limit
+
+        Returns:
+            int: Missing sessions, at most limit
+        """
+        if self.as_of is None:
+            return limit
+        today = today or nairobi_time().date()
+        missing = 0
+        day = today - timedelta(days=1)
+        while day > self.as_of and missing < limit:
+            if is_trading_day(day):
+                missing += 1
+            day -= timedelta(days=1)
+        return missing
+
+    def is_current(self, max_lag_sessions: int = PANEL_MAX_LAG_SESSIONS, today: Optional[date] = None) -> bool:
+        """Whether the panel reaches to within max_lag_sessions trading sessions of today"""
+        return self.sessions_behind(today, limit=max_lag_sessions + 1) <= max_lag_sessions
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.fields['close']
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.fields['volume']
+
+    def rows(self, start_date: Union[str, datetime, None] = None,
+             end_date: Union[str, datetime, None] = None) -> slice:
+        """
+        Row slice covering a date range
+
+        Args:
+            start_date (str | datetime, optional): First date to include
+            end_date (str | datetime, optional): Last date to include
+
+        Returns:
+            slice: Rows of every field matrix within the range
+        """
+        lo = int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date).date(), 'D'), 'left')) if start_date is not None else 0
+        hi = int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date).date(), 'D'), 'right')) if end_date is not None else len(self.dates)
+        return slice(lo, hi)
+
+    def values(self, field: str = 'close', symbols: Optional[List[str]] = None,
+               start_date: Union[str, datetime, None] = None,
+               end_date: Union[str, datetime, None] = None) -> np.ndarray:
+        """
+        Slice a field matrix (a view when all symbols are requested)
+
+        Args:
+            field (str): Panel field ('close', 'volume', 'high', 'low')
+            symbols (List[str], optional): Symbols to select, in order (default: all)
+            start_date (str | datetime, optional): First date to include
+            end_date (str | datetime, optional): Last date to include
+
+        Returns:
+            np.ndarray: (dates x symbols) float32 array
+        """
+        matrix = self.fields[field][self.rows(start_date, end_date)]
+        if symbols is None:
+            return matrix
+        return matrix[:, [self.symbol_index[symbol] for symbol in symbols]]
+
+    def frame(self, field: str = 'close', symbols: Optional[List[str]] = None,
+              start_date: Union[str, datetime, None] = None,
+              end_date: Union[str, datetime, None] = None) -> pd.DataFrame:
+        """
+        Field values as a DataFrame indexed by date with one column per symbol
+
+        Args:
+            field (str): Panel field ('close', 'volume', 'high', 'low')
+            symbols (List[str], optional): Symbols to select (default: all)
+            start_date (str | datetime, optional): First date to include
+            end_date (str | datetime, optional): Last date to include
+
+        Returns:
+            pd.DataFrame: Field values
+        """
+        symbols = [symbol for symbol in symbols if symbol in self.symbol_index] if symbols is not None else self.symbols
+        rows = self.rows(start_date, end_date)
+        return pd.DataFrame(
+            self.values(field, symbols, start_date, end_date),
+            index=pd.DatetimeIndex(self.dates[rows].astype('datetime64[ns]'), name='date'),
+            columns=symbols,
+            copy=False
+        )
+
+    def returns(self, symbols: Optional[List[str]] = None,
+                start_date: Union[str, datetime, None] = None,
+                end_date: Union[str, datetime, None] = None) -> pd.DataFrame:
+        """
+        Daily close-to-close returns, carrying the last close over non-trading days
+
+        Args:
+            symbols (List[str], optional): Symbols to select (default: all)
+            start_date (str | datetime, optional): First date to include
+            end_date (str | datetime, optional): Last date to include
+
+        Returns:
+            pd.DataFrame: Returns indexed by date with one column per symbol
+        """
+        closes = self.frame('close', symbols, start_date, end_date).astype(np.float64).ffill()
+        return closes.pct_change(fill_method=None).iloc[1:]
+
+    def history(self, symbol: str, start_date: Union[str, datetime, None] = None,
+                end_date: Union[str, datetime, None] = None) -> Optional[pd.DataFrame]:
+        """
+        One symbol's trading days with every panel field
+
+        Args:
+            symbol (str): Stock symbol
+            start_date (str | datetime, optional): First date to include
+            end_date (str | datetime, optional): Last date to include
+
+        Returns:
+            Optional[pd.DataFrame]: Rows with 'date' plus one column per field, or None
+        """
+        position = self.symbol_index.get(symbol)
+        if position is None:
+            return None
+
+        rows = self.rows(start_date, end_date)
+        close = self.fields['close'][rows, position]
+        traded = ~np.isnan(close)
+        if not traded.any():
+            return None
+
+        data = {'date': pd.to_datetime(self.dates[rows][traded].astype('datetime64[ns]'))}
+        for field, matrix in self.fields.items():
+            data[field] = matrix[rows, position][traded].astype(np.float64)
+        return pd.DataFrame(data)
+
+    def release(self, unlink: bool = False) -> None:
+        """
+        Drop this process's mapping of the panel
+
+        Args:
+            unlink (bool): Also remove the segment so no new process can attach
+        """
+        self.fields = {}
+        self.dates = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A caller still holds a view; the mapping goes away with it
+            logger.warning(f"NSE market panel {self.name} still in use; mapping left open")
+        if unlink:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+_panel_instance = None
+_panel_checked = False
+_panel_stale_logged = False
+_panel_instance_lock = threading.Lock()
+
+
+def get_market_panel() -> Optional[NSEMarketPanel]:
+    """
+    Get the process-wide NSE market panel, building it on first use
+
+    The first process to ask materializes the panel from the NSE store into
+    shared memory; later processes (or forked workers) attach to the same
+    segment. The building process owns the segment and removes its name
+    when it exits, so call this in the parent before forking workers to
+    keep the panel alive for the whole pod.
+
+    Returns:
+        Optional[NSEMarketPanel]: The shared panel, or None without an NSE store
+    """
+    global _panel_instance, _panel_checked
+    if _panel_checked:
+        return _panel_instance
+
+    with _panel_instance_lock:
+        if _panel_checked:
+            return _panel_instance
+
+        store = get_historical_store()
+        if store is None:
+            _panel_checked = True
+            return None
+
+        name = _panel_name(store)
+        panel = None
+        try:
+            try:
+                panel = NSEMarketPanel(_build_segment(name, store), owner=True)
+                atexit.register(_release_owned_panel, panel)
+            except FileExistsError:
+                panel = _attach_when_ready(name)
+        except Exception as e:
+            logger.error(f"Error loading NSE market panel: {e}")
+
+        _panel_instance = panel
+        _panel_checked = True
+        return panel
+
+
+def get_current_market_panel(max_lag_sessions: int = PANEL_MAX_LAG_SESSIONS) -> Optional[NSEMarketPanel]:
+    """
+    Get the shared NSE market panel only if its data is recent
+
+    The panel is built from CSV exports, which can be far behind the live
+    APIs. Callers that need recent history (training, predictions, returns
+    for risk) use this and fall back to their live source when it is None.
+
+    Args:
+        max_lag_sessions (int): Trading sessions the panel may be behind today
+
+    Returns:
+        Optional[NSEMarketPanel]: The shared panel, or None if it is missing or out of date
+    """
+    global _panel_stale_logged
+    panel = get_market_panel()
+    if panel is None:
+        return None
+    if panel.is_current(max_lag_sessions):
+        return panel
+    if not _panel_stale_logged:
+        _panel_stale_logged = True
+        logger.warning(f"NSE market panel data ends {panel.as_of}, more than {max_lag_sessions} "
+                       f"sessions ago; using live sources for recent history")
+    return None
+
+
+def _release_owned_panel(panel: NSEMarketPanel) -> None:
+    """Unlink the segment when the building process exits (not in forked workers)"""
+    if os.getpid() == panel.owner_pid:
+        panel.release(unlink=True)
+
+
+def _attach_when_ready(name: str) -> Optional[NSEMarketPanel]:
+    """Attach to a segment, waiting while another process is still filling it"""
+    shm = _attach(name)
+    deadline = time.monotonic() + PANEL_ATTACH_TIMEOUT
+    while True:
+        magic, ready = PANEL_HEADER.unpack_from(shm.buf, 0)[:2]
+        if magic == PANEL_MAGIC and ready:
+            return NSEMarketPanel(shm)
+        if time.monotonic() >= deadline:
+            shm.close()
+            logger.warning(f"Timed out waiting for NSE market panel {name}")
+            return None
+        time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    panel = get_market_panel()
+    if panel is None:
+        print("No NSE store found; build one with nse_store.py first")
+    else:
+        print(f"Panel {panel.name}: {len(panel.dates)} dates x {len(panel.symbols)} symbols")
+        print(panel.frame('close', ['SCOM', 'EQTY', 'KCB']).tail())
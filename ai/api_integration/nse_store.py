@@ -0,0 +1,359 @@
+import os
+import json
+import shutil
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('nse_store')
+
+# Location of the raw NSE CSV exports and of the converted store
+NSE_DATA_DIR = os.environ.get(
+    'NSE_DATA_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+)
+NSE_STORE_DIR = os.environ.get('NSE_STORE_DIR', os.path.join(NSE_DATA_DIR, "nse_store"))
+
+STORE_VERSION = 1
+STORE_INDEX_FILE = "index.json"
+CSV_PREFIX = "NSE_data_all_stocks_"
+
+# Typed numeric columns (column name -> file name inside the store)
+NUMERIC_COLUMNS = {
+    '12m_low': '12m_low',
+    '12m_high': '12m_high',
+    'day_low': 'day_low',
+    'day_high': 'day_high',
+    'day_price': 'day_price',
+    'previous': 'previous',
+    'change': 'change',
+    'change%': 'change_pct',
+    'volume': 'volume',
+    'adjusted_price': 'adjusted_price',
+}
+
+# Older exports truncate the last header to "Adjust"
+COLUMN_ALIASES = {
+    'adjust': 'adjusted_price',
+}
+
+# The exports mix two- and four-digit years ("2-Jan-13", "03-Jan-2023")
+DATE_FORMATS = ('%d-%b-%y', '%d-%b-%Y')
+
+
+def _source_label(file_name: str) -> str:
+    """Label a source file the way fetch_local_historical_data tags its 'year' column"""
+    return file_name.replace(CSV_PREFIX, "").replace(".csv", "")
+
+
+def list_source_files(csv_dir: str = NSE_DATA_DIR) -> List[str]:
+    """
+    List the yearly all-stocks CSV exports in a directory
+
+    Args:
+        csv_dir (str): Directory holding the NSE CSV exports
+
+    Returns:
+        List[str]: Sorted file names
+    """
+    if not os.path.isdir(csv_dir):
+        return []
+    return sorted(
+        f for f in os.listdir(csv_dir)
+        if f.startswith(CSV_PREFIX) and f.endswith(".csv")
+    )
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """Parse export dates, trying each known format before a lenient fallback"""
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    for fmt in DATE_FORMATS:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(values[missing], format=fmt, errors='coerce')
+    missing = parsed.isna() & values.notna()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(values[missing], dayfirst=True, errors='coerce')
+    return parsed
+
+
+def _parse_numbers(values: pd.Series) -> np.ndarray:
+    """Parse "1,900.00" / "6.54%" / "-" style cells into float64 (blanks and dashes become NaN)"""
+    cleaned = (
+        values.astype(str)
+        .str.replace(',', '', regex=False)
+        .str.replace('%', '', regex=False)
+        .str.strip()
+    )
+    return pd.to_numeric(cleaned, errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _read_source(file_path: str) -> pd.DataFrame:
+    """Read one CSV export into typed, standardized columns"""
+    raw = pd.read_csv(file_path, dtype=str, encoding='utf-8-sig', keep_default_na=False)
+    raw.columns = [COLUMN_ALIASES.get(c, c) for c in (col.strip().lower().replace(' ', '_') for col in raw.columns)]
+
+    frame = pd.DataFrame({
+        'date': _parse_dates(raw['date'].str.strip().replace('', None)),
+        'code': raw['code'].str.strip(),
+        'name': raw['name'].str.strip() if 'name' in raw.columns else "",
+    })
+    for column in NUMERIC_COLUMNS:
+        frame[column] = _parse_numbers(raw[column]) if column in raw.columns else np.nan
+
+    return frame[frame['date'].notna() & (frame['code'] != "")]
+
+
+def build_store(csv_dir: str = NSE_DATA_DIR, store_dir: str = NSE_STORE_DIR) -> Dict:
+    """
+    Convert the yearly CSV exports into a symbol-partitioned columnar store
+
+    Rows are sorted by (symbol, date) and every column is written as its own
+    .npy file, so one symbol's history is a contiguous slice of each column.
+    index.json maps each symbol to its row offset and length.
+
+    Args:
+        csv_dir (str): Directory holding the NSE CSV exports
+        store_dir (str): Directory to write the store to (replaced atomically)
+
+    Returns:
+        Dict: The written index
+    """
+    source_files = list_source_files(csv_dir)
+    if not source_files:
+        raise FileNotFoundError(f"No {CSV_PREFIX}*.csv files found in {csv_dir}")
+
+    frames = []
+    for source_id, file_name in enumerate(source_files):
+        frame = _read_source(os.path.join(csv_dir, file_name))
+        frame['source_id'] = np.int16(source_id)
+        frames.append(frame)
+        logger.info(f"Parsed {len(frame)} rows from {file_name}")
+
+    data = pd.concat(frames, ignore_index=True)
+    # Later exports win when two files overlap on the same trading day
+    data = data.drop_duplicates(subset=['code', 'date'], keep='last')
+    data = data.sort_values(['code', 'date'], kind='mergesort').reset_index(drop=True)
+
+    codes = data['code'].to_numpy()
+    boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(data)]))
+
+    dates = data['date'].to_numpy().astype('datetime64[D]')
+    names = data['name'].to_numpy()
+    symbols = {}
+    for start, end in zip(starts, ends):
+        symbols[str(codes[start])] = {
+            "offset": int(start),
+            "length": int(end - start),
+            "name": str(names[end - 1]),
+            "first_date": str(dates[start]),
+            "last_date": str(dates[end - 1]),
+        }
+
+    index = {
+        "version": STORE_VERSION,
+        "built_at": datetime.now().isoformat(),
+        "rows": int(len(data)),
+        "sources": [
+            {
+                "file": file_name,
+                "label": _source_label(file_name),
+                "mtime": os.path.getmtime(os.path.join(csv_dir, file_name)),
+            }
+            for file_name in source_files
+        ],
+        "columns": dict(NUMERIC_COLUMNS, date='date', source_id='source_id'),
+        "symbols": symbols,
+    }
+
+    # Write into a sibling directory and swap it in so readers never see a partial store
+    staging_dir = f"{store_dir}.tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    np.save(os.path.join(staging_dir, "date.npy"), dates)
+    np.save(os.path.join(staging_dir, "source_id.npy"), data['source_id'].to_numpy(dtype=np.int16))
+    for column, file_name in NUMERIC_COLUMNS.items():
+        np.save(os.path.join(staging_dir, f"{file_name}.npy"), data[column].to_numpy(dtype=np.float64))
+    with open(os.path.join(staging_dir, STORE_INDEX_FILE), 'w') as f:
+        json.dump(index, f)
+
+    previous_dir = f"{store_dir}.old"
+    shutil.rmtree(previous_dir, ignore_errors=True)
+    if os.path.exists(store_dir):
+        os.replace(store_dir, previous_dir)
+    os.replace(staging_dir, store_dir)
+    shutil.rmtree(previous_dir, ignore_errors=True)
+
+    logger.info(f"Built NSE store at {store_dir}: {len(symbols)} symbols, {len(data)} rows")
+    return index
+
+
+class NSEHistoricalStore:
+    """
+    Read-only view over a store written by build_store.
+
+    Columns are memory-mapped and only opened on first use, so loading one
+    symbol touches just that symbol's slice of each column file.
+    """
+
+    def __init__(self, store_dir: str = NSE_STORE_DIR):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, STORE_INDEX_FILE)) as f:
+            self.index = json.load(f)
+        if self.index.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported NSE store version: {self.index.get('version')}")
+
+        self.symbols = self.index["symbols"]
+        self.sources = self.index["sources"]
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, store_dir: str = NSE_STORE_DIR) -> Optional['NSEHistoricalStore']:
+        """
+        Open a store if one has been built
+
+        Args:
+            store_dir (str): Store directory
+
+        Returns:
+            Optional[NSEHistoricalStore]: The store, or None if missing or unreadable
+        """
+        if not os.path.exists(os.path.join(store_dir, STORE_INDEX_FILE)):
+            return None
+        try:
+            return cls(store_dir)
+        except Exception as e:
+            logger.error(f"Error opening NSE store at {store_dir}: {e}")
+            return None
+
+    def is_stale(self, csv_dir: str = NSE_DATA_DIR) -> bool:
+        """
+        Check whether the CSV exports changed since the store was built
+
+        Args:
+            csv_dir (str): Directory holding the NSE CSV exports
+
+        Returns:
+            bool: True if files were added, removed or modified
+        """
+        source_files = list_source_files(csv_dir)
+        if not source_files:
+            # Store shipped without the raw exports
+            return False
+        built = {source["file"]: source["mtime"] for source in self.sources}
+        if set(source_files) != set(built):
+            return True
+        return any(
+            os.path.getmtime(os.path.join(csv_dir, file_name)) > built[file_name]
+            for file_name in source_files
+        )
+
+    def column(self, file_name: str) -> np.ndarray:
+        """Memory-map a whole column file (opened on first use)"""
+        column = self._columns.get(file_name)
+        if column is None:
+            with self._lock:
+                column = self._columns.get(file_name)
+                if column is None:
+                    column = np.load(os.path.join(self.store_dir, f"{file_name}.npy"), mmap_mode='r')
+                    self._columns[file_name] = column
+        return column
+
+    def load(self, symbol: str, start_date: Union[str, datetime, None] = None,
+             end_date: Union[str, datetime, None] = None, columns: Optional[List[str]] = None,
+             include_source: bool = False) -> Optional[pd.DataFrame]:
+        """
+        Load one symbol's history, optionally limited to a date range
+
+        Args:
+            symbol (str): Stock symbol
+            start_date (str | datetime, optional): First date to include
+            end_date (str | datetime, optional): Last date to include
+            columns (List[str], optional): Numeric columns to load (default: all)
+            include_source (bool): Add a 'year' column labelling the source export
+
+        Returns:
+            Optional[pd.DataFrame]: Rows sorted by date, or None if the symbol has none in range
+        """
+        entry = self.symbols.get(symbol)
+        if entry is None:
+            return None
+
+        offset, length = entry["offset"], entry["length"]
+        dates = self.column("date")[offset:offset + length]
+
+        # Dates are sorted within a symbol, so the range is a binary search
+        lo = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start_date).date(), 'D'), 'left')) if start_date is not None else 0
+        hi = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end_date).date(), 'D'), 'right')) if end_date is not None else length
+        if hi <= lo:
+            return None
+
+        rows = slice(offset + lo, offset + hi)
+        count = hi - lo
+        frame = {
+            'date': pd.to_datetime(np.asarray(dates[lo:hi]).astype('datetime64[ns]')),
+            'code': np.full(count, symbol, dtype=object),
+            'name': np.full(count, entry["name"], dtype=object),
+        }
+        for column in (columns or NUMERIC_COLUMNS):
+            frame[column] = np.array(self.column(NUMERIC_COLUMNS[column])[rows])
+        if include_source:
+            labels = np.array([source["label"] for source in self.sources], dtype=object)
+            frame['year'] = labels[np.asarray(self.column("source_id")[rows])]
+
+        return pd.DataFrame(frame)
+
+
+_store_instance = None
+_store_checked = False
+_store_instance_lock = threading.Lock()
+
+
+def get_historical_store() -> Optional[NSEHistoricalStore]:
+    """
+    Get the process-wide NSE store, if a current one has been built
+
+    A store older than the CSV exports is ignored (with a warning) so callers
+    fall back to the CSVs until build_store is re-run.
+
+    Returns:
+        Optional[NSEHistoricalStore]: The shared store or None
+    """
+    global _store_instance, _store_checked
+    if not _store_checked:
+        with _store_instance_lock:
+            if not _store_checked:
+                store = NSEHistoricalStore.open(NSE_STORE_DIR)
+                if store is not None and store.is_stale(NSE_DATA_DIR):
+                    logger.warning(f"NSE store at {NSE_STORE_DIR} is older than the CSV exports; rebuild it with build_store()")
+                    store = None
+                _store_instance = store
+                _store_checked = True
+    return _store_instance
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Usage: python nse_store.py [csv_dir] [store_dir]
+    csv_dir = sys.argv[1] if len(sys.argv) > 1 else NSE_DATA_DIR
+    store_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(csv_dir, "nse_store")
+
+    index = build_store(csv_dir, store_dir)
+    print(f"Symbols: {len(index['symbols'])}")
+    print(f"Rows: {index['rows']}")
+    print(f"Sources: {', '.join(source['file'] for source in index['sources'])}")
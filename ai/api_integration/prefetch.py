@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+try:
+    from .cache import get_cache
+    from .market_hours import is_market_open, nairobi_time, next_market_open, session_open
+except ImportError:
+    # For standalone execution
+    from cache import get_cache
+    from market_hours import is_market_open, nairobi_time, next_market_open, session_open
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Constants
+PREFETCH_CONFIG_PATH = os.getenv(
+    "PREFETCH_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "prefetch_config.json")
+)
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+DEFAULT_TICK_SECONDS = 30
+DEFAULT_PRE_OPEN_MINUTES = 15
+DEFAULT_OPENING_WINDOW_MINUTES = 30
+
+# Warms the cache entries for a job's parameters and returns how many it refreshed
+PrefetchTask = Callable[[Dict[str, Any]], Awaitable[int]]
+
+
+class PrefetchJob:
+    """One scheduled prefetch job from the config file"""
+
+    def __init__(self, config: Dict[str, Any]):
+        schedule = config.get("schedule", {})
+        self.id = config["id"]
+        self.name = config.get("name", self.id)
+        self.task = config["task"]
+        self.parameters = config.get("parameters", {})
+        self.market_interval = schedule.get("market_hours_interval_minutes", 15) * 60
+        self.off_hours_interval = schedule.get("off_hours_interval_minutes", 240) * 60
+        self.warm_before_open = schedule.get("warm_before_open", True)
+        self.enabled = config.get("enabled", True)
+
+        self.last_run: Optional[datetime] = None
+        self.stats = {
+            "runs": 0, "skipped": 0, "errors": 0, "entries_warmed": 0,
+            "last_run": None, "last_duration_ms": None, "last_error": None
+        }
+
+    def interval(self, now: datetime) -> int:
+        """Seconds between runs at the given time"""
+        return self.market_interval if is_market_open(now) else self.off_hours_interval
+
+    def is_due(self, now: datetime, pre_open: timedelta) -> bool:
+        """
+        Whether the job should run now.
+
+        Args:
+            now: Current Nairobi time
+            pre_open: How long before the NSE opens warm-up runs happen
+
+        Returns:
+            bool: True when the interval has elapsed, or when the pre-open warm-up
+            point has passed since the last run
+        """
+        if self.last_run is None:
+            return True
+        if (now - self.last_run).total_seconds() >= self.interval(now):
+            return True
+        return self.warm_before_open and self.last_run < next_market_open(self.last_run) - pre_open <= now
+
+
+class CachePrefetcher:
+    """
+    Schedules cache warm-up jobs described in a JSON config.
+
+    Jobs run more often while the NSE is open than outside market hours, and
+    once shortly before the open so the first sessions of the day hit warm
+    caches. Workers share the cache, so a job another worker ran recently is
+    skipped. The hit rate over the first minutes after each open is recorded
+    to show the effect on the cache namespaces being warmed.
+    """
+
+    def __init__(self, tasks: Dict[str, PrefetchTask], namespaces: List[str],
+                 config_path: str = PREFETCH_CONFIG_PATH):
+        """
+        Args:
+            tasks: Task name -> coroutine function warming the cache for a job's parameters
+            namespaces: Cache namespaces the tasks fill, reported in the hit-rate stats
+            config_path: JSON file with global_settings and prefetch_jobs
+        """
+        with open(config_path) as f:
+            config = json.load(f)
+
+        settings = config.get("global_settings", {})
+        self.tick_seconds = settings.get("tick_seconds", DEFAULT_TICK_SECONDS)
+        self.pre_open = timedelta(minutes=settings.get("pre_open_minutes", DEFAULT_PRE_OPEN_MINUTES))
+        self.opening_window = timedelta(minutes=settings.get("opening_window_minutes", DEFAULT_OPENING_WINDOW_MINUTES))
+
+        self.tasks = tasks
+        self.namespaces = namespaces
+        self.jobs = []
+        for job_config in config.get("prefetch_jobs", []):
+            job = PrefetchJob(job_config)
+            if not job.enabled:
+                continue
+            if job.task not in tasks:
+                logger.warning(f"Prefetch job {job.id} uses unknown task {job.task}; skipping it")
+                continue
+            self.jobs.append(job)
+
+        self.cache = get_cache()
+        self._runner: Optional[asyncio.Task] = None
+        self._opening: Optional[Dict[str, Any]] = None
+        self.opening_hit_rates: Dict[str, Any] = {}
+
+    def start(self) -> asyncio.Task:
+        """Start the scheduler on the running event loop"""
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.get_running_loop().create_task(self._run_forever())
+            logger.info(f"Cache prefetcher started with {len(self.jobs)} jobs")
+        return self._runner
+
+    async def stop(self) -> None:
+        """Cancel the scheduler"""
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                await self.run_due()
+            except Exception as e:
+                logger.error(f"Prefetch tick failed: {str(e)}")
+            await asyncio.sleep(self.tick_seconds)
+
+    async def run_due(self, now: Optional[datetime] = None) -> List[str]:
+        """
+        Run every job that is due.
+
+        Args:
+            now: Current time; now if omitted
+
+        Returns:
+            List[str]: IDs of the jobs that ran
+        """
+        now = nairobi_time(now)
+        self._track_opening(now)
+
+        due = [job for job in self.jobs if job.is_due(now, self.pre_open)]
+        ran = await asyncio.gather(*(self.run_job(job, now) for job in due))
+        return [job.id for job, did_run in zip(due, ran) if did_run]
+
+    async def run_job(self, job: PrefetchJob, now: Optional[datetime] = None) -> bool:
+        """
+        Run one job unless another worker ran it recently.
+
+        Args:
+            job: Job to run
+            now: Current time; now if omitted
+
+        Returns:
+            bool: Whether the job ran
+        """
+        now = nairobi_time(now)
+        interval = job.interval(now)
+        warm_up_at = next_market_open(now) - self.pre_open
+        if job.warm_before_open and not is_market_open(now) and warm_up_at <= now:
+            # Pre-open warm-up: a run from before the warm-up point does not count
+            recent_since = warm_up_at.timestamp()
+        else:
+            recent_since = now.timestamp() - interval / 2
+
+        shared_last_run = self.cache.get("prefetch", job.id)
+        if shared_last_run and shared_last_run >= recent_since:
+            job.last_run = now
+            job.stats["skipped"] += 1
+            return False
+        self.cache.set("prefetch", job.id, now.timestamp(), ttl=max(interval, 60))
+
+        start = time.perf_counter()
+        job.last_run = now
+        job.stats["last_run"] = now.isoformat()
+        try:
+            warmed = await self.tasks[job.task](job.parameters)
+            job.stats["runs"] += 1
+            job.stats["entries_warmed"] += warmed or 0
+            logger.info(f"Prefetched {warmed} entries for {job.id}")
+        except Exception as e:
+            job.stats["errors"] += 1
+            job.stats["last_error"] = str(e)
+            logger.error(f"Prefetch job {job.id} failed: {str(e)}")
+        finally:
+            job.stats["last_duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return True
+
+    def _counters(self) -> Dict[str, Dict[str, int]]:
+        counters = {}
+        for namespace in self.namespaces:
+            metrics = self.cache.stats(namespace)
+            counters[namespace] = {
+                "hits": metrics["l1_hits"] + metrics["l2_hits"],
+                "misses": metrics["misses"]
+            }
+        return counters
+
+    def _track_opening(self, now: datetime) -> None:
+        """Measure cache hit rates over the first minutes of each trading session"""
+        opened_at = session_open(now)
+        if opened_at is not None and (self._opening is None or self._opening["opened_at"] != opened_at):
+            self._opening = {"opened_at": opened_at, "baseline": self._counters(), "reported": False}
+
+        opening = self._opening
+        if opening is None or opening["reported"] or now < opening["opened_at"] + self.opening_window:
+            return
+
+        report = {"session": opening["opened_at"].date().isoformat(), "namespaces": {}}
+        for namespace, counts in self._counters().items():
+            baseline = opening["baseline"].get(namespace, {"hits": 0, "misses": 0})
+            hits = counts["hits"] - baseline["hits"]
+            lookups = hits + counts["misses"] - baseline["misses"]
+            report["namespaces"][namespace] = {
+                "lookups": lookups,
+                "hit_rate": round(hits / lookups, 4) if lookups else None
+            }
+        opening["reported"] = True
+        self.opening_hit_rates = report
+        logger.info(f"Cache hit rates in the first {self.opening_window} of trading: {report['namespaces']}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Prefetch job counters plus the hit-rate impact on the warmed namespaces.
+
+        Returns:
+            Dict with per-job stats, overall hit rates of the warmed namespaces and
+            hit rates over the opening window of the latest session
+        """
+        return {
+            "running": self._runner is not None and not self._runner.done(),
+            "market_open": is_market_open(),
+            "jobs": {job.id: dict(job.stats, task=job.task) for job in self.jobs},
+            "namespaces": {namespace: self.cache.stats(namespace) for namespace in self.namespaces},
+            "opening_window": self.opening_hit_rates
+        }
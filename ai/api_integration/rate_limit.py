@@ -0,0 +1,392 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import redis
+
+try:
+    from .cache import KEY_PREFIX, REDIS_DB, REDIS_HOST, REDIS_PASSWORD, REDIS_PORT, REDIS_RETRY_INTERVAL
+except ImportError:
+    # For standalone execution
+    from cache import KEY_PREFIX, REDIS_DB, REDIS_HOST, REDIS_PASSWORD, REDIS_PORT, REDIS_RETRY_INTERVAL
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('pesaguru.rate_limit')
+
+# Seconds a batch of tokens leased from Redis stays usable in-process
+LEASE_TTL = float(os.getenv('RATE_LIMIT_LEASE_TTL', 1.0))
+
+# Default upper bound on how long acquire() blocks
+DEFAULT_ACQUIRE_TIMEOUT = float(os.getenv('RATE_LIMIT_ACQUIRE_TIMEOUT', 30))
+
+# Atomic token bucket shared by every process. Uses the Redis clock so pods with
+# skewed clocks still refill at the same rate. Grants between ARGV[3] and ARGV[4]
+# tokens (the surplus is leased to the caller's process) or none at all.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local min_tokens = tonumber(ARGV[3])
+local max_tokens = tonumber(ARGV[4])
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local granted = 0
+local wait = 0
+if tokens >= min_tokens then
+    granted = math.min(max_tokens, math.floor(tokens))
+    tokens = tokens - granted
+else
+    wait = (min_tokens - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {granted, tostring(tokens), tostring(wait)}
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request cannot get a rate limit token in time"""
+
+
+class RateLimitMetrics:
+    """Counters for one rate limiter"""
+
+    def __init__(self):
+        self.granted = 0
+        self.denied = 0
+        self.lease_hits = 0
+        self.redis_calls = 0
+        self.local_fallbacks = 0
+        self.errors = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        attempts = self.granted + self.denied
+        return {
+            'granted': self.granted,
+            'denied': self.denied,
+            'lease_hits': self.lease_hits,
+            'redis_calls': self.redis_calls,
+            'local_fallbacks': self.local_fallbacks,
+            'errors': self.errors,
+            'waits': self.waits,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': round(self.wait_seconds / self.waits * 1000, 3) if self.waits else 0.0,
+            'denial_rate': round(self.denied / attempts, 4) if attempts else 0.0,
+        }
+
+
+class TokenBucket:
+    """Thread-safe in-process token bucket, used while Redis is unreachable"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, tokens: float = 1) -> Tuple[bool, float]:
+        """
+        Take tokens if available.
+
+        Returns:
+            Tuple[bool, float]: Whether the tokens were granted, and seconds until they would be
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True, 0.0
+            return False, (tokens - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter shared by every process talking to one upstream API.
+
+    The bucket lives in Redis and is updated atomically by a Lua script, so the
+    quota holds across threads, workers and pods. Two in-process fast paths
+    avoid a Redis round-trip per request: tokens can be leased in small batches
+    (``lease``), and after a denial the process knows when the next token is due
+    and answers locally until then. If Redis is unreachable each process falls
+    back to its own bucket with the same limits.
+    """
+
+    def __init__(self, name: str, rate: float, per: float = 60.0, burst: Optional[float] = None,
+                 lease: int = 1, redis_client=None):
+        """
+        Initialize the limiter.
+
+        Args:
+            name: Upstream API name; limiters with the same name share one bucket
+            rate: Requests allowed per period
+            per: Period in seconds
+            burst: Bucket capacity (defaults to rate)
+            lease: Tokens to take from Redis per round-trip (kept for LEASE_TTL seconds)
+            redis_client: Optional Redis client; created from environment if omitted
+        """
+        self.name = name
+        self.metrics = RateLimitMetrics()
+        self._redis = redis_client
+        self._redis_retry_at = 0.0
+        self._script = None
+        self._lock = threading.Lock()
+        self.configure(rate, per, burst, lease)
+
+    def configure(self, rate: float, per: float = 60.0, burst: Optional[float] = None,
+                  lease: int = 1) -> None:
+        """
+        Update the limits.
+
+        Args:
+            rate: Requests allowed per period
+            per: Period in seconds
+            burst: Bucket capacity (defaults to rate)
+            lease: Tokens to take from Redis per round-trip
+        """
+        with self._lock:
+            self.capacity = float(burst if burst is not None else rate)
+            self.refill_rate = float(rate) / float(per)
+            self.lease = max(1, min(int(lease), int(self.capacity)))
+            self.key = f"{KEY_PREFIX}:rate_limit:{self.name}"
+            self._local = TokenBucket(self.capacity, self.refill_rate)
+            self._leased = 0
+            self._lease_expires = 0.0
+            self._blocked_until = 0.0
+
+    # ------------------------------------------------------------------
+    # Redis connection
+    # ------------------------------------------------------------------
+
+    def _get_redis(self):
+        """Return a live Redis client, or None while Redis is unreachable"""
+        if self._redis is not None:
+            return self._redis
+        if time.monotonic() < self._redis_retry_at:
+            return None
+
+        try:
+            client = redis.Redis(
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                db=REDIS_DB,
+                password=REDIS_PASSWORD,
+                socket_connect_timeout=1,
+                socket_timeout=1
+            )
+            client.ping()
+            self._redis = client
+            logger.info(f"Rate limiter '{self.name}' connected to Redis")
+        except Exception as e:
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+            logger.warning(f"Redis unavailable for rate limiter '{self.name}', limiting per process: {e}")
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        self.metrics.errors += 1
+        logger.warning(f"Redis error in rate limiter '{self.name}': {error}")
+        self._redis = None
+        self._script = None
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+
+    # ------------------------------------------------------------------
+    # Acquiring tokens
+    # ------------------------------------------------------------------
+
+    def _take(self, tokens: int) -> Tuple[bool, float]:
+        """Try to take tokens once; returns (granted, seconds until they would be)"""
+        with self._lock:
+            now = time.monotonic()
+            # Fast path 1: tokens already leased to this process
+            if self._leased >= tokens and now < self._lease_expires:
+                self._leased -= tokens
+                self.metrics.lease_hits += 1
+                return True, 0.0
+            # Fast path 2: Redis already told us the bucket is empty until then
+            if now < self._blocked_until:
+                return False, self._blocked_until - now
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                if self._script is None:
+                    self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+                granted, _, wait = self._script(
+                    keys=[self.key],
+                    args=[self.capacity, self.refill_rate, tokens, max(tokens, self.lease)]
+                )
+                self.metrics.redis_calls += 1
+                granted, wait = int(granted), float(wait)
+                with self._lock:
+                    if granted:
+                        self._leased = granted - tokens
+                        self._lease_expires = time.monotonic() + LEASE_TTL
+                    else:
+                        self._blocked_until = time.monotonic() + wait
+                return bool(granted), wait
+            except Exception as e:
+                self._redis_failed(e)
+
+        self.metrics.local_fallbacks += 1
+        return self._local.take(tokens)
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """
+        Take tokens without waiting.
+
+        Args:
+            tokens: Number of tokens (requests) to take
+
+        Returns:
+            bool: True if the request may proceed
+        """
+        granted, _ = self._take(tokens)
+        if granted:
+            self.metrics.granted += 1
+        else:
+            self.metrics.denied += 1
+        return granted
+
+    def acquire(self, tokens: int = 1, timeout: Optional[float] = DEFAULT_ACQUIRE_TIMEOUT) -> bool:
+        """
+        Take tokens, sleeping the calling thread until they are available.
+
+        Args:
+            tokens: Number of tokens (requests) to take
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            bool: True if acquired, False if the timeout ran out first
+        """
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        while True:
+            granted, wait = self._take(tokens)
+            if granted:
+                self._record_acquired(started)
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                self._record_timeout()
+                return False
+            # Jitter so processes woken together do not stampede Redis
+            time.sleep(wait + random.uniform(0, 0.05))
+
+    async def aacquire(self, tokens: int = 1, timeout: Optional[float] = DEFAULT_ACQUIRE_TIMEOUT) -> bool:
+        """
+        Take tokens, suspending the calling task (not the event loop) until they are available.
+
+        Args:
+            tokens: Number of tokens (requests) to take
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            bool: True if acquired, False if the timeout ran out first
+        """
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        while True:
+            granted, wait = self._take(tokens)
+            if granted:
+                self._record_acquired(started)
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                self._record_timeout()
+                return False
+            await asyncio.sleep(wait + random.uniform(0, 0.05))
+
+    def _record_acquired(self, started: float) -> None:
+        self.metrics.granted += 1
+        waited = time.monotonic() - started
+        if waited > 0.001:
+            self.metrics.waits += 1
+            self.metrics.wait_seconds += waited
+            logger.debug(f"Rate limiter '{self.name}' waited {waited:.2f}s")
+
+    def _record_timeout(self) -> None:
+        self.metrics.denied += 1
+        self.metrics.timeouts += 1
+        logger.warning(f"Rate limit for '{self.name}' not available within timeout, request throttled")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Describe the limiter's configuration and counters.
+
+        Returns:
+            Dict[str, Any]: Limits, backend and metrics
+        """
+        return {
+            'capacity': self.capacity,
+            'refill_per_second': round(self.refill_rate, 6),
+            'lease': self.lease,
+            'backend': 'redis' if self._redis is not None else 'local',
+            **self.metrics.to_dict(),
+        }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, per: float = 60.0, burst: Optional[float] = None,
+                     lease: int = 1) -> RateLimiter:
+    """
+    Get the process-wide limiter for an upstream API.
+
+    The limits can be overridden with ``<NAME>_RATE_LIMIT`` (requests) and
+    ``<NAME>_RATE_WINDOW`` (seconds) environment variables.
+
+    Args:
+        name: Upstream API name; callers using the same name share one quota
+        rate: Requests allowed per period
+        per: Period in seconds
+        burst: Bucket capacity (defaults to rate)
+        lease: Tokens to take from Redis per round-trip
+
+    Returns:
+        RateLimiter: The shared limiter
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                env_name = name.upper().replace('.', '_').replace('-', '_')
+                rate = float(os.getenv(f'{env_name}_RATE_LIMIT', rate))
+                per = float(os.getenv(f'{env_name}_RATE_WINDOW', per))
+                limiter = RateLimiter(name, rate, per, burst, lease)
+                _limiters[name] = limiter
+    return limiter
+
+
+def rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Metrics for every limiter created in this process.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Stats keyed by limiter name
+    """
+    return {name: limiter.stats() for name, limiter in sorted(_limiters.items())}
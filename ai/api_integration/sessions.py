@@ -1,11 +1,9 @@
 import os
-import time
 import json
 import logging
 import hashlib
 import requests
 import redis
-from redis import Redis
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Union, Tuple, List, Any
 from requests.adapters import HTTPAdapter
@@ -14,6 +12,14 @@ from dotenv import load_dotenv
 from authlib.integrations.requests_client import OAuth2Session
 from cryptography.fernet import Fernet
 
+try:
+    from .rate_limit import RateLimitExceeded, get_rate_limiter
+    from .token_manager import credential_key, get_token_manager
+except ImportError:
+    # For standalone execution
+    from rate_limit import RateLimitExceeded, get_rate_limiter
+    from token_manager import credential_key, get_token_manager
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -40,56 +46,6 @@ if not ENCRYPTION_KEY:
 cipher_suite = Fernet(ENCRYPTION_KEY)
 
 
-class APIRateLimiter:
-    """Rate limiter for API calls to prevent exceeding API limits"""
-    
-    def __init__(self, redis_client: Redis, api_name: str, max_calls: int, time_frame: int):
-        """
-        Initialize rate limiter
-        
-        Args:
-            redis_client: Redis client for tracking call rates
-            api_name: Unique name of the API
-            max_calls: Maximum number of calls allowed in the time frame
-            time_frame: Time frame in seconds for the rate limit
-        """
-        self.redis = redis_client
-        self.api_name = api_name
-        self.max_calls = max_calls
-        self.time_frame = time_frame
-        self.key = f"rate_limit:{api_name}"
-    
-    def can_make_request(self) -> bool:
-        """Check if a request can be made within the rate limits"""
-        current_count = self.redis.get(self.key)
-        if current_count is None:
-            # No previous calls, initialize counter
-            self.redis.setex(self.key, self.time_frame, 1)
-            return True
-        
-        current_count = int(current_count)
-        if current_count < self.max_calls:
-            # Increment the counter
-            self.redis.incr(self.key)
-            return True
-        
-        return False
-    
-    def time_until_reset(self) -> int:
-        """Get the time in seconds until the rate limit resets"""
-        ttl = self.redis.ttl(self.key)
-        return max(0, ttl)
-    
-    def wait_if_needed(self) -> bool:
-        """Wait if rate limit is reached, return True if waited"""
-        if not self.can_make_request():
-            wait_time = self.time_until_reset()
-            logger.warning(f"Rate limit reached for {self.api_name}. Waiting {wait_time} seconds.")
-            time.sleep(wait_time + 1)  # Add 1 second buffer
-            return True
-        return False
-
-
 class APISession:
     """Base class for API sessions with common functionality"""
     
@@ -118,13 +74,9 @@ class APISession:
         # Create session with retry strategy
         self.session = self._create_session()
         
-        # Create rate limiter (default: 100 calls per minute)
-        self.rate_limiter = APIRateLimiter(
-            self.redis,
-            api_name,
-            max_calls=int(os.getenv(f'{api_name.upper()}_RATE_LIMIT', 100)),
-            time_frame=int(os.getenv(f'{api_name.upper()}_RATE_WINDOW', 60))
-        )
+        # Shared token-bucket rate limiter (default: 100 calls per minute,
+        # overridable with <API_NAME>_RATE_LIMIT / <API_NAME>_RATE_WINDOW)
+        self.rate_limiter = get_rate_limiter(api_name, rate=100, per=60)
     
     def _create_session(self) -> requests.Session:
         """Create a session with retry strategy"""
@@ -266,7 +218,8 @@ class ApiKeySession(APISession):
                 return cached_response
         
         # Apply rate limiting
-        self.rate_limiter.wait_if_needed()
+        if not self.rate_limiter.acquire():
+            raise RateLimitExceeded(f"Rate limit for {self.api_name} not available")
         
         # Prepare headers
         request_headers = self.headers.copy()
@@ -335,9 +288,6 @@ class OAuth2ApiSession(APISession):
         self.scope = scope
         self.token_refresh_margin = token_refresh_margin
         
-        # Store token info in Redis
-        self.token_key = f"oauth_token:{api_name}"
-        
         # Create OAuth session
         self.oauth = OAuth2Session(
             client_id=client_id,
@@ -345,84 +295,53 @@ class OAuth2ApiSession(APISession):
             scope=scope
         )
         
+        # Tokens are shared across workers and renewed in the background before they expire
+        self.token_name = f"oauth:{api_name}:{credential_key(token_url, client_id)}"
+        get_token_manager().register(self.token_name, self._request_token, refresh_margin=token_refresh_margin)
+        
         # Initialize token
         self._ensure_token()
     
     def _ensure_token(self) -> None:
-        """Ensure a valid token is available, fetching a new one if needed"""
-        token_data = self.redis.get(self.token_key)
-        
-        if not token_data:
-            self._fetch_new_token()
-            return
-            
-        try:
-            token = json.loads(token_data)
-            # Check if token needs refresh
-            expires_at = token.get('expires_at', 0)
-            if time.time() + self.token_refresh_margin >= expires_at:
-                self._refresh_token(token)
-            
-            # Update OAuth session with the token
-            self.oauth.token = token
-            
-        except (json.JSONDecodeError, KeyError) as e:
-            logger.error(f"Error parsing token data: {e}")
-            self._fetch_new_token()
+        """Ensure the OAuth session holds the current shared token"""
+        token = get_token_manager().get_token_info(self.token_name)
+        current = self.oauth.token
+        if not current or current.get('access_token') != token['access_token']:
+            self.oauth.token = dict(token)
+    
+    def _request_token(self) -> Dict:
+        """Obtain a token for the token manager, refreshing the current one when possible"""
+        token = self.oauth.token
+        if token and 'refresh_token' in token:
+            try:
+                return self._refresh_token(token)
+            except Exception as e:
+                # Try to get a new token instead
+                logger.error(f"Failed to refresh token: {e}")
+        return self._fetch_new_token()
     
-    def _fetch_new_token(self) -> None:
+    def _fetch_new_token(self) -> Dict:
         """Fetch a new token using client credentials flow"""
         logger.info(f"Fetching new token for {self.api_name}")
         
         try:
-            token = self.oauth.fetch_token(
+            return self.oauth.fetch_token(
                 url=self.token_url,
                 grant_type="client_credentials",
                 client_id=self.client_id,
                 client_secret=self.client_secret
             )
-            
-            # Store token in Redis
-            self._save_token(token)
-            
         except Exception as e:
             logger.error(f"Failed to fetch token: {e}")
             raise
     
-    def _refresh_token(self, token: Dict) -> None:
+    def _refresh_token(self, token: Dict) -> Dict:
         """Refresh an existing token"""
         logger.info(f"Refreshing token for {self.api_name}")
         
-        try:
-            if 'refresh_token' in token:
-                new_token = self.oauth.refresh_token(
-                    url=self.token_url,
-                    refresh_token=token['refresh_token']
-                )
-                self._save_token(new_token)
-            else:
-                # No refresh token, get a new token
-                self._fetch_new_token()
-                
-        except Exception as e:
-            logger.error(f"Failed to refresh token: {e}")
-            # Try to get a new token instead
-            self._fetch_new_token()
-    
-    def _save_token(self, token: Dict) -> None:
-        """Save token data to Redis with expiration"""
-        # Add expiration time if not present
-        if 'expires_at' not in token and 'expires_in' in token:
-            token['expires_at'] = time.time() + token['expires_in']
-            
-        # Calculate TTL for Redis
-        ttl = int(token.get('expires_at', time.time() + 3600) - time.time())
-        
-        # Store in Redis
-        self.redis.setex(
-            self.token_key,
-            ttl,
-            json.dumps(token)
+        return self.oauth.refresh_token(
+            url=self.token_url,
+            refresh_token=token['refresh_token']
         )
     
     def request(
@@ -466,7 +385,8 @@ class OAuth2ApiSession(APISession):
         self._ensure_token()
         
         # Apply rate limiting
-        self.rate_limiter.wait_if_needed()
+        if not self.rate_limiter.acquire():
+            raise RateLimitExceeded(f"Rate limit for {self.api_name} not available")
         
         try:
             # Make OAuth request
@@ -493,7 +413,7 @@ class OAuth2ApiSession(APISession):
             # Handle token expiration
             if hasattr(e, 'response') and e.response.status_code == 401:
                 logger.info("Token may have expired. Fetching new token.")
-                self._fetch_new_token()
+                get_token_manager().invalidate(self.token_name, self.oauth.token['access_token'])
                 # Retry the request once
                 return self.request(method, endpoint, params, data, headers, use_cache, cache_ttl)
             raise
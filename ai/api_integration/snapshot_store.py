@@ -0,0 +1,263 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    from .cache import with_staleness_marker
+except ImportError:
+    # For standalone execution
+    from cache import with_staleness_marker
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('snapshot_store')
+
+# Last-known-good upstream responses live here, one JSON file per source and request
+SNAPSHOT_DIR = os.environ.get(
+    'SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "snapshots")
+)
+SOURCE_RETRY_SECONDS = int(os.environ.get('SNAPSHOT_SOURCE_RETRY_SECONDS', 60))  # How long a failed source is skipped
+SNAPSHOT_REWRITE_INTERVAL = 300  # Seconds before an unchanged response is written again (refreshes its age)
+
+
+def _is_good(data: Any) -> bool:
+    """Default check for a usable upstream response"""
+    return bool(data) and not (isinstance(data, dict) and "error" in data)
+
+
+class SnapshotStore:
+    """
+    File-backed store of the last good response from each upstream source.
+
+    Every good response is persisted (atomically, so a crash never leaves a
+    torn file). When a source fails, callers are served its last snapshot,
+    marked stale with its age, instead of mock data. A failed source is then
+    skipped for SOURCE_RETRY_SECONDS, so requests during an outage are
+    answered from disk immediately instead of waiting on timeouts.
+    """
+
+    def __init__(self, directory: str = SNAPSHOT_DIR, retry_seconds: int = SOURCE_RETRY_SECONDS):
+        self.directory = directory
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._written: Dict[str, Tuple[str, float]] = {}  # path -> (fingerprint, saved_at)
+        self._down_until: Dict[str, float] = {}
+        self.stats = {"saved": 0, "served": 0, "skipped_calls": 0, "failures": 0}
+
+    def _path(self, source: str, key: str) -> str:
+        source_dir = re.sub(r'[^A-Za-z0-9_.-]', '_', source)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.directory, source_dir, f"{digest}.json")
+
+    def save(self, source: str, key: str, data: Any) -> None:
+        """
+        Persist a good response as the source's last-known-good snapshot.
+
+        Args:
+            source: Upstream source name (e.g. "cbk")
+            key: Identifies the request within the source
+            data: JSON-serializable response
+        """
+        path = self._path(source, key)
+        try:
+            payload = json.dumps(data, sort_keys=True, default=str)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Not snapshotting {source} {key}: {e}")
+            return
+
+        now = time.time()
+        fingerprint = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        with self._lock:
+            previous = self._written.get(path)
+            if previous and previous[0] == fingerprint and now - previous[1] < SNAPSHOT_REWRITE_INTERVAL:
+                return
+            self._written[path] = (fingerprint, now)
+
+        record = json.dumps({"source": source, "key": key, "saved_at": now, "data": json.loads(payload)})
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                f.write(record)
+            os.replace(tmp_path, path)
+            self.stats["saved"] += 1
+        except OSError as e:
+            logger.warning(f"Failed to write snapshot for {source} {key}: {e}")
+            with self._lock:
+                self._written.pop(path, None)
+
+    def load(self, source: str, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Read a snapshot.
+
+        Args:
+            source: Upstream source name
+            key: Identifies the request within the source
+
+        Returns:
+            Optional[Tuple[Any, float]]: (data, unix time it was saved), or None if there is none
+        """
+        try:
+            with open(self._path(source, key)) as f:
+                record = json.load(f)
+            return record["data"], record["saved_at"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Unreadable snapshot for {source} {key}: {e}")
+            return None
+
+    def serve(self, source: str, key: str) -> Optional[Any]:
+        """
+        Last-known-good data for a request, marked with its age.
+
+        Args:
+            source: Upstream source name
+            key: Identifies the request within the source
+
+        Returns:
+            Optional[Any]: Snapshot data (dicts gain 'stale', 'data_age_seconds' and
+            'last_known_good' keys), or None if there is no snapshot
+        """
+        snapshot = self.load(source, key)
+        if snapshot is None:
+            return None
+        data, saved_at = snapshot
+        self.stats["served"] += 1
+        served = with_staleness_marker(data, time.time() - saved_at, True)
+        if isinstance(served, dict):
+            served["last_known_good"] = True
+        return served
+
+    async def asave(self, source: str, key: str, data: Any) -> None:
+        """Async variant of save(); the file is written off the event loop"""
+        await asyncio.to_thread(self.save, source, key, data)
+
+    async def aserve(self, source: str, key: str) -> Optional[Any]:
+        """Async variant of serve(); the file is read off the event loop"""
+        return await asyncio.to_thread(self.serve, source, key)
+
+    async def aserve_if_down(self, source: str, key: str) -> Optional[Any]:
+        """Async variant of serve_if_down()"""
+        if not self.is_down(source):
+            return None
+        return await asyncio.to_thread(self.serve_if_down, source, key)
+
+    def is_down(self, source: str) -> bool:
+        """Whether a source failed within the retry window"""
+        return time.time() < self._down_until.get(source, 0)
+
+    def mark_failed(self, source: str) -> None:
+        """Skip a source for the retry window"""
+        self.stats["failures"] += 1
+        self._down_until[source] = time.time() + self.retry_seconds
+        logger.warning(f"Upstream source {source} failed; serving snapshots for {self.retry_seconds}s")
+
+    def mark_ok(self, source: str) -> None:
+        """Record that a source answered"""
+        self._down_until.pop(source, None)
+
+    def serve_if_down(self, source: str, key: str) -> Optional[Any]:
+        """Snapshot to serve without calling a source that is down, if there is one"""
+        if not self.is_down(source):
+            return None
+        served = self.serve(source, key)
+        if served is not None:
+            self.stats["skipped_calls"] += 1
+        return served
+
+    def fetch(self, source: str, key: str, fetch: Callable[[], Any],
+              is_good: Callable[[Any], bool] = _is_good) -> Any:
+        """
+        Call a source, snapshotting good responses and serving the snapshot on failure.
+
+        Args:
+            source: Upstream source name
+            key: Identifies the request within the source
+            fetch: Function calling the source
+            is_good: Whether a response is usable (default: non-empty and no 'error' key)
+
+        Returns:
+            Any: Fresh data, the marked snapshot, or the failed response when there is no snapshot
+
+        Raises:
+            Exception: Whatever fetch raised, when there is no snapshot to serve
+        """
+        served = self.serve_if_down(source, key)
+        if served is not None:
+            return served
+
+        try:
+            data = fetch()
+        except Exception:
+            served = self._on_failure(source, key)
+            if served is None:
+                raise
+            return served
+        return self._on_response(source, key, data, is_good)
+
+    async def afetch(self, source: str, key: str, fetch: Callable[[], Awaitable[Any]],
+                     is_good: Callable[[Any], bool] = _is_good) -> Any:
+        """Async variant of fetch() for coroutine functions; snapshot files are read and written off the event loop"""
+        served = await self.aserve_if_down(source, key)
+        if served is not None:
+            return served
+
+        try:
+            data = await fetch()
+        except Exception:
+            served = await asyncio.to_thread(self._on_failure, source, key)
+            if served is None:
+                raise
+            return served
+        return await asyncio.to_thread(self._on_response, source, key, data, is_good)
+
+    def _on_response(self, source: str, key: str, data: Any, is_good: Callable[[Any], bool]) -> Any:
+        if is_good(data):
+            self.mark_ok(source)
+            self.save(source, key, data)
+            return data
+        served = self._on_failure(source, key)
+        return data if served is None else served
+
+    def _on_failure(self, source: str, key: str) -> Any:
+        self.mark_failed(source)
+        return self.serve(source, key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters plus the sources currently being skipped"""
+        now = time.time()
+        return {
+            **self.stats,
+            "sources_down": {source: round(until - now, 1) for source, until in self._down_until.items() if until > now},
+        }
+
+
+# Singleton instance
+_snapshot_store_instance = None
+_snapshot_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> SnapshotStore:
+    """
+    Get the process-wide last-known-good snapshot store.
+
+    Returns:
+        SnapshotStore: Store instance
+    """
+    global _snapshot_store_instance
+    if _snapshot_store_instance is None:
+        with _snapshot_store_lock:
+            if _snapshot_store_instance is None:
+                _snapshot_store_instance = SnapshotStore()
+    return _snapshot_store_instance
@@ -0,0 +1,382 @@
+import os
+import re
+import logging
+import threading
+import unicodedata
+from typing import Collection, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+try:
+    from .nse_store import NSE_DATA_DIR
+except ImportError:
+    # For standalone execution
+    from nse_store import NSE_DATA_DIR
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('stock_index')
+
+SECTOR_FILE_PREFIX = "NSE_data_stock_market_sectors"
+
+# Sector CSVs shipped with the repository, used when NSE_DATA_DIR has none
+SHIPPED_SECTOR_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "notebooks", "data", "nse_historical_data"
+)
+
+# Names people actually type for listed companies (English and Swahili)
+STOCK_ALIASES = {
+    'SCOM': ['safaricom', 'saf', 'mpesa', 'm-pesa'],
+    'EQTY': ['equity', 'equity bank', 'benki ya equity'],
+    'KCB': ['kcb bank', 'kenya commercial bank', 'benki ya kcb'],
+    'COOP': ['coop', 'co-op bank', 'cooperative bank', 'benki ya ushirika'],
+    'EABL': ['eabl', 'east african breweries', 'tusker', 'kampuni ya bia'],
+    'BAT': ['british american tobacco', 'bat kenya'],
+    'KQ': ['kenya airways', 'kq', 'the pride of africa', 'shirika la ndege la kenya'],
+    'KPLC': ['kenya power', 'kplc', 'stima', 'kenya power and lighting'],
+    'KEGN': ['kengen', 'kenya electricity generating'],
+    'ABSA': ['absa', 'barclays', 'barclays bank kenya'],
+    'SCBK': ['stanchart', 'standard chartered'],
+    'SBIC': ['stanbic', 'stanbic bank'],
+    'NCBA': ['ncba', 'nic bank', 'cba'],
+    'DTK': ['dtb', 'diamond trust'],
+    'IMH': ['i&m', 'i and m', 'i&m bank'],
+    'HFCK': ['hf group', 'housing finance'],
+    'NBK': ['national bank'],
+    'BAMB': ['bamburi'],
+    'BRIT': ['britam'],
+    'JUB': ['jubilee', 'jubilee insurance'],
+    'CIC': ['cic insurance'],
+    'KNRE': ['kenya re', 'kenyare'],
+    'SLAM': ['sanlam'],
+    'NMG': ['nation media', 'nation', 'taifa leo'],
+    'SGL': ['standard group', 'standard media'],
+    'TOTL': ['total', 'total kenya', 'totalenergies'],
+    'UMME': ['umeme'],
+    'CTUM': ['centum'],
+    'TPSE': ['serena', 'serena hotels'],
+    'UCHM': ['uchumi'],
+    'UNGA': ['unga'],
+    'MSC': ['mumias', 'mumias sugar'],
+    'NSE': ['nse', 'nairobi securities exchange', 'soko la hisa la nairobi'],
+    'SASN': ['sasini'],
+    'KUKZ': ['kakuzi'],
+    'CRWN': ['crown paints'],
+    'PORT': ['east african portland', 'portland cement'],
+    'CARB': ['carbacid'],
+    'LKL': ['longhorn'],
+    'HBE': ['homeboyz'],
+    'GLD': ['newgold', 'gold etf'],
+    'LAPR': ['laptrust', 'imara reit'],
+    '^N20I': ['nse 20', 'nse20'],
+    '^NASI': ['nasi', 'nse all share'],
+}
+
+# Trailing corporate words that carry no search signal
+NAME_NOISE_WORDS = {'ltd', 'limited', 'plc', 'holdings', 'group', 'company', 'co', 'k'}
+
+# Match kinds, best first; scores are added to a small shorter-term bonus
+MATCH_SCORES = {
+    'symbol': 100,
+    'alias': 90,
+    'name': 85,
+    'symbol_prefix': 70,
+    'alias_prefix': 60,
+    'name_prefix': 55,
+    'word_prefix': 45,
+}
+
+TRIE_TOP_K = 20  # Ranked matches kept at every trie node
+MIN_TRIGRAM_SIMILARITY = 0.3
+MAX_ENTITY_WORDS = 5  # Longest alias/name phrase resolve() looks for
+
+# Aliases that are also everyday words; they complete searches but are not entity mentions
+AMBIGUOUS_ALIASES = {'total', 'nation', 'nse', 'stima', 'unga', 'saf', 'cba', 'kq', 'mpesa'}
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, and collapse whitespace"""
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode()
+    text = text.lower().replace('&', ' and ').replace('-', '')
+    return ' '.join(re.findall(r'[a-z0-9^]+', text))
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a normalized string, padded so short words still index"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []  # [(score, entry id, match kind)] best first, at most TRIE_TOP_K
+
+
+class StockSearchIndex:
+    """
+    In-memory autocomplete over NSE symbols, company names and aliases.
+
+    A prefix trie answers keystroke queries: every node keeps its best-ranked
+    entries, so a lookup is one walk down the query's characters. A trigram
+    index catches misspellings ("safricom") when no prefix matches. Both are
+    built once from the sector CSVs; queries never touch disk or the network.
+    """
+
+    def __init__(self, stocks: List[Dict[str, str]], aliases: Optional[Dict[str, List[str]]] = None):
+        """
+        Build the index.
+
+        Args:
+            stocks: Records with 'symbol', 'name' and 'sector'
+            aliases: Extra names per symbol (defaults to STOCK_ALIASES)
+        """
+        self.entries = []
+        self._symbols = {}
+        self._root = _TrieNode()
+        self._trigrams: Dict[str, Set[int]] = {}  # trigram -> entry ids
+        self._entry_trigrams: Dict[int, List[Set[str]]] = {}  # entry id -> trigrams of each term
+        self._phrases: Dict[str, Tuple[int, Set[str]]] = {}  # normalized term -> (entry id, match kinds)
+
+        for stock in stocks:
+            self._symbols[stock['symbol']] = len(self.entries)
+            self.entries.append(stock)
+
+        aliases = STOCK_ALIASES if aliases is None else aliases
+        for entry_id, stock in enumerate(self.entries):
+            self._index_entry(entry_id, stock, aliases.get(stock['symbol'], []))
+
+    @classmethod
+    def from_sector_files(cls, data_dir: str = NSE_DATA_DIR) -> 'StockSearchIndex':
+        """
+        Build the index from the NSE sector CSVs (newer files override older ones)
+
+        Falls back to the CSVs shipped in the repository when data_dir has no
+        sector files, and to the STOCK_ALIASES symbols when neither does, so
+        that well-known stocks always resolve.
+
+        Args:
+            data_dir (str): Directory holding the NSE_data_stock_market_sectors*.csv files
+
+        Returns:
+            StockSearchIndex: The index
+        """
+        stocks = {}
+        sector_files = cls._sector_files(data_dir)
+        if not sector_files and data_dir != SHIPPED_SECTOR_DIR:
+            data_dir = SHIPPED_SECTOR_DIR
+            sector_files = cls._sector_files(data_dir)
+
+        for file_name in sector_files:
+            try:
+                df = pd.read_csv(os.path.join(data_dir, file_name), dtype=str, encoding='utf-8-sig').fillna('')
+            except Exception as e:
+                logger.error(f"Error reading {file_name}: {e}")
+                continue
+            df.columns = [col.strip().lower().replace(' ', '_') for col in df.columns]
+            code_col = next((col for col in df.columns if 'code' in col), None)
+            name_col = next((col for col in df.columns if 'name' in col), None)
+            sector_col = next((col for col in df.columns if 'sector' in col), None)
+            if not code_col or not name_col:
+                continue
+            for row in df.itertuples(index=False):
+                row = row._asdict()
+                symbol = row[code_col].strip()
+                if not symbol:
+                    # Section heading rows carry only a sector name
+                    continue
+                stocks[symbol] = {
+                    'symbol': symbol,
+                    'name': row[name_col].strip() or symbol,
+                    'sector': row[sector_col].strip() if sector_col and row[sector_col].strip() else 'Unknown',
+                }
+
+        if not stocks:
+            logger.warning("No NSE sector files found; indexing the known aliases only")
+            stocks = {
+                symbol: {'symbol': symbol, 'name': aliases[0].title(), 'sector': 'Unknown'}
+                for symbol, aliases in STOCK_ALIASES.items()
+            }
+
+        logger.info(f"Built stock search index with {len(stocks)} symbols from {len(sector_files)} sector files")
+        return cls(list(stocks.values()))
+
+    @staticmethod
+    def _sector_files(data_dir: str) -> List[str]:
+        if not os.path.isdir(data_dir):
+            return []
+        return sorted(f for f in os.listdir(data_dir) if f.startswith(SECTOR_FILE_PREFIX))
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def _index_entry(self, entry_id: int, stock: Dict[str, str], aliases: List[str]) -> None:
+        symbol = normalize(stock['symbol'])
+        name = normalize(stock['name'])
+        core_name = ' '.join(word for word in name.split() if word not in NAME_NOISE_WORDS) or name
+
+        terms = [(symbol, 'symbol'), (name, 'name'), (core_name, 'name')]
+        terms += [(normalize(alias), 'alias') for alias in aliases]
+        # Later words of a name ("... Breweries") are reachable by prefix too
+        terms += [(' '.join(name.split()[i:]), 'word') for i in range(1, len(name.split()))]
+
+        for term, kind in terms:
+            if not term:
+                continue
+            if kind != 'word':
+                self._phrases.setdefault(term, (entry_id, set()))[1].add(kind)
+                self._add_trigrams(entry_id, term)
+            self._insert(term, entry_id, kind)
+
+    def _insert(self, term: str, entry_id: int, kind: str) -> None:
+        """Walk the term into the trie, offering the entry to every prefix node"""
+        node = self._root
+        for depth, char in enumerate(term, start=1):
+            node = node.children.setdefault(char, _TrieNode())
+            exact = depth == len(term)
+            match = kind if exact and kind != 'word' else f"{kind}_prefix"
+            # Shorter completed terms rank higher among equal match kinds
+            score = MATCH_SCORES[match] + 10.0 * depth / len(term)
+            self._offer(node, score, entry_id, match)
+
+    @staticmethod
+    def _offer(node: _TrieNode, score: float, entry_id: int, match: str) -> None:
+        for i, (existing_score, existing_id, _) in enumerate(node.top):
+            if existing_id == entry_id:
+                if existing_score >= score:
+                    return
+                del node.top[i]
+                break
+        node.top.append((score, entry_id, match))
+        node.top.sort(key=lambda item: -item[0])
+        del node.top[TRIE_TOP_K:]
+
+    def _add_trigrams(self, entry_id: int, term: str) -> None:
+        grams = trigrams(term)
+        self._entry_trigrams.setdefault(entry_id, []).append(grams)
+        for gram in grams:
+            self._trigrams.setdefault(gram, set()).add(entry_id)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def get(self, symbol: str) -> Optional[Dict[str, str]]:
+        """Look up a stock by its exact symbol"""
+        entry_id = self._symbols.get(symbol.upper())
+        return self.entries[entry_id] if entry_id is not None else None
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Ranked autocomplete matches for a partial symbol, name or alias
+
+        Args:
+            query (str): What the user has typed so far
+            limit (int): Maximum number of matches
+
+        Returns:
+            List[Dict]: Matches (symbol, name, sector, score, match) best first
+        """
+        term = normalize(query)
+        if not term:
+            return []
+
+        node = self._root
+        for char in term:
+            node = node.children.get(char)
+            if node is None:
+                break
+
+        if node is not None and node.top:
+            ranked = node.top[:limit]
+        else:
+            ranked = self._fuzzy(term, limit)
+
+        return [
+            {**self.entries[entry_id], 'score': round(score, 2), 'match': match}
+            for score, entry_id, match in ranked
+        ]
+
+    def _fuzzy(self, term: str, limit: int) -> List[Tuple[float, int, str]]:
+        """Trigram (Dice) similarity against every term sharing a trigram with the query"""
+        query_grams = trigrams(term)
+        candidates = set()
+        for gram in query_grams:
+            candidates |= self._trigrams.get(gram, set())
+
+        best = {}
+        for entry_id in candidates:
+            similarity = max(
+                2 * len(query_grams & grams) / (len(query_grams) + len(grams))
+                for grams in self._entry_trigrams[entry_id]
+            )
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                best[entry_id] = similarity
+
+        ranked = sorted(best.items(), key=lambda item: -item[1])[:limit]
+        return [(40 * similarity, entry_id, 'fuzzy') for entry_id, similarity in ranked]
+
+    def resolve(self, text: str, exclude: Collection[str] = ()) -> Optional[str]:
+        """
+        Find the stock a free-text message refers to
+
+        Looks for the longest alias, company name or symbol phrase in the text.
+        Bare symbols only count when written in capitals ("SCOM", not "bat"),
+        and aliases that are everyday words ("total", "kq") are ignored unless
+        written as a capitalised symbol ("KQ").
+
+        Args:
+            text (str): User message
+            exclude (Collection[str]): Symbols never to return (e.g. "NSE" where
+                the exchange itself is meant rather than its listed shares)
+
+        Returns:
+            Optional[str]: The NSE symbol, or None if no stock is mentioned
+        """
+        raw_words = re.findall(r"[A-Za-z0-9&^'-]+", text)
+        words = [normalize(word) for word in raw_words]
+
+        for size in range(min(MAX_ENTITY_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                phrase = ' '.join(word for word in words[start:start + size] if word)
+                if phrase not in self._phrases:
+                    continue
+                entry_id, kinds = self._phrases[phrase]
+                if self.entries[entry_id]['symbol'] in exclude:
+                    continue
+                as_symbol = 'symbol' in kinds and size == 1 and raw_words[start].isupper()
+                if as_symbol:
+                    return self.entries[entry_id]['symbol']
+                if kinds == {'symbol'} or phrase in AMBIGUOUS_ALIASES:
+                    continue
+                return self.entries[entry_id]['symbol']
+        return None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+_index_instance = None
+_index_instance_lock = threading.Lock()
+
+
+def get_stock_index() -> StockSearchIndex:
+    """
+    Get the process-wide stock search index, building it on first use
+
+    Returns:
+        StockSearchIndex: The shared index
+    """
+    global _index_instance
+    if _index_instance is None:
+        with _index_instance_lock:
+            if _index_instance is None:
+                _index_instance = StockSearchIndex.from_sector_files(NSE_DATA_DIR)
+    return _index_instance
@@ -0,0 +1,296 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from .cache import LOCK_POLL_INTERVAL, LOCK_TTL_MS, get_cache
+except ImportError:
+    # For standalone execution
+    from cache import LOCK_POLL_INTERVAL, LOCK_TTL_MS, get_cache
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('token_manager')
+
+# Cache namespace carrying tokens between workers
+TOKEN_NAMESPACE = "oauth_tokens"
+
+TOKEN_REFRESH_MARGIN = int(os.environ.get('TOKEN_REFRESH_MARGIN', 300))  # Renew this many seconds before expiry
+TOKEN_EXPIRY_SAFETY = 30  # Never hand out a token this close to its expiry
+TOKEN_RETRY_SECONDS = 30  # Wait after a failed background renewal (doubles while it keeps failing)
+DEFAULT_TOKEN_LIFETIME = 3600  # For token responses without expires_in
+REFRESHER_MAX_SLEEP = 3600
+
+# Calls a token endpoint and returns the token response ('access_token' plus
+# 'expires_in' or 'expires_at'); returns None or raises when the endpoint fails
+TokenFetcher = Callable[[], Optional[Dict[str, Any]]]
+
+
+class TokenUnavailable(Exception):
+    """Raised when no valid token can be obtained"""
+    pass
+
+
+def credential_key(*parts: Any) -> str:
+    """
+    Short stable identifier for a set of credentials, for use in token names.
+
+    Clients built from the same credentials end up sharing one token, and the
+    credentials themselves never appear in Redis keys.
+
+    Returns:
+        str: Hex digest of the parts
+    """
+    return hashlib.sha1(":".join(str(part) for part in parts).encode('utf-8')).hexdigest()[:12]
+
+
+class SharedTokenManager:
+    """
+    OAuth access tokens shared by every client in a process and across workers.
+
+    Each upstream registers a fetcher under a token name. Tokens are held in
+    memory and published to the other workers through the Redis-backed cache.
+    A background thread renews each token before it expires, so requests only
+    wait on a token endpoint when no valid token exists at all (in practice,
+    at startup). Concurrent refreshes are coalesced: within a process one
+    thread fetches while the others wait for its token, and across workers the
+    cache's load lock lets one worker fetch while the rest pick its token up
+    from Redis.
+    """
+
+    def __init__(self, cache=None):
+        """
+        Initialize the token manager.
+
+        Args:
+            cache: TieredCache used to share tokens; the process-wide cache if omitted
+        """
+        self.cache = cache or get_cache()
+        # Tokens live in _tokens; the in-process cache tier would only hide newer tokens in Redis
+        self.cache.configure_namespace(TOKEN_NAMESPACE, ttl=DEFAULT_TOKEN_LIFETIME, l1_ttl=0, use_l2=True)
+
+        self._fetchers: Dict[str, TokenFetcher] = {}
+        self._margins: Dict[str, int] = {}
+        self._tokens: Dict[str, Dict[str, Any]] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._failed_renewals: Dict[str, int] = {}
+        self._name_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        self.stats = {"fetches": 0, "shared": 0, "renewals": 0, "request_waits": 0, "failures": 0}
+
+    def register(self, name: str, fetcher: TokenFetcher, refresh_margin: int = TOKEN_REFRESH_MARGIN) -> None:
+        """
+        Register (or replace) the fetcher for a token and renew it in the background.
+
+        The refresher thread fetches the first token straight away, so it is
+        usually ready before a request needs it.
+
+        Args:
+            name: Token name; use credential_key() so clients with the same credentials share it
+            fetcher: Function calling the token endpoint
+            refresh_margin: Seconds before expiry the token is renewed (at most half its lifetime)
+        """
+        with self._lock:
+            self._fetchers[name] = fetcher
+            self._margins[name] = refresh_margin
+            self._name_locks.setdefault(name, threading.Lock())
+            if self._refresher is None or not self._refresher.is_alive():
+                self._refresher = threading.Thread(target=self._run_refresher, name="token-refresher", daemon=True)
+                self._refresher.start()
+        self._wakeup.set()
+
+    def get_token(self, name: str) -> str:
+        """
+        Get a valid access token.
+
+        Args:
+            name: Registered token name
+
+        Returns:
+            str: Access token
+
+        Raises:
+            TokenUnavailable: If no fetcher is registered or the endpoint returned no token
+            Exception: Whatever the fetcher raised
+        """
+        return self.get_token_info(name)["access_token"]
+
+    def get_token_info(self, name: str) -> Dict[str, Any]:
+        """
+        Get the full token response (e.g. for OAuth clients that need the refresh token).
+
+        Args:
+            name: Registered token name
+
+        Returns:
+            Dict: Token response with 'expires_at' and 'refresh_at' unix times added
+        """
+        entry = self._tokens.get(name)
+        if entry is not None and self._is_valid(entry):
+            return entry
+        self.stats["request_waits"] += 1
+        return self._refresh(name, self._is_valid)
+
+    async def aget_token(self, name: str) -> str:
+        """Async variant of get_token(); only a missing token is fetched off the event loop"""
+        entry = self._tokens.get(name)
+        if entry is not None and self._is_valid(entry):
+            return entry["access_token"]
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_token, name)
+
+    def invalidate(self, name: str, rejected_token: str) -> None:
+        """
+        Drop a token the upstream rejected so the next get_token() fetches a new one.
+
+        Args:
+            name: Registered token name
+            rejected_token: The access token the upstream refused
+        """
+        with self._lock:
+            entry = self._tokens.get(name)
+            if entry is not None and entry["access_token"] == rejected_token:
+                del self._tokens[name]
+
+        shared = self.cache.get(TOKEN_NAMESPACE, name)
+        if shared is not None and shared["access_token"] == rejected_token:
+            self.cache.delete(TOKEN_NAMESPACE, name)
+
+    @staticmethod
+    def _is_valid(entry: Dict[str, Any]) -> bool:
+        return time.time() < entry["expires_at"] - TOKEN_EXPIRY_SAFETY
+
+    @staticmethod
+    def _is_fresh(entry: Dict[str, Any]) -> bool:
+        return time.time() < entry["refresh_at"]
+
+    def _refresh(self, name: str, acceptable: Callable[[Dict[str, Any]], bool]) -> Dict[str, Any]:
+        """Replace a token unless another thread or worker already has an acceptable one"""
+        fetcher = self._fetchers.get(name)
+        if fetcher is None:
+            raise TokenUnavailable(f"No token fetcher registered for {name}")
+
+        with self._name_locks[name]:
+            # Another thread may have refreshed while this one waited
+            entry = self._tokens.get(name)
+            if entry is not None and acceptable(entry):
+                return entry
+
+            # Or another worker
+            entry = self._adopt_shared(name, acceptable)
+            if entry is not None:
+                return entry
+
+            with self.cache.load_lock(TOKEN_NAMESPACE, name) as should_fetch:
+                if not should_fetch:
+                    deadline = time.monotonic() + LOCK_TTL_MS / 1000
+                    while time.monotonic() < deadline:
+                        time.sleep(LOCK_POLL_INTERVAL)
+                        entry = self._adopt_shared(name, acceptable)
+                        if entry is not None:
+                            return entry
+                    # The other worker failed; fetch locally
+                    logger.debug(f"Timed out waiting for another worker's {name} token")
+                return self._fetch(name, fetcher)
+
+    def _adopt_shared(self, name: str, acceptable: Callable[[Dict[str, Any]], bool]) -> Optional[Dict[str, Any]]:
+        shared = self.cache.get(TOKEN_NAMESPACE, name)
+        if shared is None or not acceptable(shared):
+            return None
+        self._tokens[name] = shared
+        self.stats["shared"] += 1
+        return shared
+
+    def _fetch(self, name: str, fetcher: TokenFetcher) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            response = fetcher()
+            if not response or not response.get("access_token"):
+                raise TokenUnavailable(f"Token endpoint for {name} returned no access token")
+
+            now = time.time()
+            expires_in = response.get("expires_in") or DEFAULT_TOKEN_LIFETIME
+            expires_at = float(response.get("expires_at") or now + int(expires_in))
+            lifetime = expires_at - now
+            if lifetime <= TOKEN_EXPIRY_SAFETY:
+                raise TokenUnavailable(f"Token endpoint for {name} returned a token expiring in {lifetime:.0f}s")
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+
+        entry = dict(response, expires_at=expires_at,
+                     refresh_at=expires_at - min(self._margins[name], lifetime / 2))
+        self._tokens[name] = entry
+        self.cache.set(TOKEN_NAMESPACE, name, entry, ttl=int(lifetime))
+        self.stats["fetches"] += 1
+        logger.info(f"Fetched {name} token in {(time.perf_counter() - start) * 1000:.0f} ms, valid for {lifetime:.0f}s")
+        self._wakeup.set()
+        return entry
+
+    def _due_at(self, name: str) -> float:
+        entry = self._tokens.get(name)
+        due_at = entry["refresh_at"] if entry is not None else 0
+        return max(due_at, self._retry_at.get(name, 0))
+
+    def _run_refresher(self) -> None:
+        """Renew every registered token once it reaches its refresh point"""
+        while True:
+            self._wakeup.clear()
+            next_due = time.time() + REFRESHER_MAX_SLEEP
+            for name in list(self._fetchers):
+                if self._due_at(name) <= time.time():
+                    try:
+                        self._refresh(name, self._is_fresh)
+                        self.stats["renewals"] += 1
+                        self._retry_at.pop(name, None)
+                        self._failed_renewals.pop(name, None)
+                    except Exception as e:
+                        failures = self._failed_renewals.get(name, 0) + 1
+                        self._failed_renewals[name] = failures
+                        delay = min(TOKEN_RETRY_SECONDS * 2 ** (failures - 1), REFRESHER_MAX_SLEEP)
+                        self._retry_at[name] = time.time() + delay
+                        logger.warning(f"Renewing {name} token failed, retrying in {delay}s: {e}")
+                next_due = min(next_due, self._due_at(name))
+            self._wakeup.wait(max(0.0, next_due - time.time()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters plus the remaining lifetime of each token (never the tokens themselves)"""
+        now = time.time()
+        return {
+            **self.stats,
+            "tokens": {
+                name: {
+                    "expires_in": round(entry["expires_at"] - now),
+                    "renews_in": round(entry["refresh_at"] - now)
+                }
+                for name, entry in list(self._tokens.items())
+            }
+        }
+
+
+# Singleton instance
+_token_manager_instance = None
+_token_manager_lock = threading.Lock()
+
+
+def get_token_manager() -> SharedTokenManager:
+    """
+    Get the process-wide token manager.
+
+    Returns:
+        SharedTokenManager: Token manager instance
+    """
+    global _token_manager_instance
+    if _token_manager_instance is None:
+        with _token_manager_lock:
+            if _token_manager_instance is None:
+                _token_manager_instance = SharedTokenManager()
+    return _token_manager_instance
@@ -1,8 +1,17 @@
+import atexit
+import copy
 import logging
+import threading
 import uuid
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 
+try:
+    from .context_store import get_context_store
+except ImportError:
+    # For standalone execution
+    from context_store import get_context_store
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -16,17 +25,31 @@ class ContextManager:
     context-aware processing for financial advisory interactions.
     """
     
-    def __init__(self, max_context_length: int = 10, context_expiry_minutes: int = 30):
+    def __init__(self, max_context_length: int = 10, context_expiry_minutes: int = 30,
+                 flush_interval_seconds: float = 5.0, flush_batch_size: int = 50):
         """
         Initialize the context manager.
         
         Args:
             max_context_length: Maximum number of conversation turns to retain in context
             context_expiry_minutes: Time in minutes after which context expires if inactive
+            flush_interval_seconds: Interval between write-behind flushes of dirty sessions
+            flush_batch_size: Number of dirty sessions that triggers an early flush
         """
         self.contexts = {}  # Dictionary to store all active conversation contexts
         self.max_context_length = max_context_length
         self.context_expiry_minutes = context_expiry_minutes
+        
+        # Write-behind persistence state
+        self.flush_interval_seconds = flush_interval_seconds
+        self.flush_batch_size = flush_batch_size
+        self._dirty_sessions = set()
+        self._dirty_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._db_connector = None
+        self._flush_thread = None
+        self._flush_event = threading.Event()
+        self._stop_event = threading.Event()
         logger.info("Context Manager initialized with max_length=%d, expiry=%d minutes", 
                    max_context_length, context_expiry_minutes)
     
@@ -60,6 +83,7 @@ class ContextManager:
             'sentiment_history': []
         }
         
+        self._mark_dirty(session_id)
         logger.info(f"Created new session {session_id} for user {user_id}")
         return session_id
     
@@ -131,7 +155,8 @@ class ContextManager:
         # Trim context if it exceeds maximum length
         if len(self.contexts[session_id]['messages']) > self.max_context_length:
             self.contexts[session_id]['messages'] = self.contexts[session_id]['messages'][-self.max_context_length:]
-            
+        
+        self._mark_dirty(session_id)
         logger.debug(f"Added message to session {session_id}: {message[:50]}...")
         return True
     
@@ -213,6 +238,7 @@ class ContextManager:
         for key, value in profile_data.items():
             self.contexts[session_id]['user_profile'][key] = value
         
+        self._mark_dirty(session_id)
         logger.info(f"Updated user profile for session {session_id}")
         return True
     
@@ -379,6 +405,7 @@ class ContextManager:
             'sentiment_history': []
         }
         
+        self._mark_dirty(session_id)
         logger.info(f"Cleared context for session {session_id}")
         return True
     
@@ -397,6 +424,8 @@ class ContextManager:
             return False
         
         del self.contexts[session_id]
+        with self._dirty_lock:
+            self._dirty_sessions.discard(session_id)
         logger.info(f"Deleted session {session_id}")
         return True
     
@@ -417,9 +446,21 @@ class ContextManager:
             if current_time > expiry_time:
                 expired_session_ids.append(session_id)
         
+        # Persist pending changes before expired sessions are evicted
+        with self._dirty_lock:
+            has_dirty_expired = any(sid in self._dirty_sessions for sid in expired_session_ids)
+        if has_dirty_expired and self._db_connector is not None:
+            self.flush_dirty_contexts()
+            
+            # Sessions whose save failed stay in memory until a later flush succeeds
+            with self._dirty_lock:
+                expired_session_ids = [sid for sid in expired_session_ids if sid not in self._dirty_sessions]
+        
         # Delete expired sessions
         for session_id in expired_session_ids:
             del self.contexts[session_id]
+            with self._dirty_lock:
+                self._dirty_sessions.discard(session_id)
             
         if expired_session_ids:
             logger.info(f"Cleaned up {len(expired_session_ids)} expired contexts")
@@ -441,6 +482,9 @@ class ContextManager:
             logger.warning(f"Attempted to save non-existent session {session_id}")
             return False
         
+        with self._dirty_lock:
+            self._dirty_sessions.discard(session_id)
+        
         try:
             # Convert datetime objects to strings for database storage
             context_copy = self._prepare_context_for_storage(session_id)
@@ -449,6 +493,7 @@ class ContextManager:
             return True
         except Exception as e:
             logger.error(f"Failed to save context to database: {str(e)}")
+            self._mark_dirty(session_id)
             return False
     
     def load_from_database(self, session_id: str, db_connector) -> bool:
@@ -479,6 +524,184 @@ class ContextManager:
             logger.error(f"Failed to load context from database: {str(e)}")
             return False
     
+    def load_many_from_database(self, session_ids: List[str], db_connector) -> int:
+        """
+        Hydrate several conversation contexts with a single database query.
+        
+        Uses the connector's `load_conversation_contexts(session_ids)` bulk method
+        when available, falling back to one `load_conversation_context` call per
+        session for connectors that only support single-session loads.
+        
+        Args:
+            session_ids: Session identifiers to load
+            db_connector: Database connector object with load method(s)
+            
+        Returns:
+            Number of sessions loaded
+        """
+        # Sessions already in memory may hold unflushed changes; never overwrite them
+        pending = [sid for sid in dict.fromkeys(session_ids) if sid not in self.contexts]
+        if not pending:
+            return 0
+        
+        try:
+            if hasattr(db_connector, 'load_conversation_contexts'):
+                loaded = db_connector.load_conversation_contexts(pending) or {}
+            else:
+                loaded = {sid: db_connector.load_conversation_context(sid) for sid in pending}
+        except Exception as e:
+            logger.error(f"Failed to load contexts from database: {str(e)}")
+            return 0
+        
+        count = 0
+        for session_id, context_data in loaded.items():
+            if not context_data:
+                continue
+            try:
+                self.contexts[session_id] = self._prepare_loaded_context(context_data)
+                count += 1
+            except Exception as e:
+                logger.error(f"Failed to restore context for session {session_id}: {str(e)}")
+        
+        logger.info(f"Loaded {count} of {len(pending)} contexts from database")
+        return count
+    
+    def start_write_behind(self, db_connector) -> None:
+        """
+        Start persisting changed sessions in the background.
+        
+        Dirty sessions are flushed every `flush_interval_seconds`, or sooner once
+        `flush_batch_size` sessions are waiting, so conversation turns no longer
+        cost a database round-trip each.
+        
+        Args:
+            db_connector: Database connector object with save method(s)
+        """
+        self._db_connector = db_connector
+        if self._flush_thread is not None and self._flush_thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._flush_thread = threading.Thread(
+            target=self._write_behind_loop,
+            name="context-write-behind",
+            daemon=True
+        )
+        self._flush_thread.start()
+        logger.info("Started context write-behind (interval=%.1fs, batch=%d)",
+                    self.flush_interval_seconds, self.flush_batch_size)
+    
+    def stop_write_behind(self, flush: bool = True) -> None:
+        """
+        Stop the background flusher, optionally persisting outstanding changes.
+        
+        Args:
+            flush: Whether to flush remaining dirty sessions before returning
+        """
+        self._stop_event.set()
+        self._flush_event.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join(timeout=self.flush_interval_seconds + 5)
+            self._flush_thread = None
+        
+        if flush and self._db_connector is not None:
+            self.flush_dirty_contexts()
+        logger.info("Stopped context write-behind")
+    
+    def flush_dirty_contexts(self, db_connector=None) -> int:
+        """
+        Persist all changed sessions in batched writes.
+        
+        Uses the connector's `save_conversation_contexts(contexts)` bulk upsert when
+        available, where `contexts` maps session IDs to serialized contexts. Batches
+        are capped at `flush_batch_size` rows. Sessions that fail to save are marked
+        dirty again so the next flush retries them.
+        
+        Args:
+            db_connector: Optional connector overriding the write-behind connector
+            
+        Returns:
+            Number of sessions persisted
+        """
+        connector = db_connector or self._db_connector
+        if connector is None:
+            logger.warning("No database connector configured for context flush")
+            return 0
+        
+        with self._flush_lock:
+            with self._dirty_lock:
+                session_ids = [sid for sid in self._dirty_sessions if sid in self.contexts]
+                self._dirty_sessions.clear()
+            
+            saved = 0
+            batch_size = max(1, self.flush_batch_size)
+            for start in range(0, len(session_ids), batch_size):
+                batch_ids = session_ids[start:start + batch_size]
+                batch = {}
+                for session_id in batch_ids:
+                    try:
+                        batch[session_id] = self._prepare_context_for_storage(session_id)
+                    except KeyError:
+                        # Session was deleted after it was collected
+                        continue
+                    except Exception as e:
+                        # e.g. the context changed size mid-copy; retry on the next flush
+                        logger.error(f"Failed to prepare context {session_id} for storage: {str(e)}")
+                        with self._dirty_lock:
+                            self._dirty_sessions.add(session_id)
+                
+                try:
+                    if hasattr(connector, 'save_conversation_contexts'):
+                        connector.save_conversation_contexts(batch)
+                    else:
+                        for session_id, context_copy in batch.items():
+                            connector.save_conversation_context(session_id, context_copy)
+                    saved += len(batch)
+                except Exception as e:
+                    logger.error(f"Failed to flush {len(batch)} contexts to database: {str(e)}")
+                    with self._dirty_lock:
+                        self._dirty_sessions.update(sid for sid in batch if sid in self.contexts)
+        
+        if saved:
+            logger.debug(f"Flushed {saved} contexts to database")
+        return saved
+    
+    def get_dirty_session_count(self) -> int:
+        """
+        Get the number of sessions with changes not yet persisted.
+        
+        Returns:
+            Number of dirty sessions
+        """
+        with self._dirty_lock:
+            return len(self._dirty_sessions)
+    
+    def _mark_dirty(self, session_id: str) -> None:
+        """
+        Record that a session changed and wake the flusher if the batch is full.
+        
+        Args:
+            session_id: Session identifier
+        """
+        with self._dirty_lock:
+            self._dirty_sessions.add(session_id)
+            batch_full = len(self._dirty_sessions) >= self.flush_batch_size
+        
+        if batch_full and self._flush_thread is not None:
+            self._flush_event.set()
+    
+    def _write_behind_loop(self) -> None:
+        """Background loop flushing dirty sessions on interval or size threshold."""
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self.flush_interval_seconds)
+            self._flush_event.clear()
+            if self._stop_event.is_set():
+                break
+            try:
+                self.flush_dirty_contexts()
+            except Exception as e:
+                logger.error(f"Context write-behind flush failed: {str(e)}")
+    
     def _prepare_context_for_storage(self, session_id: str) -> Dict:
         """
         Prepare context for database storage by converting datetime objects to strings.
@@ -489,7 +712,8 @@ class ContextManager:
         Returns:
             Context dictionary with serializable values
         """
-        context = dict(self.contexts[session_id])
+        # Deep copy so the in-memory context keeps its datetime objects
+        context = copy.deepcopy(self.contexts[session_id])
         
         # Convert datetime objects to ISO format strings
         context['created_at'] = context['created_at'].isoformat()
@@ -553,3 +777,32 @@ class ContextManager:
             return max(sentiment_counts, key=sentiment_counts.get)
         
         return None# Conversation context manager 
+
+
+# Shared context manager used by the chat services
+_context_manager = None
+_context_manager_lock = threading.Lock()
+
+
+def get_context_manager() -> ContextManager:
+    """
+    Get the shared context manager, persisting contexts in the background.
+    
+    On first use the write-behind flusher is started against the configured
+    context store (if any) and registered to flush and stop at interpreter exit,
+    so every chat service in the process shares one flusher and one batch.
+    
+    Returns:
+        ContextManager instance
+    """
+    global _context_manager
+    if _context_manager is None:
+        with _context_manager_lock:
+            if _context_manager is None:
+                manager = ContextManager()
+                store = get_context_store()
+                if store is not None:
+                    manager.start_write_behind(store)
+                    atexit.register(manager.stop_write_behind)
+                _context_manager = manager
+    return _context_manager
@@ -0,0 +1,191 @@
+import os
+import json
+import logging
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Table holding one serialized context per session (see
+# database/migrations/create_conversation_contexts_table.sql)
+CONTEXT_TABLE = "conversation_contexts"
+
+# SQL Server accepts at most 2100 parameters per statement; four per row keeps
+# each statement well below that
+MAX_ROWS_PER_STATEMENT = 500
+
+# Connection settings: an ODBC connection string for the SQL Server database the
+# migrations target, or a SQLite file for development
+CONTEXT_DB_ODBC = os.getenv("CONTEXT_DB_ODBC", "")
+CONTEXT_DB_PATH = os.getenv("CONTEXT_DB_PATH", "")
+
+SQLITE_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {CONTEXT_TABLE} (
+    session_id TEXT PRIMARY KEY,
+    user_id TEXT,
+    context TEXT NOT NULL,
+    last_updated TEXT
+)
+"""
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ConversationContextStore:
+    """
+    Database connector persisting conversation contexts for the ContextManager.
+
+    Each session is stored as one row holding the JSON-serialized context, so a
+    batch of dirty sessions is written with one multi-row upsert and a batch of
+    sessions is hydrated with a single `IN (...)` query. Works with any DB-API
+    driver using `?` placeholders (pyodbc for SQL Server, sqlite3).
+    """
+
+    def __init__(self, connect: Callable[[], Any], table: str = CONTEXT_TABLE):
+        """
+        Initialize the store.
+
+        Args:
+            connect: Callable returning a new DB-API connection
+            table: Name of the contexts table
+        """
+        self.connect = connect
+        self.table = table
+
+    def save_conversation_context(self, session_id: str, context: Dict) -> None:
+        """
+        Persist a single serialized context.
+
+        Args:
+            session_id: Session identifier
+            context: Context prepared for storage
+        """
+        self.save_conversation_contexts({session_id: context})
+
+    def save_conversation_contexts(self, contexts: Dict[str, Dict]) -> None:
+        """
+        Upsert several serialized contexts in one transaction.
+
+        Existing rows for the sessions are deleted and the batch re-inserted with a
+        multi-row INSERT, which behaves the same on SQL Server and SQLite. Any error
+        rolls the whole batch back and is re-raised so the caller can retry it.
+
+        Args:
+            contexts: Mapping of session ID to context prepared for storage
+        """
+        if not contexts:
+            return
+
+        rows = [
+            (session_id, context.get('user_id'), json.dumps(context, default=str), context.get('last_updated'))
+            for session_id, context in contexts.items()
+        ]
+
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            for chunk in _chunks(rows, MAX_ROWS_PER_STATEMENT):
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(
+                    f"DELETE FROM {self.table} WHERE session_id IN ({placeholders})",
+                    [row[0] for row in chunk]
+                )
+                values = ", ".join("(?, ?, ?, ?)" for _ in chunk)
+                cursor.execute(
+                    f"INSERT INTO {self.table} (session_id, user_id, context, last_updated) VALUES {values}",
+                    [value for row in chunk for value in row]
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        logger.debug(f"Upserted {len(rows)} conversation contexts")
+
+    def load_conversation_context(self, session_id: str) -> Optional[Dict]:
+        """
+        Load a single serialized context.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            Stored context, or None if the session is unknown
+        """
+        return self.load_conversation_contexts([session_id]).get(session_id)
+
+    def load_conversation_contexts(self, session_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Load several serialized contexts with a single `IN (...)` query.
+
+        Args:
+            session_ids: Session identifiers to load
+
+        Returns:
+            Mapping of session ID to stored context for the sessions found
+        """
+        session_ids = list(dict.fromkeys(session_ids))
+        if not session_ids:
+            return {}
+
+        contexts = {}
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            for chunk in _chunks(session_ids, MAX_ROWS_PER_STATEMENT):
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(
+                    f"SELECT session_id, context FROM {self.table} WHERE session_id IN ({placeholders})",
+                    chunk
+                )
+                for session_id, context in cursor.fetchall():
+                    contexts[session_id] = json.loads(context)
+        finally:
+            conn.close()
+
+        return contexts
+
+
+# Shared store, configured from the environment
+_context_store = None
+_context_store_lock = threading.Lock()
+
+
+def get_context_store() -> Optional[ConversationContextStore]:
+    """
+    Get the shared context store configured through the environment.
+
+    Uses `CONTEXT_DB_ODBC` (requires pyodbc) when set, otherwise the SQLite file
+    at `CONTEXT_DB_PATH`, whose table is created on first use.
+
+    Returns:
+        ConversationContextStore, or None if no database is configured
+    """
+    global _context_store
+    if _context_store is None:
+        with _context_store_lock:
+            if _context_store is None:
+                if CONTEXT_DB_ODBC:
+                    try:
+                        import pyodbc
+                    except ImportError:
+                        logger.warning("pyodbc is not installed; conversation contexts will not be persisted")
+                        return None
+                    _context_store = ConversationContextStore(lambda: pyodbc.connect(CONTEXT_DB_ODBC))
+                elif CONTEXT_DB_PATH:
+                    conn = sqlite3.connect(CONTEXT_DB_PATH)
+                    try:
+                        conn.execute(SQLITE_SCHEMA)
+                        conn.commit()
+                    finally:
+                        conn.close()
+                    _context_store = ConversationContextStore(lambda: sqlite3.connect(CONTEXT_DB_PATH))
+    return _context_store
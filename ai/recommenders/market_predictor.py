@@ -27,6 +27,7 @@ from ..services.market_data_api import MarketDataAPI
 from ..services.sentiment_analysis import SentimentAnalyzer
 from ..services.risk_evaluation import RiskEvaluator
 from ..api_integration.nse_api import NSEAPI
+from ..api_integration.nse_panel import get_current_market_panel
 from ..api_integration.crypto_api import CryptoAPI
 from ..api_integration.forex_api import ForexAPI
 from ..api_integration.news_api import NewsAPI
@@ -177,6 +178,29 @@ class MarketPredictor:
         
         logger.info("Models saved successfully")
     
+    def _get_stock_history(self, symbol: str, days: int) -> pd.DataFrame:
+        """
+        Get recent stock history, slicing the shared NSE market panel when it
+        holds the symbol and is up to date, and from the NSE API otherwise.
+        
+        Args:
+            symbol (str): Stock symbol (e.g., 'SCOM' for Safaricom)
+            days (int): Calendar days of history, counted back from today
+            
+        Returns:
+            pd.DataFrame: Daily close, volume, high and low indexed by date
+        """
+        panel = get_current_market_panel()
+        if panel is None or symbol not in panel:
+            return self.nse_api.get_historical_data(symbol, days=days)
+        
+        start_date = pd.Timestamp.today().normalize() - pd.Timedelta(days=days)
+        history = panel.history(symbol, start_date=start_date)
+        if history is None:
+            return pd.DataFrame()
+        
+        return history.set_index('date')[['close', 'volume', 'high', 'low']]
+    
     def preprocess_data(self, data: pd.DataFrame, asset_type: str) -> Tuple[np.ndarray, np.ndarray]:
         """
         Preprocess and normalize market data for model input.
@@ -249,7 +273,7 @@ class MarketPredictor:
         
         try:
             # Fetch historical stock data
-            historical_data = self.nse_api.get_historical_data(symbol, days=365)
+            historical_data = self._get_stock_history(symbol, days=365)
             
             if historical_data.empty:
                 return {"error": "No historical data available for training"}
@@ -460,7 +484,7 @@ class MarketPredictor:
                 self.train_stock_model(symbol)
             
             # Get latest market data
-            latest_data = self.nse_api.get_historical_data(symbol, days=60)
+            latest_data = self._get_stock_history(symbol, days=60)
             
             if latest_data.empty:
                 return {"error": "No market data available for prediction"}
@@ -469,6 +493,7 @@ class MarketPredictor:
             predictions = {
                 "symbol": symbol,
                 "current_price": latest_data['close'].iloc[-1],
+                "data_as_of": latest_data.index[-1].strftime('%Y-%m-%d') if isinstance(latest_data.index, pd.DatetimeIndex) else None,
                 "prediction_date": datetime.now().strftime('%Y-%m-%d'),
                 "forecasts": [],
                 "confidence_intervals": [],
@@ -636,7 +661,7 @@ class MarketPredictor:
         try:
             # Fetch historical data based on market type
             if market_type == 'stock':
-                historical_data = self.nse_api.get_historical_data(symbol, days=30)
+                historical_data = self._get_stock_history(symbol, days=30)
             elif market_type == 'crypto':
                 historical_data = self.crypto_api.get_historical_data(symbol, days=30)
             elif market_type == 'forex':
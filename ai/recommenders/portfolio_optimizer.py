@@ -16,6 +16,7 @@ from services.market_data_api import MarketDataAPI
 from services.risk_evaluation import RiskEvaluator
 from services.user_profiler import UserProfiler
 from api_integration.nse_api import NSEAPI
+from api_integration.nse_panel import get_current_market_panel
 from api_integration.cbk_api import CBKAPI
 from api_integration.crypto_api import CryptoAPI
 from api_integration.forex_api import ForexAPI
@@ -27,6 +28,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger("portfolio_optimizer")
 
+# Market panel sampling per data frequency (pandas period codes)
+PANEL_FREQUENCIES = {
+    "daily": None,
+    "weekly": "W",
+    "monthly": "M",
+}
+
 
 class PortfolioOptimizer:
     """
@@ -150,8 +158,13 @@ class PortfolioOptimizer:
         # Fetch data from various APIs based on asset prefix
         all_data = {}
         
+        # NSE stocks in the shared market panel (when up to date) come from one array slice
+        all_data.update(self._fetch_panel_prices(assets, period, frequency))
+        
         for asset in assets:
-            if asset.startswith("NSE:"):
+            if asset in all_data:
+                continue
+            elif asset.startswith("NSE:"):
                 # Fetch NSE stock data
                 symbol = asset.split(":")[1]
                 data = self.nse_api.get_historical_prices(symbol, period, frequency)
@@ -179,6 +192,41 @@ class PortfolioOptimizer:
         logger.info(f"Fetched market data for {len(assets)} assets over {period}")
         return returns_df
 
+    def _fetch_panel_prices(self, assets, period, frequency):
+        """
+        Slice closing prices for NSE assets held in the shared market panel.
+        
+        Nothing is sliced when the panel is out of date, so every asset is
+        fetched from the live APIs instead.
+        
+        Args:
+            assets (list): Asset identifiers
+            period (str): Lookback period ('1y', '3y', '5y'), counted back from today
+            frequency (str): Data frequency ('daily', 'weekly', 'monthly')
+            
+        Returns:
+            dict: Closing price series keyed by asset identifier
+        """
+        panel = get_current_market_panel()
+        if panel is None:
+            return {}
+        
+        symbols = {asset: asset.split(":")[1] for asset in assets
+                   if asset.startswith("NSE:") and asset.split(":")[1] in panel}
+        if not symbols:
+            return {}
+        
+        years = int(period[:-1]) if period.endswith("y") and period[:-1].isdigit() else 5
+        start_date = pd.Timestamp.today().normalize() - pd.DateOffset(years=years)
+        closes = panel.frame("close", list(symbols.values()), start_date=start_date).astype(float).ffill()
+        
+        period_code = PANEL_FREQUENCIES.get(frequency)
+        if period_code:
+            closes = closes.groupby(closes.index.to_period(period_code)).last()
+            closes.index = closes.index.to_timestamp()
+        
+        return {asset: closes[symbol] for asset, symbol in symbols.items()}
+
     def calculate_expected_returns(self, returns_df, method="mean_historical"):
         """
         Calculate expected returns for assets using various methods.
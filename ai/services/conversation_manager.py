@@ -9,7 +9,7 @@ from ..nlp.text_preprocessor import TextPreprocessor
 from ..nlp.intent_classifier import IntentClassifier
 from ..nlp.entity_extractor import EntityExtractor
 from ..nlp.language_detector import LanguageDetector
-from ..nlp.context_manager import ContextManager
+from ..nlp.context_manager import get_context_manager
 
 # Import financial services
 from .sentiment_analysis import SentimentAnalyzer
@@ -48,7 +48,7 @@ class ConversationManager:
         self.intent_classifier = IntentClassifier()
         self.entity_extractor = EntityExtractor()
         self.language_detector = LanguageDetector()
-        self.context_manager = ContextManager(user_id=self.user_id)
+        self.context_manager = get_context_manager()
         
         # Initialize financial advisory services
         self.sentiment_analyzer = SentimentAnalyzer()
@@ -0,0 +1,261 @@
+import os
+import time
+import logging
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from statsmodels.tsa.arima.model import ARIMA
+
+try:
+    from ..api_integration.cache import get_cache
+except ImportError:
+    # For standalone testing
+    from api_integration.cache import get_cache
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Constants
+FORECAST_REFIT_INTERVAL = int(os.getenv("FORECAST_REFIT_INTERVAL", 6 * 3600))  # Seconds before a fitted model is refit
+FORECAST_SWEEP_INTERVAL = int(os.getenv("FORECAST_SWEEP_INTERVAL", 300))  # Seconds between background refit sweeps
+FORECAST_MAX_MODELS = int(os.getenv("FORECAST_MAX_MODELS", 256))  # Fitted models kept per process
+FORECAST_FIT_WORKERS = int(os.getenv("FORECAST_FIT_WORKERS", 2))  # Background fitting threads
+FORECAST_PARAMS_TTL = 7 * 86400  # Shared fitted parameters, used to warm-start other workers
+
+Fallback = Callable[[np.ndarray, int], List[float]]
+
+
+class _FittedModel:
+    """A fitted ARIMA plus what is needed to serve, extend and refit it"""
+
+    __slots__ = ('results', 'params', 'fitted_at', 'fingerprint', 'data')
+
+    def __init__(self, results: Any, fitted_at: float, data: np.ndarray):
+        self.results = results
+        self.params = np.asarray(results.params)
+        self.fitted_at = fitted_at
+        self.fingerprint = _fingerprint(data)
+        self.data = data
+
+
+def _fingerprint(data: np.ndarray) -> int:
+    return hash(data.tobytes())
+
+
+class ForecastCache:
+    """
+    Cache of fitted ARIMA forecasters keyed by series and model order.
+
+    Forecasts are served from the cached fitted model. New observations are
+    run through the model's existing parameters (a Kalman filter pass, no
+    optimisation). Models older than FORECAST_REFIT_INTERVAL are refit on a
+    background thread, warm-started from their previous parameters. A miss
+    returns the caller's fast fallback while the first fit runs in the
+    background. Fitted parameters are shared through the tiered cache so
+    other workers can skip straight to filtering.
+    """
+
+    def __init__(self, refit_interval: int = FORECAST_REFIT_INTERVAL,
+                 max_models: int = FORECAST_MAX_MODELS, workers: int = FORECAST_FIT_WORKERS):
+        self.refit_interval = refit_interval
+        self.max_models = max_models
+        self._models: "OrderedDict[Tuple[str, Tuple[int, int, int]], _FittedModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fitting = set()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="arima-fit")
+        self._sweeper = None
+        self.stats = {"hits": 0, "filtered": 0, "misses": 0, "fits": 0, "fit_errors": 0}
+
+        self.shared = get_cache()
+        self.shared.configure_namespace("forecasts", ttl=FORECAST_PARAMS_TTL)
+
+    def forecast(self, series_key: Optional[str], data: np.ndarray, order: Tuple[int, int, int],
+                 steps: int, fallback: Fallback) -> List[float]:
+        """
+        Forecast a series from its cached fitted model.
+
+        Args:
+            series_key: Identifies the series (e.g. "stock:SCOM"); None fits inline without caching
+            data: Observations, oldest first
+            order: ARIMA (p, d, q) order
+            steps: Number of periods to forecast
+            fallback: Fast forecaster used on a cache miss or model failure
+
+        Returns:
+            List of forecast values
+        """
+        return self.forecast_with_source(series_key, data, order, steps, fallback)[0]
+
+    def forecast_with_source(self, series_key: Optional[str], data: np.ndarray, order: Tuple[int, int, int],
+                             steps: int, fallback: Fallback) -> Tuple[List[float], bool]:
+        """
+        Like forecast(), also reporting whether the ARIMA model produced the values.
+
+        Callers caching forecasts should only keep fallback forecasts briefly,
+        since the fitted model usually replaces them within seconds.
+
+        Returns:
+            Tuple of (forecast values, True if they came from the ARIMA model)
+        """
+        data = np.asarray(data, dtype=float)
+        order = tuple(order)
+
+        if series_key is None:
+            try:
+                return self._fit(order, data).forecast(steps=steps).tolist(), True
+            except Exception as e:
+                logger.error(f"Error fitting ARIMA{order}: {str(e)}")
+                return fallback(data, steps), False
+
+        model_key = (series_key, order)
+        self._ensure_sweeper()
+
+        try:
+            model = self._lookup(model_key, data)
+            if model is None:
+                self.stats["misses"] += 1
+                self._schedule_fit(model_key, data)
+                return fallback(data, steps), False
+
+            if time.time() - model.fitted_at >= self.refit_interval:
+                self._schedule_fit(model_key, data, model.params)
+            return model.results.forecast(steps=steps).tolist(), True
+
+        except Exception as e:
+            logger.error(f"Error forecasting {series_key} with ARIMA{order}: {str(e)}")
+            return fallback(data, steps), False
+
+    def _lookup(self, model_key: Tuple[str, Tuple[int, int, int]], data: np.ndarray) -> Optional[_FittedModel]:
+        """Cached model for the key, brought up to date with the latest observations"""
+        with self._lock:
+            model = self._models.get(model_key)
+            if model is not None:
+                self._models.move_to_end(model_key)
+
+        if model is not None and model.fingerprint == _fingerprint(data):
+            self.stats["hits"] += 1
+            return model
+
+        if model is not None:
+            params, fitted_at = model.params, model.fitted_at
+        else:
+            # Another worker may have fitted this series already
+            shared = self.shared.get("forecasts", self._shared_key(model_key))
+            if not shared:
+                return None
+            params, fitted_at = np.asarray(shared["params"]), shared["fitted_at"]
+
+        # Reuse the fitted parameters on the new observations instead of re-optimising
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            results = ARIMA(data, order=model_key[1]).filter(params)
+        self.stats["filtered"] += 1
+        model = _FittedModel(results, fitted_at, data)
+        self._store(model_key, model)
+        return model
+
+    def _fit(self, order: Tuple[int, int, int], data: np.ndarray,
+             start_params: Optional[np.ndarray] = None) -> Any:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return ARIMA(data, order=order).fit(start_params=start_params)
+
+    def _schedule_fit(self, model_key: Tuple[str, Tuple[int, int, int]], data: np.ndarray,
+                      start_params: Optional[np.ndarray] = None) -> None:
+        """Fit a model on a background thread, at most once per key at a time"""
+        with self._lock:
+            if model_key in self._fitting:
+                return
+            self._fitting.add(model_key)
+
+        def fit():
+            try:
+                start = time.perf_counter()
+                results = self._fit(model_key[1], data, start_params)
+                model = _FittedModel(results, time.time(), data)
+                self._store(model_key, model)
+                self.shared.set("forecasts", self._shared_key(model_key), {
+                    "params": model.params.tolist(),
+                    "fitted_at": model.fitted_at,
+                })
+                self.stats["fits"] += 1
+                logger.info(f"Fitted ARIMA{model_key[1]} for {model_key[0]} in "
+                            f"{time.perf_counter() - start:.2f}s ({'warm' if start_params is not None else 'cold'} start)")
+            except Exception as e:
+                self.stats["fit_errors"] += 1
+                logger.error(f"Error fitting ARIMA{model_key[1]} for {model_key[0]}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._fitting.discard(model_key)
+
+        self._executor.submit(fit)
+
+    def _store(self, model_key: Tuple[str, Tuple[int, int, int]], model: _FittedModel) -> None:
+        with self._lock:
+            current = self._models.get(model_key)
+            if current is not None and current.fitted_at > model.fitted_at:
+                # A refit finished while this model was being filtered; keep the newer parameters
+                return
+            self._models[model_key] = model
+            self._models.move_to_end(model_key)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+
+    @staticmethod
+    def _shared_key(model_key: Tuple[str, Tuple[int, int, int]]) -> str:
+        series_key, order = model_key
+        return f"{series_key}:arima{'-'.join(map(str, order))}"
+
+    def _ensure_sweeper(self) -> None:
+        """Start the background refit schedule on first use"""
+        if self._sweeper is not None:
+            return
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._sweep, name="arima-refit", daemon=True)
+            self._sweeper.start()
+
+    def _sweep(self) -> None:
+        """Refit every cached model whose parameters are older than the refit interval"""
+        while True:
+            time.sleep(FORECAST_SWEEP_INTERVAL)
+            now = time.time()
+            with self._lock:
+                stale = [(key, model) for key, model in self._models.items()
+                         if now - model.fitted_at >= self.refit_interval]
+            for model_key, model in stale:
+                self._schedule_fit(model_key, model.data, model.params)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Forecast cache counters plus the number of cached models"""
+        with self._lock:
+            return {**self.stats, "models": len(self._models), "fitting": len(self._fitting)}
+
+
+# Singleton instance
+_forecast_cache_instance = None
+_forecast_cache_lock = threading.Lock()
+
+
+def get_forecast_cache() -> ForecastCache:
+    """
+    Get the process-wide forecaster cache.
+
+    Returns:
+        ForecastCache: Cache instance
+    """
+    global _forecast_cache_instance
+    if _forecast_cache_instance is None:
+        with _forecast_cache_lock:
+            if _forecast_cache_instance is None:
+                _forecast_cache_instance = ForecastCache()
+    return _forecast_cache_instance
@@ -1,7 +1,9 @@
 import os
 import json
+import time
 import datetime
 import logging
+import threading
 import numpy as np
 import pandas as pd
 import requests
@@ -11,7 +13,6 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
-from statsmodels.tsa.arima.model import ARIMA
 from dotenv import load_dotenv
 
 # Local imports
@@ -19,13 +20,23 @@ try:
     from . import sentiment_analysis
     from . import risk_evaluation
     from . import market_data_api
+    from .forecasting import get_forecast_cache
+    from .report_graph import ReportGraph, ReportSection, SECTION_OK
     from ..api_integration import nse_api, cbk_api, forex_api, crypto_api
+    from ..api_integration.cache import get_cache
+    from ..api_integration.indicators import get_indicator_engine
+    from ..api_integration.stock_index import get_stock_index
 except ImportError:
     # For standalone testing
     import sentiment_analysis
     import risk_evaluation
     import market_data_api
+    from forecasting import get_forecast_cache
+    from report_graph import ReportGraph, ReportSection, SECTION_OK
     from api_integration import nse_api, cbk_api, forex_api, crypto_api
+    from api_integration.cache import get_cache
+    from api_integration.indicators import get_indicator_engine
+    from api_integration.stock_index import get_stock_index
 
 # Load environment variables
 load_dotenv()
@@ -47,6 +58,91 @@ CBK_API_KEY = os.getenv("CBK_API_KEY")
 CRYPTO_API_KEY = os.getenv("CRYPTO_API_KEY")
 FOREX_API_KEY = os.getenv("FOREX_API_KEY")
 CACHE_DURATION = 3600  # Cache duration in seconds (1 hour)
+FORECAST_FALLBACK_TTL = 60  # Cache lifetime of results whose forecast is the trend-line fallback
+
+# Result fields holding a forecast, and the forecast methods they report
+PREDICTION_FIELDS = ["price_prediction", "prediction", "rate_prediction"]
+FORECAST_MODEL = "ARIMA"
+FALLBACK_FORECAST_MODEL = "linear_trend"
+MARKET_REPORT_DEADLINE = float(os.getenv("MARKET_REPORT_DEADLINE", 20))  # Seconds before a report returns partial results
+MARKET_REPORT_WORKERS = 8  # Report sections computed concurrently
+
+# Precomputed personalized-insight payloads (one per risk bucket for the current market regime)
+INSIGHT_RISK_BUCKETS = ["conservative", "moderate", "aggressive"]
+INSIGHT_CURRENCIES = ["USD", "EUR", "GBP"]  # Pairs against KES analyzed ahead of requests
+INSIGHT_REFRESH_INTERVAL = int(os.getenv("INSIGHT_REFRESH_INTERVAL", 900))  # Seconds between snapshot refreshes
+INSIGHT_SNAPSHOT_TTL = 3 * INSIGHT_REFRESH_INTERVAL  # Serve a snapshot through a couple of failed refreshes
+
+# Stock analysis sections and the result fields each one produces. Sections are
+# computed only when requested and cached separately, so a price/trend question
+# never pays for news sentiment or ARIMA forecasting.
+STOCK_ANALYSIS_SECTIONS = {
+    "price": ["latest_price", "price_change", "price_change_pct"],
+    "trend": ["current_trend", "technical_indicators"],
+    "volatility": ["volatility", "risk_level"],
+    "fundamentals": ["company_name", "fundamentals"],
+    "sentiment": ["sentiment_score", "sentiment_analysis"],
+    "recommendation": ["recommendation"],
+    "prediction": ["price_prediction"],
+}
+
+# Result key order of a full stock analysis
+STOCK_ANALYSIS_FIELDS = [
+    "symbol", "company_name", "latest_price", "price_change", "price_change_pct",
+    "current_trend", "recommendation", "sentiment_score", "sentiment_analysis",
+    "volatility", "risk_level", "technical_indicators", "price_prediction",
+    "fundamentals", "analysis_timestamp"
+]
+
+
+class _InsufficientData(Exception):
+    """Raised when a stock has too little history to analyze"""
+
+
+def resolve_stock_fields(fields: Optional[Union[str, List[str]]]) -> Tuple[List[str], Optional[set]]:
+    """
+    Map requested section or field names to the sections that produce them.
+    
+    Args:
+        fields: Section and/or result field names (list or comma-separated string), or None
+    
+    Returns:
+        Tuple of (sections to compute, result fields to return or None for all fields of those sections)
+    """
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+    
+    if not fields:
+        return list(STOCK_ANALYSIS_SECTIONS), None
+    
+    field_sections = {
+        field: section for section, section_fields in STOCK_ANALYSIS_SECTIONS.items()
+        for field in section_fields
+    }
+    sections = []
+    selected_fields = {"symbol", "analysis_timestamp"}
+    unknown = []
+    for field in fields:
+        if field in STOCK_ANALYSIS_SECTIONS:
+            section = field
+            selected_fields.update(STOCK_ANALYSIS_SECTIONS[section])
+        elif field in field_sections:
+            section = field_sections[field]
+            selected_fields.add(field)
+        elif field in ("symbol", "analysis_timestamp"):
+            continue
+        else:
+            unknown.append(field)
+            continue
+        if section not in sections:
+            sections.append(section)
+    
+    if unknown:
+        raise ValueError(
+            f"Unknown analysis fields: {', '.join(unknown)}. "
+            f"Available sections: {', '.join(STOCK_ANALYSIS_SECTIONS)}"
+        )
+    return sections, selected_fields
 
 
 class MarketAnalysis:
@@ -64,41 +160,38 @@ class MarketAnalysis:
         self.risk_evaluator = risk_evaluation.RiskEvaluation()
         self.market_data = market_data_api.MarketDataAPI()
         
-        # Cache for storing market data and analysis results
-        self.data_cache = {}
-        
-        logger.info("Market Analysis module initialized")
-    
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """
-        Check if cached data is still valid based on cache duration.
+        # Shared, size-bounded cache for market data and analysis results
+        self.data_cache = get_cache()
+        self.data_cache.configure_namespace("market_analysis", ttl=CACHE_DURATION)
         
-        Args:
-            cache_key: Key to check in the cache
-            
-        Returns:
-            bool: True if cache is valid, False otherwise
-        """
-        if cache_key not in self.data_cache:
-            return False
+        # Fitted ARIMA models, refit in the background
+        self.forecasts = get_forecast_cache()
         
-        cache_time = self.data_cache[cache_key]['timestamp']
-        current_time = datetime.datetime.now().timestamp()
+        # Market-wide insight payloads, refreshed by a periodic job
+        self.data_cache.configure_namespace("market_insights", ttl=INSIGHT_SNAPSHOT_TTL,
+                                            l1_ttl=max(1, INSIGHT_REFRESH_INTERVAL // 3))
+        self._insight_refresher = None
         
-        return (current_time - cache_time) < CACHE_DURATION
+        logger.info("Market Analysis module initialized")
     
     def _update_cache(self, cache_key: str, data: Any) -> None:
         """
         Update the cache with new data.
         
+        Results carrying a fallback forecast are kept for FORECAST_FALLBACK_TTL
+        only, so the ARIMA forecast replaces them once the model is fitted.
+        
         Args:
             cache_key: Key to store in the cache
             data: Data to cache
         """
-        self.data_cache[cache_key] = {
-            'data': data,
-            'timestamp': datetime.datetime.now().timestamp()
-        }
+        ttl = None
+        if isinstance(data, dict) and any(
+            isinstance(data.get(field), dict) and data[field].get("model") == FALLBACK_FORECAST_MODEL
+            for field in PREDICTION_FIELDS
+        ):
+            ttl = FORECAST_FALLBACK_TTL
+        self.data_cache.set("market_analysis", cache_key, data, ttl=ttl)
     
     def _get_from_cache(self, cache_key: str) -> Any:
         """
@@ -110,172 +203,237 @@ class MarketAnalysis:
         Returns:
             Any: Cached data or None if not found
         """
-        if self._is_cache_valid(cache_key):
-            return self.data_cache[cache_key]['data']
-        return None
+        return self.data_cache.get("market_analysis", cache_key)
     
-    def analyze_stock(self, symbol: str, days: int = 90) -> Dict[str, Any]:
+    def analyze_stock(self, symbol: str, days: int = 90,
+                      fields: Optional[Union[str, List[str]]] = None) -> Dict[str, Any]:
         """
         Analyze a specific stock by symbol with trend analysis, key metrics, and recommendation.
         
         Args:
             symbol: Stock symbol to analyze (e.g., 'SCOM' for Safaricom)
             days: Number of days of historical data to analyze
+            fields: Sections (see STOCK_ANALYSIS_SECTIONS) or result fields to compute,
+                as a list or comma-separated string. Defaults to the full analysis.
             
         Returns:
             Dict with stock analysis including price trends, metrics, and recommendations
         """
-        cache_key = f"stock_analysis_{symbol}_{days}"
-        cached_data = self._get_from_cache(cache_key)
-        
-        if cached_data:
-            logger.info(f"Using cached stock analysis for {symbol}")
-            return cached_data
-        
         try:
-            # Get historical stock data
-            historical_data = self.nse_client.get_historical_data(symbol, days)
-            
-            if not historical_data or len(historical_data) < 10:
-                logger.warning(f"Insufficient historical data for {symbol}")
-                return {"error": f"Insufficient data for {symbol}"}
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(historical_data)
-            df['date'] = pd.to_datetime(df['date'])
-            df = df.sort_values('date')
-            
-            # Calculate key metrics
-            latest_price = df['close'].iloc[-1]
-            price_change = df['close'].iloc[-1] - df['close'].iloc[0]
-            price_change_pct = (price_change / df['close'].iloc[0]) * 100
-            
-            # Calculate moving averages
-            df['SMA_20'] = df['close'].rolling(window=20).mean()
-            df['SMA_50'] = df['close'].rolling(window=50).mean()
-            
-            # Calculate RSI (Relative Strength Index)
-            delta = df['close'].diff()
-            gain = delta.where(delta > 0, 0)
-            loss = -delta.where(delta < 0, 0)
-            avg_gain = gain.rolling(window=14).mean()
-            avg_loss = loss.rolling(window=14).mean()
-            rs = avg_gain / avg_loss
-            df['RSI'] = 100 - (100 / (1 + rs))
-            
-            # Calculate Bollinger Bands
-            df['20dSTD'] = df['close'].rolling(window=20).std()
-            df['upper_band'] = df['SMA_20'] + (df['20dSTD'] * 2)
-            df['lower_band'] = df['SMA_20'] - (df['20dSTD'] * 2)
-            
-            # Determine trend
-            if df['SMA_20'].iloc[-1] > df['SMA_50'].iloc[-1]:
-                trend = "Bullish"
-            elif df['SMA_20'].iloc[-1] < df['SMA_50'].iloc[-1]:
-                trend = "Bearish"
-            else:
-                trend = "Neutral"
+            sections, selected_fields = resolve_stock_fields(fields)
+        except ValueError as e:
+            return {"error": str(e)}
+        
+        history = {}
+        computed = {}
+        
+        def get_history() -> pd.DataFrame:
+            """Historical prices, fetched at most once and only if a section needs them"""
+            if "df" not in history:
+                historical_data = self.nse_client.get_historical_data(symbol, days)
+                if not historical_data or len(historical_data) < 10:
+                    raise _InsufficientData(f"Insufficient data for {symbol}")
                 
-            # Get company fundamentals
-            company_info = self.nse_client.get_company_info(symbol)
-            
-            # Get sentiment score for this stock (based on news articles)
-            sentiment_score = self.sentiment.analyze_stock_sentiment(symbol)
-            
-            # Generate investment recommendation
-            if price_change_pct > 15 and trend == "Bullish" and sentiment_score > 0.6:
-                recommendation = "Strong Buy"
-            elif price_change_pct > 5 and trend == "Bullish" and sentiment_score > 0:
-                recommendation = "Buy"
-            elif price_change_pct < -15 and trend == "Bearish" and sentiment_score < -0.6:
-                recommendation = "Strong Sell"
-            elif price_change_pct < -5 and trend == "Bearish" and sentiment_score < 0:
-                recommendation = "Sell"
-            else:
-                recommendation = "Hold"
-            
-            # Predict price trend for next 7 days
-            price_prediction = self._predict_stock_price(df['close'].values, 7)
-            
-            # Calculate volatility (standard deviation of returns)
-            returns = df['close'].pct_change().dropna()
-            volatility = returns.std() * (252 ** 0.5)  # Annualized volatility
+                df = pd.DataFrame(historical_data)
+                df['date'] = pd.to_datetime(df['date'])
+                history["df"] = df.sort_values('date')
+            return history["df"]
+        
+        def get_section(name: str) -> Dict[str, Any]:
+            """A section's fields, from its own cache entry or computed on demand"""
+            if name not in computed:
+                cache_key = f"stock_analysis_{symbol}_{days}_{name}"
+                section = self._get_from_cache(cache_key)
+                if section:
+                    logger.info(f"Using cached {name} analysis for {symbol}")
+                else:
+                    section = builders[name]()
+                    self._update_cache(cache_key, section)
+                computed[name] = section
+            return computed[name]
+        
+        builders = {
+            "price": lambda: self._stock_price_section(get_history()),
+            "trend": lambda: self._stock_trend_section(symbol, get_history()),
+            "volatility": lambda: self._stock_volatility_section(get_history()),
+            "fundamentals": lambda: self._stock_fundamentals_section(symbol),
+            "sentiment": lambda: self._stock_sentiment_section(symbol),
+            "recommendation": lambda: self._stock_recommendation_section(
+                get_section("price"), get_section("trend"), get_section("sentiment")
+            ),
+            "prediction": lambda: self._stock_prediction_section(symbol, get_history()),
+        }
+        
+        try:
+            values = {"symbol": symbol}
+            for name in sections:
+                values.update(get_section(name))
+            values["analysis_timestamp"] = datetime.datetime.now().isoformat()
             
-            # Compile results
             analysis_result = {
-                "symbol": symbol,
-                "company_name": company_info.get('name', symbol),
-                "latest_price": latest_price,
-                "price_change": price_change,
-                "price_change_pct": price_change_pct,
-                "current_trend": trend,
-                "recommendation": recommendation,
-                "sentiment_score": sentiment_score,
-                "sentiment_analysis": self._interpret_sentiment(sentiment_score),
-                "volatility": volatility,
-                "risk_level": self._calculate_risk_level(volatility),
-                "technical_indicators": {
-                    "RSI": df['RSI'].iloc[-1],
-                    "SMA_20": df['SMA_20'].iloc[-1],
-                    "SMA_50": df['SMA_50'].iloc[-1],
-                    "upper_band": df['upper_band'].iloc[-1],
-                    "lower_band": df['lower_band'].iloc[-1]
-                },
-                "price_prediction": {
-                    "next_7_days": price_prediction,
-                    "prediction_trend": "Up" if price_prediction[-1] > latest_price else "Down"
-                },
-                "fundamentals": company_info,
-                "analysis_timestamp": datetime.datetime.now().isoformat()
+                field: values[field] for field in STOCK_ANALYSIS_FIELDS
+                if field in values and (selected_fields is None or field in selected_fields)
             }
-            
-            # Cache the results
-            self._update_cache(cache_key, analysis_result)
-            logger.info(f"Completed stock analysis for {symbol}")
+            logger.info(f"Completed stock analysis for {symbol} ({', '.join(sections)})")
             
             return analysis_result
             
+        except _InsufficientData as e:
+            logger.warning(str(e))
+            return {"error": str(e)}
         except Exception as e:
             logger.error(f"Error analyzing stock {symbol}: {str(e)}")
             return {"error": f"Failed to analyze stock {symbol}: {str(e)}"}
     
-    def _predict_stock_price(self, historical_prices: np.ndarray, days_ahead: int = 7) -> List[float]:
+    def _stock_price_section(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Latest price and change over the analysis window."""
+        latest_price = df['close'].iloc[-1]
+        price_change = df['close'].iloc[-1] - df['close'].iloc[0]
+        price_change_pct = (price_change / df['close'].iloc[0]) * 100
+        
+        return {
+            "latest_price": latest_price,
+            "price_change": price_change,
+            "price_change_pct": price_change_pct
+        }
+    
+    def _stock_trend_section(self, symbol: str, df: pd.DataFrame) -> Dict[str, Any]:
+        """SMA crossover trend and technical indicators."""
+        # Read the rolling indicators, applying only bars the engine has not seen
+        indicators = get_indicator_engine().sync(symbol, df['close'].values, df['date'].values)
+        
+        # Determine trend
+        if indicators['SMA_20'] > indicators['SMA_50']:
+            trend = "Bullish"
+        elif indicators['SMA_20'] < indicators['SMA_50']:
+            trend = "Bearish"
+        else:
+            trend = "Neutral"
+        
+        return {
+            "current_trend": trend,
+            "technical_indicators": {
+                "RSI": indicators['RSI'],
+                "SMA_20": indicators['SMA_20'],
+                "SMA_50": indicators['SMA_50'],
+                "upper_band": indicators['upper_band'],
+                "lower_band": indicators['lower_band']
+            }
+        }
+    
+    def _stock_volatility_section(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Annualized volatility and the risk level it implies."""
+        # Calculate volatility (standard deviation of returns)
+        returns = df['close'].pct_change().dropna()
+        volatility = returns.std() * (252 ** 0.5)  # Annualized volatility
+        
+        return {
+            "volatility": volatility,
+            "risk_level": self._calculate_risk_level(volatility)
+        }
+    
+    def _stock_fundamentals_section(self, symbol: str) -> Dict[str, Any]:
+        """Company fundamentals from the NSE API."""
+        company_info = self.nse_client.get_company_info(symbol)
+        
+        return {
+            "company_name": company_info.get('name', symbol),
+            "fundamentals": company_info
+        }
+    
+    def _stock_sentiment_section(self, symbol: str) -> Dict[str, Any]:
+        """News sentiment for the stock."""
+        # Get sentiment score for this stock (based on news articles)
+        sentiment_score = self.sentiment.analyze_stock_sentiment(symbol)
+        
+        return {
+            "sentiment_score": sentiment_score,
+            "sentiment_analysis": self._interpret_sentiment(sentiment_score)
+        }
+    
+    def _stock_recommendation_section(self, price: Dict[str, Any], trend: Dict[str, Any],
+                                      sentiment: Dict[str, Any]) -> Dict[str, Any]:
+        """Investment recommendation from price change, trend and sentiment."""
+        price_change_pct = price["price_change_pct"]
+        current_trend = trend["current_trend"]
+        sentiment_score = sentiment["sentiment_score"]
+        
+        # Generate investment recommendation
+        if price_change_pct > 15 and current_trend == "Bullish" and sentiment_score > 0.6:
+            recommendation = "Strong Buy"
+        elif price_change_pct > 5 and current_trend == "Bullish" and sentiment_score > 0:
+            recommendation = "Buy"
+        elif price_change_pct < -15 and current_trend == "Bearish" and sentiment_score < -0.6:
+            recommendation = "Strong Sell"
+        elif price_change_pct < -5 and current_trend == "Bearish" and sentiment_score < 0:
+            recommendation = "Sell"
+        else:
+            recommendation = "Hold"
+        
+        return {"recommendation": recommendation}
+    
+    def _stock_prediction_section(self, symbol: str, df: pd.DataFrame) -> Dict[str, Any]:
+        """ARIMA price forecast for the next 7 days."""
+        # Predict price trend for next 7 days
+        price_prediction, model = self._predict_stock_price(df['close'].values, 7, series_key=f"stock:{symbol}")
+        
+        return {
+            "price_prediction": {
+                "next_7_days": price_prediction,
+                "prediction_trend": "Up" if price_prediction[-1] > df['close'].iloc[-1] else "Down",
+                "model": model
+            }
+        }
+    
+    def _predict_stock_price(self, historical_prices: np.ndarray, days_ahead: int = 7,
+                             series_key: Optional[str] = None) -> Tuple[List[float], str]:
         """
         Predict stock prices for a specified number of days ahead using ARIMA model.
         
         Args:
             historical_prices: Array of historical stock prices
             days_ahead: Number of days to predict ahead
+            series_key: Identifies the series in the forecaster cache (e.g. 'stock:SCOM')
+            
+        Returns:
+            Tuple of (predicted prices, forecast model: 'ARIMA' or 'linear_trend')
+        """
+        return self._forecast(series_key, historical_prices, (5, 1, 0), days_ahead)
+    
+    def _forecast(self, series_key: Optional[str], values: np.ndarray, order: Tuple[int, int, int],
+                  days_ahead: int) -> Tuple[List[float], str]:
+        """ARIMA forecast from the forecaster cache, with the method that produced it"""
+        forecast, from_model = self.forecasts.forecast_with_source(
+            series_key, values, order, days_ahead, fallback=self._linear_forecast
+        )
+        return forecast, FORECAST_MODEL if from_model else FALLBACK_FORECAST_MODEL
+    
+    @staticmethod
+    def _linear_forecast(historical_values: np.ndarray, periods_ahead: int) -> List[float]:
+        """
+        Fast trend-line forecast, used until a series has a fitted ARIMA model.
+        
+        Args:
+            historical_values: Array of historical values
+            periods_ahead: Number of periods to predict ahead
             
         Returns:
-            List of predicted prices
+            List of predicted values
         """
         try:
-            # Fit ARIMA model
-            model = ARIMA(historical_prices, order=(5, 1, 0))
-            model_fit = model.fit()
+            x = np.array(range(len(historical_values))).reshape(-1, 1)
+            y = historical_values
+            model = LinearRegression()
+            model.fit(x, y)
             
-            # Make prediction
-            forecast = model_fit.forecast(steps=days_ahead)
-            return forecast.tolist()
+            future_x = np.array(range(len(historical_values), len(historical_values) + periods_ahead)).reshape(-1, 1)
+            predictions = model.predict(future_x)
             
+            return predictions.tolist()
         except Exception as e:
-            logger.error(f"Error predicting stock price: {str(e)}")
-            # Fallback to simple linear regression
-            try:
-                x = np.array(range(len(historical_prices))).reshape(-1, 1)
-                y = historical_prices
-                model = LinearRegression()
-                model.fit(x, y)
-                
-                future_x = np.array(range(len(historical_prices), len(historical_prices) + days_ahead)).reshape(-1, 1)
-                predictions = model.predict(future_x)
-                
-                return predictions.tolist()
-            except Exception as nested_e:
-                logger.error(f"Fallback prediction also failed: {str(nested_e)}")
-                # Return the last price repeated
-                return [historical_prices[-1]] * days_ahead
+            logger.error(f"Fallback prediction also failed: {str(e)}")
+            # Return the last value repeated
+            return [historical_values[-1]] * periods_ahead
     
     def _interpret_sentiment(self, sentiment_score: float) -> str:
         """
@@ -355,14 +513,13 @@ class MarketAnalysis:
             change = df['value'].iloc[-1] - df['value'].iloc[0]
             change_pct = (change / df['value'].iloc[0]) * 100
             
-            # Calculate moving averages
-            df['SMA_20'] = df['value'].rolling(window=20).mean()
-            df['SMA_50'] = df['value'].rolling(window=50).mean()
+            # Read the rolling indicators, applying only bars the engine has not seen
+            indicators = get_indicator_engine().sync(f"index:{index_name}", df['value'].values, df['date'].values)
             
             # Determine trend
-            if df['SMA_20'].iloc[-1] > df['SMA_50'].iloc[-1]:
+            if indicators['SMA_20'] > indicators['SMA_50']:
                 trend = "Bullish"
-            elif df['SMA_20'].iloc[-1] < df['SMA_50'].iloc[-1]:
+            elif indicators['SMA_20'] < indicators['SMA_50']:
                 trend = "Bearish"
             else:
                 trend = "Neutral"
@@ -383,7 +540,7 @@ class MarketAnalysis:
             sector_performance = self.nse_client.get_sector_performance()
             
             # Predict index trend for next 7 days
-            index_prediction = self._predict_stock_price(df['value'].values, 7)
+            index_prediction, prediction_model = self._predict_stock_price(df['value'].values, 7, series_key=f"index:{index_name}")
             
             # Compile results
             analysis_result = {
@@ -401,12 +558,13 @@ class MarketAnalysis:
                 },
                 "sector_performance": sector_performance,
                 "technical_indicators": {
-                    "SMA_20": df['SMA_20'].iloc[-1],
-                    "SMA_50": df['SMA_50'].iloc[-1],
+                    "SMA_20": indicators['SMA_20'],
+                    "SMA_50": indicators['SMA_50'],
                 },
                 "prediction": {
                     "next_7_days": index_prediction,
-                    "prediction_trend": "Up" if index_prediction[-1] > latest_value else "Down"
+                    "prediction_trend": "Up" if index_prediction[-1] > latest_value else "Down",
+                    "model": prediction_model
                 },
                 "analysis_timestamp": datetime.datetime.now().isoformat()
             }
@@ -442,6 +600,64 @@ class MarketAnalysis:
         else:
             return "Very Weak"
     
+    def screen_sector(self, sector: str, signal: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
+        """
+        Screen the stocks of an NSE sector on their latest technical indicators.
+        
+        Args:
+            sector: Sector name as in the NSE sector listings (e.g., "Banking")
+            signal: Optional filter - "oversold" (RSI < 30), "overbought" (RSI > 70),
+                "bullish" (SMA_20 above SMA_50) or "bearish" (SMA_20 below SMA_50)
+            limit: Maximum number of stocks to return
+        
+        Returns:
+            Dict with the matching stocks ranked by RSI (lowest first)
+        """
+        symbols = [
+            stock['symbol'] for stock in get_stock_index().entries
+            if stock['sector'].lower() == sector.lower()
+        ]
+        if not symbols:
+            return {"error": f"No stocks found for sector {sector}"}
+        
+        # One vectorized read of the precomputed indicators for the whole sector
+        screen = get_indicator_engine().snapshot(symbols).dropna(subset=['RSI'])
+        
+        if signal == "oversold":
+            screen = screen[screen['RSI'] < 30]
+        elif signal == "overbought":
+            screen = screen[screen['RSI'] > 70]
+        elif signal == "bullish":
+            screen = screen[screen['SMA_20'] > screen['SMA_50']]
+        elif signal == "bearish":
+            screen = screen[screen['SMA_20'] < screen['SMA_50']]
+        elif signal is not None:
+            return {"error": f"Unknown screen signal {signal}"}
+        
+        screen = screen.sort_values('RSI').head(limit)
+        stocks = [
+            {
+                "symbol": symbol,
+                "latest_price": row['close'],
+                "as_of": row['date'].strftime('%Y-%m-%d'),
+                "technical_indicators": {
+                    "RSI": row['RSI'],
+                    "SMA_20": row['SMA_20'],
+                    "SMA_50": row['SMA_50'],
+                    "upper_band": row['upper_band'],
+                    "lower_band": row['lower_band']
+                }
+            }
+            for symbol, row in screen.iterrows()
+        ]
+        
+        return {
+            "sector": sector,
+            "signal": signal,
+            "stocks": stocks,
+            "analysis_timestamp": datetime.datetime.now().isoformat()
+        }
+    
     def analyze_crypto(self, symbol: str = "BTC", vs_currency: str = "KES", days: int = 90) -> Dict[str, Any]:
         """
         Analyze cryptocurrency performance, volatility, and trends.
@@ -514,7 +730,7 @@ class MarketAnalysis:
                 insight = "Sideways movement with no clear direction"
             
             # Predict price trend for next 7 days
-            price_prediction = self._predict_crypto_price(df['price'].values, 7)
+            price_prediction, prediction_model = self._predict_crypto_price(df['price'].values, 7, series_key=f"crypto:{symbol}:{vs_currency}")
             
             # Get additional crypto info
             crypto_info = self.crypto_client.get_coin_info(symbol)
@@ -539,7 +755,8 @@ class MarketAnalysis:
                 },
                 "price_prediction": {
                     "next_7_days": price_prediction,
-                    "prediction_trend": "Up" if price_prediction[-1] > latest_price else "Down"
+                    "prediction_trend": "Up" if price_prediction[-1] > latest_price else "Down",
+                    "model": prediction_model
                 },
                 "market_data": {
                     "market_cap": crypto_info.get('market_cap', 'N/A'),
@@ -559,7 +776,8 @@ class MarketAnalysis:
             logger.error(f"Error analyzing cryptocurrency {symbol}: {str(e)}")
             return {"error": f"Failed to analyze cryptocurrency {symbol}: {str(e)}"}
     
-    def _predict_crypto_price(self, historical_prices: np.ndarray, days_ahead: int = 7) -> List[float]:
+    def _predict_crypto_price(self, historical_prices: np.ndarray, days_ahead: int = 7,
+                              series_key: Optional[str] = None) -> Tuple[List[float], str]:
         """
         Predict cryptocurrency prices for specified days ahead.
         Similar to stock prediction but modified for crypto's higher volatility.
@@ -567,37 +785,13 @@ class MarketAnalysis:
         Args:
             historical_prices: Array of historical crypto prices
             days_ahead: Number of days to predict ahead
+            series_key: Identifies the series in the forecaster cache (e.g. 'crypto:BTC:KES')
             
         Returns:
-            List of predicted prices
+            Tuple of (predicted prices, forecast model: 'ARIMA' or 'linear_trend')
         """
         # Use the same ARIMA model but with different parameters for crypto
-        try:
-            # Fit ARIMA model with parameters suitable for volatile assets
-            model = ARIMA(historical_prices, order=(2, 1, 2))
-            model_fit = model.fit()
-            
-            # Make prediction
-            forecast = model_fit.forecast(steps=days_ahead)
-            return forecast.tolist()
-            
-        except Exception as e:
-            logger.error(f"Error predicting crypto price: {str(e)}")
-            # Fallback to simple linear regression
-            try:
-                x = np.array(range(len(historical_prices))).reshape(-1, 1)
-                y = historical_prices
-                model = LinearRegression()
-                model.fit(x, y)
-                
-                future_x = np.array(range(len(historical_prices), len(historical_prices) + days_ahead)).reshape(-1, 1)
-                predictions = model.predict(future_x)
-                
-                return predictions.tolist()
-            except Exception as nested_e:
-                logger.error(f"Fallback prediction also failed: {str(nested_e)}")
-                # Return the last price repeated
-                return [historical_prices[-1]] * days_ahead
+        return self._forecast(series_key, historical_prices, (2, 1, 2), days_ahead)
     
     def _calculate_crypto_risk(self, volatility: float, symbol: str) -> str:
         """
@@ -705,7 +899,7 @@ class MarketAnalysis:
                 ksh_inflation = base_inflation = None
                 
             # Predict forex rate for next 7 days
-            rate_prediction = self._predict_forex_rate(df['rate'].values, 7)
+            rate_prediction, prediction_model = self._predict_forex_rate(df['rate'].values, 7, series_key=f"forex:{base_currency}/{quote_currency}")
             
             # Compile results
             analysis_result = {
@@ -723,7 +917,8 @@ class MarketAnalysis:
                 },
                 "rate_prediction": {
                     "next_7_days": rate_prediction,
-                    "prediction_trend": "Up" if rate_prediction[-1] > latest_rate else "Down"
+                    "prediction_trend": "Up" if rate_prediction[-1] > latest_rate else "Down",
+                    "model": prediction_model
                 },
                 "economic_context": {
                     "KES_inflation": ksh_inflation,
@@ -742,44 +937,21 @@ class MarketAnalysis:
             logger.error(f"Error analyzing forex {base_currency}/{quote_currency}: {str(e)}")
             return {"error": f"Failed to analyze forex {base_currency}/{quote_currency}: {str(e)}"}
     
-    def _predict_forex_rate(self, historical_rates: np.ndarray, days_ahead: int = 7) -> List[float]:
+    def _predict_forex_rate(self, historical_rates: np.ndarray, days_ahead: int = 7,
+                            series_key: Optional[str] = None) -> Tuple[List[float], str]:
         """
         Predict forex exchange rates for specified days ahead.
         
         Args:
             historical_rates: Array of historical exchange rates
             days_ahead: Number of days to predict ahead
+            series_key: Identifies the series in the forecaster cache (e.g. 'forex:USD/KES')
             
         Returns:
-            List of predicted rates
+            Tuple of (predicted rates, forecast model: 'ARIMA' or 'linear_trend')
         """
         # Using ARIMA model optimized for forex
-        try:
-            # Fit ARIMA model with parameters suitable for forex
-            model = ARIMA(historical_rates, order=(1, 1, 1))
-            model_fit = model.fit()
-            
-            # Make prediction
-            forecast = model_fit.forecast(steps=days_ahead)
-            return forecast.tolist()
-            
-        except Exception as e:
-            logger.error(f"Error predicting forex rate: {str(e)}")
-            # Fallback to simple linear regression
-            try:
-                x = np.array(range(len(historical_rates))).reshape(-1, 1)
-                y = historical_rates
-                model = LinearRegression()
-                model.fit(x, y)
-                
-                future_x = np.array(range(len(historical_rates), len(historical_rates) + days_ahead)).reshape(-1, 1)
-                predictions = model.predict(future_x)
-                
-                return predictions.tolist()
-            except Exception as nested_e:
-                logger.error(f"Fallback prediction also failed: {str(nested_e)}")
-                # Return the last rate repeated
-                return [historical_rates[-1]] * days_ahead
+        return self._forecast(series_key, historical_rates, (1, 1, 1), days_ahead)
     
     def _interpret_forex_stability(self, volatility: float) -> str:
         """
@@ -1168,12 +1340,19 @@ class MarketAnalysis:
                 
         return strategy
     
-    def generate_market_report(self, market_type: str = "stocks") -> Dict[str, Any]:
+    def generate_market_report(self, market_type: str = "stocks",
+                               deadline: Optional[float] = MARKET_REPORT_DEADLINE) -> Dict[str, Any]:
         """
         Generate a comprehensive market report with insights and recommendations.
         
+        Sections run as a dependency graph: independent sections (index, crypto
+        and forex analyses, interest rates, ...) run concurrently and the ones
+        that need market sentiment start as soon as it is ready. Sections still
+        running at the deadline are left out and listed in "sections".
+        
         Args:
             market_type: Type of market ('stocks', 'crypto', 'forex', 'all')
+            deadline: Seconds the report may take before returning partial results (None to wait for all)
             
         Returns:
             Dict with comprehensive market report
@@ -1186,78 +1365,73 @@ class MarketAnalysis:
             "timestamp": datetime.datetime.now().isoformat()
         }
         
-        try:
-            # Market sentiment analysis
-            sentiment = self.analyze_market_sentiment(market_type if market_type != "all" else "general")
-            report["summary"]["market_sentiment"] = sentiment
-            
-            # Add market-specific data
-            if market_type in ["stocks", "all"]:
-                try:
-                    report["data"]["nse_index"] = self.analyze_nse_index("NSE_20")
-                    
-                    # Add top gainers and losers
-                    report["data"]["stock_movers"] = self.nse_client.get_top_movers()
-                    
-                    # Add sector performance
-                    report["data"]["sector_performance"] = self.nse_client.get_sector_performance()
-                    
-                    # Generate stock recommendations
-                    report["recommendations"]["stocks"] = self._generate_stock_recommendations(sentiment["combined_sentiment"])
-                    
-                except Exception as e:
-                    logger.error(f"Error in stock market analysis: {str(e)}")
-                    report["data"]["stocks_error"] = str(e)
-            
-            if market_type in ["crypto", "all"]:
-                try:
-                    # Analyze major cryptocurrencies
-                    report["data"]["bitcoin"] = self.analyze_crypto("BTC", "KES")
-                    report["data"]["ethereum"] = self.analyze_crypto("ETH", "KES")
-                    
-                    # Get overall crypto market cap
-                    report["data"]["crypto_market_cap"] = self.crypto_client.get_global_market_cap()
-                    
-                    # Generate crypto recommendations
-                    report["recommendations"]["crypto"] = self._generate_crypto_recommendations(sentiment["combined_sentiment"])
-                    
-                except Exception as e:
-                    logger.error(f"Error in crypto market analysis: {str(e)}")
-                    report["data"]["crypto_error"] = str(e)
-            
-            if market_type in ["forex", "all"]:
-                try:
-                    # Analyze major forex pairs relevant to KES
-                    report["data"]["usd_kes"] = self.analyze_forex("USD", "KES")
-                    report["data"]["eur_kes"] = self.analyze_forex("EUR", "KES")
-                    report["data"]["gbp_kes"] = self.analyze_forex("GBP", "KES")
-                    
-                    # Generate forex recommendations
-                    report["recommendations"]["forex"] = self._generate_forex_recommendations()
-                    
-                except Exception as e:
-                    logger.error(f"Error in forex market analysis: {str(e)}")
-                    report["data"]["forex_error"] = str(e)
-            
+        # Where each section's result goes in the report
+        placement = {"market_sentiment": "summary", "market_outlook": "summary"}
+        
+        def sentiment_score(inputs: Dict[str, Any]) -> float:
+            return inputs["market_sentiment"]["combined_sentiment"]
+        
+        sections = [
+            ReportSection("market_sentiment",
+                          lambda inputs: self.analyze_market_sentiment(market_type if market_type != "all" else "general")),
             # Add interest rate data for all report types
-            try:
-                report["data"]["interest_rates"] = self.analyze_interest_rates()
-            except Exception as e:
-                logger.error(f"Error in interest rate analysis: {str(e)}")
-                report["data"]["interest_rates_error"] = str(e)
-            
-            # Generate overall market outlook
-            report["summary"]["market_outlook"] = self._generate_market_outlook(report)
-            
-            logger.info(f"Generated comprehensive market report for {market_type}")
-            return report
-            
-        except Exception as e:
-            logger.error(f"Error generating market report: {str(e)}")
-            return {
-                "error": f"Failed to generate market report: {str(e)}",
-                "partial_data": report
-            }
+            ReportSection("interest_rates", lambda inputs: self.analyze_interest_rates()),
+        ]
+        
+        if market_type in ["stocks", "all"]:
+            sections += [
+                ReportSection("nse_index", lambda inputs: self.analyze_nse_index("NSE_20")),
+                ReportSection("stock_movers", lambda inputs: self.nse_client.get_top_movers()),
+                ReportSection("sector_performance", lambda inputs: self.nse_client.get_sector_performance()),
+                ReportSection("stocks", lambda inputs: self._generate_stock_recommendations(sentiment_score(inputs)),
+                              depends_on=["market_sentiment"]),
+            ]
+            placement["stocks"] = "recommendations"
+        
+        if market_type in ["crypto", "all"]:
+            sections += [
+                ReportSection("bitcoin", lambda inputs: self.analyze_crypto("BTC", "KES")),
+                ReportSection("ethereum", lambda inputs: self.analyze_crypto("ETH", "KES")),
+                ReportSection("crypto_market_cap", lambda inputs: self.crypto_client.get_global_market_cap()),
+                ReportSection("crypto", lambda inputs: self._generate_crypto_recommendations(sentiment_score(inputs)),
+                              depends_on=["market_sentiment"]),
+            ]
+            placement["crypto"] = "recommendations"
+        
+        if market_type in ["forex", "all"]:
+            sections += [
+                ReportSection("usd_kes", lambda inputs: self.analyze_forex("USD", "KES")),
+                ReportSection("eur_kes", lambda inputs: self.analyze_forex("EUR", "KES")),
+                ReportSection("gbp_kes", lambda inputs: self.analyze_forex("GBP", "KES")),
+                ReportSection("forex", lambda inputs: self._generate_forex_recommendations()),
+            ]
+            placement["forex"] = "recommendations"
+        
+        # Generate overall market outlook from whatever sentiment and rate data arrived
+        sections.append(ReportSection(
+            "market_outlook",
+            lambda inputs: self._generate_market_outlook({
+                "summary": {"market_sentiment": inputs["market_sentiment"]} if "market_sentiment" in inputs else {},
+                "data": {"interest_rates": inputs["interest_rates"]} if "interest_rates" in inputs else {}
+            }),
+            uses=["market_sentiment", "interest_rates"]
+        ))
+        
+        results, timings = ReportGraph(sections, max_workers=MARKET_REPORT_WORKERS).run(deadline)
+        
+        for name, timing in timings.items():
+            part = placement.get(name, "data")
+            if name in results:
+                report[part][name] = results[name]
+            elif part == "data":
+                report["data"][f"{name}_error"] = timing.get("error", timing["status"])
+        
+        report["sections"] = timings
+        report["partial"] = any(timing["status"] != SECTION_OK for timing in timings.values())
+        
+        logger.info(f"Generated market report for {market_type} "
+                    f"({sum(t['status'] == SECTION_OK for t in timings.values())}/{len(timings)} sections)")
+        return report
     
     def _generate_stock_recommendations(self, sentiment: float) -> Dict[str, Any]:
         """
@@ -1486,6 +1660,10 @@ class MarketAnalysis:
         """
         Generate personalized market insights based on user's risk profile and investment goals.
         
+        The market analysis behind the insights is shared by every user: a periodic
+        job precomputes it, with the payload for each risk bucket, so a request
+        only splices in the user's horizon, preferred assets and currencies.
+        
         Args:
             user_profile: Dict containing user's risk profile, goals, and preferences
             
@@ -1502,141 +1680,43 @@ class MarketAnalysis:
         }
         
         try:
-            # Get market sentiment
-            sentiment = self.analyze_market_sentiment("general")
+            self.start_insight_refresher()
+            snapshot = self._get_insight_snapshot()
+            market = snapshot["market"]
             
             # Get user's investment preferences
             preferences = user_profile.get("investment_preferences", {})
             preferred_assets = preferences.get("asset_classes", ["stocks", "bonds"])
-            preferred_sectors = preferences.get("sectors", [])
             preferred_currencies = preferences.get("currencies", ["KES", "USD"])
             
-            # Match risk profile with current market sentiment
+            # Precomputed payload for the user's risk bucket (built on the spot for unusual risk levels)
             risk_level = user_profile.get("risk_profile", "moderate").lower()
-            sentiment_level = sentiment["combined_sentiment"]
+            bucket = snapshot["buckets"].get(risk_level) or self._build_insight_bucket(risk_level, market)
+            sentiment_level = market["sentiment_level"]
             
-            # Generate personalized market summary
-            if risk_level == "conservative":
-                if sentiment_level < -0.3:
-                    insights["personalized_insights"]["market_summary"] = "Current market conditions align with your conservative approach. Focus on capital preservation."
-                elif sentiment_level < 0.3:
-                    insights["personalized_insights"]["market_summary"] = "Market showing mixed signals. Your conservative approach suggests maintaining quality fixed income exposure."
-                else:
-                    insights["personalized_insights"]["market_summary"] = "Market showing positive signals, but maintain your conservative positioning with selective equity exposure."
+            if "market_summary" in bucket:
+                insights["personalized_insights"]["market_summary"] = bucket["market_summary"]
             
-            elif risk_level == "moderate":
-                if sentiment_level < -0.3:
-                    insights["personalized_insights"]["market_summary"] = "Current market weakness suggests reducing risk. Consider increasing fixed income allocation."
-                elif sentiment_level < 0.3:
-                    insights["personalized_insights"]["market_summary"] = "Market showing mixed signals. Balanced approach aligns with your moderate risk profile."
-                else:
-                    insights["personalized_insights"]["market_summary"] = "Positive market sentiment aligns well with your moderate risk profile. Consider tactical opportunities."
-            
-            elif risk_level == "aggressive":
-                if sentiment_level < -0.3:
-                    insights["personalized_insights"]["market_summary"] = "Market weakness may present buying opportunities for your aggressive strategy, but exercise caution."
-                elif sentiment_level < 0.3:
-                    insights["personalized_insights"]["market_summary"] = "Market showing mixed signals. Selective approach to high-growth assets aligns with your risk tolerance."
-                else:
-                    insights["personalized_insights"]["market_summary"] = "Strong market sentiment aligns well with your aggressive approach. Growth assets favored."
-            
-            # Generate asset-specific insights based on preferences
+            # Asset-specific insights for the user's preferred assets
             insights["personalized_insights"]["asset_specific"] = {}
             
             if "stocks" in preferred_assets:
-                try:
-                    # Get NSE index analysis
-                    nse_analysis = self.analyze_nse_index("NSE_20")
-                    
-                    # Generate stock insights based on risk profile and market conditions
-                    if risk_level == "conservative":
-                        recommended_stocks = ["Safaricom", "EABL", "KCB Group"] if sentiment_level > -0.3 else ["BAT Kenya", "Bamburi Cement", "Jubilee Holdings"]
-                        strategy = "Focus on established blue-chip companies with strong dividends and low volatility"
-                    elif risk_level == "moderate":
-                        recommended_stocks = ["Safaricom", "Equity Bank", "EABL", "Co-operative Bank", "NCBA Group"]
-                        strategy = "Balanced approach with a mix of growth and value stocks in established sectors"
-                    else:  # aggressive
-                        recommended_stocks = ["Safaricom", "Equity Bank", "KCB Group", "Centum Investment", "TransCentury"]
-                        strategy = "Growth-focused approach with potential for capital appreciation, including select mid-cap stocks"
-                    
-                    # Filter by preferred sectors if specified
-                    if preferred_sectors:
-                        # This would require a mapping of stocks to sectors
-                        pass
-                    
-                    insights["personalized_insights"]["asset_specific"]["stocks"] = {
-                        "market_trend": nse_analysis.get("current_trend", "Unable to determine"),
-                        "recommended_strategy": strategy,
-                        "recommended_stocks": recommended_stocks
-                    }
-                    
-                except Exception as e:
-                    logger.error(f"Error generating stock insights: {str(e)}")
-                    insights["personalized_insights"]["asset_specific"]["stocks"] = {"error": str(e)}
+                insights["personalized_insights"]["asset_specific"]["stocks"] = bucket["stocks"]
             
             if "crypto" in preferred_assets:
-                try:
-                    # Get crypto market sentiment
-                    crypto_sentiment = self.analyze_market_sentiment("crypto")
-                    
-                    # Generate crypto insights based on risk profile and market conditions
-                    if risk_level == "conservative":
-                        if sentiment_level < -0.3:
-                            crypto_strategy = "Avoid cryptocurrency exposure in current market conditions"
-                            crypto_allocation = "0%"
-                        else:
-                            crypto_strategy = "Very limited exposure to established cryptocurrencies only (Bitcoin)"
-                            crypto_allocation = "1-2% maximum"
-                    elif risk_level == "moderate":
-                        if sentiment_level < -0.3:
-                            crypto_strategy = "Minimal exposure focused on Bitcoin and stablecoins"
-                            crypto_allocation = "1-3%"
-                        else:
-                            crypto_strategy = "Measured exposure to established cryptocurrencies (Bitcoin, Ethereum)"
-                            crypto_allocation = "3-5%"
-                    else:  # aggressive
-                        if sentiment_level < -0.3:
-                            crypto_strategy = "Limited exposure with focus on dollar-cost averaging into Bitcoin"
-                            crypto_allocation = "3-5%"
-                        else:
-                            crypto_strategy = "Strategic allocation to major cryptocurrencies and select altcoins"
-                            crypto_allocation = "5-10% maximum"
-                    
-                    insights["personalized_insights"]["asset_specific"]["crypto"] = {
-                        "market_trend": crypto_sentiment.get("market_phase", "Unable to determine"),
-                        "recommended_strategy": crypto_strategy,
-                        "recommended_allocation": crypto_allocation
-                    }
-                    
-                except Exception as e:
-                    logger.error(f"Error generating crypto insights: {str(e)}")
-                    insights["personalized_insights"]["asset_specific"]["crypto"] = {"error": str(e)}
+                insights["personalized_insights"]["asset_specific"]["crypto"] = bucket["crypto"]
             
             if "forex" in preferred_assets or any(curr != "KES" for curr in preferred_currencies):
                 try:
-                    # Generate forex insights based on preferred currencies
                     forex_insights = {}
-                    
                     for currency in preferred_currencies:
                         if currency != "KES":
-                            # Analyze currency pair
-                            pair_analysis = self.analyze_forex(currency, "KES")
-                            forex_insights[f"{currency}/KES"] = {
-                                "current_trend": pair_analysis.get("current_trend", "Unable to determine"),
-                                "stability": pair_analysis.get("stability", "Unknown")
-                            }
-                    
-                    # Generate forex strategy
-                    if risk_level == "conservative":
-                        forex_strategy = "Focus on major reserve currencies (USD, EUR) for stability"
-                    elif risk_level == "moderate":
-                        forex_strategy = "Balanced exposure to major currencies with limited emerging market exposure"
-                    else:  # aggressive
-                        forex_strategy = "Diversified currency exposure including emerging market currencies for potential higher returns"
+                            pair = f"{currency}/KES"
+                            forex_insights[pair] = market["forex"].get(pair) or self._forex_pair_insight(currency)
                     
                     insights["personalized_insights"]["asset_specific"]["forex"] = {
                         "currency_pairs": forex_insights,
-                        "recommended_strategy": forex_strategy
+                        "recommended_strategy": bucket["forex_strategy"]
                     }
                     
                 except Exception as e:
@@ -1650,6 +1730,7 @@ class MarketAnalysis:
                 user_profile.get("investment_horizon", "medium"),
                 preferred_assets
             )
+            insights["market_data_as_of"] = snapshot["computed_at"]
             
             logger.info(f"Generated personalized market insights for user {user_profile.get('user_id', 'unknown')}")
             return insights
@@ -1662,6 +1743,219 @@ class MarketAnalysis:
                 "partial_insights": insights
             }
     
+    def refresh_insight_buckets(self) -> Dict[str, Any]:
+        """
+        Recompute the shared market snapshot and every risk bucket's insight payload.
+        
+        Returns:
+            Dict with the snapshot that personalized insights are served from
+        """
+        start = datetime.datetime.now()
+        snapshot = self._compute_insight_snapshot()
+        self.data_cache.set("market_insights", "snapshot", snapshot)
+        logger.info(f"Refreshed market insight buckets ({snapshot['market']['regime']} regime) "
+                    f"in {(datetime.datetime.now() - start).total_seconds():.1f}s")
+        return snapshot
+    
+    def start_insight_refresher(self, interval: int = INSIGHT_REFRESH_INTERVAL) -> None:
+        """
+        Start the periodic insight refresh job on a daemon thread (once per process).
+        
+        Args:
+            interval: Seconds between refreshes
+        """
+        if self._insight_refresher is not None:
+            return
+        
+        def refresh_periodically():
+            while True:
+                try:
+                    snapshot = self.data_cache.get("market_insights", "snapshot")
+                    if snapshot is None:
+                        # Coalesces with any request computing the first snapshot
+                        self._get_insight_snapshot()
+                    elif time.time() - snapshot["computed_ts"] >= interval / 2:
+                        # Otherwise another worker refreshed the shared snapshot recently
+                        self.refresh_insight_buckets()
+                except Exception as e:
+                    logger.error(f"Error refreshing market insight buckets: {str(e)}")
+                time.sleep(interval)
+        
+        self._insight_refresher = threading.Thread(target=refresh_periodically, name="insight-refresh", daemon=True)
+        self._insight_refresher.start()
+    
+    def _get_insight_snapshot(self) -> Dict[str, Any]:
+        """Shared market snapshot, computed inline (once across workers) if the job has not produced one yet."""
+        snapshot = self.data_cache.get_or_set("market_insights", "snapshot", self._compute_insight_snapshot)
+        if not snapshot:
+            raise RuntimeError("Market insight snapshot unavailable")
+        return snapshot
+    
+    def _compute_insight_snapshot(self) -> Dict[str, Any]:
+        """
+        Run the market-wide analyses personalized insights depend on, then build each risk bucket.
+        
+        Returns:
+            Dict with the market data, one payload per risk bucket and the computation time
+        """
+        # Get market sentiment
+        sentiment = self.analyze_market_sentiment("general")
+        sentiment_level = sentiment["combined_sentiment"]
+        
+        market = {
+            "sentiment_level": sentiment_level,
+            "regime": self._market_regime(sentiment_level),
+            "forex": {}
+        }
+        
+        try:
+            # Get NSE index analysis
+            nse_analysis = self.analyze_nse_index("NSE_20")
+            market["stock_trend"] = nse_analysis.get("current_trend", "Unable to determine")
+        except Exception as e:
+            logger.error(f"Error generating stock insights: {str(e)}")
+            market["stocks_error"] = str(e)
+        
+        try:
+            # Get crypto market sentiment
+            crypto_sentiment = self.analyze_market_sentiment("crypto")
+            market["crypto_phase"] = crypto_sentiment.get("market_phase", "Unable to determine")
+        except Exception as e:
+            logger.error(f"Error generating crypto insights: {str(e)}")
+            market["crypto_error"] = str(e)
+        
+        for currency in INSIGHT_CURRENCIES:
+            try:
+                market["forex"][f"{currency}/KES"] = self._forex_pair_insight(currency)
+            except Exception as e:
+                logger.error(f"Error analyzing {currency}/KES for insights: {str(e)}")
+        
+        now = datetime.datetime.now()
+        return {
+            "market": market,
+            "buckets": {risk_level: self._build_insight_bucket(risk_level, market) for risk_level in INSIGHT_RISK_BUCKETS},
+            "computed_at": now.isoformat(),
+            "computed_ts": now.timestamp()
+        }
+    
+    def _forex_pair_insight(self, currency: str) -> Dict[str, str]:
+        """Trend and stability of a currency against KES."""
+        # Analyze currency pair
+        pair_analysis = self.analyze_forex(currency, "KES")
+        return {
+            "current_trend": pair_analysis.get("current_trend", "Unable to determine"),
+            "stability": pair_analysis.get("stability", "Unknown")
+        }
+    
+    def _market_regime(self, sentiment_level: float) -> str:
+        """Market regime used to bucket insights: bearish, mixed or bullish."""
+        if sentiment_level < -0.3:
+            return "bearish"
+        elif sentiment_level < 0.3:
+            return "mixed"
+        return "bullish"
+    
+    def _build_insight_bucket(self, risk_level: str, market: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insight payload shared by every user with the same risk level in the current market.
+        
+        Args:
+            risk_level: User's risk tolerance level
+            market: Market snapshot from _compute_insight_snapshot
+            
+        Returns:
+            Dict with the market summary, stock and crypto insights and forex strategy
+        """
+        bucket = {}
+        sentiment_level = market["sentiment_level"]
+        
+        # Generate personalized market summary
+        if risk_level == "conservative":
+            if sentiment_level < -0.3:
+                bucket["market_summary"] = "Current market conditions align with your conservative approach. Focus on capital preservation."
+            elif sentiment_level < 0.3:
+                bucket["market_summary"] = "Market showing mixed signals. Your conservative approach suggests maintaining quality fixed income exposure."
+            else:
+                bucket["market_summary"] = "Market showing positive signals, but maintain your conservative positioning with selective equity exposure."
+        
+        elif risk_level == "moderate":
+            if sentiment_level < -0.3:
+                bucket["market_summary"] = "Current market weakness suggests reducing risk. Consider increasing fixed income allocation."
+            elif sentiment_level < 0.3:
+                bucket["market_summary"] = "Market showing mixed signals. Balanced approach aligns with your moderate risk profile."
+            else:
+                bucket["market_summary"] = "Positive market sentiment aligns well with your moderate risk profile. Consider tactical opportunities."
+        
+        elif risk_level == "aggressive":
+            if sentiment_level < -0.3:
+                bucket["market_summary"] = "Market weakness may present buying opportunities for your aggressive strategy, but exercise caution."
+            elif sentiment_level < 0.3:
+                bucket["market_summary"] = "Market showing mixed signals. Selective approach to high-growth assets aligns with your risk tolerance."
+            else:
+                bucket["market_summary"] = "Strong market sentiment aligns well with your aggressive approach. Growth assets favored."
+        
+        # Generate stock insights based on risk profile and market conditions
+        if "stocks_error" in market:
+            bucket["stocks"] = {"error": market["stocks_error"]}
+        else:
+            if risk_level == "conservative":
+                recommended_stocks = ["Safaricom", "EABL", "KCB Group"] if sentiment_level > -0.3 else ["BAT Kenya", "Bamburi Cement", "Jubilee Holdings"]
+                strategy = "Focus on established blue-chip companies with strong dividends and low volatility"
+            elif risk_level == "moderate":
+                recommended_stocks = ["Safaricom", "Equity Bank", "EABL", "Co-operative Bank", "NCBA Group"]
+                strategy = "Balanced approach with a mix of growth and value stocks in established sectors"
+            else:  # aggressive
+                recommended_stocks = ["Safaricom", "Equity Bank", "KCB Group", "Centum Investment", "TransCentury"]
+                strategy = "Growth-focused approach with potential for capital appreciation, including select mid-cap stocks"
+            
+            bucket["stocks"] = {
+                "market_trend": market["stock_trend"],
+                "recommended_strategy": strategy,
+                "recommended_stocks": recommended_stocks
+            }
+        
+        # Generate crypto insights based on risk profile and market conditions
+        if "crypto_error" in market:
+            bucket["crypto"] = {"error": market["crypto_error"]}
+        else:
+            if risk_level == "conservative":
+                if sentiment_level < -0.3:
+                    crypto_strategy = "Avoid cryptocurrency exposure in current market conditions"
+                    crypto_allocation = "0%"
+                else:
+                    crypto_strategy = "Very limited exposure to established cryptocurrencies only (Bitcoin)"
+                    crypto_allocation = "1-2% maximum"
+            elif risk_level == "moderate":
+                if sentiment_level < -0.3:
+                    crypto_strategy = "Minimal exposure focused on Bitcoin and stablecoins"
+                    crypto_allocation = "1-3%"
+                else:
+                    crypto_strategy = "Measured exposure to established cryptocurrencies (Bitcoin, Ethereum)"
+                    crypto_allocation = "3-5%"
+            else:  # aggressive
+                if sentiment_level < -0.3:
+                    crypto_strategy = "Limited exposure with focus on dollar-cost averaging into Bitcoin"
+                    crypto_allocation = "3-5%"
+                else:
+                    crypto_strategy = "Strategic allocation to major cryptocurrencies and select altcoins"
+                    crypto_allocation = "5-10% maximum"
+            
+            bucket["crypto"] = {
+                "market_trend": market["crypto_phase"],
+                "recommended_strategy": crypto_strategy,
+                "recommended_allocation": crypto_allocation
+            }
+        
+        # Generate forex strategy
+        if risk_level == "conservative":
+            bucket["forex_strategy"] = "Focus on major reserve currencies (USD, EUR) for stability"
+        elif risk_level == "moderate":
+            bucket["forex_strategy"] = "Balanced exposure to major currencies with limited emerging market exposure"
+        else:  # aggressive
+            bucket["forex_strategy"] = "Diversified currency exposure including emerging market currencies for potential higher returns"
+        
+        return bucket
+    
     def _generate_personalized_recommendations(self, risk_level: str, sentiment: float, 
                                                investment_horizon: str, preferred_assets: List[str]) -> Dict[str, Any]:
         """
@@ -1837,6 +2131,78 @@ class MarketAnalysis:
         return recommendations
 
 
+# Singleton instance
+_market_analysis_instance = None
+
+
+def get_market_analysis() -> MarketAnalysis:
+    """
+    Get the shared MarketAnalysis instance.
+    
+    Returns:
+        MarketAnalysis: Analyzer instance
+    """
+    global _market_analysis_instance
+    if _market_analysis_instance is None:
+        _market_analysis_instance = MarketAnalysis()
+    return _market_analysis_instance
+
+
+def handle_market_request(data: Dict[str, Any]) -> Union[Dict[str, Any], Tuple[Dict[str, Any], int]]:
+    """
+    Handle a market analysis API request.
+    
+    Args:
+        data: Request body, e.g. {"type": "stock", "symbol": "SCOM", "days": 90,
+            "fields": ["price", "trend"]}. "type" is one of stock, index, crypto,
+            forex, interest_rates, sentiment, report, sector or insights
+            (with "user_profile").
+            
+    Returns:
+        Analysis result, or an (error, status code) tuple for a bad request
+    """
+    data = data or {}
+    analysis_type = data.get("type", "stock")
+    days = int(data.get("days", 90))
+    analyzer = get_market_analysis()
+    
+    if analysis_type == "stock":
+        if not data.get("symbol"):
+            return {"error": "symbol is required"}, 400
+        try:
+            resolve_stock_fields(data.get("fields"))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        result = analyzer.analyze_stock(data["symbol"].upper(), days, fields=data.get("fields"))
+    elif analysis_type == "index":
+        result = analyzer.analyze_nse_index(data.get("index_name", "NSE_20"), days)
+    elif analysis_type == "crypto":
+        result = analyzer.analyze_crypto(data.get("symbol", "BTC"), data.get("vs_currency", "KES"), days)
+    elif analysis_type == "forex":
+        result = analyzer.analyze_forex(data.get("base_currency", "USD"), data.get("quote_currency", "KES"), days)
+    elif analysis_type == "interest_rates":
+        result = analyzer.analyze_interest_rates()
+    elif analysis_type == "sentiment":
+        result = analyzer.analyze_market_sentiment(data.get("market", "general"))
+    elif analysis_type == "report":
+        deadline = data.get("deadline", MARKET_REPORT_DEADLINE)
+        result = analyzer.generate_market_report(
+            data.get("market_type", "stocks"), float(deadline) if deadline is not None else None
+        )
+    elif analysis_type == "sector":
+        if not data.get("sector"):
+            return {"error": "sector is required"}, 400
+        result = analyzer.screen_sector(data["sector"], data.get("signal"), int(data.get("limit", 10)))
+    elif analysis_type == "insights":
+        if not isinstance(data.get("user_profile"), dict):
+            return {"error": "user_profile is required"}, 400
+        result = analyzer.personalized_market_insights(data["user_profile"])
+    else:
+        return {"error": f"Unknown analysis type: {analysis_type}"}, 400
+    
+    return result
+
+
 # Example usage if run directly
 if __name__ == "__main__":
     analyzer = MarketAnalysis()
@@ -1845,6 +2211,9 @@ if __name__ == "__main__":
     stock_analysis = analyzer.analyze_stock("SCOM")  # Safaricom
     print(json.dumps(stock_analysis, indent=2))
     
+    # Example: Only the cheap sections
+    print(json.dumps(analyzer.analyze_stock("SCOM", fields=["price", "trend"]), indent=2))
+    
     # Example: Analyze market sentiment
     sentiment_analysis = analyzer.analyze_market_sentiment()
     print(json.dumps(sentiment_analysis, indent=2))
@@ -4,8 +4,19 @@ import time
 import logging
 import requests
 from typing import Dict, List, Union, Optional, Any
-from datetime import datetime, timedelta
-import redis
+from datetime import datetime
+
+try:
+    from ..api_integration.cache import get_cache, with_staleness_marker
+    from ..api_integration.http_pool import get_http_pool
+    from ..api_integration.market_hours import CBK_DAILY, FOREX, NSE_DAILY, NSE_SESSION, policy_ttl
+    from ..api_integration.rate_limit import RateLimiter, RateLimitExceeded, get_rate_limiter
+except ImportError:
+    # For standalone testing
+    from api_integration.cache import get_cache, with_staleness_marker
+    from api_integration.http_pool import get_http_pool
+    from api_integration.market_hours import CBK_DAILY, FOREX, NSE_DAILY, NSE_SESSION, policy_ttl
+    from api_integration.rate_limit import RateLimiter, RateLimitExceeded, get_rate_limiter
 
 # Initialize logging
 logging.basicConfig(
@@ -21,89 +32,33 @@ try:
 except ImportError:
     logger.warning("dotenv not installed. Using environment variables directly.")
 
-# Initialize Redis for caching
-try:
-    redis_client = redis.Redis(
-        host=os.getenv('REDIS_HOST', 'localhost'),
-        port=int(os.getenv('REDIS_PORT', 6379)),
-        password=os.getenv('REDIS_PASSWORD', ''),
-        db=int(os.getenv('REDIS_DB', 0))
-    )
-    redis_client.ping()  # Test connection
-    logger.info("Redis cache connection established successfully")
-except Exception as e:
-    logger.warning(f"Redis connection failed: {e}. Using in-memory cache fallback.")
-    redis_client = None
-
-class APIRateLimiter:
-    """
-    Handles API rate limiting to prevent exceeding quotas
-    """
-    def __init__(self, calls_per_minute: int = 60):
-        self.calls_per_minute = calls_per_minute
-        self.call_timestamps = []
-        
-    def wait_if_needed(self):
-        """Check if rate limit is reached and wait if necessary"""
-        current_time = time.time()
-        # Remove timestamps older than a minute
-        self.call_timestamps = [ts for ts in self.call_timestamps 
-                               if current_time - ts < 60]
-        
-        if len(self.call_timestamps) >= self.calls_per_minute:
-            # Wait until oldest timestamp is a minute old
-            sleep_time = 60 - (current_time - self.call_timestamps[0])
-            if sleep_time > 0:
-                logger.info(f"Rate limit approached. Waiting {sleep_time:.2f} seconds")
-                time.sleep(sleep_time)
-            # Clear old timestamps
-            self.call_timestamps = self.call_timestamps[1:]
-            
-        # Add current call timestamp
-        self.call_timestamps.append(time.time())
+# Shared keep-alive HTTP connection pools
+http_pool = get_http_pool()
 
 class CacheManager:
     """
-    Manages caching of financial data to reduce API calls
+    Manages caching of financial data to reduce API calls.
+    
+    Thin adapter over the shared two-tier cache (in-process LRU + Redis).
     """
-    def __init__(self, redis_client=None):
-        self.redis_client = redis_client
-        # In-memory cache fallback
-        self.memory_cache = {}
-        self.cache_expiry = {}
+    def __init__(self, namespace: str = "market_data_api"):
+        self.namespace = namespace
+        self.cache = get_cache()
         
     def get(self, key: str) -> Optional[Any]:
         """Get data from cache"""
-        if self.redis_client:
-            data = self.redis_client.get(key)
-            if data:
-                return json.loads(data)
-        else:
-            # Check memory cache and expiry
-            if key in self.memory_cache and key in self.cache_expiry:
-                if datetime.now() < self.cache_expiry[key]:
-                    return self.memory_cache[key]
-                else:
-                    # Remove expired data
-                    del self.memory_cache[key]
-                    del self.cache_expiry[key]
-        return None
+        return self.cache.get(self.namespace, key)
         
     def set(self, key: str, value: Any, expiry_seconds: int = 3600) -> None:
         """Set data in cache with expiry time"""
-        try:
-            if self.redis_client:
-                self.redis_client.setex(
-                    key,
-                    expiry_seconds,
-                    json.dumps(value)
-                )
-            else:
-                # Use in-memory cache
-                self.memory_cache[key] = value
-                self.cache_expiry[key] = datetime.now() + timedelta(seconds=expiry_seconds)
-        except Exception as e:
-            logger.error(f"Cache error: {e}")
+        self.cache.set(self.namespace, key, value, ttl=expiry_seconds)
+        
+    def get_stale_while_revalidate(self, key: str, loader, expiry_seconds: int,
+                                   max_stale_seconds: int) -> Any:
+        """Serve cached data immediately, refreshing expired data in the background"""
+        return with_staleness_marker(*self.cache.get_stale_while_revalidate(
+            self.namespace, key, loader, ttl=expiry_seconds, max_stale=max_stale_seconds
+        ))
 
 class MarketDataAPI:
     """
@@ -124,19 +79,20 @@ class MarketDataAPI:
         self.crypto_base_url = "https://api.coingecko.com/api/v3"
         self.alpha_vantage_base_url = "https://www.alphavantage.co/query"
         
-        # Initialize rate limiters
-        self.nse_rate_limiter = APIRateLimiter(calls_per_minute=30)
-        self.cbk_rate_limiter = APIRateLimiter(calls_per_minute=30)
-        self.forex_rate_limiter = APIRateLimiter(calls_per_minute=10)
-        self.crypto_rate_limiter = APIRateLimiter(calls_per_minute=50)
-        self.alpha_vantage_rate_limiter = APIRateLimiter(calls_per_minute=5)
+        # Shared token-bucket rate limiters (calls per minute across all workers)
+        self.nse_rate_limiter = get_rate_limiter("market_data_api.nse", rate=30, per=60)
+        self.cbk_rate_limiter = get_rate_limiter("market_data_api.cbk", rate=30, per=60)
+        self.forex_rate_limiter = get_rate_limiter("market_data_api.forex", rate=10, per=60)
+        self.crypto_rate_limiter = get_rate_limiter("market_data_api.crypto", rate=50, per=60)
+        self.alpha_vantage_rate_limiter = get_rate_limiter("market_data_api.alpha_vantage", rate=5, per=60)
         
         # Initialize cache
-        self.cache = CacheManager(redis_client)
+        self.cache = CacheManager()
         
     def _make_request(self, url: str, headers: Dict = None, params: Dict = None, 
-                     rate_limiter: APIRateLimiter = None, cache_key: str = None, 
-                     cache_expiry: int = 3600, method: str = "GET", data: Dict = None) -> Dict:
+                     rate_limiter: RateLimiter = None, cache_key: str = None, 
+                     cache_expiry: int = 3600, method: str = "GET", data: Dict = None,
+                     data_class: Optional[str] = None) -> Dict:
         """
         Make API request with rate limiting, caching, and error handling
         
@@ -149,6 +105,7 @@ class MarketDataAPI:
             cache_expiry: Cache expiry time in seconds
             method: HTTP method (GET or POST)
             data: POST request data
+            data_class: When the data can change; adjusts cache_expiry to the NSE/CBK calendar
             
         Returns:
             JSON response data
@@ -161,14 +118,14 @@ class MarketDataAPI:
                 return cached_data
         
         # Apply rate limiting if provided
-        if rate_limiter:
-            rate_limiter.wait_if_needed()
+        if rate_limiter and not rate_limiter.acquire():
+            raise RateLimitExceeded(f"Rate limit for {rate_limiter.name} not available")
         
         try:
             if method.upper() == "GET":
-                response = requests.get(url, headers=headers, params=params, timeout=10)
+                response = http_pool.session().get(url, headers=headers, params=params, timeout=10)
             elif method.upper() == "POST":
-                response = requests.post(url, headers=headers, params=params, json=data, timeout=10)
+                response = http_pool.session().post(url, headers=headers, params=params, json=data, timeout=10)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
                 
@@ -177,7 +134,7 @@ class MarketDataAPI:
             
             # Cache response if cache_key provided
             if cache_key:
-                self.cache.set(cache_key, data, expiry_seconds=cache_expiry)
+                self.cache.set(cache_key, data, expiry_seconds=policy_ttl(cache_expiry, data_class))
                 
             return data
         except requests.exceptions.HTTPError as e:
@@ -221,7 +178,8 @@ class MarketDataAPI:
             headers=headers,
             rate_limiter=self.nse_rate_limiter,
             cache_key=cache_key,
-            cache_expiry=300  # 5 minutes
+            cache_expiry=300,  # 5 minutes
+            data_class=NSE_SESSION
         )
     
     def get_nse_index(self, index_name: str = "NSE20") -> Dict:
@@ -246,7 +204,8 @@ class MarketDataAPI:
             headers=headers,
             rate_limiter=self.nse_rate_limiter,
             cache_key=cache_key,
-            cache_expiry=300  # 5 minutes
+            cache_expiry=300,  # 5 minutes
+            data_class=NSE_SESSION
         )
     
     def get_nse_stock_historical(self, symbol: str, days: int = 30) -> Dict:
@@ -276,7 +235,8 @@ class MarketDataAPI:
             params=params,
             rate_limiter=self.alpha_vantage_rate_limiter,
             cache_key=cache_key,
-            cache_expiry=86400  # 24 hours for historical data
+            cache_expiry=86400,  # 24 hours for historical data
+            data_class=NSE_DAILY
         )
         
         # Process and filter Alpha Vantage data
@@ -319,7 +279,8 @@ class MarketDataAPI:
             headers=headers,
             rate_limiter=self.nse_rate_limiter,
             cache_key=cache_key,
-            cache_expiry=3600  # 1 hour
+            cache_expiry=3600,  # 1 hour
+            data_class=NSE_SESSION
         )
         
         # Limit results if needed
@@ -364,7 +325,8 @@ class MarketDataAPI:
                     headers=headers,
                     rate_limiter=self.cbk_rate_limiter,
                     cache_key=cache_key,
-                    cache_expiry=21600  # 6 hours
+                    cache_expiry=21600,  # 6 hours
+                    data_class=CBK_DAILY
                 )
             else:
                 logger.error("Failed to get CBK API token")
@@ -414,7 +376,8 @@ class MarketDataAPI:
                 params=params,
                 rate_limiter=self.forex_rate_limiter,
                 cache_key=cache_key,
-                cache_expiry=3600  # 1 hour
+                cache_expiry=3600,  # 1 hour
+                data_class=FOREX
             )
             
             return rates_data
@@ -775,11 +738,33 @@ class MarketDataAPI:
         Returns:
             Market summary data
         """
-        cache_key = "market:summary"
-        cached_data = self.cache.get(cache_key)
-        if cached_data:
-            return cached_data
+        try:
+            # Serve the cached summary immediately; rebuild it in the background once expired
+            return self.cache.get_stale_while_revalidate(
+                "market:summary",
+                self._build_market_summary,
+                expiry_seconds=1800,  # 30 minutes
+                max_stale_seconds=3600  # Never serve a summary more than 90 minutes old
+            )
+        except Exception as e:
+            logger.error(f"Market summary error: {e}")
+            # Return a basic fallback response
+            return {
+                "nse": {"index": 1645.28, "change": -0.5},
+                "forex": {"USD": 147.35, "EUR": 158.92, "GBP": 185.40},
+                "crypto": {"bitcoin": 3500000, "ethereum": 250000},
+                "interest_rates": {"central_bank_rate": 7.0},
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "note": "Fallback data - API connection failed"
+            }
+    
+    def _build_market_summary(self) -> Dict:
+        """
+        Build the market summary from the individual data sources
         
+        Returns:
+            Market summary data
+        """
         try:
             # Get data from various sources
             try:
@@ -848,21 +833,10 @@ class MarketDataAPI:
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
             
-            # Cache the aggregated data
-            self.cache.set(cache_key, summary, expiry_seconds=1800)  # 30 minutes
-            
             return summary
         except Exception as e:
             logger.error(f"Market summary error: {e}")
-            # Return a basic fallback response
-            return {
-                "nse": {"index": 1645.28, "change": -0.5},
-                "forex": {"USD": 147.35, "EUR": 158.92, "GBP": 185.40},
-                "crypto": {"bitcoin": 3500000, "ethereum": 250000},
-                "interest_rates": {"central_bank_rate": 7.0},
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "note": "Fallback data - API connection failed"
-            }
+            raise
     
     def get_economic_indicators(self) -> Dict:
         """
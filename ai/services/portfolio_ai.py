@@ -24,11 +24,13 @@ logger = logging.getLogger(__name__)
 # Import internal modules
 try:
     from ..services import market_data_api, risk_evaluation, sentiment_analysis
+    from ..api_integration.nse_panel import get_current_market_panel
 except ImportError:
     logger.warning("Unable to import internal modules directly. Using alternate import path.")
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from services import market_data_api, risk_evaluation, sentiment_analysis
+    from api_integration.nse_panel import get_current_market_panel
 
 
 class PortfolioAI:
@@ -468,8 +470,10 @@ class PortfolioAI:
             dict: VaR metrics
         """
         # Get historical data for all assets
-        asset_histories = {}
+        asset_histories = self._panel_returns(portfolio, days=252)
         for asset, weight in portfolio.items():
+            if asset in asset_histories:
+                continue
             try:
                 history = self.market_data.get_asset_history(
                     asset_id=asset,
@@ -522,6 +526,35 @@ class PortfolioAI:
             'interpretation': f"With {confidence_level*100}% confidence, the maximum loss over {time_horizon} days will not exceed {round(float(-var_horizon * 100), 2)}% (KES {round(float(-var_horizon * portfolio_value), 2):,})"
         }
 
+    def _panel_returns(self, portfolio, days=252):
+        """
+        Daily returns for NSE stocks held in the shared market panel, from one cross-sectional slice.
+        
+        Returns nothing when the panel is out of date, so the live asset history is used instead.
+        
+        Args:
+            portfolio (dict): Portfolio with assets and weights
+            days (int): Number of trading sessions of returns
+            
+        Returns:
+            dict: Daily return series keyed by asset
+        """
+        panel = get_current_market_panel()
+        if panel is None:
+            return {}
+        
+        symbols = {}
+        for asset in portfolio:
+            symbol = asset.split(":", 1)[1] if asset.startswith("NSE:") else asset
+            if symbol in panel:
+                symbols[asset] = symbol
+        if not symbols:
+            return {}
+        
+        start_date = panel.dates[max(len(panel.dates) - days - 1, 0)]
+        returns = panel.returns(list(symbols.values()), start_date=start_date)
+        return {asset: returns[symbol].dropna() for asset, symbol in symbols.items()}
+
     def stress_test_portfolio(self, portfolio, scenarios=None):
         """
         Perform stress testing on a portfolio under various scenarios.
@@ -19,7 +19,7 @@ from ..api_integration.cbk_api import CBKDataAPI
 from ..api_integration.mpesa_api import MPesaAPI
 from ..api_integration.crypto_api import CryptoAPI
 from ..api_integration.forex_api import ForexAPI
-from ..nlp.context_manager import ContextManager
+from ..nlp.context_manager import get_context_manager
 
 
 # Configure logging
@@ -48,7 +48,7 @@ class RecommendationEngine:
         self.market_analysis = MarketAnalysis()
         self.risk_evaluator = RiskEvaluator()
         self.sentiment_analyzer = SentimentAnalyzer()
-        self.context_manager = ContextManager()
+        self.context_manager = get_context_manager()
         
         # API integrations
         self.nse_api = NSEDataAPI()
@@ -0,0 +1,160 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Section outcomes reported in the timings
+SECTION_OK = "ok"
+SECTION_ERROR = "error"
+SECTION_SKIPPED = "skipped"  # A required dependency failed or timed out
+SECTION_TIMED_OUT = "timed_out"
+
+
+class ReportSection:
+    """
+    One node of a report graph.
+
+    The section's function receives a dict of its dependencies' results.
+    Required dependencies (`depends_on`) must succeed or the section is
+    skipped. Optional ones (`uses`) are waited for but may be missing from
+    the dict when they failed.
+    """
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any],
+                 depends_on: Optional[List[str]] = None, uses: Optional[List[str]] = None):
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on or [])
+        self.uses = list(uses or [])
+
+    @property
+    def waits_for(self) -> List[str]:
+        return self.depends_on + self.uses
+
+
+class ReportGraph:
+    """
+    Runs report sections as a dependency graph on a thread pool.
+
+    Every section whose dependencies have finished starts immediately, so
+    independent sections (each with its own upstream fetches and model work)
+    overlap. When the report deadline passes, the sections still pending are
+    reported as timed out and the results gathered so far are returned;
+    their threads finish in the background and their results are dropped.
+    """
+
+    def __init__(self, sections: List[ReportSection], max_workers: int = 8):
+        self.sections = {section.name: section for section in sections}
+        self.max_workers = max_workers
+
+        for section in sections:
+            missing = [name for name in section.waits_for if name not in self.sections]
+            if missing:
+                raise ValueError(f"Section {section.name} depends on unknown sections: {', '.join(missing)}")
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        visiting, done = set(), set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Report sections form a cycle through {name}")
+            visiting.add(name)
+            for dependency in self.sections[name].waits_for:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.sections:
+            visit(name)
+
+    def run(self, deadline: Optional[float] = None) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """
+        Run every section, honouring dependencies and the deadline.
+
+        Args:
+            deadline: Seconds the whole report may take (None waits for every section)
+
+        Returns:
+            Tuple of (results of the sections that succeeded, per-section timings
+            with status, start offset, duration and any error)
+        """
+        start = time.perf_counter()
+        results: Dict[str, Any] = {}
+        timings: Dict[str, Dict[str, Any]] = {}
+        lock = threading.Lock()
+
+        def execute(section: ReportSection, inputs: Dict[str, Any]) -> Any:
+            started = time.perf_counter()
+            with lock:
+                timings[section.name] = {"status": "running", "start_ms": round((started - start) * 1000, 1)}
+            try:
+                return section.func(inputs)
+            finally:
+                with lock:
+                    timings[section.name]["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="report-section")
+        running = {}
+        pending = dict(self.sections)
+        finished = set()
+
+        try:
+            while pending or running:
+                # Start or skip every section whose dependencies have all finished
+                for name, section in list(pending.items()):
+                    if not all(dependency in finished for dependency in section.waits_for):
+                        continue
+                    del pending[name]
+                    failed = [dependency for dependency in section.depends_on if dependency not in results]
+                    if failed:
+                        timings[name] = {"status": SECTION_SKIPPED, "error": f"Missing {', '.join(failed)}"}
+                        finished.add(name)
+                        continue
+                    inputs = {dependency: results[dependency] for dependency in section.waits_for if dependency in results}
+                    running[executor.submit(execute, section, inputs)] = name
+
+                if not running:
+                    # Nothing left to wait for (the graph is acyclic, so nothing is pending either)
+                    break
+
+                remaining = None if deadline is None else deadline - (time.perf_counter() - start)
+                if remaining is not None and remaining <= 0:
+                    break
+                done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+
+                for future in done:
+                    name = running.pop(future)
+                    finished.add(name)
+                    try:
+                        results[name] = future.result()
+                        timings[name]["status"] = SECTION_OK
+                    except Exception as e:
+                        logger.error(f"Report section {name} failed: {str(e)}")
+                        timings[name]["status"] = SECTION_ERROR
+                        timings[name]["error"] = str(e)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # Whatever is left missed the deadline
+        with lock:
+            for name in list(running.values()) + list(pending):
+                timings.setdefault(name, {})["status"] = SECTION_TIMED_OUT
+            timings = {name: dict(timings[name]) for name in self.sections}
+
+        if running or pending:
+            logger.warning(f"Report deadline of {deadline}s reached with "
+                           f"{len(running) + len(pending)} sections unfinished")
+        return results, timings
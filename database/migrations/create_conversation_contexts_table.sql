@@ -0,0 +1,25 @@
+-- Migration: Create Conversation Contexts Table
+-- Description: Stores the live conversation context (messages, entities, profile, topics) of each chatbot session.
+-- conversation_history keeps one row per exchange for analysis; this table keeps one row per session so the
+-- context manager can persist changed sessions in batches and restore them with a single query.
+
+-- Check if table already exists before creating
+IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[conversation_contexts]') AND type in (N'U'))
+BEGIN
+    CREATE TABLE [dbo].[conversation_contexts] (
+        -- Primary key and identifiers
+        [session_id] NVARCHAR(255) NOT NULL PRIMARY KEY, -- Same identifier as conversation_history.session_id
+        [user_id] NVARCHAR(255), -- User the session belongs to
+
+        -- Context
+        [context] NVARCHAR(MAX) NOT NULL, -- JSON-serialized context as written by the context manager
+        [last_updated] NVARCHAR(50), -- ISO timestamp of the last change to the context
+
+        -- Timestamps
+        [created_at] DATETIME2 DEFAULT GETDATE() -- Timestamp when the row was written
+    );
+
+    -- Indexes for efficient querying
+    CREATE INDEX [idx_conversation_contexts_user_id] ON [dbo].[conversation_contexts] ([user_id]);
+END
+GO
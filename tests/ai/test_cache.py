@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+from cache import ColumnarCodec, TieredCache
+
+NAMESPACE = "test_cache"
+
+
+@pytest.fixture
+def cache():
+    """In-process cache that never talks to Redis"""
+    tiered = TieredCache(max_entries=16)
+    tiered.configure_namespace(NAMESPACE, ttl=60, use_l2=False)
+    return tiered
+
+
+def test_get_or_set_runs_loader_once_for_concurrent_misses(cache):
+    calls = []
+    results = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"price": 27.5}
+
+    def worker():
+        results.append(cache.get_or_set(NAMESPACE, "SCOM", loader))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"price": 27.5}] * 8
+    assert cache.stats(NAMESPACE)["coalesced"] == 7
+
+
+def test_aget_or_set_runs_loader_once_for_concurrent_misses(cache):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {"price": 27.5}
+
+    async def run():
+        return await asyncio.gather(*(cache.aget_or_set(NAMESPACE, "SCOM", loader) for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert results == [{"price": 27.5}] * 5
+
+
+def test_loader_error_reaches_every_waiter(cache):
+    def loader():
+        time.sleep(0.1)
+        raise RuntimeError("upstream down")
+
+    errors = []
+
+    def worker():
+        try:
+            cache.get_or_set(NAMESPACE, "EQTY", loader)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ["upstream down"] * 4
+    assert cache.get(NAMESPACE, "EQTY") is None
+
+
+def test_falsy_results_are_not_cached(cache):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {}
+
+    assert cache.get_or_set(NAMESPACE, "KCB", loader) == {}
+    assert cache.get_or_set(NAMESPACE, "KCB", loader) == {}
+    assert len(calls) == 2
+
+
+def test_cached_values_are_copied_on_read_and_write(cache):
+    value = {"prices": [1.0, 2.0]}
+    cache.set(NAMESPACE, "EABL", value)
+    value["prices"].append(3.0)
+
+    first = cache.get(NAMESPACE, "EABL")
+    first["prices"].append(4.0)
+
+    assert cache.get(NAMESPACE, "EABL") == {"prices": [1.0, 2.0]}
+
+
+def test_entries_expire_after_ttl(cache):
+    cache.set(NAMESPACE, "BAT", {"price": 380}, ttl=0.05)
+    assert cache.get(NAMESPACE, "BAT") == {"price": 380}
+    time.sleep(0.1)
+    assert cache.get(NAMESPACE, "BAT") is None
+
+
+def test_columnar_codec_round_trips_record_lists():
+    codec = ColumnarCodec()
+    bars = [
+        {"date": f"2024-01-{day:02d}", "close": 14.5 + day, "volume": 1000 * day, "note": None}
+        for day in range(1, 31)
+    ]
+    value = {"symbol": "SCOM", "history": bars}
+
+    encoded = codec.dumps(value)
+
+    assert encoded.startswith(ColumnarCodec.MAGIC)
+    assert codec.loads(encoded) == value
+
+
+def test_columnar_codec_keeps_field_names_as_data():
+    codec = ColumnarCodec(compress=False)
+    rows = [{"a'}": 1, "__import__('os')": "x"}, {"a'}": 2, "__import__('os')": "y"}]
+
+    assert codec.loads(codec.dumps(rows)) == rows
+
+
+def test_columnar_codec_reads_json_entries():
+    assert ColumnarCodec().loads(b'{"price": 27.5}') == {"price": 27.5}
+
+
+def test_ttl_function_sees_the_loaded_value(cache):
+    seen = []
+
+    def ttl(value):
+        seen.append(value)
+        return 0.05 if value.get("partial") else 60
+
+    cache.get_or_set(NAMESPACE, "COOP", lambda: {"price": 14.2, "partial": True}, ttl=ttl)
+    time.sleep(0.1)
+
+    assert seen == [{"price": 14.2, "partial": True}]
+    assert cache.get(NAMESPACE, "COOP") is None
@@ -0,0 +1,166 @@
+import os
+import sys
+import time
+import sqlite3
+from datetime import datetime
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai')))
+
+from nlp.context_manager import ContextManager
+from nlp.context_store import SQLITE_SCHEMA, ConversationContextStore
+
+
+class FakeConnector:
+    """Connector recording each bulk call, optionally failing saves"""
+
+    def __init__(self):
+        self.saves = []
+        self.loads = []
+        self.stored = {}
+        self.fail = False
+
+    def save_conversation_contexts(self, contexts):
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        self.saves.append(sorted(contexts))
+        self.stored.update(contexts)
+
+    def load_conversation_contexts(self, session_ids):
+        self.loads.append(list(session_ids))
+        return {sid: self.stored[sid] for sid in session_ids if sid in self.stored}
+
+
+@pytest.fixture
+def connector():
+    return FakeConnector()
+
+
+@pytest.fixture
+def managers():
+    """Context managers whose flushers are stopped after the test"""
+    created = []
+
+    def make(**kwargs):
+        manager = ContextManager(**kwargs)
+        created.append(manager)
+        return manager
+
+    yield make
+    for manager in created:
+        manager.stop_write_behind(flush=False)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_dirty_sessions_are_flushed_on_interval(managers, connector):
+    manager = managers(flush_interval_seconds=0.05)
+    manager.start_write_behind(connector)
+
+    first = manager.create_session("user-1")
+    second = manager.create_session("user-2")
+
+    assert wait_for(lambda: connector.saves)
+    assert connector.saves[0] == sorted([first, second])
+    assert manager.get_dirty_session_count() == 0
+
+
+def test_full_batch_is_flushed_before_the_interval(managers, connector):
+    manager = managers(flush_interval_seconds=60, flush_batch_size=3)
+    manager.start_write_behind(connector)
+
+    sessions = [manager.create_session(f"user-{i}") for i in range(3)]
+
+    assert wait_for(lambda: connector.saves)
+    assert connector.saves == [sorted(sessions)]
+
+
+def test_batches_are_capped_at_batch_size(managers, connector):
+    manager = managers(flush_batch_size=2)
+    for i in range(5):
+        manager.create_session(f"user-{i}")
+
+    assert manager.flush_dirty_contexts(connector) == 5
+    assert [len(batch) for batch in connector.saves] == [2, 2, 1]
+
+
+def test_failed_save_marks_sessions_dirty_again(managers, connector):
+    manager = managers()
+    session_id = manager.create_session("user-1")
+    connector.fail = True
+
+    assert manager.flush_dirty_contexts(connector) == 0
+    assert manager.get_dirty_session_count() == 1
+
+    connector.fail = False
+    assert manager.flush_dirty_contexts(connector) == 1
+    assert connector.saves == [[session_id]]
+
+
+def test_expired_sessions_are_flushed_before_eviction(managers, connector):
+    manager = managers(context_expiry_minutes=0, flush_interval_seconds=60)
+    manager.start_write_behind(connector)
+    session_id = manager.create_session("user-1")
+    manager.add_message(session_id, "How do I buy Safaricom shares?", is_user_message=True)
+
+    assert manager.cleanup_expired_contexts() == 1
+
+    assert session_id not in manager.contexts
+    assert connector.stored[session_id]['messages'][0]['text'] == "How do I buy Safaricom shares?"
+
+
+def test_expired_session_is_kept_when_its_flush_fails(managers, connector):
+    manager = managers(context_expiry_minutes=0, flush_interval_seconds=60)
+    manager.start_write_behind(connector)
+    session_id = manager.create_session("user-1")
+    connector.fail = True
+
+    assert manager.cleanup_expired_contexts() == 0
+    assert session_id in manager.contexts
+    assert manager.get_dirty_session_count() == 1
+
+
+def test_sessions_are_hydrated_with_one_query(managers, connector):
+    source = managers()
+    sessions = [source.create_session(f"user-{i}") for i in range(3)]
+    source.add_message(sessions[0], "Niambie kuhusu M-Shwari", is_user_message=True)
+    source.flush_dirty_contexts(connector)
+
+    manager = managers()
+    local = manager.create_session("user-local")
+
+    assert manager.load_many_from_database(sessions + [local, "unknown"], connector) == 3
+    assert len(connector.loads) == 1
+    assert local not in connector.loads[0]
+    assert isinstance(manager.contexts[sessions[0]]['created_at'], datetime)
+    assert isinstance(manager.contexts[sessions[0]]['messages'][0]['timestamp'], datetime)
+
+
+def test_store_upserts_and_loads_contexts(tmp_path):
+    path = str(tmp_path / "contexts.db")
+    conn = sqlite3.connect(path)
+    conn.execute(SQLITE_SCHEMA)
+    conn.close()
+    store = ConversationContextStore(lambda: sqlite3.connect(path))
+
+    manager = ContextManager()
+    first = manager.create_session("user-1")
+    second = manager.create_session("user-2")
+    manager.flush_dirty_contexts(store)
+    manager.add_message(first, "What is the CBK rate?", is_user_message=True)
+    manager.flush_dirty_contexts(store)
+
+    loaded = store.load_conversation_contexts([first, second, "unknown"])
+
+    assert sorted(loaded) == sorted([first, second])
+    assert loaded[first]['messages'][0]['text'] == "What is the CBK rate?"
+    assert loaded[second]['user_id'] == "user-2"
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM conversation_contexts").fetchone()[0] == 2
+    conn.close()
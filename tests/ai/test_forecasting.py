@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import numpy as np
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai')))
+
+from services.forecasting import ForecastCache
+
+
+def last_value_fallback(data, steps):
+    return [float(data[-1])] * steps
+
+
+@pytest.fixture
+def forecasts():
+    """Forecaster cache that keeps fitted parameters in-process"""
+    cache = ForecastCache(workers=1)
+    cache.shared.configure_namespace("forecasts", use_l2=False)
+    return cache
+
+
+@pytest.fixture
+def series():
+    return 100 + np.cumsum(np.random.default_rng(3).normal(0, 1, 120))
+
+
+def wait_for_fit(forecasts, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if forecasts.get_stats()["fits"]:
+            return
+        time.sleep(0.1)
+    pytest.fail("ARIMA model was not fitted in time")
+
+
+def test_miss_reports_fallback_then_serves_fitted_model(forecasts, series):
+    key = f"test:{time.time()}"
+
+    values, from_model = forecasts.forecast_with_source(key, series, (1, 1, 1), 3, last_value_fallback)
+    assert not from_model
+    assert values == last_value_fallback(series, 3)
+
+    wait_for_fit(forecasts)
+
+    values, from_model = forecasts.forecast_with_source(key, series, (1, 1, 1), 3, last_value_fallback)
+    assert from_model
+    assert len(values) == 3
+    assert forecasts.forecast(key, series, (1, 1, 1), 3, last_value_fallback) == values
+
+
+def test_uncached_series_fits_inline(forecasts, series):
+    values, from_model = forecasts.forecast_with_source(None, series, (1, 1, 1), 3, last_value_fallback)
+
+    assert from_model
+    assert len(values) == 3
@@ -0,0 +1,117 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+import forex_api
+from cache import TieredCache
+from forex_api import ForexAPIException, ForexRateMatrix, ForexRateStore
+
+# Units per US dollar
+USD_RATES = {"KES": 129.5, "EUR": 0.92, "GBP": 0.79, "UGX": 3780.0, "TZS": 2650.0}
+
+
+@pytest.fixture
+def matrix():
+    return ForexRateMatrix("USD", USD_RATES, timestamp=1700000000, source="test")
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    """Forex cache that stays in this process"""
+    tiered = TieredCache()
+    tiered.configure_namespace("forex", use_l2=False)
+    monkeypatch.setattr(forex_api, "cache", tiered)
+    return tiered
+
+
+@pytest.mark.parametrize("from_currency, to_currency, expected", [
+    ("USD", "KES", 129.5),
+    ("KES", "USD", 1 / 129.5),
+    ("EUR", "KES", 129.5 / 0.92),
+    ("GBP", "EUR", 0.92 / 0.79),
+    ("UGX", "TZS", 2650.0 / 3780.0),
+    ("KES", "KES", 1.0),
+])
+def test_cross_rates_are_triangulated_through_the_anchor(matrix, from_currency, to_currency, expected):
+    assert matrix.rate(from_currency, to_currency) == pytest.approx(expected, rel=1e-12)
+
+
+def test_cross_rates_are_consistent(matrix):
+    assert matrix.rate("EUR", "GBP") * matrix.rate("GBP", "KES") == pytest.approx(matrix.rate("EUR", "KES"))
+    np.testing.assert_allclose(matrix.matrix * matrix.matrix.T, 1.0)
+
+
+def test_unknown_currency_raises(matrix):
+    with pytest.raises(ForexAPIException):
+        matrix.rate("KES", "XYZ")
+
+
+def test_missing_rates_are_left_out():
+    matrix = ForexRateMatrix("USD", {"KES": 129.5, "ZAR": None, "NGN": 0})
+
+    assert "KES" in matrix
+    assert "ZAR" not in matrix and "NGN" not in matrix
+
+
+def test_rates_for_skips_unknown_targets(matrix):
+    rates = matrix.rates_for("KES", ["USD", "EUR", "XYZ"])
+
+    assert sorted(rates) == ["EUR", "USD"]
+    assert rates["EUR"] == pytest.approx(0.92 / 129.5)
+
+
+def test_convert_many_with_one_pair(matrix):
+    converted = matrix.convert_many([100, 250.5, 0], "USD", "KES")
+
+    np.testing.assert_allclose(converted, [12950.0, 250.5 * 129.5, 0.0])
+
+
+def test_convert_many_with_a_pair_per_amount(matrix):
+    amounts = np.array([100.0, 1000.0, 50.0, 20000.0])
+    sources = np.array(["USD", "KES", "EUR", "UGX"])
+    targets = np.array(["KES", "USD", "GBP", "KES"])
+
+    converted = matrix.convert_many(amounts, sources, targets)
+
+    expected = [amount * matrix.rate(source, target) for amount, source, target in zip(amounts, sources, targets)]
+    np.testing.assert_allclose(converted, expected)
+
+
+def test_convert_many_rejects_unknown_codes(matrix):
+    with pytest.raises(ForexAPIException):
+        matrix.convert_many([1, 2], ["USD", "XYZ"], "KES")
+
+
+def test_matrix_round_trips_through_dict(matrix):
+    restored = ForexRateMatrix.from_dict(matrix.to_dict())
+
+    assert restored.currencies == matrix.currencies
+    np.testing.assert_allclose(restored.matrix, matrix.matrix)
+    assert restored.timestamp == matrix.timestamp
+
+
+def test_rate_store_splits_stored_and_missing_dates(shared_cache):
+    store = ForexRateStore()
+    store.merge("USD", {"2024-03-01": {"KES": 143.1, "EUR": 0.92}, "2024-03-04": {"KES": 142.8}})
+
+    found, missing = store.lookup("USD", "EUR", ["2024-03-01", "2024-03-04", "2024-03-05"])
+
+    assert found == {"2024-03-01": 0.92}
+    assert missing == ["2024-03-04", "2024-03-05"]
+
+
+def test_rate_store_merge_keeps_dates_from_other_workers(shared_cache):
+    first, second = ForexRateStore(), ForexRateStore()
+    second.lookup("USD", "KES", ["2024-03-01"])  # Loaded before the other worker stored anything
+
+    first.merge("USD", {"2024-03-01": {"KES": 143.1}})
+    second.merge("USD", {"2024-03-04": {"KES": 142.8}, "2024-03-01": {"EUR": 0.92}})
+
+    found, missing = ForexRateStore().lookup("USD", "KES", ["2024-03-01", "2024-03-04"])
+    assert found == {"2024-03-01": 143.1, "2024-03-04": 142.8}
+    assert missing == []
+    assert ForexRateStore().lookup("USD", "EUR", ["2024-03-01"])[0] == {"2024-03-01": 0.92}
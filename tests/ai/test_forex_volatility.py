@@ -0,0 +1,73 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+from forex_api import compute_volatility_analytics
+
+
+def rate_paths():
+    """Three random-walk rate series with gaps, including a leading gap and gaps near the end"""
+    rng = np.random.default_rng(7)
+    steps = rng.normal(0, 0.004, size=(3, 120))
+    rates = np.array([[129.5], [140.2], [0.0345]]) * np.exp(np.cumsum(steps, axis=1))
+    rates[0, [15, 16, 17, 100, 117]] = np.nan
+    rates[1, :5] = np.nan
+    rates[1, [60, 118]] = np.nan
+    rates[2, 90:95] = np.nan
+    return rates
+
+
+def reference(series: pd.Series, window: int) -> dict:
+    """The per-pair pandas calculation the vectorized analytics replace"""
+    returns = series.ffill().pct_change(fill_method=None).where(series.notna())
+    window_returns = returns.iloc[-window:]
+    window_rates = series.iloc[-(window + 1):]
+    first = window_rates.dropna().iloc[0]
+    last = series.ffill().iloc[-1]
+    return {
+        "volatility": window_returns.std(),
+        "average_change": window_returns.abs().mean(),
+        "max_change": window_returns.abs().max(),
+        "change": (last - first) / first,
+        "max_drawdown": (1 - window_rates / window_rates.cummax()).max(),
+        "rolling_volatility": returns.rolling(window, min_periods=2).std().to_numpy(),
+    }
+
+
+@pytest.mark.parametrize("window", [7, 30, 90])
+def test_volatility_analytics_match_pandas(window):
+    rates = rate_paths()
+
+    analytics = compute_volatility_analytics(rates, windows=(window,))[window]
+
+    for pair in range(rates.shape[0]):
+        expected = reference(pd.Series(rates[pair]), window)
+        for metric in ["volatility", "average_change", "max_change", "change", "max_drawdown"]:
+            assert analytics[metric][pair] == pytest.approx(expected[metric], rel=1e-6), (pair, metric)
+        np.testing.assert_allclose(analytics["rolling_volatility"][pair], expected["rolling_volatility"],
+                                   rtol=1e-6, equal_nan=True)
+
+
+def test_gaps_compare_with_previous_available_rate():
+    rates = np.array([[100.0, np.nan, 110.0, 99.0]])
+
+    analytics = compute_volatility_analytics(rates, windows=(3,))[3]
+
+    assert analytics["max_change"][0] == pytest.approx(0.1)
+    assert analytics["average_change"][0] == pytest.approx((0.1 + 0.1) / 2)
+    assert analytics["max_drawdown"][0] == pytest.approx(0.1)
+    assert analytics["change"][0] == pytest.approx(-0.01)
+
+
+def test_pair_without_enough_rates_gives_nan():
+    rates = np.array([[np.nan] * 9 + [129.5], [129.0 + i for i in range(10)]])
+
+    analytics = compute_volatility_analytics(rates, windows=(7,))[7]
+
+    assert np.isnan(analytics["volatility"][0])
+    assert not np.isnan(analytics["volatility"][1])
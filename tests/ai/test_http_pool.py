@@ -0,0 +1,87 @@
+import os
+import sys
+import socket
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+import http_pool
+from http_pool import DNSCache
+
+
+class Resolver:
+    """Resolver counting lookups per host"""
+
+    def __init__(self):
+        self.lookups = []
+
+    def __call__(self, host, port, family=0, type=0, proto=0, flags=0):
+        self.lookups.append(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("196.201.214.200", port))]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable monotonic clock for the cache"""
+    now = [1000.0]
+    monkeypatch.setattr(http_pool.time, "monotonic", lambda: now[0])
+    return now
+
+
+def make_cache(ttl=60, max_entries=256):
+    cache = DNSCache(ttl=ttl, max_entries=max_entries)
+    cache._resolve = Resolver()
+    return cache
+
+
+def test_lookup_is_reused_until_it_expires(clock):
+    cache = make_cache(ttl=60)
+
+    cache.getaddrinfo("api.safaricom.co.ke", 443)
+    cache.getaddrinfo("api.safaricom.co.ke", 443)
+    clock[0] += 61
+    cache.getaddrinfo("api.safaricom.co.ke", 443)
+
+    assert cache._resolve.lookups == ["api.safaricom.co.ke"] * 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_expired_lookups_are_evicted(clock):
+    cache = make_cache(ttl=60, max_entries=2)
+    cache.getaddrinfo("api.safaricom.co.ke", 443)
+    cache.getaddrinfo("cbk-bonds.p.rapidapi.com", 443)
+
+    clock[0] += 61
+    cache.getaddrinfo("exchange-rates7.p.rapidapi.com", 443)
+
+    assert len(cache) == 1
+
+
+def test_cache_never_exceeds_max_entries(clock):
+    cache = make_cache(ttl=60, max_entries=3)
+
+    for i in range(10):
+        cache.getaddrinfo(f"host-{i}.example.com", 443)
+
+    assert len(cache) == 3
+    cache.getaddrinfo("host-9.example.com", 443)
+    assert cache._resolve.lookups.count("host-9.example.com") == 1
+
+
+def test_install_and_uninstall_restore_resolver():
+    original = socket.getaddrinfo
+    cache = DNSCache(ttl=60)
+
+    cache.install()
+    try:
+        assert socket.getaddrinfo == cache.getaddrinfo
+    finally:
+        cache.uninstall()
+
+    assert socket.getaddrinfo is original
+
+
+@pytest.mark.skipif(bool(os.getenv("HTTP_DNS_CACHE_TTL")), reason="DNS cache enabled in the environment")
+def test_dns_cache_is_opt_in():
+    assert http_pool.get_http_pool().dns_cache is None
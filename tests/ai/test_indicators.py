@@ -0,0 +1,99 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+from indicators import IndicatorEngine, compute_indicators
+
+
+@pytest.fixture
+def history():
+    """60 business days of closes ending today"""
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=60)
+    rng = np.random.default_rng(7)
+    closes = 18 + np.cumsum(rng.normal(0, 0.3, len(dates)))
+    return pd.DataFrame({'date': dates, 'close': closes})
+
+
+def pandas_indicators(closes: pd.Series) -> dict:
+    """Reference values computed the way the analysis code did before the engine"""
+    delta = closes.diff()
+    gain = delta.clip(lower=0).rolling(14).mean()
+    loss = (-delta.clip(upper=0)).rolling(14).mean()
+    sma_20 = closes.rolling(20).mean()
+    std_20 = closes.rolling(20).std()
+    return {
+        'RSI': (100 - 100 / (1 + gain / loss)).iloc[-1],
+        'SMA_20': sma_20.iloc[-1],
+        'SMA_50': closes.rolling(50).mean().iloc[-1],
+        'upper_band': (sma_20 + 2 * std_20).iloc[-1],
+        'lower_band': (sma_20 - 2 * std_20).iloc[-1],
+    }
+
+
+def assert_matches_pandas(row: dict, closes: pd.Series) -> None:
+    for name, expected in pandas_indicators(closes).items():
+        assert row[name] == pytest.approx(expected), name
+
+
+def test_cold_start_matches_pandas(history):
+    row = compute_indicators(history['close'].values)
+
+    assert row['bars'] == 60
+    assert_matches_pandas(row, history['close'])
+
+
+def test_incremental_updates_match_cold_start(history):
+    engine = IndicatorEngine()
+    engine.sync('SCOM', history['close'].values[:40], history['date'].values[:40])
+    for date, close in zip(history['date'].values[40:], history['close'].values[40:]):
+        engine.update('SCOM', close, date)
+
+    assert_matches_pandas(engine.get('SCOM'), history['close'])
+
+
+def test_sync_after_a_live_quote_rebuilds_from_history(history):
+    engine = IndicatorEngine()
+    # A quote recorded before the symbol's history was ever loaded
+    engine.update('SCOM', history['close'].iloc[-1], history['date'].iloc[-1])
+
+    row = engine.sync('SCOM', history['close'].values, history['date'].values)
+
+    assert row['bars'] == 60
+    assert_matches_pandas(row, history['close'])
+
+
+def test_sync_with_longer_history_rebuilds_state(history):
+    engine = IndicatorEngine()
+    engine.sync('SCOM', history['close'].values[-10:], history['date'].values[-10:])
+
+    row = engine.sync('SCOM', history['close'].values, history['date'].values)
+
+    assert row['bars'] == 60
+    assert_matches_pandas(row, history['close'])
+
+
+def test_sync_applies_only_new_bars(history):
+    engine = IndicatorEngine()
+    engine.sync('SCOM', history['close'].values[:59], history['date'].values[:59])
+
+    row = engine.sync('SCOM', history['close'].values[-30:], history['date'].values[-30:])
+
+    assert row['bars'] == 60
+    assert_matches_pandas(row, history['close'])
+
+
+def test_same_day_quote_revises_last_bar(history):
+    engine = IndicatorEngine()
+    engine.sync('SCOM', history['close'].values, history['date'].values)
+
+    revised = history['close'].copy()
+    revised.iloc[-1] += 1.5
+    row = engine.update('SCOM', revised.iloc[-1], history['date'].iloc[-1])
+
+    assert row['bars'] == 60
+    assert_matches_pandas(row, revised)
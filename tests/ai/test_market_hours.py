@@ -0,0 +1,76 @@
+import os
+import sys
+from datetime import datetime
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+from market_hours import (
+    CBK_DAILY, FOREX, NSE_DAILY, NSE_SESSION, NSE_TIMEZONE, SETTLE_TTL,
+    is_complete, policy_ttl,
+)
+
+
+def nairobi(day, hour, minute=0):
+    """Timestamp in March 2025 (the 14th is a Friday, the 17th a Monday)"""
+    return datetime(2025, 3, day, hour, minute, tzinfo=NSE_TIMEZONE)
+
+
+def test_session_data_keeps_base_ttl_while_trading():
+    assert policy_ttl(300, NSE_SESSION, at=nairobi(12, 11)) == 300
+
+
+def test_complete_session_data_lives_until_next_open():
+    ttl = policy_ttl(300, NSE_SESSION, at=nairobi(14, 17))
+
+    assert ttl == int((nairobi(17, 9, 30) - nairobi(14, 17)).total_seconds())
+
+
+def test_incomplete_session_data_is_not_stretched_over_the_weekend():
+    assert policy_ttl(300, NSE_SESSION, at=nairobi(14, 17), complete=False) == 300
+
+
+@pytest.mark.parametrize("data_class, at", [
+    (NSE_SESSION, nairobi(14, 15, 5)),
+    (NSE_DAILY, nairobi(14, 15, 35)),
+    (CBK_DAILY, nairobi(12, 16, 1)),
+])
+def test_ttl_is_capped_just_after_a_publication(data_class, at):
+    assert policy_ttl(43200, data_class, at=at) == min(43200, SETTLE_TTL)
+
+
+def test_cbk_rates_live_until_next_publication_once_settled():
+    ttl = policy_ttl(43200, CBK_DAILY, at=nairobi(12, 18))
+
+    assert ttl == 22 * 3600
+
+
+def test_incomplete_cbk_rates_keep_base_ttl():
+    assert policy_ttl(3600, CBK_DAILY, at=nairobi(12, 18), complete=False) == 3600
+
+
+def test_incomplete_values_are_still_trimmed_before_a_publication():
+    ttl = policy_ttl(43200, CBK_DAILY, at=nairobi(12, 15, 50), complete=False)
+
+    assert ttl == 600
+
+
+def test_forex_is_stretched_only_over_the_weekend():
+    assert policy_ttl(3600, FOREX, at=nairobi(12, 3)) == 3600
+    assert policy_ttl(3600, FOREX, at=nairobi(15, 12)) == int((nairobi(17, 1) - nairobi(15, 12)).total_seconds())
+
+
+@pytest.mark.parametrize("value, expected", [
+    ({"rate": 10.5}, True),
+    ([{"symbol": "SCOM"}], True),
+    (None, False),
+    ({}, False),
+    ({"error": "upstream down"}, False),
+    ({"rate": 10.5, "partial": True}, False),
+    ({"rate": 10.5, "partial": False}, True),
+    ({"rate": 10.5, "stale": True, "data_age_seconds": 900}, False),
+    ({"rate": 10.5, "last_known_good": True}, False),
+])
+def test_is_complete(value, expected):
+    assert is_complete(value) is expected
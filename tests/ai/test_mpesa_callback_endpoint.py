@@ -0,0 +1,41 @@
+import os
+import sys
+import pytest
+from fastapi.testclient import TestClient
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+import chat_api
+
+CALLBACK = {"Body": {"stkCallback": {"CheckoutRequestID": "ws_CO_7", "ResultCode": 0, "ResultDesc": "ok"}}}
+
+
+@pytest.fixture
+def client():
+    return TestClient(chat_api.app)
+
+
+def test_callbacks_are_refused_without_a_configured_token(client, monkeypatch):
+    monkeypatch.setattr(chat_api, "MPESA_CALLBACK_TOKEN", None)
+
+    assert client.post("/api/callbacks/mpesa", json=CALLBACK).status_code == 503
+
+
+def test_callbacks_need_the_token(client, monkeypatch):
+    monkeypatch.setattr(chat_api, "MPESA_CALLBACK_TOKEN", "s3cret")
+
+    assert client.post("/api/callbacks/mpesa", json=CALLBACK).status_code == 401
+    assert client.post("/api/callbacks/mpesa?token=wrong", json=CALLBACK).status_code == 401
+
+
+def test_callback_with_token_is_processed_and_acknowledged(client, monkeypatch):
+    monkeypatch.setattr(chat_api, "MPESA_CALLBACK_TOKEN", "s3cret")
+    processed = []
+    monkeypatch.setattr(chat_api.get_mpesa_api(), "process_callback",
+                        lambda data: processed.append(data) or {"type": "stk_push"})
+
+    response = client.post("/api/callbacks/mpesa?token=s3cret", json=CALLBACK)
+
+    assert response.json() == {"ResultCode": 0, "ResultDesc": "Accepted"}
+    assert processed == [CALLBACK]
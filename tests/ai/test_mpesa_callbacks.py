@@ -0,0 +1,119 @@
+import os
+import sys
+import asyncio
+import threading
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+from mpesa_api import CALLBACK_NAMESPACE, CallbackWaiters, MpesaAPI
+import mpesa_api
+
+
+def stk_callback(checkout_request_id, result_code=0):
+    return {"Body": {"stkCallback": {
+        "MerchantRequestID": "29115-34620561-1",
+        "CheckoutRequestID": checkout_request_id,
+        "ResultCode": result_code,
+        "ResultDesc": "The service request is processed successfully.",
+    }}}
+
+
+@pytest.fixture
+def waiters(monkeypatch):
+    """Callback waiters that share callbacks through the in-process cache only"""
+    callback_waiters = CallbackWaiters()
+    callback_waiters.cache.configure_namespace(CALLBACK_NAMESPACE, use_l2=False)
+    monkeypatch.setattr(mpesa_api, "callback_waiters", callback_waiters)
+    return callback_waiters
+
+
+@pytest.fixture
+def mpesa():
+    return MpesaAPI(env="sandbox")
+
+
+def test_callback_processed_on_another_thread_resolves_waiter(waiters, mpesa):
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.1, lambda: threading.Thread(
+            target=mpesa.process_callback, args=(stk_callback("ws_CO_1"),)).start())
+        return await waiters.wait("ws_CO_1", timeout=5)
+
+    result = asyncio.run(run())
+
+    assert result["type"] == "stk_push"
+    assert result["checkout_request_id"] == "ws_CO_1"
+
+
+def test_callback_received_before_the_wait_is_returned(waiters, mpesa):
+    mpesa.process_callback(stk_callback("ws_CO_2", result_code=1032))
+
+    result = asyncio.run(waiters.wait("ws_CO_2", timeout=1))
+
+    assert result["result_code"] == 1032
+
+
+def test_wait_times_out_without_callback(waiters):
+    assert asyncio.run(waiters.wait("ws_CO_3", timeout=0.2)) is None
+
+
+def stub_status(monkeypatch, mpesa, result_code):
+    queries = []
+
+    async def acheck_stk_push_status(checkout_request_id):
+        queries.append(checkout_request_id)
+        return {"CheckoutRequestID": checkout_request_id, "ResultCode": result_code, "ResultDesc": "status"}
+
+    monkeypatch.setattr(mpesa, "acheck_stk_push_status", acheck_stk_push_status)
+    return queries
+
+
+def test_successful_callback_is_confirmed_by_status_query(waiters, mpesa, monkeypatch):
+    queries = stub_status(monkeypatch, mpesa, "0")
+    mpesa.process_callback(stk_callback("ws_CO_4"))
+
+    result = asyncio.run(mpesa.wait_for_stk_result("ws_CO_4", timeout=1))
+
+    assert queries == ["ws_CO_4"]
+    assert result["type"] == "stk_push"
+
+
+def test_unconfirmed_success_callback_is_not_returned_as_paid(waiters, mpesa, monkeypatch):
+    stub_status(monkeypatch, mpesa, "1032")
+    mpesa.process_callback(stk_callback("ws_CO_5"))
+
+    result = asyncio.run(mpesa.wait_for_stk_result("ws_CO_5", timeout=1))
+
+    assert result["ResultCode"] == "1032"
+
+
+def test_failed_callback_needs_no_status_query(waiters, mpesa, monkeypatch):
+    queries = stub_status(monkeypatch, mpesa, "0")
+    mpesa.process_callback(stk_callback("ws_CO_6", result_code=1032))
+
+    result = asyncio.run(mpesa.wait_for_stk_result("ws_CO_6", timeout=1))
+
+    assert queries == []
+    assert result["result_code"] == 1032
+
+
+def test_auth_token_request_uses_pooled_session_with_timeout(mpesa, monkeypatch):
+    calls = []
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {"access_token": "token", "expires_in": "3599"}
+
+    class Session:
+        def get(self, url, **kwargs):
+            calls.append(kwargs)
+            return Response()
+
+    monkeypatch.setattr(mpesa_api.http_pool, "session", lambda: Session())
+
+    assert mpesa._request_auth_token()["access_token"] == "token"
+    assert calls[0]["timeout"] == mpesa_api.MPESA_REQUEST_TIMEOUT
@@ -0,0 +1,170 @@
+import os
+import sys
+import uuid
+from datetime import date
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+import nse_panel
+from nse_panel import (
+    PANEL_FIELDS, PANEL_HEADER, PANEL_HEADER_SIZE, PANEL_MAGIC,
+    NSEMarketPanel, _attach_when_ready, _build_segment, _layout,
+)
+from nse_store import NSEHistoricalStore, build_store
+
+HEADER = "DATE,CODE,NAME,12m Low,12m High,Day Low,Day High,Day Price,Previous,Change,Change%,Volume,Adjusted Price"
+
+# Closing prices per export; None marks a day the symbol did not trade
+CLOSES = {
+    "2023": {
+        "27-Dec-2023": {"SCOM": 13.50, "EQTY": 34.10, "KCB": 21.25},
+        "28-Dec-2023": {"SCOM": 13.65, "EQTY": 34.40, "KCB": 21.40},
+        "29-Dec-2023": {"SCOM": 13.80, "EQTY": 34.00, "KCB": None},
+    },
+    "2024": {
+        "02-Jan-2024": {"SCOM": 13.95, "EQTY": 34.75, "KCB": 21.55},
+        "03-Jan-2024": {"SCOM": 14.10, "EQTY": 35.00, "KCB": None},
+        "04-Jan-2024": {"SCOM": 14.05, "EQTY": None, "KCB": 21.80},
+        "05-Jan-2024": {"SCOM": 14.20, "EQTY": 35.10, "KCB": 21.95},
+    },
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    """NSE store built from a two-file CSV fixture"""
+    csv_dir = tmp_path / "csv"
+    csv_dir.mkdir()
+    for label, days in CLOSES.items():
+        lines = [HEADER]
+        for day, closes in days.items():
+            for code, close in closes.items():
+                if close is not None:
+                    lines.append(f"{day},{code},{code} Plc,{close - 2:.2f},{close + 2:.2f},{close - 0.1:.2f},"
+                                 f"{close + 0.1:.2f},{close:.2f},{close:.2f},0.00,0.00%,{int(close * 1000)},{close:.2f}")
+        (csv_dir / f"NSE_data_all_stocks_{label}.csv").write_text("\n".join(lines) + "\n")
+
+    build_store(str(csv_dir), str(tmp_path / "nse_store"))
+    return NSEHistoricalStore(str(tmp_path / "nse_store"))
+
+
+@pytest.fixture
+def panel(store):
+    """Panel built into a uniquely named segment, unlinked after the test"""
+    built = NSEMarketPanel(_build_segment(f"pgtest_{uuid.uuid4().hex[:12]}", store), owner=True)
+    yield built
+    built.release(unlink=True)
+
+
+def test_layout_blocks_are_aligned_and_disjoint():
+    layout = _layout(n_dates=7, n_symbols=3, meta_len=45)
+
+    assert layout['dates'] == 112
+    starts = [layout['dates']] + [layout[field] for field in PANEL_FIELDS]
+    sizes = [7 * 8] + [7 * 3 * 4] * len(PANEL_FIELDS)
+    assert all(start % 8 == 0 for start in starts)
+    assert all(start + size <= following for start, size, following in zip(starts, sizes, starts[1:]))
+    assert layout['size'] == starts[-1] + sizes[-1]
+
+
+def test_segment_holds_every_store_row(panel, store):
+    assert panel.symbols == ["EQTY", "KCB", "SCOM"]
+    assert list(panel.dates.astype(str)) == ["2023-12-27", "2023-12-28", "2023-12-29",
+                                             "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+    assert panel.close.shape == (7, 3)
+    assert np.count_nonzero(~np.isnan(panel.close)) == store.index["rows"]
+    assert not panel.close.flags.writeable
+
+
+def test_unready_segment_is_rejected(monkeypatch):
+    name = f"pgtest_{uuid.uuid4().hex[:12]}"
+    shm = shared_memory.SharedMemory(name=name, create=True, size=PANEL_HEADER_SIZE)
+    try:
+        PANEL_HEADER.pack_into(shm.buf, 0, PANEL_MAGIC, 0, 0, 0, 0)
+
+        with pytest.raises(ValueError):
+            NSEMarketPanel(shm)
+
+        monkeypatch.setattr(nse_panel, "PANEL_ATTACH_TIMEOUT", 0.1)
+        assert _attach_when_ready(name) is None
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_ready_segment_is_attached(panel):
+    attached = _attach_when_ready(panel.name)
+    try:
+        assert attached.symbols == panel.symbols
+        np.testing.assert_array_equal(attached.close, panel.close)
+    finally:
+        attached.release()
+
+
+@pytest.mark.parametrize("symbol, start, end", [
+    ("SCOM", None, None),
+    ("KCB", "2023-12-28", "2024-01-04"),
+    ("EQTY", "2024-01-01", None),
+])
+def test_history_matches_store(panel, store, symbol, start, end):
+    history = panel.history(symbol, start, end)
+    loaded = store.load(symbol, start_date=start, end_date=end)
+
+    assert list(history["date"]) == list(loaded["date"])
+    np.testing.assert_allclose(history["close"], loaded["day_price"], rtol=1e-6)
+    np.testing.assert_allclose(history["volume"], loaded["volume"], rtol=1e-6)
+
+
+def test_history_of_unknown_or_idle_symbol_is_none(panel):
+    assert panel.history("XXXX") is None
+    assert panel.history("KCB", "2023-12-29", "2023-12-29") is None
+
+
+def test_returns_carry_closes_over_gaps(panel, store):
+    returns = panel.returns(["KCB", "EQTY"], start_date="2023-12-28")
+
+    dates = pd.DatetimeIndex(panel.dates.astype("datetime64[ns]"))
+    closes = pd.DataFrame({
+        symbol: store.load(symbol).set_index("date")["day_price"].reindex(dates) for symbol in ["KCB", "EQTY"]
+    }).loc["2023-12-28":]
+    expected = closes.ffill().pct_change(fill_method=None).iloc[1:]
+
+    assert list(returns.columns) == ["KCB", "EQTY"]
+    assert list(returns.index) == list(expected.index)
+    # Panel closes are float32
+    np.testing.assert_allclose(returns.to_numpy(), expected.to_numpy(), atol=1e-6)
+    assert returns.loc["2023-12-29", "KCB"] == 0.0
+
+
+def test_values_slice_rows_and_symbols(panel):
+    values = panel.values("close", ["SCOM"], "2024-01-02", "2024-01-03")
+
+    np.testing.assert_allclose(values[:, 0], [13.95, 14.10], rtol=1e-6)
+
+
+@pytest.mark.parametrize("today, behind", [
+    (date(2024, 1, 5), 0),   # Same day as the last session
+    (date(2024, 1, 8), 0),   # Monday after; the weekend is not a session
+    (date(2024, 1, 10), 2),  # Monday and Tuesday missing
+    (date(2024, 1, 11), 3),
+])
+def test_sessions_behind_counts_trading_days(panel, today, behind):
+    assert panel.as_of == date(2024, 1, 5)
+    assert panel.sessions_behind(today) == behind
+    assert panel.is_current(2, today) is (behind <= 2)
+
+
+def test_sessions_behind_stops_at_limit(panel):
+    assert panel.sessions_behind(date(2024, 12, 31), limit=5) == 5
+
+
+def test_stale_panel_is_not_served_as_current(panel, monkeypatch):
+    monkeypatch.setattr(nse_panel, "get_market_panel", lambda: panel)
+
+    assert nse_panel.get_current_market_panel() is None
+    assert nse_panel.get_current_market_panel(max_lag_sessions=1000) is panel
@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+import nse_api
+from nse_store import NSEHistoricalStore, build_store
+
+HEADER = "DATE,CODE,NAME,12m Low,12m High,Day Low,Day High,Day Price,Previous,Change,Change%,Volume,Adjusted Price"
+
+# Two yearly exports; KCB did not trade on 3 Jan 2024
+EXPORTS = {
+    "2023": [
+        ("27-Dec-2023", "SCOM", "Safaricom Plc", 13.50, 1200000),
+        ("27-Dec-2023", "EQTY", "Equity Group Holdings", 34.10, 350000),
+        ("27-Dec-2023", "KCB", "KCB Group Plc", 21.25, 410000),
+        ("28-Dec-2023", "SCOM", "Safaricom Plc", 13.65, 980000),
+        ("28-Dec-2023", "EQTY", "Equity Group Holdings", 34.40, 290000),
+        ("28-Dec-2023", "KCB", "KCB Group Plc", 21.40, 385000),
+        ("29-Dec-2023", "SCOM", "Safaricom Plc", 13.80, 1500000),
+        ("29-Dec-2023", "EQTY", "Equity Group Holdings", 34.00, 310000),
+        ("29-Dec-2023", "KCB", "KCB Group Plc", 21.10, 402000),
+    ],
+    "2024": [
+        ("02-Jan-2024", "SCOM", "Safaricom Plc", 13.95, 1100000),
+        ("02-Jan-2024", "EQTY", "Equity Group Holdings", 34.75, 275000),
+        ("02-Jan-2024", "KCB", "KCB Group Plc", 21.55, 365000),
+        ("03-Jan-2024", "SCOM", "Safaricom Plc", 14.10, 1250000),
+        ("03-Jan-2024", "EQTY", "Equity Group Holdings", 35.00, 330000),
+        ("04-Jan-2024", "SCOM", "Safaricom Plc", 14.05, 905000),
+        ("04-Jan-2024", "EQTY", "Equity Group Holdings", 35.20, 298000),
+        ("04-Jan-2024", "KCB", "KCB Group Plc", 21.80, 415000),
+        ("05-Jan-2024", "SCOM", "Safaricom Plc", 14.20, 1320000),
+        ("05-Jan-2024", "EQTY", "Equity Group Holdings", 35.10, 305000),
+        ("05-Jan-2024", "KCB", "KCB Group Plc", 21.95, 388000),
+    ],
+}
+
+
+def write_export(csv_dir, label, rows):
+    lines = [HEADER]
+    for day, code, name, price, volume in rows:
+        lines.append(f"{day},{code},{name},{price - 2:.2f},{price + 2:.2f},{price - 0.1:.2f},"
+                     f"{price + 0.1:.2f},{price:.2f},{price - 0.05:.2f},0.05,0.36%,{volume},{price:.2f}")
+    (csv_dir / f"NSE_data_all_stocks_{label}.csv").write_text("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    """Directory holding the two-file CSV fixture"""
+    directory = tmp_path / "csv"
+    directory.mkdir()
+    for label, rows in EXPORTS.items():
+        write_export(directory, label, rows)
+    return directory
+
+
+@pytest.fixture
+def store(csv_dir, tmp_path):
+    store_dir = str(tmp_path / "nse_store")
+    build_store(str(csv_dir), store_dir)
+    return NSEHistoricalStore(store_dir)
+
+
+@pytest.fixture
+def from_csv(csv_dir, monkeypatch):
+    """fetch_local_historical_data forced onto its CSV path"""
+    monkeypatch.setattr(nse_api, "get_historical_store", lambda: None)
+    monkeypatch.setattr(nse_api, "NSE_DATA_DIR", str(csv_dir))
+    return nse_api.fetch_local_historical_data
+
+
+def test_index_records_contiguous_symbol_slices(store):
+    symbols = store.symbols
+
+    assert sorted(symbols) == ["EQTY", "KCB", "SCOM"]
+    assert [symbols[s]["offset"] for s in ["EQTY", "KCB", "SCOM"]] == [0, 7, 13]
+    assert [symbols[s]["length"] for s in ["EQTY", "KCB", "SCOM"]] == [7, 6, 7]
+    assert symbols["KCB"]["first_date"] == "2023-12-27"
+    assert symbols["KCB"]["last_date"] == "2024-01-05"
+    assert store.index["rows"] == 20
+
+    kcb = slice(symbols["KCB"]["offset"], symbols["KCB"]["offset"] + symbols["KCB"]["length"])
+    assert list(np.asarray(store.column("date"))[kcb].astype(str)) == [
+        "2023-12-27", "2023-12-28", "2023-12-29", "2024-01-02", "2024-01-04", "2024-01-05"]
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    ("2023-12-28", "2024-01-02", ["2023-12-28", "2023-12-29", "2024-01-02"]),
+    ("2023-12-30", "2024-01-01", None),
+    ("2024-01-03", None, ["2024-01-04", "2024-01-05"]),
+    (None, "2023-12-27", ["2023-12-27"]),
+])
+def test_date_range_is_inclusive(store, start, end, expected):
+    frame = store.load("KCB", start_date=start, end_date=end)
+
+    if expected is None:
+        assert frame is None
+    else:
+        assert list(frame["date"].dt.strftime("%Y-%m-%d")) == expected
+
+
+def test_include_source_labels_rows_with_their_export(store):
+    frame = store.load("SCOM", include_source=True)
+
+    assert list(frame["year"]) == ["2023"] * 3 + ["2024"] * 4
+
+
+def test_load_matches_csv_path(store, from_csv):
+    for symbol in ["SCOM", "EQTY", "KCB"]:
+        expected = from_csv(symbol).reset_index(drop=True)
+        loaded = store.load(symbol, include_source=True)
+
+        assert list(loaded["date"]) == list(expected["date"])
+        assert list(loaded["year"]) == list(expected["year"].astype(str))
+        for column in ["day_price", "day_low", "day_high", "volume", "adjusted_price"]:
+            np.testing.assert_allclose(loaded[column].to_numpy(), expected[column].astype(float).to_numpy())
+
+
+def test_year_request_matches_csv_path(store, from_csv):
+    expected = from_csv("EQTY", year="2024").reset_index(drop=True)
+    loaded = store.load("EQTY", start_date="2024-01-01", end_date="2024-12-31")
+
+    assert list(loaded["date"]) == list(expected["date"])
+    np.testing.assert_allclose(loaded["day_price"].to_numpy(), expected["day_price"].to_numpy())
+
+
+def test_unknown_symbol_is_none(store):
+    assert store.load("XXXX") is None
+
+
+def test_export_formats_are_parsed(tmp_path):
+    csv_dir = tmp_path / "csv"
+    csv_dir.mkdir()
+    (csv_dir / "NSE_data_all_stocks_2013.csv").write_text(
+        "DATE,CODE,NAME,12m Low,12m High,Day Low,Day High,Day Price,Previous,Change,Change%,Volume,Adjust\n"
+        '2-Jan-13,BAT,British American Tobacco,"1,250.00","1,900.00","1,880.00","1,910.00","1,900.00","1,890.00",10.00,0.53%,"12,500","1,900.00"\n'
+        "3-Jan-13,BAT,British American Tobacco,-,-,-,-,-,-,-,-,-,-\n"
+    )
+    build_store(str(csv_dir), str(tmp_path / "nse_store"))
+
+    frame = NSEHistoricalStore(str(tmp_path / "nse_store")).load("BAT")
+
+    assert list(frame["date"].dt.strftime("%Y-%m-%d")) == ["2013-01-02", "2013-01-03"]
+    assert frame["day_price"].iloc[0] == 1900.0
+    assert frame["change%"].iloc[0] == 0.53
+    assert frame["volume"].iloc[0] == 12500
+    assert frame["adjusted_price"].iloc[0] == 1900.0
+    assert frame.iloc[1][["day_price", "volume"]].isna().all()
+
+
+def test_later_export_wins_on_overlap(csv_dir, tmp_path):
+    write_export(csv_dir, "2024_revised", [("05-Jan-2024", "KCB", "KCB Group Plc", 22.05, 390000)])
+    build_store(str(csv_dir), str(tmp_path / "nse_store"))
+
+    frame = NSEHistoricalStore(str(tmp_path / "nse_store")).load("KCB", start_date="2024-01-05", include_source=True)
+
+    assert list(frame["day_price"]) == [22.05]
+    assert list(frame["year"]) == ["2024_revised"]
+
+
+def test_store_goes_stale_when_exports_change(store, csv_dir):
+    assert not store.is_stale(str(csv_dir))
+
+    write_export(csv_dir, "2025", [("02-Jan-2025", "SCOM", "Safaricom Plc", 17.00, 1000000)])
+
+    assert store.is_stale(str(csv_dir))
+
+
+def test_unsupported_version_is_not_opened(store):
+    index_path = os.path.join(store.store_dir, "index.json")
+    with open(index_path) as f:
+        index = json.load(f)
+    index["version"] = 99
+    with open(index_path, "w") as f:
+        json.dump(index, f)
+
+    assert NSEHistoricalStore.open(store.store_dir) is None
+
+
+def test_loaded_frame_is_a_dataframe_sorted_by_date(store):
+    frame = store.load("EQTY")
+
+    assert isinstance(frame, pd.DataFrame)
+    assert frame["date"].is_monotonic_increasing
+    assert set(frame["code"]) == {"EQTY"}
+    assert set(frame["name"]) == {"Equity Group Holdings"}
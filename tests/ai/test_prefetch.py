@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import asyncio
+from datetime import datetime
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+from cache import TieredCache
+from market_hours import NSE_TIMEZONE
+from prefetch import CachePrefetcher
+
+
+def nairobi(day, hour, minute=0):
+    """Timestamp in March 2025 (the 14th is a Friday, the 17th a Monday)"""
+    return datetime(2025, 3, day, hour, minute, tzinfo=NSE_TIMEZONE)
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "prefetch_config.json"
+    path.write_text(json.dumps({
+        "global_settings": {"pre_open_minutes": 15},
+        "prefetch_jobs": [
+            {
+                "id": "top_stock_prices",
+                "task": "stock_prices",
+                "schedule": {"market_hours_interval_minutes": 15, "off_hours_interval_minutes": 1440,
+                             "warm_before_open": True},
+                "parameters": {"symbols": ["SCOM", "EQTY"]},
+            },
+            {
+                "id": "cbk_rates",
+                "task": "cbk_rates",
+                "schedule": {"market_hours_interval_minutes": 15, "off_hours_interval_minutes": 1440,
+                             "warm_before_open": False},
+            },
+        ],
+    }))
+    return str(path)
+
+
+@pytest.fixture
+def shared_cache():
+    """Cache shared by the workers of one test, kept in this process"""
+    tiered = TieredCache()
+    tiered.configure_namespace("prefetch", use_l2=False)
+    return tiered
+
+
+@pytest.fixture
+def workers(config_path, shared_cache):
+    """Prefetchers standing in for separate workers that share the cache"""
+    calls = []
+
+    def make():
+        async def warm(parameters):
+            calls.append(parameters)
+            return len(parameters.get("symbols", [])) or 1
+
+        prefetcher = CachePrefetcher({"stock_prices": warm, "cbk_rates": warm}, namespaces=["nse"],
+                                     config_path=config_path)
+        prefetcher.cache = shared_cache
+        prefetcher.calls = calls
+        return prefetcher
+
+    return make
+
+
+def run(prefetcher, now):
+    return asyncio.run(prefetcher.run_due(now=now))
+
+
+def test_every_job_runs_first_time(workers):
+    assert run(workers(), nairobi(17, 11)) == ["top_stock_prices", "cbk_rates"]
+
+
+def test_jobs_follow_the_market_hours_interval(workers):
+    prefetcher = workers()
+    run(prefetcher, nairobi(17, 11))
+
+    assert run(prefetcher, nairobi(17, 11, 10)) == []
+    assert run(prefetcher, nairobi(17, 11, 15)) == ["top_stock_prices", "cbk_rates"]
+
+
+def test_warm_up_runs_shortly_before_the_open(workers):
+    prefetcher = workers()
+    run(prefetcher, nairobi(16, 12))  # Sunday; the off-hours interval is a day
+
+    assert run(prefetcher, nairobi(17, 9, 10)) == []
+    assert run(prefetcher, nairobi(17, 9, 16)) == ["top_stock_prices"]
+    assert run(prefetcher, nairobi(17, 9, 20)) == []
+
+
+def test_warm_up_waits_for_the_next_trading_day(workers):
+    prefetcher = workers()
+    run(prefetcher, nairobi(14, 16))  # Friday after the close
+
+    assert run(prefetcher, nairobi(15, 9, 20)) == []  # Saturday: no session to warm for
+
+
+def test_job_run_by_another_worker_is_skipped(workers):
+    first, second = workers(), workers()
+    run(first, nairobi(17, 11))
+    calls = len(first.calls)
+
+    assert run(second, nairobi(17, 11, 1)) == []
+    assert len(second.calls) == calls
+    assert second.get_stats()["jobs"]["top_stock_prices"]["skipped"] == 1
+
+    # Once half the interval has passed since the other worker's run, it runs again
+    assert run(second, nairobi(17, 11, 17)) == ["top_stock_prices", "cbk_rates"]
+
+
+def test_pre_open_skip_ignores_runs_before_the_warm_up_point(workers):
+    first, second = workers(), workers()
+    run(first, nairobi(16, 12))  # Sunday run, before Monday's warm-up point
+
+    assert "top_stock_prices" in run(second, nairobi(17, 9, 16))
+    assert run(first, nairobi(17, 9, 17)) == []
+    assert first.get_stats()["jobs"]["top_stock_prices"]["skipped"] == 1
+
+
+def test_failing_task_is_counted_and_retried_on_schedule(workers):
+    prefetcher = workers()
+
+    async def broken(parameters):
+        raise ConnectionError("NSE API unreachable")
+
+    prefetcher.tasks["stock_prices"] = broken
+
+    assert "top_stock_prices" in run(prefetcher, nairobi(17, 11))
+    stats = prefetcher.get_stats()["jobs"]["top_stock_prices"]
+    assert stats["errors"] == 1
+    assert stats["last_error"] == "NSE API unreachable"
+    assert run(prefetcher, nairobi(17, 11, 5)) == []
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import asyncio
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+import rate_limit
+from rate_limit import RateLimiter, TokenBucket, get_rate_limiter
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """Limiter that never reaches Redis, so it enforces its in-process bucket"""
+    monkeypatch.setattr(RateLimiter, "_get_redis", lambda self: None)
+    return RateLimiter("test", rate=2, per=1.0)
+
+
+def test_token_bucket_grants_burst_then_reports_wait():
+    bucket = TokenBucket(capacity=2, rate=1.0)
+
+    assert bucket.take() == (True, 0.0)
+    assert bucket.take() == (True, 0.0)
+    granted, wait = bucket.take()
+    assert not granted
+    assert 0 < wait <= 1.0
+
+
+def test_try_acquire_denies_once_bucket_is_empty(limiter):
+    assert limiter.try_acquire()
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+    stats = limiter.stats()
+    assert stats["backend"] == "local"
+    assert stats["granted"] == 2
+    assert stats["denied"] == 1
+
+
+def test_acquire_waits_for_refill(limiter):
+    limiter.try_acquire(2)
+
+    started = time.monotonic()
+    assert limiter.acquire(timeout=2)
+    assert time.monotonic() - started >= 0.4
+
+
+def test_acquire_returns_false_when_timeout_is_too_short(limiter):
+    limiter.try_acquire(2)
+
+    assert not limiter.acquire(timeout=0.1)
+    assert limiter.stats()["timeouts"] == 1
+
+
+def test_aacquire_waits_without_blocking_the_loop(limiter):
+    limiter.try_acquire(2)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.05)
+
+    async def acquire():
+        acquired = await limiter.aacquire(timeout=2)
+        return acquired, time.monotonic()
+
+    async def run():
+        return await asyncio.gather(acquire(), ticker())
+
+    (acquired, acquired_at), _ = asyncio.run(run())
+
+    assert acquired
+    # The ticker kept running while aacquire() waited for a token
+    assert ticks[-1] < acquired_at
+
+
+def test_get_rate_limiter_shares_one_limiter_per_name(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    monkeypatch.setenv("TEST_SHARED_RATE_LIMIT", "7")
+
+    first = get_rate_limiter("test.shared", rate=1, per=1)
+    second = get_rate_limiter("test.shared", rate=100, per=1)
+
+    assert first is second
+    assert first.capacity == 7
@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+import threading
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/services')))
+
+from report_graph import (
+    SECTION_ERROR, SECTION_OK, SECTION_SKIPPED, SECTION_TIMED_OUT,
+    ReportGraph, ReportSection,
+)
+
+
+@pytest.fixture
+def release():
+    """Event letting sections that missed the deadline finish after the test"""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def sleeper(seconds, value):
+    def section(inputs):
+        time.sleep(seconds)
+        return value
+    return section
+
+
+def failing(inputs):
+    raise ConnectionError("CBK API unreachable")
+
+
+def test_independent_sections_overlap():
+    graph = ReportGraph([
+        ReportSection("nse", sleeper(0.2, "nse")),
+        ReportSection("cbk", sleeper(0.2, "cbk")),
+        ReportSection("forex", sleeper(0.2, "forex")),
+    ])
+
+    started = time.perf_counter()
+    results, timings = graph.run()
+
+    assert time.perf_counter() - started < 0.5
+    assert results == {"nse": "nse", "cbk": "cbk", "forex": "forex"}
+    assert {timing["status"] for timing in timings.values()} == {SECTION_OK}
+
+
+def test_sections_receive_their_dependencies_results():
+    graph = ReportGraph([
+        ReportSection("prices", lambda inputs: {"SCOM": 14.2}),
+        ReportSection("rates", lambda inputs: {"cbr": 10.75}),
+        ReportSection("summary", lambda inputs: sorted(inputs), depends_on=["prices"], uses=["rates"]),
+    ])
+
+    results, _ = graph.run()
+
+    assert results["summary"] == ["prices", "rates"]
+
+
+def test_deadline_returns_partial_results(release):
+    graph = ReportGraph([
+        ReportSection("prices", lambda inputs: {"SCOM": 14.2}),
+        ReportSection("news", lambda inputs: release.wait(5)),
+        ReportSection("sentiment", lambda inputs: "neutral", depends_on=["news"]),
+    ])
+
+    started = time.perf_counter()
+    results, timings = graph.run(deadline=0.2)
+
+    assert time.perf_counter() - started < 1.0
+    assert results == {"prices": {"SCOM": 14.2}}
+    assert timings["prices"]["status"] == SECTION_OK
+    assert timings["news"]["status"] == SECTION_TIMED_OUT
+    assert "start_ms" in timings["news"]
+    # Never started because its dependency was still running
+    assert timings["sentiment"] == {"status": SECTION_TIMED_OUT}
+
+
+def test_failed_section_skips_required_dependents_only():
+    graph = ReportGraph([
+        ReportSection("cbk", failing),
+        ReportSection("prices", lambda inputs: {"SCOM": 14.2}),
+        ReportSection("bonds", lambda inputs: "bonds", depends_on=["cbk"]),
+        ReportSection("summary", lambda inputs: sorted(inputs), depends_on=["prices"], uses=["cbk"]),
+    ])
+
+    results, timings = graph.run(deadline=5)
+
+    assert timings["cbk"]["status"] == SECTION_ERROR
+    assert timings["cbk"]["error"] == "CBK API unreachable"
+    assert timings["bonds"] == {"status": SECTION_SKIPPED, "error": "Missing cbk"}
+    assert results["summary"] == ["prices"]
+    assert "bonds" not in results and "cbk" not in results
+
+
+def test_timings_record_every_section_in_order():
+    graph = ReportGraph([
+        ReportSection("first", sleeper(0.05, 1)),
+        ReportSection("second", sleeper(0.05, 2), depends_on=["first"]),
+    ])
+
+    _, timings = graph.run()
+
+    assert list(timings) == ["first", "second"]
+    # Allow for the 0.1ms rounding of each figure
+    assert timings["second"]["start_ms"] >= timings["first"]["start_ms"] + timings["first"]["duration_ms"] - 0.2
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        ReportGraph([ReportSection("summary", lambda inputs: None, depends_on=["missing"])])
+
+
+def test_cycle_is_rejected():
+    with pytest.raises(ValueError):
+        ReportGraph([
+            ReportSection("a", lambda inputs: None, depends_on=["b"]),
+            ReportSection("b", lambda inputs: None, uses=["a"]),
+        ])
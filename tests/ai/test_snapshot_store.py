@@ -0,0 +1,92 @@
+import os
+import sys
+import asyncio
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+from snapshot_store import SnapshotStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Store writing into a temporary directory"""
+    return SnapshotStore(directory=str(tmp_path), retry_seconds=60)
+
+
+def failing_fetch():
+    raise ConnectionError("CBK API unreachable")
+
+
+def test_good_response_is_saved_and_returned(store):
+    data = store.fetch("cbk", "rates", lambda: {"central_bank_rate": 10.5})
+
+    assert data == {"central_bank_rate": 10.5}
+    assert store.load("cbk", "rates")[0] == data
+    assert store.get_stats()["saved"] == 1
+
+
+def test_failure_serves_marked_snapshot(store):
+    store.save("cbk", "rates", {"central_bank_rate": 10.5})
+
+    served = store.fetch("cbk", "rates", failing_fetch)
+
+    assert served["central_bank_rate"] == 10.5
+    assert served["stale"] is True
+    assert served["last_known_good"] is True
+    assert served["data_age_seconds"] >= 0
+
+
+def test_failure_without_snapshot_raises(store):
+    with pytest.raises(ConnectionError):
+        store.fetch("cbk", "rates", failing_fetch)
+
+
+def test_error_response_is_not_saved(store):
+    data = store.fetch("cbk", "rates", lambda: {"error": "maintenance"})
+
+    assert data == {"error": "maintenance"}
+    assert store.load("cbk", "rates") is None
+    assert store.is_down("cbk")
+
+
+def test_source_is_skipped_while_down(store):
+    store.save("cbk", "rates", {"central_bank_rate": 10.5})
+    store.fetch("cbk", "rates", failing_fetch)
+    calls = []
+
+    served = store.fetch("cbk", "rates", lambda: calls.append(1) or {"central_bank_rate": 10.75})
+
+    assert calls == []
+    assert served["last_known_good"] is True
+    assert store.get_stats()["skipped_calls"] == 1
+
+
+def test_unchanged_response_is_not_rewritten(store):
+    store.save("cbk", "rates", {"central_bank_rate": 10.5})
+    store.save("cbk", "rates", {"central_bank_rate": 10.5})
+    store.save("cbk", "rates", {"central_bank_rate": 10.75})
+
+    assert store.get_stats()["saved"] == 2
+    assert store.load("cbk", "rates")[0] == {"central_bank_rate": 10.75}
+
+
+def test_unreadable_snapshot_is_ignored(store):
+    store.save("cbk", "rates", {"central_bank_rate": 10.5})
+    with open(store._path("cbk", "rates"), "w") as f:
+        f.write("{not json")
+
+    assert store.load("cbk", "rates") is None
+
+
+def test_afetch_serves_snapshot_on_failure(store):
+    store.save("cbk", "rates", {"central_bank_rate": 10.5})
+
+    async def failing():
+        raise ConnectionError("CBK API unreachable")
+
+    served = asyncio.run(store.afetch("cbk", "rates", failing))
+
+    assert served["last_known_good"] is True
+    assert asyncio.run(store.aserve_if_down("cbk", "rates"))["central_bank_rate"] == 10.5
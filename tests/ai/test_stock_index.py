@@ -0,0 +1,54 @@
+import os
+import sys
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+import stock_index
+from stock_index import STOCK_ALIASES, StockSearchIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    """Index built from the sector CSVs shipped with the repository"""
+    return StockSearchIndex.from_sector_files(stock_index.SHIPPED_SECTOR_DIR)
+
+
+@pytest.mark.parametrize("text, symbol", [
+    ("how is safaricom doing", "SCOM"),
+    ("how is KQ doing", "KQ"),
+    ("BAT shares today", "BAT"),
+    ("bei ya hisa za kenya airways", "KQ"),
+])
+def test_resolve_finds_mentioned_stock(index, text, symbol):
+    assert index.resolve(text) == symbol
+
+
+@pytest.mark.parametrize("text", [
+    "how is kq doing",
+    "what is the total value",
+    "how is bat doing",
+])
+def test_resolve_ignores_everyday_words(index, text):
+    assert index.resolve(text) is None
+
+
+def test_search_completes_prefixes_and_misspellings(index):
+    assert index.search("safari")[0]["symbol"] == "SCOM"
+    assert index.search("safricom")[0]["symbol"] == "SCOM"
+
+
+def test_missing_sector_files_fall_back_to_known_aliases(tmp_path, monkeypatch):
+    monkeypatch.setattr(stock_index, "SHIPPED_SECTOR_DIR", str(tmp_path / "missing"))
+
+    fallback = StockSearchIndex.from_sector_files(str(tmp_path))
+
+    assert len(fallback) == len(STOCK_ALIASES)
+    assert fallback.resolve("how is safaricom doing") == "SCOM"
+
+
+def test_resolve_skips_excluded_symbols(index):
+    assert index.resolve("how is the NSE doing") == "NSE"
+    assert index.resolve("how is the NSE doing", exclude={"NSE"}) is None
+    assert index.resolve("NSE and safaricom today", exclude={"NSE"}) == "SCOM"
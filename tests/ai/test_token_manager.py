@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import pytest
+
+# Add necessary paths to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../ai/api_integration')))
+
+from cache import TieredCache
+from token_manager import TOKEN_NAMESPACE, SharedTokenManager, TokenUnavailable, credential_key
+
+
+@pytest.fixture
+def manager():
+    """Token manager whose tokens never leave the process"""
+    tokens = SharedTokenManager(cache=TieredCache())
+    tokens.cache.configure_namespace(TOKEN_NAMESPACE, use_l2=False)
+    return tokens
+
+
+class Fetcher:
+    """Token endpoint handing out numbered tokens"""
+
+    def __init__(self, expires_in=3600, delay=0.0):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        time.sleep(self.delay)
+        self.calls += 1
+        return {"access_token": f"token-{self.calls}", "expires_in": self.expires_in}
+
+
+def test_token_is_fetched_once_and_reused(manager):
+    fetcher = Fetcher()
+    manager.register("cbk", fetcher)
+
+    assert manager.get_token("cbk") == "token-1"
+    assert manager.get_token("cbk") == "token-1"
+    assert fetcher.calls == 1
+
+
+def test_concurrent_requests_share_one_fetch(manager):
+    fetcher = Fetcher(delay=0.2)
+    manager.register("mpesa", fetcher)
+    tokens = []
+
+    def worker():
+        tokens.append(manager.get_token("mpesa"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tokens == ["token-1"] * 8
+    assert fetcher.calls == 1
+
+
+def test_invalidate_drops_only_the_rejected_token(manager):
+    fetcher = Fetcher()
+    manager.register("cbk", fetcher)
+    token = manager.get_token("cbk")
+
+    manager.invalidate("cbk", "some-older-token")
+    assert manager.get_token("cbk") == token
+
+    manager.invalidate("cbk", token)
+    assert manager.get_token("cbk") == "token-2"
+
+
+def test_short_lived_token_is_renewed_halfway(manager):
+    manager.register("cbk", Fetcher(expires_in=100), refresh_margin=300)
+    manager.get_token("cbk")
+
+    renews_in = manager.get_stats()["tokens"]["cbk"]["renews_in"]
+
+    assert 45 <= renews_in <= 50
+
+
+def test_missing_access_token_raises(manager):
+    manager.register("cbk", lambda: {"error": "invalid_client"})
+
+    with pytest.raises(TokenUnavailable):
+        manager.get_token("cbk")
+    assert manager.get_stats()["failures"] >= 1
+
+
+def test_unregistered_token_raises(manager):
+    with pytest.raises(TokenUnavailable):
+        manager.get_token("unknown")
+
+
+def test_aget_token_returns_shared_token(manager):
+    fetcher = Fetcher()
+    manager.register("cbk", fetcher)
+
+    async def run():
+        return await asyncio.gather(*(manager.aget_token("cbk") for _ in range(3)))
+
+    assert asyncio.run(run()) == ["token-1"] * 3
+    assert fetcher.calls == 1
+
+
+def test_credential_key_is_stable_and_hides_credentials():
+    key = credential_key("client-id", "client-secret")
+
+    assert key == credential_key("client-id", "client-secret")
+    assert key != credential_key("client-id", "other-secret")
+    assert "client-secret" not in key